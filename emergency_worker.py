@@ -6,8 +6,11 @@ from worker import (
     supabase, FMP_API_KEY, 
     run_tab0_analysis, run_tab1_analysis, run_tab3_analysis, 
     run_tab4_analysis, run_tab6_analysis, run_tab2_premium_collection,
-    fetch_analyst_estimates, fetch_premium_financials, fetch_smart_money_data
+    fetch_analyst_estimates, fetch_premium_financials, fetch_smart_money_data,
+    build_ticker_graph, ticker_context, resolve_official_symbol, get_target_stocks, get_sec_master_mapping,
+    STAGE_EXECUTOR, WRITE_BUFFER
 )
+from utils.run_journal import RunJournal, input_fingerprint, latest_run
 
 def run_emergency_fix(ticker, tab_name):
     print(f"🚨 [긴급 복구] {ticker} - {tab_name} 분석 시작: {datetime.now()}")
@@ -45,10 +48,63 @@ def run_emergency_fix(ticker, tab_name):
     except Exception as e:
         print(f"❌ 복구 실패 ({ticker}): {e}")
 
+def run_journal_fix(run_id="latest", ticker=None):
+    """🧾 실행 저널에서 failed / skipped / cancelled / unconfirmed 로 끝난 (종목, 단계)만 골라 같은 run_id로 재실행"""
+    if run_id == "latest":
+        header = latest_run(supabase, unfinished_only=False)
+        if not header:
+            print("❌ 에러: 실행 저널에 기록된 실행이 없습니다.")
+            return
+        run_id = header["run_id"]
+    journal = RunJournal(supabase, WRITE_BUFFER.add, run_id)
+    pairs = journal.failed_pairs(ticker)
+    if not pairs:
+        print(f"✅ [{run_id}] 재실행할 실패 단계가 없습니다.")
+        return
+
+    by_ticker = {}
+    for t, stage in pairs: by_ticker.setdefault(t, []).append(stage)
+    print(f"🚨 [긴급 복구] {run_id}: {len(by_ticker)}개 종목 / {len(pairs)}개 단계 재실행 시작: {datetime.now()}")
+
+    # 본 워커와 같은 입력: 캘린더 행(상장 상태 / 상장일) + SEC 공식 티커 보정 → 같은 키 / 같은 실행 조건 지문
+    calendar = get_target_stocks()
+    calendar_rows = {str(r['symbol']): dict(r) for _, r in calendar.iterrows()} if not calendar.empty else {}
+    cik_mapping, name_to_ticker_map = get_sec_master_mapping()
+
+    for t, stages in by_ticker.items():
+        row = calendar_rows.get(t)
+        if row is None:
+            res = supabase.table("stock_cache").select("name").eq("symbol", t).execute()
+            if not res.data:
+                print(f"❌ 에러: {t}는 DB에 존재하지 않는 종목입니다.")
+                continue
+            print(f"⚠️ [{t}] IPO 캘린더에 없는 종목: 상장 상태 / 상장일 없이 재실행 (--resume 지문이 다를 수 있음)")
+            row = {"symbol": t, "name": res.data[0]['name']}
+        company_name = row['name']
+        official_symbol = resolve_official_symbol(row, cik_mapping, name_to_ticker_map)
+        context = ticker_context(official_symbol, row)
+        graph = build_ticker_graph(official_symbol, company_name, row, cik_mapping, t).subgraph(stages)
+
+        def on_finish(stage, status, kwargs, busy, t=t, context=context):
+            journal.record(t, stage, status, input_fingerprint(context, kwargs), busy)
+
+        stage_run = STAGE_EXECUTOR.run(graph, on_finish=on_finish)
+        print(f"{'❌' if stage_run.errors else '✅'} [{t}] {', '.join(stages)} → {stage_run.summary()}")
+
+    WRITE_BUFFER.flush_all()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="UnicornFinder 데이터 복구 엔진")
-    parser.add_argument("--ticker", required=True, help="종목 티커 (예: AAPL)")
-    parser.add_argument("--tab", required=True, help="탭 (tab0, tab1, tab2, tab3, tab4, tab6)") # tab2 추가
+    parser.add_argument("--ticker", help="종목 티커 (예: AAPL)")
+    parser.add_argument("--tab", help="탭 (tab0, tab1, tab2, tab3, tab4, tab6)") # tab2 추가
+    parser.add_argument("--from-journal", nargs="?", const="latest", default=None, metavar="RUN_ID",
+                        help="실행 저널의 실패/건너뜀/취소/미확정 단계만 재실행 (RUN_ID 생략 시 마지막 실행, --ticker로 종목 제한)")
     
     args = parser.parse_args()
-    run_emergency_fix(args.ticker.upper(), args.tab.lower())
+    if args.from_journal:
+        run_journal_fix(args.from_journal, args.ticker.upper() if args.ticker else None)
+    elif args.ticker and args.tab:
+        run_emergency_fix(args.ticker.upper(), args.tab.lower())
+    else:
+        parser.error("--ticker와 --tab을 함께 지정하거나 --from-journal을 사용하세요.")
+    STAGE_EXECUTOR.shutdown()
@@ -0,0 +1,45 @@
+-- ==========================================
+-- [리포트 인덱스] analysis_cache 메타데이터 정규화 테이블
+-- ==========================================
+-- analysis_cache는 cache_key 문자열 기반 KV 테이블이라 "종목 X / 탭 Y / 언어 Z의 리포트가 있는가"를
+-- 알려면 cache_key를 전부 내려받아 패턴을 파싱해야 했습니다.
+-- 워커가 analysis_cache에 리포트를 쓸 때마다 이 테이블에 메타데이터 한 줄을 함께 upsert 하고,
+-- 대시보드/존재 확인은 아래 인덱스와 집계 함수(RPC)로 서버에서 처리합니다.
+
+CREATE TABLE IF NOT EXISTS report_index (
+    cache_key     text PRIMARY KEY,
+    ticker        text,
+    company       text,
+    tab           text NOT NULL,
+    report_type   text NOT NULL,
+    lang          text,
+    version       text,
+    tier          text,
+    content_hash  text,
+    content_len   integer,
+    updated_at    timestamptz
+);
+
+CREATE INDEX IF NOT EXISTS report_index_ticker_idx  ON report_index (ticker, report_type, lang);
+CREATE INDEX IF NOT EXISTS report_index_company_idx ON report_index (company, report_type, lang);
+CREATE INDEX IF NOT EXISTS report_index_tab_idx     ON report_index (tab, updated_at);
+CREATE INDEX IF NOT EXISTS report_index_type_idx    ON report_index (report_type, updated_at);
+
+-- 관리자 헬스체크: 탭별 전체 리포트 수 / fresh_since 이후 갱신된 리포트 수
+CREATE OR REPLACE FUNCTION report_index_tab_stats(fresh_since timestamptz)
+RETURNS TABLE (tab text, total bigint, fresh bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT tab, count(*) AS total, count(*) FILTER (WHERE updated_at > fresh_since) AS fresh
+    FROM report_index
+    GROUP BY tab;
+$$;
+
+-- 일일 시그널 집계: since 이후 갱신된 리포트를 (종목, 리포트 종류) 단위로 중복 없이 카운트 (언어 무시)
+CREATE OR REPLACE FUNCTION report_index_type_counts(since timestamptz)
+RETURNS TABLE (report_type text, reports bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT report_type, count(DISTINCT coalesce(ticker, company)) AS reports
+    FROM report_index
+    WHERE updated_at >= since
+    GROUP BY report_type;
+$$;
@@ -0,0 +1,17 @@
+-- ==========================================
+-- [핫 쿼리 인덱스] 키가 아닌 컬럼으로 필터링하는 반복 조회용 인덱스
+-- ==========================================
+-- premium_alerts : created_at 기간 + alert_type / ticker 필터 (시장 통계, 알람 요약, 일일 시그널 집계)
+-- price_cache    : updated_at 기준 최근 갱신 종목 수 (관리자 헬스체크)
+-- watchlist      : ticker + prediction 투표 수 (커뮤니티 UP/DOWN)
+-- user_decisions : ticker 별 점수 (커뮤니티 낙관도)
+
+CREATE INDEX IF NOT EXISTS premium_alerts_created_at_idx   ON premium_alerts (created_at);
+CREATE INDEX IF NOT EXISTS premium_alerts_type_created_idx ON premium_alerts (alert_type, created_at);
+CREATE INDEX IF NOT EXISTS premium_alerts_ticker_created_idx ON premium_alerts (ticker, created_at);
+
+CREATE INDEX IF NOT EXISTS price_cache_updated_at_idx ON price_cache (updated_at);
+
+CREATE INDEX IF NOT EXISTS watchlist_ticker_prediction_idx ON watchlist (ticker, prediction);
+
+CREATE INDEX IF NOT EXISTS user_decisions_ticker_idx ON user_decisions (ticker);
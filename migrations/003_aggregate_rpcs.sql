@@ -0,0 +1,62 @@
+-- ==========================================
+-- [집계 RPC] 행을 내려받아 파이썬에서 세던 집계를 서버 함수로 이동
+-- ==========================================
+-- 호출: supabase.rpc("함수명", {파라미터}).execute()
+
+-- 알림 종류별 개수 (since 이후 created_at)
+CREATE OR REPLACE FUNCTION premium_alert_type_counts(since timestamptz)
+RETURNS TABLE (alert_type text, alerts bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT alert_type, count(*) AS alerts
+    FROM premium_alerts
+    WHERE created_at >= since
+    GROUP BY alert_type;
+$$;
+
+-- 알림 종류 x 일자별 개수 (대시보드 추이용)
+CREATE OR REPLACE FUNCTION premium_alert_daily_counts(since timestamptz)
+RETURNS TABLE (day date, alert_type text, alerts bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT created_at::date AS day, alert_type, count(*) AS alerts
+    FROM premium_alerts
+    WHERE created_at >= since
+    GROUP BY 1, 2;
+$$;
+
+-- 종목별 알림 수 + 중복 없는 알림 종류 목록 (종목마다 한 번씩 조회하던 알람 요약용)
+CREATE OR REPLACE FUNCTION premium_alert_ticker_activity(since timestamptz)
+RETURNS TABLE (ticker text, alerts bigint, alert_types text[])
+LANGUAGE sql STABLE AS $$
+    SELECT ticker, count(*) AS alerts, array_agg(DISTINCT alert_type) AS alert_types
+    FROM premium_alerts
+    WHERE created_at >= since
+    GROUP BY ticker;
+$$;
+
+-- 커뮤니티 UP/DOWN 투표 수
+CREATE OR REPLACE FUNCTION watchlist_sentiment_counts(p_ticker text)
+RETURNS TABLE (up bigint, down bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT count(*) FILTER (WHERE prediction = 'UP')   AS up,
+           count(*) FILTER (WHERE prediction = 'DOWN') AS down
+    FROM watchlist
+    WHERE ticker = p_ticker;
+$$;
+
+-- 커뮤니티 점수 분포 (score별 인원)
+CREATE OR REPLACE FUNCTION user_decision_score_histogram(p_ticker text)
+RETURNS TABLE (score integer, votes bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT score::integer, count(*) AS votes
+    FROM user_decisions
+    WHERE ticker = p_ticker AND score IS NOT NULL
+    GROUP BY 1;
+$$;
+
+-- 실시간 주가 캐시 신선도 (전체 종목 수 / fresh_since 이후 갱신된 종목 수)
+CREATE OR REPLACE FUNCTION price_cache_freshness(fresh_since timestamptz)
+RETURNS TABLE (total bigint, fresh bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT count(*) AS total, count(*) FILTER (WHERE updated_at > fresh_since) AS fresh
+    FROM price_cache;
+$$;
@@ -0,0 +1,18 @@
+-- ==========================================
+-- [보존 정책] analysis_cache 키 / 크기 스캔
+-- ==========================================
+-- utils/retention.py가 삭제 대상을 고를 때 content 본문을 내려받지 않고
+-- 키 / 종목 / 갱신 시각 / 본문 바이트 수만 cache_key 순서(keyset)로 페이지 단위 조회합니다.
+-- 호출: supabase.rpc("analysis_cache_key_sizes", {"after_key": "", "page_size": 1000}).execute()
+
+CREATE OR REPLACE FUNCTION analysis_cache_key_sizes(after_key text DEFAULT '', page_size integer DEFAULT 1000)
+RETURNS TABLE (cache_key text, ticker text, updated_at timestamptz, content_bytes integer)
+LANGUAGE sql STABLE AS $$
+    SELECT cache_key, ticker, updated_at, octet_length(content) AS content_bytes
+    FROM analysis_cache
+    WHERE cache_key > after_key
+    ORDER BY cache_key
+    LIMIT page_size;
+$$;
+
+CREATE INDEX IF NOT EXISTS analysis_cache_updated_at_idx ON analysis_cache (updated_at);
@@ -0,0 +1,40 @@
+-- ==========================================
+-- [우선순위 스케줄러] 종목별 관심도 / 리포트 신선도 집계
+-- ==========================================
+-- 워커는 실행 시간(5.5시간) 안에 가치가 큰 종목부터 분석하기 위해 (utils/priority.py)
+-- 종목별 관심도와 마지막 리포트 갱신 시각을 한 번씩만 조회합니다.
+-- 호출: supabase.rpc("ticker_interest_scores", {"since": ...}).execute()
+--       supabase.rpc("report_index_ticker_freshness", {}).execute()
+
+-- 관심도: 워치리스트 등록 수 / 최근 행동 로그 수 (각각 프리미엄 회원 분리)
+CREATE OR REPLACE FUNCTION ticker_interest_scores(since timestamptz)
+RETURNS TABLE (ticker text, watchers bigint, premium_watchers bigint, actions bigint, premium_actions bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT ticker,
+           sum(w)::bigint  AS watchers,
+           sum(pw)::bigint AS premium_watchers,
+           sum(a)::bigint  AS actions,
+           sum(pa)::bigint AS premium_actions
+    FROM (
+        SELECT w.ticker, 1 AS w, (COALESCE(u.membership_level, '') IN ('premium', 'premium_plus'))::int AS pw, 0 AS a, 0 AS pa
+        FROM watchlist w LEFT JOIN users u ON u.id::text = w.user_id::text
+        UNION ALL
+        SELECT l.ticker, 0, 0, 1, (COALESCE(u.membership_level, '') IN ('premium', 'premium_plus'))::int
+        FROM action_logs l LEFT JOIN users u ON u.id::text = l.user_id::text
+        WHERE l.created_at >= since
+    ) t
+    WHERE ticker IS NOT NULL
+    GROUP BY ticker;
+$$;
+
+-- 종목별 마지막 리포트 갱신 시각
+CREATE OR REPLACE FUNCTION report_index_ticker_freshness()
+RETURNS TABLE (ticker text, last_updated timestamptz, reports bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT ticker, max(updated_at) AS last_updated, count(*) AS reports
+    FROM report_index
+    WHERE ticker IS NOT NULL
+    GROUP BY ticker;
+$$;
+
+CREATE INDEX IF NOT EXISTS action_logs_created_at_idx ON action_logs (created_at);
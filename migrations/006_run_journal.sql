@@ -0,0 +1,24 @@
+-- ==========================================
+-- [실행 저널] 워커 실행의 종목 x 단계별 완료 기록
+-- ==========================================
+-- 워커(utils/run_journal.py)가 단계가 끝날 때마다 (run_id, ticker, stage, status, fingerprint)를 upsert 합니다.
+--   ticker = '*' : 실행 전체 단계 (stage = 'run' 헤더 행의 detail에는 계획된 종목 목록 JSON)
+--   status       : done / failed / skipped (입력 단계 실패로 건너뜀) / cancelled (실행 취소로 멈춤)
+--                  / started · interrupted · finished (헤더 전용)
+-- python worker.py --resume 은 마지막 미완료 실행의 done이 아닌 단계만 이어서 실행하고,
+-- python emergency_worker.py --from-journal 은 failed / skipped / cancelled 단계만 골라 재실행합니다.
+
+CREATE TABLE IF NOT EXISTS run_journal (
+    run_id       text NOT NULL,
+    ticker       text NOT NULL,
+    stage        text NOT NULL,
+    status       text NOT NULL,
+    fingerprint  text,
+    duration_sec real,
+    detail       text,
+    updated_at   timestamptz DEFAULT now(),
+    PRIMARY KEY (run_id, ticker, stage)
+);
+
+CREATE INDEX IF NOT EXISTS run_journal_header_idx ON run_journal (stage, updated_at DESC) WHERE ticker = '*';
+CREATE INDEX IF NOT EXISTS run_journal_status_idx ON run_journal (run_id, status);
@@ -0,0 +1,67 @@
+-- ==========================================
+-- [샤드 워커] 종목 배치 / 전역 단계 리스(lease) 테이블
+-- ==========================================
+-- 여러 워커 프로세스(또는 Actions matrix 작업)가 같은 cycle_id로 실행되면 (utils/leases.py)
+--   unit = 'leader'         : 리더 락. 리더만 전역 단계(매크로 / stock_cache / 타겟 선별)를 실행하고 배치를 게시
+--   unit = 'batch:0007'     : 종목 배치 (payload = 종목 행 JSON, seq = 우선순위 순서)
+--   unit = 'phase:alerts'   : 배치가 모두 끝난 뒤 한 번만 실행할 전역 단계
+-- 리스를 가진 프로세스는 heartbeat로 lease_until을 연장하고, 만료된 리스는 다른 프로세스가 회수합니다.
+-- 호출: supabase.rpc("acquire_worker_lease", {...}) / rpc("claim_worker_batch", {...}) / rpc("renew_worker_leases", {...})
+
+CREATE TABLE IF NOT EXISTS worker_leases (
+    cycle_id     text NOT NULL,
+    unit         text NOT NULL,
+    kind         text NOT NULL DEFAULT 'batch',
+    seq          integer NOT NULL DEFAULT 0,
+    status       text NOT NULL DEFAULT 'pending',   -- pending / leased / done
+    holder       text,
+    lease_until  timestamptz,
+    heartbeat_at timestamptz,
+    attempts     integer NOT NULL DEFAULT 0,
+    payload      text,
+    updated_at   timestamptz DEFAULT now(),
+    PRIMARY KEY (cycle_id, unit)
+);
+
+CREATE INDEX IF NOT EXISTS worker_leases_claim_idx ON worker_leases (cycle_id, kind, status, seq);
+
+-- 지정한 단위의 리스 획득 (없으면 생성). 완료되지 않았고 비어 있거나 만료됐거나 이미 내 것일 때만 성공 → 행 1개 반환
+CREATE OR REPLACE FUNCTION acquire_worker_lease(p_cycle text, p_unit text, p_kind text, p_holder text, p_lease_sec integer)
+RETURNS TABLE (unit text, status text, attempts integer, payload text)
+LANGUAGE sql VOLATILE AS $$
+    INSERT INTO worker_leases AS l (cycle_id, unit, kind, status, holder, lease_until, heartbeat_at, attempts, updated_at)
+    VALUES (p_cycle, p_unit, p_kind, 'leased', p_holder, now() + make_interval(secs => p_lease_sec), now(), 1, now())
+    ON CONFLICT (cycle_id, unit) DO UPDATE
+        SET status = 'leased', holder = EXCLUDED.holder, lease_until = EXCLUDED.lease_until,
+            heartbeat_at = now(), attempts = l.attempts + 1, updated_at = now()
+        WHERE l.status <> 'done' AND (l.lease_until IS NULL OR l.lease_until < now() OR l.holder = EXCLUDED.holder)
+    RETURNING l.unit, l.status, l.attempts, l.payload;
+$$;
+
+-- 아직 끝나지 않은 배치 중 비어 있거나 만료된 것 하나를 우선순위(seq) 순으로 가져감
+CREATE OR REPLACE FUNCTION claim_worker_batch(p_cycle text, p_holder text, p_lease_sec integer)
+RETURNS TABLE (unit text, status text, attempts integer, payload text)
+LANGUAGE sql VOLATILE AS $$
+    UPDATE worker_leases AS l
+    SET status = 'leased', holder = p_holder, lease_until = now() + make_interval(secs => p_lease_sec),
+        heartbeat_at = now(), attempts = l.attempts + 1, updated_at = now()
+    WHERE (l.cycle_id, l.unit) = (
+        SELECT c.cycle_id, c.unit FROM worker_leases c
+        WHERE c.cycle_id = p_cycle AND c.kind = 'batch' AND c.status <> 'done'
+          AND (c.lease_until IS NULL OR c.lease_until < now())
+        ORDER BY c.seq
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING l.unit, l.status, l.attempts, l.payload;
+$$;
+
+-- heartbeat: 내가 가진 (완료 안 된) 리스를 모두 연장하고, 아직 내 것인 단위 목록을 반환
+CREATE OR REPLACE FUNCTION renew_worker_leases(p_cycle text, p_holder text, p_lease_sec integer)
+RETURNS TABLE (unit text)
+LANGUAGE sql VOLATILE AS $$
+    UPDATE worker_leases AS l
+    SET lease_until = now() + make_interval(secs => p_lease_sec), heartbeat_at = now()
+    WHERE l.cycle_id = p_cycle AND l.holder = p_holder AND l.status = 'leased'
+    RETURNING l.unit;
+$$;
@@ -0,0 +1,20 @@
+-- ==========================================
+-- [변경 감지] 종목 x 단계별 마지막 완료 시각 (실행 저널 기준)
+-- ==========================================
+-- 워커의 사전 점검(utils/change_detect.py)은 이 시각 이후에 피드(뉴스 / 등급 / 실적 / 공시 ...)에
+-- 새 이벤트가 있었던 (종목, 단계)만 실행 계획에 넣습니다.
+-- 결과가 PostgREST 최대 행 수를 넘을 수 있어 (ticker, stage) 키셋 페이지로 호출합니다.
+-- 호출: supabase.rpc("stage_last_checked", {"since": ..., "after_ticker": "", "after_stage": "", "page_size": 1000})
+
+CREATE INDEX IF NOT EXISTS run_journal_done_idx ON run_journal (ticker, stage, updated_at DESC) WHERE status = 'done';
+
+CREATE OR REPLACE FUNCTION stage_last_checked(since timestamptz, after_ticker text, after_stage text, page_size integer)
+RETURNS TABLE (ticker text, stage text, last_done timestamptz, fingerprint text)
+LANGUAGE sql STABLE AS $$
+    SELECT DISTINCT ON (j.ticker, j.stage) j.ticker, j.stage, j.updated_at AS last_done, j.fingerprint
+    FROM run_journal j
+    WHERE j.status = 'done' AND j.ticker <> '*' AND j.updated_at >= since
+      AND (j.ticker, j.stage) > (after_ticker, after_stage)
+    ORDER BY j.ticker, j.stage, j.updated_at DESC
+    LIMIT page_size;
+$$;
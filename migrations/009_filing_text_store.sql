@@ -0,0 +1,13 @@
+-- ==========================================
+-- [공시 본문 저장소] accession 번호 기반 공유 티어 (utils/filing_store.py)
+-- ==========================================
+-- FILING_STORE_SHARED=1 인 워커들이 정제된 SEC 공시 본문을 공유합니다.
+-- 로컬 SQLite에 없는 본문은 이 테이블에서 먼저 찾고, 없을 때만 SEC에서 다운로드합니다.
+
+CREATE TABLE IF NOT EXISTS filing_text_store (
+    accession  text PRIMARY KEY,      -- 숫자만 남긴 accession 번호
+    sha256     text,
+    text_len   integer,
+    body       text,                  -- zlib 압축 후 base64 인코딩
+    stored_at  timestamptz DEFAULT now()
+);
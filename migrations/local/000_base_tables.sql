@@ -0,0 +1,61 @@
+-- ==========================================
+-- [로컬 전용] Supabase 기본 테이블 최소 스키마
+-- ==========================================
+-- 운영 DB에는 이미 있는 테이블입니다. 로컬 Postgres에서 마이그레이션/RPC를 검증할 때만
+--   python -m utils.migrations --dsn postgresql://localhost/unicorn --local --smoke
+-- 로 먼저 적용됩니다. (운영 DB에는 적용하지 마세요)
+
+CREATE TABLE IF NOT EXISTS analysis_cache (
+    cache_key  text PRIMARY KEY,
+    content    text,
+    updated_at timestamptz DEFAULT now(),
+    ticker     text,
+    tab_name   text,
+    lang       text,
+    data_type  text,
+    tier       text
+);
+
+CREATE TABLE IF NOT EXISTS premium_alerts (
+    id         bigserial PRIMARY KEY,
+    ticker     text NOT NULL,
+    alert_type text NOT NULL,
+    title      text,
+    message    text,
+    created_at timestamptz DEFAULT now(),
+    UNIQUE (ticker, alert_type)
+);
+
+CREATE TABLE IF NOT EXISTS price_cache (
+    ticker     text PRIMARY KEY,
+    price      numeric,
+    updated_at timestamptz DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS watchlist (
+    user_id    text NOT NULL,
+    ticker     text NOT NULL,
+    prediction text,
+    PRIMARY KEY (user_id, ticker)
+);
+
+CREATE TABLE IF NOT EXISTS user_decisions (
+    user_id    text NOT NULL,
+    ticker     text NOT NULL,
+    score      integer,
+    updated_at timestamptz DEFAULT now(),
+    PRIMARY KEY (user_id, ticker)
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id               text PRIMARY KEY,
+    membership_level text DEFAULT 'free'
+);
+
+CREATE TABLE IF NOT EXISTS action_logs (
+    id          bigserial PRIMARY KEY,
+    user_id     text,
+    ticker      text,
+    action_type text,
+    created_at  timestamptz DEFAULT now()
+);
@@ -62,6 +62,9 @@ try:
     # [신규] Supabase 라이브러리 및 초기화
     # ==========================================
     from supabase import create_client, Client
+    from utils.bulk_writer import BulkWriter
+    from utils.ticker_alias import ALIAS_MAP_KEY, alias_cache_keys, pick_best_row
+    from utils.paged_reader import iter_pages, fetch_all_rows, fetch_dict, fetch_dataframe
 
     # 1. Supabase 연결 초기화 (리소스 캐싱)
     @st.cache_resource
@@ -127,37 +130,27 @@ def batch_upsert(table_name, data_list, on_conflict="ticker"):
     변경: 리스트 전체를 1번에 호출 (빠름, 안정적)
     """
     if not data_list: return
-    
-    url = st.secrets["supabase"]["url"].rstrip('/')
-    key = st.secrets["supabase"]["key"]
-    
-    # URL 및 엔드포인트 설정
-    base_url = url if "/rest/v1" in url else f"{url}/rest/v1"
-    endpoint = f"{base_url}/{table_name}?on_conflict={on_conflict}"
-    
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-        "Prefer": "resolution=merge-duplicates" # 중복 시 덮어쓰기 허용
-    }
 
-    # 데이터 정제 및 벌크 전송용 리스트 생성
+    # 데이터 정제 및 벌크 전송용 리스트 생성 ('ticker,target_date' 같은 복합 키도 모든 컬럼이 있어야 통과)
+    conflict_cols = [c.strip() for c in on_conflict.split(',')]
     clean_batch = []
     for item in data_list:
         payload = {k: sanitize_value(v) for k, v in item.items()}
-        if payload.get(on_conflict):
+        if all(payload.get(c) for c in conflict_cols):
             clean_batch.append(payload)
 
     if not clean_batch: return
 
-    try:
-        # [핵심] 리스트 전체를 한 번의 POST로 전송!
-        resp = requests.post(endpoint, json=clean_batch, headers=headers)
-        if resp.status_code not in [200, 201, 204]:
-            st.error(f"DB 업데이트 실패: {resp.text}")
-    except Exception as e:
-        st.error(f"통신 오류: {e}")
+    # [핵심] 공용 대량 쓰기 엔진으로 전송 (크기 분할 / gzip / 지터 재시도)
+    if not get_bulk_writer().upsert(table_name, clean_batch, on_conflict):
+        st.error(f"DB 업데이트 실패: {table_name}")
+
+@st.cache_resource
+def get_bulk_writer():
+    """앱 전역에서 공유하는 대량 쓰기 엔진 (세션 재사용)"""
+    url = st.secrets["supabase"]["url"]
+    key = st.secrets["supabase"]["key"]
+    return BulkWriter(url, key, prefer="resolution=merge-duplicates") # 중복 시 덮어쓰기 허용
             
 # 2. 데이터 캐싱 함수 (데이터 캐싱: 3초 -> 0.1초 마법)
 @st.cache_data(ttl=600)  # 600초(10분) 동안 메모리에 저장
@@ -170,15 +163,12 @@ def load_price_data():
         return pd.DataFrame()
 
     try:
-        # 1. Supabase에서 모든 데이터 조회 (행 제한 없이)
-        response = supabase.table("price_cache").select("*").execute()
+        # 1. Supabase에서 모든 데이터를 페이지 단위로 조회 (서버 기본 행 제한에 잘리지 않도록)
+        df = fetch_dataframe(supabase, "price_cache", "*", order="ticker", workers=4)
         
         # 2. 데이터가 없으면 빈 DataFrame 반환
-        if not response.data:
+        if df.empty:
             return pd.DataFrame()
-            
-        # 3. DataFrame으로 변환
-        df = pd.DataFrame(response.data)
         
         # 4. 숫자형 변환 및 날짜 정리 (오류 방지)
         if 'price' in df.columns:
@@ -309,13 +299,19 @@ def db_load_all_users():
 def db_load_sentiment_counts(ticker):
     """watchlist 테이블에서 해당 종목의 UP/DOWN 개수를 집계 (디버깅 추가)"""
     try:
-        # 상승(UP) 투표 수 조회
-        up_res = supabase.table("watchlist").select("ticker", count="exact").eq("ticker", ticker).eq("prediction", "UP").execute()
-        up_count = up_res.count if up_res.count is not None else 0
-        
-        # 하락(DOWN) 투표 수 조회
-        down_res = supabase.table("watchlist").select("ticker", count="exact").eq("ticker", ticker).eq("prediction", "DOWN").execute()
-        down_count = down_res.count if down_res.count is not None else 0
+        # 상승(UP)/하락(DOWN) 투표 수를 서버 집계 RPC 한 번으로 조회
+        try:
+            res = supabase.rpc("watchlist_sentiment_counts", {"p_ticker": ticker}).execute()
+            row = res.data[0] if res.data else {}
+            up_count = int(row.get('up') or 0)
+            down_count = int(row.get('down') or 0)
+        except Exception as e:
+            # 집계 RPC(migrations/003)가 없는 DB면 기존 count 조회로 대체
+            print(f"Sentiment RPC Error (fallback to count): {e}")
+            up_res = supabase.table("watchlist").select("ticker", count="exact").eq("ticker", ticker).eq("prediction", "UP").execute()
+            up_count = up_res.count if up_res.count is not None else 0
+            down_res = supabase.table("watchlist").select("ticker", count="exact").eq("ticker", ticker).eq("prediction", "DOWN").execute()
+            down_count = down_res.count if down_res.count is not None else 0
         
         # [디버그 로그]
         print(f"--- DB Fetch Debug ({ticker}) --- UP: {up_count}, DOWN: {down_count}")
@@ -591,10 +587,18 @@ def db_load_user_specific_decisions(user_id, ticker):
 def db_load_community_scores(ticker):
     """특정 종목(ticker)에 대한 모든 실제 유저의 점수 리스트를 불러옴"""
     try:
-        res = supabase.table("user_decisions").select("score").eq("ticker", ticker).execute()
-        if res.data:
-            return [item['score'] for item in res.data]
-        return []
+        # 점수별 인원(히스토그램)만 서버에서 받아 리스트로 복원 (점수 종류는 -5~+5 범위라 응답이 작음)
+        try:
+            res = supabase.rpc("user_decision_score_histogram", {"p_ticker": ticker}).execute()
+        except Exception as e:
+            # 집계 RPC(migrations/003)가 없는 DB면 행 단위로 읽음
+            print(f"Community RPC Error (fallback to scan): {e}")
+            rows = fetch_all_rows(supabase, "user_decisions", "id, score", order="id", filters=lambda q: q.eq("ticker", ticker))
+            return [item['score'] for item in rows]
+        scores = []
+        for item in res.data or []:
+            scores += [item['score']] * int(item['votes'] or 0)
+        return scores
     except Exception as e:
         print(f"Community Load Error: {e}")
         return []
@@ -688,6 +692,31 @@ model = configure_genai()
 # [1] 통합 분석 함수 (Tab 1 & Tab 4 대체용) - 프롬프트 강화판
 # ---------------------------------------------------------
 
+# ---------------------------------------------------------
+# [티커 별칭] 우선주/유닛 티커 ↔ 본주 티커 읽기 시점 해석
+# ---------------------------------------------------------
+@st.cache_data(show_spinner=False, ttl=3600)
+def get_ticker_alias_map():
+    """워커가 저장한 { 별칭 티커: 본주 티커 } 매핑을 가져옵니다."""
+    try:
+        res = supabase.table("analysis_cache").select("content").eq("cache_key", ALIAS_MAP_KEY).execute()
+        if res.data:
+            import json
+            return json.loads(res.data[0]['content'])
+    except Exception as e:
+        print(f"Ticker Alias Map Error: {e}")
+    return {}
+
+def select_cache_with_alias(cache_key, ticker):
+    """cache_key 한 줄을 조회하되, 없거나 빈약하면 같은 본주를 공유하는 티커의 키를 대신 사용합니다. (.in_ 한 번)"""
+    from types import SimpleNamespace
+    keys = alias_cache_keys(cache_key, ticker, get_ticker_alias_map())
+    if len(keys) == 1:
+        return supabase.table("analysis_cache").select("content").eq("cache_key", cache_key).execute()
+    res = supabase.table("analysis_cache").select("cache_key, content, updated_at").in_("cache_key", keys).execute()
+    best = pick_best_row(res.data, cache_key)
+    return SimpleNamespace(data=[best] if best else [])
+
 # (A) Tab 1용: 비즈니스 요약 + 뉴스 통합 (동적 캐싱 및 맞춤형 프롬프트 적용)
 @st.cache_data(show_spinner=False, ttl=600)
 def get_unified_tab1_analysis(company_name, ticker, lang_code, ipo_status="Active", ipo_date_str=None):
@@ -695,7 +724,7 @@ def get_unified_tab1_analysis(company_name, ticker, lang_code, ipo_status="Activ
     cache_key = f"{ticker}_Tab1_v5_{lang_code}"
     
     try:
-        res = supabase.table("analysis_cache").select("content").eq("cache_key", cache_key).execute()
+        res = select_cache_with_alias(cache_key, ticker)
         if res.data:
             import json
             saved_data = json.loads(res.data[0]['content'])
@@ -716,10 +745,10 @@ def get_premium_tab1_summaries(ticker, lang_code):
     """[Tab 1] 프리미엄 뉴스 및 보도자료 AI 요약본을 DB에서 가져옵니다."""
     news_summary, pr_summary = "", ""
     try:
-        res_n = supabase.table("analysis_cache").select("content").eq("cache_key", f"{ticker}_PremiumNewsSummary_v1_{lang_code}").execute()
+        res_n = select_cache_with_alias(f"{ticker}_PremiumNewsSummary_v1_{lang_code}", ticker)
         if res_n.data: news_summary = res_n.data[0]['content']
         
-        res_p = supabase.table("analysis_cache").select("content").eq("cache_key", f"{ticker}_PressReleaseSummary_v1_{lang_code}").execute()
+        res_p = select_cache_with_alias(f"{ticker}_PressReleaseSummary_v1_{lang_code}", ticker)
         if res_p.data: pr_summary = res_p.data[0]['content']
     except Exception as e:
         print(f"Premium Tab1 Cache Error: {e}")
@@ -730,7 +759,7 @@ def get_premium_tab1_summaries(ticker, lang_code):
 def get_premium_tab0_ec(ticker, lang_code):
     """[Tab 0] 어닝 콜 AI 요약본을 DB에서 가져옵니다."""
     try:
-        res = supabase.table("analysis_cache").select("content").eq("cache_key", f"{ticker}_PremiumEarningsCall_v1_{lang_code}").execute()
+        res = select_cache_with_alias(f"{ticker}_PremiumEarningsCall_v1_{lang_code}", ticker)
         if res.data: return res.data[0]['content']
     except: pass
     return ""
@@ -739,7 +768,7 @@ def get_premium_tab0_ec(ticker, lang_code):
 def get_premium_tab2_esg(ticker, lang_code):
     """[Tab 2] ESG 평가 AI 요약본을 DB에서 가져옵니다."""
     try:
-        res = supabase.table("analysis_cache").select("content").eq("cache_key", f"{ticker}_PremiumESG_v1_{lang_code}").execute()
+        res = select_cache_with_alias(f"{ticker}_PremiumESG_v1_{lang_code}", ticker)
         if res.data: return res.data[0]['content']
     except: pass
     return ""
@@ -774,9 +803,9 @@ def get_cached_raw_financials(symbol):
     """
     fin_data = {'status': 'Error'}
     try:
-        # 워커가 '{symbol}_Raw_Financials' 키로 저장했다고 가정
+        # 워커가 '{symbol}_Raw_Financials' 키로 저장했다고 가정 (본주 / 우선주 / 유닛은 별칭 키까지 조회)
         cache_key = f"{symbol}_Raw_Financials"
-        res = supabase.table("analysis_cache").select("content").eq("cache_key", cache_key).execute()
+        res = select_cache_with_alias(cache_key, symbol)
         
         if res.data:
             import json
@@ -1444,8 +1473,7 @@ def generate_alerts_from_db(supabase, df_calendar):
     new_alerts = []
 
     # 1. DB에서 가장 최신 주가 정보 전체를 한 번에 가져옴 (속도 0.1초)
-    res = supabase.table("price_cache").select("ticker, price").execute()
-    db_prices = {row['ticker']: float(row['price']) for row in res.data if row['price']}
+    db_prices = fetch_dict(supabase, "price_cache", "ticker", lambda row: float(row['price']) if row['price'] else None, "ticker, price")
 
     # 2. 캘린더 데이터를 돌면서 분석
     for _, row in df_calendar.iterrows():
@@ -1613,7 +1641,7 @@ def get_financial_report_analysis(company_name, ticker, metrics, lang_code):
     cache_key = f"{ticker}_Tab3_v2_Premium_{lang_code}"
     
     try:
-        res = supabase.table("analysis_cache").select("content").eq("cache_key", cache_key).execute()
+        res = select_cache_with_alias(cache_key, ticker)
         if res.data:
             return res.data[0]['content']
     except Exception as e:
@@ -1634,10 +1662,10 @@ def get_premium_tab3_summaries(ticker, lang_code):
     """[Tab 3] 어닝 서프라이즈 및 실적 전망치 AI 요약본을 DB에서 가져옵니다."""
     surp_summary, est_summary = "", ""
     try:
-        res_s = supabase.table("analysis_cache").select("content").eq("cache_key", f"{ticker}_PremiumSurprise_v1_{lang_code}").execute()
+        res_s = select_cache_with_alias(f"{ticker}_PremiumSurprise_v1_{lang_code}", ticker)
         if res_s.data: surp_summary = res_s.data[0]['content']
         
-        res_e = supabase.table("analysis_cache").select("content").eq("cache_key", f"{ticker}_PremiumEstimate_v1_{lang_code}").execute()
+        res_e = select_cache_with_alias(f"{ticker}_PremiumEstimate_v1_{lang_code}", ticker)
         if res_e.data: est_summary = res_e.data[0]['content']
     except Exception as e:
         print(f"Premium Tab3 Cache Error: {e}")
@@ -1648,7 +1676,7 @@ def get_premium_tab3_summaries(ticker, lang_code):
 def get_premium_tab3_revenue(ticker, lang_code):
     """[Tab 3] 부문별 매출 비중 AI 요약본을 DB에서 가져옵니다."""
     try:
-        res = supabase.table("analysis_cache").select("content").eq("cache_key", f"{ticker}_PremiumRevenueSeg_v1_{lang_code}").execute()
+        res = select_cache_with_alias(f"{ticker}_PremiumRevenueSeg_v1_{lang_code}", ticker)
         if res.data: return res.data[0]['content']
     except: pass
     return ""
@@ -1658,10 +1686,10 @@ def get_premium_tab4_summaries(ticker, lang_code):
     """[Tab 4] 투자의견 히스토리 및 경쟁사 비교 AI 요약본을 DB에서 가져옵니다."""
     ud_summary, peers_summary = "", ""
     try:
-        res_ud = supabase.table("analysis_cache").select("content").eq("cache_key", f"{ticker}_PremiumUpgrades_v1_{lang_code}").execute()
+        res_ud = select_cache_with_alias(f"{ticker}_PremiumUpgrades_v1_{lang_code}", ticker)
         if res_ud.data: ud_summary = res_ud.data[0]['content']
         
-        res_p = supabase.table("analysis_cache").select("content").eq("cache_key", f"{ticker}_PremiumPeers_v1_{lang_code}").execute()
+        res_p = select_cache_with_alias(f"{ticker}_PremiumPeers_v1_{lang_code}", ticker)
         if res_p.data: peers_summary = res_p.data[0]['content']
     except Exception as e:
         print(f"Premium Tab4 Cache Error: {e}")
@@ -1683,7 +1711,7 @@ def get_sudden_additions():
 def get_premium_tab4_ma(ticker, lang_code):
     """[Tab 4] M&A 내역 AI 요약본을 DB에서 가져옵니다."""
     try:
-        res = supabase.table("analysis_cache").select("content").eq("cache_key", f"{ticker}_PremiumMA_v1_{lang_code}").execute()
+        res = select_cache_with_alias(f"{ticker}_PremiumMA_v1_{lang_code}", ticker)
         if res.data: return res.data[0]['content']
     except: pass
     return ""
@@ -1770,7 +1798,7 @@ def get_unified_tab4_analysis(company_name, ticker, lang_code, ipo_status="Activ
     cache_key = f"{ticker}_Tab4_v4_Premium_{lang_code}"
     
     try:
-        res = supabase.table("analysis_cache").select("content").eq("cache_key", cache_key).execute()
+        res = select_cache_with_alias(cache_key, ticker)
         if res.data:
             import json
             return json.loads(res.data[0]['content'])
@@ -1900,7 +1928,7 @@ def get_smart_money_analysis_app(company_name, ticker, lang_code):
     cache_key = f"{ticker}_Tab6_SmartMoney_v1_{lang_code}"
     
     try:
-        res = supabase.table("analysis_cache").select("content").eq("cache_key", cache_key).execute()
+        res = select_cache_with_alias(cache_key, ticker)
         if res.data: 
             return res.data[0]['content']
     except Exception as e:
@@ -4102,12 +4130,19 @@ elif st.session_state.page == 'setup':
                 now = datetime.now()
                 
                 # [1] 주가 캐시 (Price) 모니터링
-                res_price_all = supabase.table("price_cache").select("ticker", count="exact").execute()
-                total_price_cnt = res_price_all.count if res_price_all and res_price_all.count else 1
-                
                 thirty_mins_ago = (now - timedelta(minutes=30)).isoformat()
-                res_price_active = supabase.table("price_cache").select("ticker").gt("updated_at", thirty_mins_ago).execute()
-                active_price_cnt = len(res_price_active.data) if res_price_active.data else 0
+                try:
+                    res_price_fresh = supabase.rpc("price_cache_freshness", {"fresh_since": thirty_mins_ago}).execute()
+                    price_row = res_price_fresh.data[0] if res_price_fresh.data else {}
+                    total_price_cnt = int(price_row.get('total') or 0) or 1
+                    active_price_cnt = int(price_row.get('fresh') or 0)
+                except Exception as e:
+                    # 집계 RPC(migrations/003)가 없는 DB면 기존 count 조회로 대체
+                    print(f"Price Freshness RPC Error (fallback to count): {e}")
+                    res_price_all = supabase.table("price_cache").select("ticker", count="exact").limit(1).execute()
+                    total_price_cnt = res_price_all.count if res_price_all and res_price_all.count else 1
+                    res_price_active = supabase.table("price_cache").select("ticker", count="exact").gt("updated_at", thirty_mins_ago).limit(1).execute()
+                    active_price_cnt = res_price_active.count or 0
                 
                 price_pct = int((active_price_cnt / total_price_cnt) * 100) if total_price_cnt > 0 else 0
                 
@@ -4117,8 +4152,6 @@ elif st.session_state.page == 'setup':
                 is_market_open = (now_est.weekday() < 5) and (4 <= now_est.hour <= 20)
                 
                 # [2] AI 리포트 전체 캐시 (Tab 0 ~ 6) 모니터링
-                res_analysis_all = supabase.table("analysis_cache").select("cache_key, updated_at").execute()
-                
                 tab0_total = 0; tab0_fresh = 0
                 tab1_total = 0; tab1_fresh = 0
                 tab2_total = 0; tab2_fresh = 0
@@ -4128,8 +4161,24 @@ elif st.session_state.page == 'setup':
                 
                 seven_days_ago = now - timedelta(days=7)
                 
-                if res_analysis_all.data:
-                    for item in res_analysis_all.data:
+                # 💡 [리포트 인덱스] 탭별 집계는 서버(report_index_tab_stats RPC)에서 처리
+                # 인덱스가 아직 없으면(마이그레이션 미적용) 예전처럼 analysis_cache를 페이지 단위로 스캔
+                try:
+                    tab_stats = supabase.rpc("report_index_tab_stats", {"fresh_since": seven_days_ago.isoformat()}).execute().data or []
+                    tab_counts = {r['tab']: (int(r['total'] or 0), int(r['fresh'] or 0)) for r in tab_stats}
+                    tab0_total, tab0_fresh = tab_counts.get("tab0", (0, 0))
+                    tab1_total, tab1_fresh = tab_counts.get("tab1", (0, 0))
+                    tab2_total, tab2_fresh = tab_counts.get("tab2", (0, 0))
+                    tab3_total, tab3_fresh = tab_counts.get("tab3", (0, 0))
+                    tab4_total, tab4_fresh = tab_counts.get("tab4", (0, 0))
+                    tab6_total, tab6_fresh = tab_counts.get("tab6", (0, 0))
+                    analysis_pages = []
+                except Exception as e:
+                    print(f"Report Index Stats Error (fallback to scan): {e}")
+                    analysis_pages = iter_pages(supabase, "analysis_cache", "cache_key, updated_at", order="cache_key", workers=4)
+                
+                for page in analysis_pages:
+                    for item in page:
                         key = item['cache_key']
                         try:
                             item_time_str = str(item['updated_at']).split('.')[0].replace('Z', '')
@@ -4216,9 +4265,10 @@ elif st.session_state.page == 'setup':
 
             try:
                 # 오늘 자정 이후 업데이트된 모든 캐시 가져오기
-                res_premium = supabase.table("analysis_cache").select("cache_key, updated_at").gte("updated_at", today_iso).execute()
+                premium_rows = fetch_all_rows(supabase, "analysis_cache", "cache_key, updated_at", order="cache_key",
+                                              filters=lambda q: q.gte("updated_at", today_iso))
                 
-                if res_premium.data:
+                if premium_rows:
                     # 워커 코드에서 확인한 '프리미엄 전용' 키워드들
                     premium_keywords = [
                         "PremiumEarningsCall", "PressReleaseSummary", "PremiumESG", 
@@ -4227,7 +4277,7 @@ elif st.session_state.page == 'setup':
                     ]
                     
                     # 프리미엄 키워드가 포함된 데이터만 필터링
-                    premium_data = [item for item in res_premium.data if any(kw in item['cache_key'] for kw in premium_keywords)]
+                    premium_data = [item for item in premium_rows if any(kw in item['cache_key'] for kw in premium_keywords)]
                     
                     if premium_data:
                         df_prem = pd.DataFrame(premium_data)
@@ -4841,9 +4891,16 @@ with main_area.container():
                 # 🔍 8-K 데이터 존재 여부 확인
                 has_8k = False
                 try:
-                    r_8k = supabase.table("analysis_cache").select("cache_key").eq("cache_key", f"{stock['name']}_8-K_Tab0_v16_{st.session_state.lang}").execute()
+                    # 💡 [리포트 인덱스] 회사명 문자열 키 대신 (ticker, 리포트 종류, 언어)로 확인
+                    r_8k = supabase.table("report_index").select("cache_key").eq("ticker", stock['symbol']).eq("report_type", "8-K").eq("lang", st.session_state.lang).limit(1).execute()
                     if r_8k.data: has_8k = True
                 except: pass
+                if not has_8k:
+                    # 인덱스 테이블이 아직 없거나, 워커가 이름 보정한 공식 티커로 인덱스를 남긴 경우 → 회사명 키로 조회
+                    try:
+                        r_8k = supabase.table("analysis_cache").select("cache_key").eq("cache_key", f"{stock['name']}_8-K_Tab0_v16_{st.session_state.lang}").execute()
+                        if r_8k.data: has_8k = True
+                    except: pass
                 if has_8k: btn_layout.append(("8-K", "primary"))
             
                 valid_topics = [b[0] for b in btn_layout]
@@ -5271,7 +5328,7 @@ with main_area.container():
                     data_source = "FMP Premium API" if (fin_data and len(fin_data) > 5) else "Data Unavailable"
                     
                     # 🚀 [핵심 1] 3D 카드용 '심층 요약 조각' 로드 (Tab3_Summary)
-                    res_sum = supabase.table("analysis_cache").select("content").eq("cache_key", f"{sid}_Tab3_Summary_{curr_lang}").execute()
+                    res_sum = select_cache_with_alias(f"{sid}_Tab3_Summary_{curr_lang}", sid)
                     sum_text = res_sum.data[0]['content'] if res_sum.data else ""
                     
                     # 💡 [정규식 클리너 추가] AI가 남긴 잡다한 텍스트 제거
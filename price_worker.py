@@ -6,6 +6,9 @@ import pytz
 import time
 import re
 
+from utils.storage import create_storage_client, create_bulk_writer, is_local_backend
+from utils.paged_reader import fetch_all_rows
+
 # [1] 환경 설정
 SUPABASE_URL = os.environ.get("SUPABASE_URL", "").strip().rstrip('/')
 if "/rest/v1" in SUPABASE_URL:
@@ -13,24 +16,19 @@ if "/rest/v1" in SUPABASE_URL:
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "").strip()
 FMP_API_KEY = os.environ.get("FMP_API_KEY", "").strip()
 
-if not SUPABASE_URL or not SUPABASE_KEY:
+if (not SUPABASE_URL or not SUPABASE_KEY) and not is_local_backend():
     print("❌ 에러: Supabase 환경변수 누락", flush=True); exit(1)
 if not FMP_API_KEY:
     print("❌ 에러: FMP_API_KEY 환경변수 누락", flush=True); exit(1)
 
+# 🚀 [대량 쓰기 엔진] 크기 분할 + gzip + 지터 재시도 (worker와 공용)
+BULK_WRITER = create_bulk_writer(SUPABASE_URL, SUPABASE_KEY, timeout=20, log_fn=lambda msg: print(msg, flush=True))
+# 🗄️ 조회용 클라이언트 (STORAGE_BACKEND=sqlite 이면 로컬 SQLite)
+STORAGE = create_storage_client(SUPABASE_URL, SUPABASE_KEY)
+
 def batch_upsert_raw(table_name, data_list, on_conflict="ticker"):
     if not data_list: return False
-    endpoint = f"{SUPABASE_URL}/rest/v1/{table_name}?on_conflict={on_conflict}"
-    headers = {
-        "apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}",
-        "Content-Type": "application/json", "Prefer": "return=minimal,resolution=merge-duplicates"
-    }
-    try:
-        resp = requests.post(endpoint, json=data_list, headers=headers, timeout=20)
-        return resp.status_code in [200, 201, 204]
-    except Exception as e:
-        print(f"❌ DB 전송 에러: {e}", flush=True)
-        return False
+    return BULK_WRITER.upsert(table_name, data_list, on_conflict)
 
 # 💡 대표님이 만드신 SEC 이중 검증 시스템
 def get_sec_ticker_mapping():
@@ -53,20 +51,20 @@ def normalize_name(name):
 
 def fetch_otc_price_premium(ticker): return 0.0
 
-def fetch_and_update_prices():
+def fetch_and_update_prices(sec_map=None):
+    """FMP 일괄 시세 → price_cache / price_history. 반환값: 갱신한 price_cache 행 (데몬 모드의 급등 감지용)
+    sec_map: 데몬 모드가 데워 둔 {정규화 회사명: 공식 티커} (없으면 SEC에서 새로 받음)"""
     now_est = datetime.now(pytz.timezone('US/Eastern'))
     print(f"🚀 실시간 주가 업데이트 시작 (EST: {now_est.strftime('%H:%M')})", flush=True)
 
     try:
-        get_url = f"{SUPABASE_URL}/rest/v1/stock_cache?select=symbol,name"
-        headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
-        stock_data = requests.get(get_url, headers=headers, timeout=15).json()
+        stock_data = fetch_all_rows(STORAGE, "stock_cache", "symbol, name", order="symbol")
     except Exception as e:
-        print(f"❌ 데이터 로드 실패: {e}", flush=True); return
+        print(f"❌ 데이터 로드 실패: {e}", flush=True); return []
 
-    if not stock_data: return
+    if not stock_data: return []
 
-    sec_map = get_sec_ticker_mapping()
+    if sec_map is None: sec_map = get_sec_ticker_mapping()
     query_map = {sec_map.get(normalize_name(item.get('name', '')), item['symbol']): item['symbol'] for item in stock_data}
     official_tickers = list(query_map.keys())
     print(f"📦 대상: {len(official_tickers)}개 FMP API로 주가 다운로드 시작...", flush=True)
@@ -115,14 +113,17 @@ def fetch_and_update_prices():
 
     if upsert_list:
         print(f"\n📊 {len(upsert_list)}개 가격 데이터 DB 전송 시작...", flush=True)
-        for i in range(0, len(upsert_list), chunk_size): batch_upsert_raw("price_cache", upsert_list[i : i+chunk_size], on_conflict="ticker")
-        for i in range(0, len(history_list), chunk_size): batch_upsert_raw("price_history", history_list[i : i+chunk_size], on_conflict="ticker,target_date")
+        # 🚀 요청 분할은 대량 쓰기 엔진이 직렬화 크기 기준으로 처리
+        batch_upsert_raw("price_cache", upsert_list, on_conflict="ticker")
+        batch_upsert_raw("price_history", history_list, on_conflict="ticker,target_date")
         print(f"✅ {len(upsert_list)}개 종목 실시간 주가 갱신 완벽 종료", flush=True)
     else:
         print("⚠️ 이번 루프에서 업데이트할 수 있는 가격 데이터가 없습니다.", flush=True)
 
     batch_upsert_raw("analysis_cache", [{"cache_key": "PRICE_WORKER_LAST_RUN", "content": "alive", "updated_at": now_iso}], on_conflict="cache_key")
+    print(f"📦 [대량 쓰기] 테이블별 전송 통계\n{BULK_WRITER.report()}", flush=True)
     print(f"🏁 워커 실행 종료", flush=True)
+    return upsert_list
 
 if __name__ == "__main__":
     print("🤖 FMP 실시간 주가 수집 워커를 실행합니다.", flush=True)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# utils 패키지를 저장소 루트 기준으로 임포트
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
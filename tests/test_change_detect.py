@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+
+from utils.change_detect import ChangeDetector, STAGE_RULES
+from utils.edgar_index import EdgarIndexConsumer
+
+
+def tab0_reason(edgar):
+    now = datetime.now()
+    t = {"ticker": "ABC", "cik": "1", "symbols": ["ABC"], "ipo_date": None}
+    last = {("ABC", "tab0"): (now - timedelta(hours=1), "")}
+    return ChangeDetector(None, None, edgar)._stage_reason(t, "tab0", STAGE_RULES["tab0"], last, {}, now)
+
+
+def make_edgar():
+    edgar = EdgarIndexConsumer()
+    edgar.covered = {"1": datetime.now().strftime("%Y-%m-%d")}
+    edgar.ready = edgar.complete = True
+    return edgar
+
+
+def test_tab0_clean_when_index_complete():
+    assert tab0_reason(make_edgar()) is None
+
+
+def test_tab0_unknown_when_live_feed_truncated():
+    edgar = make_edgar()
+    edgar.partial_forms = {"8-K"}
+    assert tab0_reason(edgar) == "filings_unknown"
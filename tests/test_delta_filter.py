@@ -0,0 +1,73 @@
+from utils.delta_filter import DeltaFilter
+from utils.write_buffer import WriteBehindBuffer
+
+
+def make_path(tmp_path):
+    sent = []
+
+    def post(table, on_conflict, rows):
+        sent.append((table, [dict(r) for r in rows]))
+        return True
+
+    delta = DeltaFilter(path=str(tmp_path / "manifest.json.gz"), touch_tables={"analysis_cache": ["updated_at"]})
+    buffer = WriteBehindBuffer(delta.sender(post, exempt={"run_journal"}))
+    return delta, buffer, sent
+
+
+def row(content, ts):
+    return {"cache_key": "RAW_FMP_PROFILE_ABC", "content": content, "updated_at": ts}
+
+
+def test_unchanged_write_reads_back_full_row(tmp_path):
+    delta, buffer, sent = make_path(tmp_path)
+    buffer.add("analysis_cache", "cache_key", [row("{\"a\": 1}", "2026-10-19T00:00:00")])
+    buffer.flush_all()
+
+    # 같은 내용을 다시 쓰면 DB에는 하트비트만 가지만, 전송 전 읽기는 전체 행이어야 함
+    delta.prefer("analysis_cache", "cache_key", [row("{\"a\": 1}", "2026-10-19T06:00:00")])
+    buffer.add("analysis_cache", "cache_key", [row("{\"a\": 1}", "2026-10-19T06:00:00")])
+    pending = buffer.pending("analysis_cache", "RAW_FMP_PROFILE_ABC")
+    assert pending["content"] == "{\"a\": 1}"
+    assert pending["updated_at"] == "2026-10-19T06:00:00"
+
+    buffer.flush_all()
+    assert sent[-1] == ("analysis_cache", [{"cache_key": "RAW_FMP_PROFILE_ABC", "updated_at": "2026-10-19T06:00:00"}])
+
+
+def test_touch_false_skips_unchanged_row(tmp_path):
+    delta, buffer, sent = make_path(tmp_path)
+    buffer.add("analysis_cache", "cache_key", [row("x", "t1")])
+    buffer.flush_all()
+
+    delta.prefer("analysis_cache", "cache_key", [row("x", "t2")], touch=False)
+    buffer.add("analysis_cache", "cache_key", [row("x", "t2")])
+    buffer.flush_all()
+    assert len(sent) == 1
+
+
+def test_changed_row_is_sent_and_committed(tmp_path):
+    delta, buffer, sent = make_path(tmp_path)
+    buffer.add("analysis_cache", "cache_key", [row("x", "t1")])
+    buffer.flush_all()
+    buffer.add("analysis_cache", "cache_key", [row("y", "t2")])
+    buffer.flush_all()
+    assert sent[-1][1][0]["content"] == "y"
+    assert delta.stats["analysis_cache"] == {"written": 2, "touched": 0, "skipped": 0}
+
+
+def test_failed_send_is_not_committed(tmp_path):
+    delta = DeltaFilter(path=str(tmp_path / "manifest.json.gz"))
+    attempts = []
+    send = delta.sender(lambda table, on_conflict, rows: attempts.append(rows) and False)
+    send("stock_list", "ticker", [{"ticker": "ABC", "name": "A"}])
+    send("stock_list", "ticker", [{"ticker": "ABC", "name": "A"}])
+    assert len(attempts) == 2
+
+
+def test_exempt_table_bypasses_filter(tmp_path):
+    delta, buffer, sent = make_path(tmp_path)
+    for _ in range(2):
+        buffer.add("run_journal", "run_id,ticker,stage", [{"run_id": "r", "ticker": "ABC", "stage": "tab1", "status": "done"}])
+        buffer.flush_all()
+    assert len(sent) == 2
+    assert "run_journal" not in delta.stats
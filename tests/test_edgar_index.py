@@ -0,0 +1,28 @@
+import json
+from datetime import datetime
+
+from utils.edgar_index import EdgarIndexConsumer
+
+
+def test_failed_cik_from_other_shard_drops_coverage():
+    today = datetime.now().strftime("%Y-%m-%d")
+    finisher = EdgarIndexConsumer()
+    finisher.load_state(json.dumps({"date": "2026-10-01", "ciks": {"1": today, "2": today}}))
+
+    other = EdgarIndexConsumer()
+    other.mark_failed("1")
+    other.mark_checked("3")
+    finisher.merge_marks(other.marks())
+    finisher.mark_checked("1")   # 다른 샤드가 실패한 CIK는 여기서 점검됐어도 실패로 남음
+
+    covered = json.loads(finisher.dump_state())["ciks"]
+    assert "1" not in covered
+    assert covered["2"] == today
+    assert covered["3"] == today
+
+
+def test_merge_marks_ignores_bad_payload():
+    consumer = EdgarIndexConsumer()
+    consumer.merge_marks("not json")
+    consumer.merge_marks(None)
+    assert json.loads(consumer.marks()) == {"checked": [], "failed": []}
@@ -0,0 +1,33 @@
+from utils.name_resolver import CompanyNameResolver, EXACT_SCORE, distinguishing_tokens
+
+
+def make_resolver():
+    resolver = CompanyNameResolver()
+    resolver.add("Ares Acquisition Corp", "1829432", "AAC")
+    resolver.add("Churchill Capital Corp V", "1838001", "CCV")
+    resolver.add("Churchill Capital Corp VII", "1838002", "CVII")
+    resolver.add("Apple Inc.", "320193", "AAPL")
+    return resolver
+
+
+def test_serial_spac_is_not_matched_to_sibling():
+    resolver = make_resolver()
+    cik, score = resolver.resolve(company_name="Ares Acquisition Corp II")
+    assert cik is None or score < EXACT_SCORE
+    assert resolver.rank("Ares Acquisition Corp II") == []
+    assert all(c[0] != "0001838001" for c in resolver.rank("Churchill Capital Corp IX"))
+
+
+def test_exact_and_fuzzy_scores():
+    resolver = make_resolver()
+    assert resolver.resolve(company_name="APPLE INC") == ("0000320193", EXACT_SCORE)
+    cik, score = resolver.resolve(company_name="Apple Incorporated Common Stock")
+    assert score == EXACT_SCORE
+    cik, score = resolver.resolve(company_name="Appel Inc")
+    assert score < EXACT_SCORE
+
+
+def test_distinguishing_tokens():
+    assert distinguishing_tokens("Churchill Capital Corp IX") == {"ix"}
+    assert distinguishing_tokens("Gores Holdings X Inc. Class A") == {"x", "a"}
+    assert distinguishing_tokens("Civic Mix Labs") == frozenset()
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+from utils.retention import RetentionJob, Universe
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+class FakeRpc:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self):
+        return self
+
+
+class FakeClient:
+    """analysis_cache_key_sizes RPC만 흉내 (after_key 기준 페이지)"""
+
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda r: r["cache_key"])
+
+    def rpc(self, name, params):
+        page = [r for r in self.rows if r["cache_key"] > params["after_key"]][:params["page_size"]]
+        rpc = FakeRpc(page)
+        rpc.data = page
+        return rpc
+
+
+def cache_row(key, days_old, size=10):
+    return {"cache_key": key, "updated_at": (NOW - timedelta(days=days_old)).isoformat(), "content_bytes": size}
+
+
+def plan(rows, universe=None, min_universe=2):
+    job = RetentionJob(FakeClient(rows), min_universe=min_universe, log_fn=lambda *_: None)
+    return {key: reason for key, reason, _ in job.plan(universe, now=NOW)}
+
+
+def test_max_age_applies_without_universe():
+    planned = plan([cache_row("RAW_FMP_PROFILE_ABC", 20), cache_row("RAW_FMP_PROFILE_XYZ", 3)])
+    assert planned == {"RAW_FMP_PROFILE_ABC": "fmp_raw"}
+
+
+def test_unmatched_keys_are_never_planned():
+    planned = plan([cache_row("IPO_CALENDAR_DATA", 900), cache_row("WORKER_LAST_RUN", 900)],
+                   Universe(["AAA", "BBB"]))
+    assert planned == {}
+
+
+def test_universe_grace_period():
+    rows = [cache_row("GONE_Tab1_RawTracker", 40), cache_row("NEW_Tab1_RawTracker", 5),
+            cache_row("AAA_Tab1_RawTracker", 400)]
+    planned = plan(rows, Universe(["AAA", "BBB"]))
+    # 유니버스 밖이라도 grace 기간(30일) 안이면 유지, 유니버스 안이면 오래되어도 유지
+    assert planned == {"GONE_Tab1_RawTracker": "trackers:universe"}
+
+
+def test_preferred_ticker_matches_base_in_universe():
+    planned = plan([cache_row("NHPBP_Tab1_RawTracker", 400)], Universe(["NHP", "BBB"]))
+    assert planned == {}
+
+
+def test_keep_latest_groups_by_subject_type_and_lang():
+    rows = [cache_row("Acme Corp_S-1_Tab0_v15_ko", 1), cache_row("Acme Corp_S-1_Tab0_v16_ko", 1),
+            cache_row("Acme Corp_S-1_Tab0_v15_en", 1),
+            cache_row("AAA_Tab1_v2_ko", 1), cache_row("AAA_Tab1_v3_ko", 1)]
+    planned = plan(rows, Universe(["AAA", "BBB"], ["Acme Corp"]))
+    # 같은 (대상, 리포트 종류, 언어) 안에서만 구버전 삭제 (en은 v15뿐이라 유지)
+    assert planned == {"Acme Corp_S-1_Tab0_v15_ko": "reports:superseded", "AAA_Tab1_v2_ko": "reports:superseded"}
+
+
+def test_partial_universe_skips_universe_deletes():
+    rows = [cache_row("GONE_Tab1_RawTracker", 400), cache_row("GONE_Twitter_Sent_Tracker_ko", 400),
+            cache_row("RAW_FMP_PROFILE_GONE", 20)]
+    planned = plan(rows, Universe(["AAA", "BBB"], complete=False))
+    assert planned == {"RAW_FMP_PROFILE_GONE": "fmp_raw"}
+
+
+def test_small_universe_skips_universe_deletes():
+    planned = plan([cache_row("GONE_Tab1_RawTracker", 400)], Universe(["AAA"]), min_universe=100)
+    assert planned == {}
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from utils.stage_graph import StageExecutor, StageGraph
+
+
+def make_executor():
+    return StageExecutor(pools={"io": 2, "llm": 1}, default_pool="io", limits={"sec": 1})
+
+
+def test_resource_wait_does_not_hold_pool_thread():
+    executor = make_executor()
+    release = threading.Event()
+    holding = threading.Event()
+
+    def hold_sec():
+        holding.set()
+        release.wait(5)
+        return "sec"
+
+    sec_run = threading.Thread(target=executor.run, args=(StageGraph("A").add("fetch", hold_sec, pool="io", resources=["sec"]),))
+    sec_run.start()
+    assert holding.wait(5)
+
+    # llm 풀 단계가 "sec" 허가를 기다리는 동안에도 LLM 전용 단계는 llm 스레드를 써야 함
+    waiting = threading.Thread(target=executor.run, args=(StageGraph("B").add("sec_llm", lambda: "b", pool="llm", resources=["sec"]),))
+    waiting.start()
+    time.sleep(0.2)
+
+    started = time.time()
+    run = executor.run(StageGraph("C").add("llm_only", lambda: release.is_set(), pool="llm"))
+    assert run.outputs["llm_only"] is False
+    assert time.time() - started < 2
+
+    release.set()
+    sec_run.join(5)
+    waiting.join(5)
+    assert not waiting.is_alive()
+    executor.shutdown()
+
+
+def test_resource_permits_limit_concurrency():
+    executor = StageExecutor(pools={"io": 4}, limits={"sec": 1})
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock: active[0] -= 1
+        return True
+
+    graph = StageGraph("limit")
+    for i in range(4): graph.add(f"s{i}", work, resources=["sec"])
+    run = executor.run(graph)
+    assert len(run.outputs) == 4
+    assert peak[0] == 1
+    executor.shutdown()
@@ -0,0 +1,83 @@
+import requests
+
+from utils import cancellation
+from utils.bulk_writer import BulkWriter
+from utils.cancellation import CancelToken, Cancelled
+from utils.run_journal import unconfirm_rows
+from utils.write_buffer import WriteBehindBuffer
+
+
+class DownSession:
+    def post(self, *args, **kwargs):
+        raise requests.exceptions.ConnectionError("unreachable")
+
+
+def test_cancelled_run_still_parks_failed_rows(monkeypatch):
+    monkeypatch.setattr("utils.bulk_writer.time.sleep", lambda sec: None)
+    writer = BulkWriter("https://example.invalid", "key", max_retries=2, log_fn=None)
+    writer.session = DownSession()
+    buffer = WriteBehindBuffer(lambda table, on_conflict, rows: writer.upsert(table, rows, on_conflict))
+
+    token = CancelToken()
+    token.cancel("signal:SIGTERM")
+    with cancellation.scope(token):
+        buffer.add("analysis_cache", "cache_key", [{"cache_key": "A", "content": "x"}])
+        buffer.flush_all()
+
+    # 종료 신호 뒤의 재시도 실패도 retry_failed() 대상으로 남아야 함
+    assert sum(len(rows) for _, _, rows in writer.failed) == 1
+    assert buffer.depth() == 0
+
+
+def test_send_error_clears_inflight():
+    def send(table, on_conflict, rows):
+        raise Cancelled("signal:SIGTERM")
+
+    buffer = WriteBehindBuffer(send)
+    buffer.add("analysis_cache", "cache_key", [{"cache_key": "A", "content": "x"}])
+    try: buffer.flush_all()
+    except Cancelled: pass
+    assert buffer.depth() == 0
+
+
+def journal_row(stage, status="done"):
+    return {"run_id": "r1", "ticker": "ABC", "stage": stage, "status": status}
+
+
+def test_journal_rows_sent_after_stage_output():
+    sent = []
+
+    def send(table, on_conflict, rows):
+        sent.append((table, [dict(r) for r in rows]))
+        return True
+
+    buffer = WriteBehindBuffer(send, deferred={"run_journal": unconfirm_rows})
+    buffer.add("analysis_cache", "cache_key", [{"cache_key": "ABC_Tab1_v5_ko", "content": "x"}])
+    buffer.add("run_journal", "run_id,ticker,stage", [journal_row("tab1")])
+    buffer.flush("run_journal", "run_id,ticker,stage")
+
+    assert [t for t, _ in sent] == ["analysis_cache", "run_journal"]
+    assert sent[1][1][0]["status"] == "done"
+
+
+def test_done_becomes_unconfirmed_after_failed_output():
+    sent = []
+
+    def send(table, on_conflict, rows):
+        sent.append((table, [dict(r) for r in rows]))
+        return table != "analysis_cache"
+
+    buffer = WriteBehindBuffer(send, deferred={"run_journal": unconfirm_rows})
+    buffer.add("analysis_cache", "cache_key", [{"cache_key": "ABC_Tab1_v5_ko", "content": "x"}])
+    buffer.flush_all()
+    # 결과 전송이 실패한 뒤에 들어온 done도 확정하지 않음
+    buffer.add("run_journal", "run_id,ticker,stage", [journal_row("tab1"), journal_row("tab4", "failed")])
+    buffer.flush_all()
+
+    statuses = {r["stage"]: r["status"] for r in sent[-1][1]}
+    assert statuses == {"tab1": "unconfirmed", "tab4": "failed"}
+
+    buffer.clear_failures()
+    buffer.add("run_journal", "run_id,ticker,stage", [journal_row("tab6")])
+    buffer.flush_all()
+    assert sent[-1][1][0]["status"] == "done"
@@ -0,0 +1,43 @@
+from utils import xbrl_facts
+from utils.xbrl_facts import compute_financial_metrics, get_xbrl_summary
+
+
+def series(annual=(), quarterly=()):
+    return {"annual": list(annual), "quarterly": list(quarterly), "unit": "USD"}
+
+
+def test_metrics_skip_fields_from_other_periods():
+    data = {
+        "revenue": series(annual=[("2025-12-31", 1000.0), ("2024-12-31", 800.0)]),
+        # 연간 순이익은 아직 없고 분기 값만 있음 → 연간 매출과 섞지 않음
+        "net_income": series(quarterly=[("2026-03-31", 50.0)]),
+        "operating_income": series(annual=[("2024-12-31", 90.0)]),
+        "gross_profit": series(annual=[("2025-12-31", 400.0)]),
+        "operating_cash_flow": series(annual=[("2025-12-31", 300.0)]),
+        "capex": series(quarterly=[("2025-12-31", 20.0)]),
+    }
+    metrics = compute_financial_metrics(data)
+    assert metrics["period"] == "FY" and metrics["as_of"] == "2025-12-31"
+    assert metrics["growth"] == "+25.0%"
+    assert metrics["gross_margin"] == "40.0%"
+    assert "net_margin" not in metrics
+    assert "op_margin" not in metrics
+    assert "free_cash_flow" not in metrics
+
+
+def test_summary_failures_expire(monkeypatch):
+    xbrl_facts.clear_cache()
+    calls = []
+    monkeypatch.setattr(xbrl_facts, "fetch_company_facts", lambda cik, headers=None: calls.append(cik))
+    clock = [1000.0]
+    monkeypatch.setattr(xbrl_facts.time, "time", lambda: clock[0])
+
+    assert get_xbrl_summary("1") is None
+    assert get_xbrl_summary("1") is None
+    assert len(calls) == 1
+    clock[0] += xbrl_facts.FAILURE_TTL_SEC + 1
+    get_xbrl_summary("1")
+    assert len(calls) == 2
+    xbrl_facts.clear_cache()
+    get_xbrl_summary("1")
+    assert len(calls) == 3
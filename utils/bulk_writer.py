@@ -0,0 +1,168 @@
+import gzip
+import json
+import time
+import random
+import threading
+
+import requests
+
+# ==========================================
+# [대량 쓰기 엔진] PostgREST upsert 공용 전송기
+# ==========================================
+# worker / price_worker / 앱의 batch_upsert가 공통으로 사용합니다.
+# - 직렬화 크기 기준으로 요청을 쪼갬 (한 요청에 수만 행이 실려 타임아웃 나는 것 방지)
+# - 큰 본문은 gzip 압축 전송 (게이트웨이가 거부하면(415 / 비압축 재전송만 성공하는 400) 비압축 전환)
+# - 429 / 5xx / 연결 오류는 지터 백오프로 재시도 (on_conflict upsert라 재전송해도 결과 동일)
+# - 테이블별 전송 행 수 / 바이트 / 실패 통계 기록, 최종 실패 행은 보관 후 retry_failed()로 재시도
+
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+GZIP_MIN_BYTES = 8 * 1024
+MAX_FAILED_ROWS = 5000
+
+
+def rest_base_url(url):
+    """'https://x.supabase.co' 또는 '.../rest/v1' 어느 쪽이든 REST 베이스 URL로 맞춥니다."""
+    url = str(url or "").strip().rstrip('/')
+    if "/rest/v1" in url: url = url.split("/rest/v1")[0]
+    return f"{url}/rest/v1"
+
+
+class BulkWriter:
+    """크기 분할 + gzip + 재시도가 적용된 PostgREST 대량 upsert 전송기"""
+
+    def __init__(self, base_url, api_key, max_bytes=900_000, max_retries=4, timeout=30,
+                 use_gzip=True, prefer="return=minimal,resolution=merge-duplicates", log_fn=print):
+        self.base_url = rest_base_url(base_url)
+        self.api_key = api_key
+        self.max_bytes = max_bytes
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.use_gzip = use_gzip
+        self.prefer = prefer
+        self.log_fn = log_fn
+
+        self.session = requests.Session()
+        self.stats = {}
+        self.failed = []   # [(table, on_conflict, rows)]
+        self._lock = threading.Lock()
+
+    # ------------------------------------------
+    # 통계
+    # ------------------------------------------
+    def _stat(self, table, **inc):
+        with self._lock:
+            s = self.stats.setdefault(table, {"rows": 0, "bytes": 0, "requests": 0, "retries": 0, "failures": 0, "rows_failed": 0})
+            for k, v in inc.items(): s[k] += v
+
+    def report(self):
+        lines = []
+        for table, s in sorted(self.stats.items()):
+            lines.append(f"{table}: {s['rows']}행 / {s['bytes'] / 1024:.0f}KB / 요청 {s['requests']}회 (재시도 {s['retries']}, 실패 {s['failures']}건·{s['rows_failed']}행)")
+        return "\n".join(lines)
+
+    # ------------------------------------------
+    # 분할
+    # ------------------------------------------
+    def _chunks(self, rows):
+        """직렬화된 JSON 배열 크기가 max_bytes를 넘지 않도록 (행 목록, 본문 bytes) 단위로 나눕니다."""
+        chunk, parts, size = [], [], 2
+        for row in rows:
+            part = json.dumps(row, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+            if chunk and size + len(part) + 1 > self.max_bytes:
+                yield chunk, b"[" + b",".join(parts) + b"]"
+                chunk, parts, size = [], [], 2
+            chunk.append(row)
+            parts.append(part)
+            size += len(part) + 1
+        if chunk:
+            yield chunk, b"[" + b",".join(parts) + b"]"
+
+    # ------------------------------------------
+    # 전송
+    # ------------------------------------------
+    def _post(self, table, on_conflict, body):
+        headers = {
+            "apikey": self.api_key,
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Prefer": self.prefer,
+        }
+        data = body
+        compressed = self.use_gzip and len(body) >= GZIP_MIN_BYTES
+        if compressed:
+            data = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+
+        url = f"{self.base_url}/{table}?on_conflict={on_conflict}"
+        resp = self.session.post(url, data=data, headers=headers, timeout=self.timeout)
+
+        # 게이트웨이가 gzip 본문을 지원하지 않으면 이후로는 비압축 전송
+        # 415는 확실한 거부, 400은 컬럼 / 제약 조건 오류일 수도 있으므로 비압축 재전송이 성공할 때만 끔
+        if compressed and resp.status_code in [400, 415]:
+            headers.pop("Content-Encoding", None)
+            data = body
+            retry = self.session.post(url, data=data, headers=headers, timeout=self.timeout)
+            if resp.status_code == 415 or retry.status_code in [200, 201, 204]:
+                if self.use_gzip and self.log_fn: self.log_fn(f"ℹ️ [{table}] gzip 본문 거부 (HTTP {resp.status_code}) → 이후 비압축 전송")
+                self.use_gzip = False
+            resp = retry
+        return resp, len(data)
+
+    def _send_chunk(self, table, on_conflict, rows, body):
+        last_error = ""
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                self._stat(table, retries=1)
+            try:
+                resp, sent = self._post(table, on_conflict, body)
+                if resp.status_code in [200, 201, 204]:
+                    self._stat(table, rows=len(rows), bytes=sent, requests=1)
+                    return True
+                self._stat(table, requests=1)
+                last_error = f"HTTP {resp.status_code}: {resp.text[:300]}"
+                if resp.status_code not in RETRY_STATUS:
+                    break
+                retry_after = resp.headers.get("Retry-After")
+                wait = float(retry_after) if (retry_after and retry_after.isdigit()) else None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._stat(table, requests=1)
+                last_error = str(e)
+                wait = None
+            except Exception as e:
+                last_error = str(e)
+                break
+
+            if attempt < self.max_retries:
+                # 지터 백오프: 0.5 * 2^n 초 범위에서 무작위 대기 (여러 스레드가 동시에 재시도하지 않도록)
+                # 실행 취소와 무관하게 대기: 종료 직전의 잔여분 전송도 재시도 / failed 보관까지 마쳐야 함
+                time.sleep(wait if wait is not None else random.uniform(0.2, 0.5 * (2 ** (attempt + 1))))
+
+        self._stat(table, failures=1, rows_failed=len(rows))
+        with self._lock:
+            if sum(len(r) for _, _, r in self.failed) + len(rows) <= MAX_FAILED_ROWS:
+                self.failed.append((table, on_conflict, rows))
+        if self.log_fn: self.log_fn(f"❌ [{table}] 저장 실패 ({len(rows)}행): {last_error}")
+        return False
+
+    def upsert(self, table, rows, on_conflict="ticker"):
+        """rows를 크기 단위로 나눠 전송합니다. 모든 청크가 성공하면 True."""
+        if not rows: return True
+        # PostgREST 대량 upsert는 배열 안 모든 객체의 키 구성이 같아야 하므로 (PGRST102)
+        # 키 구성별로 묶어서 보냄 (빈 값을 뺀 행이 기존 컬럼을 NULL로 덮어쓰지 않도록 채우지 않음)
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row.keys())), []).append(row)
+        ok = True
+        for group in groups.values():
+            for chunk, body in self._chunks(group):
+                ok = self._send_chunk(table, on_conflict, chunk, body) and ok
+        return ok
+
+    def retry_failed(self):
+        """보관해 둔 실패 행을 한 번 더 전송합니다. 반환값: 여전히 실패한 행 수"""
+        with self._lock:
+            pending, self.failed = self.failed, []
+        for table, on_conflict, rows in pending:
+            self.upsert(table, rows, on_conflict)
+        with self._lock:
+            return sum(len(r) for _, _, r in self.failed)
@@ -0,0 +1,79 @@
+import threading
+
+# ==========================================
+# [캐시 스냅샷] 종목 단위 analysis_cache 일괄 선로딩
+# ==========================================
+# 종목 하나를 처리하는 동안 *_RawTracker, *_LastAccNum, 리포트 존재 확인(test_key) 등
+# 수십 번의 단건 조회(.eq("cache_key", ...))가 발생합니다.
+# 처리 시작 시 필요한 키 목록을 .in_() 한두 번으로 미리 읽어 메모리에 올려두고,
+# 각 단계는 이 스냅샷을 먼저 확인합니다. 쓰기 경로(batch_upsert)는 note_write()로 스냅샷을 최신 상태로 유지합니다.
+#
+# 선로딩한 키는 '존재/부재'가 모두 확정된 상태이므로, 스냅샷에 없는 키는 DB를 다시 볼 필요가 없습니다.
+
+
+class CacheSnapshot:
+    """analysis_cache 키 → 행 메모리 스냅샷 (스레드 안전)"""
+
+    def __init__(self, client, table="analysis_cache", key_col="cache_key",
+                 columns="cache_key, content, updated_at", chunk_size=120):
+        self.client = client
+        self.table = table
+        self.key_col = key_col
+        self.columns = columns
+        self.chunk_size = chunk_size
+
+        self._rows = {}     # key → row (None = 선로딩 결과 DB에 없음)
+        self._loading = set()  # 선로딩 조회 중인 키 (그 사이의 쓰기가 묻히지 않도록)
+        self._lock = threading.Lock()
+        self.stats = {"queries": 0, "loaded": 0, "hits": 0, "misses": 0}
+
+    def preload(self, keys):
+        """키 목록을 chunk_size 단위 .in_() 조회로 한꺼번에 읽어 옵니다. 반환값: DB에 존재한 행 수"""
+        with self._lock:
+            todo = [k for k in dict.fromkeys(keys) if k and k not in self._rows and k not in self._loading]
+            self._loading.update(todo)
+        found = 0
+        for i in range(0, len(todo), self.chunk_size):
+            chunk = todo[i:i + self.chunk_size]
+            try:
+                res = self.client.table(self.table).select(self.columns).in_(self.key_col, chunk).execute()
+                rows = {r[self.key_col]: r for r in (res.data or [])}
+            except Exception as e:
+                # 선로딩 실패 시 해당 키들은 '모름' 상태로 두어 기존처럼 단건 조회하게 함
+                print(f"⚠️ [캐시 스냅샷] 선로딩 실패 ({len(chunk)}개 키): {e}")
+                with self._lock: self._loading.difference_update(chunk)
+                continue
+            with self._lock:
+                self.stats["queries"] += 1
+                for k in chunk:
+                    # 조회 중에 다른 스레드가 쓴 값이 있으면 그것이 더 최신
+                    if k not in self._rows: self._rows[k] = rows.get(k)
+                self._loading.difference_update(chunk)
+                self.stats["loaded"] += len(chunk)
+            found += len(rows)
+        return found
+
+    def lookup(self, key):
+        """(확정 여부, 행) 을 반환합니다. 확정 여부가 False면 호출 측에서 DB를 조회해야 합니다."""
+        with self._lock:
+            if key in self._rows:
+                self.stats["hits"] += 1
+                row = self._rows[key]
+                return True, (dict(row) if row else None)
+            self.stats["misses"] += 1
+            return False, None
+
+    def note_write(self, rows):
+        """쓰기 경로에서 호출: 스냅샷에 올라와 있는 키만 새 값으로 갱신합니다."""
+        with self._lock:
+            for row in rows:
+                key = row.get(self.key_col)
+                if key in self._rows or key in self._loading:
+                    merged = dict(self._rows.get(key) or {})
+                    merged.update(row)
+                    self._rows[key] = merged
+
+    def evict(self, keys):
+        with self._lock:
+            for k in keys:
+                self._rows.pop(k, None)
@@ -0,0 +1,124 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# ==========================================
+# [협조적 취소] 실행 취소 토큰 / 단계별 마감 시각
+# ==========================================
+# 시간 제한에 걸리면 executor.shutdown(cancel_futures=True)은 대기 중인 종목만 버리고, 이미 실행 중인 스레드는
+# 80초 LLM 백오프 / 트위터 30초 대기를 그대로 진행하다가 프로세스 종료와 함께 쓰기 도중에 끊길 수 있었습니다.
+#   - 실행 토큰(CancelToken): 마감 시각이 지나거나 cancel()(SIGTERM 등)되면 취소 상태
+#   - 단계 토큰(child): 실행 토큰의 취소를 공유하고, 남은 실행 시간 안에서 단계별 마감 시각을 따로 가짐
+#   - sleep() / check(): 현재 스레드의 토큰 기준으로 대기하다가 취소되면 즉시 Cancelled 발생
+# 단계 실행기(utils/stage_graph.py)가 단계를 실행하는 동안 그 단계의 토큰을 현재 스레드에 걸어 두므로
+# 단계 함수는 인자 없이 cancellation.sleep() / check()만 부르면 됩니다.
+# Cancelled는 BaseException이라 단계 함수의 except Exception 폴백에 삼켜지지 않고 단계 밖까지 올라옵니다.
+
+
+STAGE_DEADLINE = "stage deadline"
+
+
+class Cancelled(BaseException):
+    """토큰이 취소됐거나 마감 시각이 지남. timeout=True면 단계 자체의 마감 시각 초과 (실행 전체는 계속)"""
+
+    def __init__(self, reason="cancelled", timeout=False):
+        super().__init__(reason)
+        self.reason = reason
+        self.timeout = timeout
+
+
+class CancelToken:
+    def __init__(self, deadline=None, parent=None, label="deadline"):
+        self.parent = parent
+        self.deadline = deadline
+        self.label = label   # 이 토큰의 마감 시각이 지났을 때의 취소 사유
+        # 자식 토큰은 부모의 이벤트를 공유 → 부모가 취소되면 자식의 sleep()도 즉시 깨어남
+        self._event = parent._event if parent else threading.Event()
+        self._root = parent._root if parent else self
+        self._reason = None
+
+    def cancel(self, reason="cancelled"):
+        if self._root._reason is None: self._root._reason = reason
+        self._event.set()
+
+    def _expired(self):
+        return self.deadline is not None and time.time() >= self.deadline
+
+    @property
+    def cancelled(self):
+        return self._event.is_set() or self._expired() or bool(self.parent and self.parent.cancelled)
+
+    @property
+    def reason(self):
+        if self._event.is_set(): return self._root._reason
+        token = self
+        while token:
+            if token._expired(): return token.label
+            token = token.parent
+        return None
+
+    def remaining(self):
+        """마감 시각까지 남은 초 (마감 시각이 없으면 None)"""
+        deadlines = []
+        token = self
+        while token:
+            if token.deadline is not None: deadlines.append(token.deadline)
+            token = token.parent
+        return max(min(deadlines) - time.time(), 0.0) if deadlines else None
+
+    def child(self, timeout=None, label="deadline"):
+        """남은 실행 시간 안에서 timeout초 마감 시각을 가진 하위 토큰"""
+        return CancelToken(time.time() + timeout if timeout else None, parent=self, label=label)
+
+    def check(self):
+        if self.cancelled:
+            reason = self.reason
+            raise Cancelled(reason, timeout=(reason == STAGE_DEADLINE))
+
+    def wait(self, seconds):
+        """seconds초 대기. 도중에 취소되면 바로 True 반환 (예외 없음)"""
+        remaining = self.remaining()
+        if remaining is not None and remaining < seconds:
+            self._event.wait(remaining)
+            return True
+        return self._event.wait(seconds) or self.cancelled
+
+    def sleep(self, seconds):
+        """seconds초 대기. 도중에 취소되면 Cancelled"""
+        if self.wait(seconds): self.check()
+
+
+# ------------------------------------------
+# 현재 스레드의 토큰
+# ------------------------------------------
+_local = threading.local()
+_default = CancelToken()
+
+
+def set_default(token):
+    """단계 밖 스레드(종목 스레드 / 메인 스레드)가 쓸 기본 토큰"""
+    global _default
+    _default = token
+    return token
+
+
+def current():
+    return getattr(_local, "token", None) or _default
+
+
+@contextmanager
+def scope(token):
+    prev = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = prev
+
+
+def sleep(seconds):
+    current().sleep(seconds)
+
+
+def check():
+    current().check()
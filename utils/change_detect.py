@@ -0,0 +1,294 @@
+import concurrent.futures
+from datetime import datetime, timedelta
+
+import requests
+
+# ==========================================
+# [변경 감지] 종목 x 단계 사전 점검 → 바뀐 (종목, 단계)만 실행 계획에 포함
+# ==========================================
+# 하루 4번 실행 사이에 대부분의 종목은 새 공시 / 뉴스 / 등급 변경 / 실적이 없는데도
+# 모든 종목이 모든 단계를 돌면서 단계마다 FMP 조회 + 트래커 비교를 반복했습니다.
+# 사전 점검은 아래를 한 번씩만 대량으로 읽고 단계별로 판단합니다.
+#   - 실행 저널(stage_last_checked RPC): (종목, 단계)가 마지막으로 done 된 시각과 실행 조건 지문
+#   - FMP 최신 피드(전 종목 대상 1~수 페이지): 뉴스 / 보도자료 / 등급 변경 / M&A / 내부자 거래 / 실적 일정
+#   - EDGAR 인덱스(EdgarIndexConsumer): CIK별 신규 공시 여부
+# 단계가 dirty 인 경우
+#   - 한 번도 완료된 적 없음 / 실행 조건(종목명·상장 상태·상장일) 변경 / max_age_h 경과 (주기적 전수 재점검)
+#   - 연결된 피드에 마지막 완료 시각 이후 이벤트가 있음 / 피드를 충분히 읽지 못해 판단 불가
+# 입력 전용 단계(analyst / financials / smart_money)는 dirty 단계의 입력으로만 실행됩니다 (StageGraph.subgraph).
+# freshness(utils/freshness.py)를 넘기면 생애 주기별 갱신 주기가 오지 않았거나 동결된 단계는
+# 피드 이벤트가 있어도 실행하지 않습니다. (처음 실행 / 실행 조건 변경은 예외, 동결은 항상 생략)
+
+FMP_FEEDS = {
+    # 피드 이름: (URL, 시각 필드, 종목 필드)
+    "news": ("https://financialmodelingprep.com/stable/news/stock-latest?page={page}&limit=250&apikey={key}", ["publishedDate"], ["symbol"]),
+    "press": ("https://financialmodelingprep.com/stable/news/press-releases-latest?page={page}&limit=250&apikey={key}", ["publishedDate"], ["symbol"]),
+    "grades": ("https://financialmodelingprep.com/stable/grades-latest-news?page={page}&limit=250&apikey={key}", ["publishedDate"], ["symbol"]),
+    "mna": ("https://financialmodelingprep.com/stable/mergers-acquisitions-latest?page={page}&limit=250&apikey={key}",
+            ["acceptedDate", "transactionDate"], ["symbol", "targetedSymbol"]),
+    "insider": ("https://financialmodelingprep.com/stable/insider-trading/latest?page={page}&limit=250&apikey={key}",
+                ["filingDate", "transactionDate"], ["symbol"]),
+}
+EARNINGS_URL = "https://financialmodelingprep.com/stable/earnings-calendar?from={since}&to={to}&apikey={key}"
+
+# 단계별 규칙: feeds = 이벤트가 있으면 dirty, filings = EDGAR 신규 공시 서류(None이면 모든 서류), max_age_h = 강제 재점검 주기
+STAGE_RULES = {
+    "tab1":         {"feeds": ["news", "press"], "max_age_h": 24},
+    "tab0":         {"filings": None, "max_age_h": 72},
+    "tab0_premium": {"feeds": ["earnings"], "max_age_h": 168},
+    "tab2_esg":     {"feeds": [], "max_age_h": 168},
+    "tab4":         {"feeds": ["grades"], "max_age_h": 24},
+    "tab4_ma":      {"feeds": ["mna"], "max_age_h": 168},
+    "tab4_premium": {"feeds": ["grades"], "max_age_h": 72},
+    "tab3":         {"feeds": ["earnings"], "filings": ["10-Q", "10-K", "20-F", "6-K"], "max_age_h": 168},
+    "tab3_premium": {"feeds": ["earnings"], "max_age_h": 168},
+    "tab3_revenue": {"feeds": ["earnings"], "filings": ["10-Q", "10-K", "20-F"], "max_age_h": 168},
+    "tab6":         {"feeds": ["insider"], "max_age_h": 72},
+}
+# 규칙 없이 다른 단계를 따라가는 단계 (트위터는 Tab1 요약이 새로 나올 때만 의미가 있음)
+FOLLOW_STAGES = {"twitter": "tab1"}
+
+# 피드 시각(미 동부)과 저널 시각(UTC)의 차이 + 수집 지연을 덮는 여유
+CLOCK_MARGIN = timedelta(hours=6)
+# 상장 직전/직후에는 오늘 접수된 서류(daily-index 미게시)를 놓치지 않도록 공시 단계를 항상 실행
+IPO_WINDOW_DAYS = (35, 7)
+MAX_FEED_PAGES = 40
+
+
+def stages_for_event(filing_form=None, feeds=()):
+    """이벤트 하나(신규 공시 서류 / 피드 이름)에 반응하는 단계 목록 (데몬 모드의 이벤트 트리거용)"""
+    wanted = filing_form.upper() if filing_form else None
+    stages = []
+    for stage, rule in STAGE_RULES.items():
+        if wanted and "filings" in rule:
+            forms = rule["filings"]
+            if forms is None or any(wanted == f or wanted.startswith(f + "-") for f in forms):
+                stages.append(stage)
+                continue
+        if set(feeds) & set(rule.get("feeds", [])): stages.append(stage)
+    return stages + [s for s, lead in FOLLOW_STAGES.items() if lead in stages]
+
+
+def _parse_ts(value):
+    if not value: return None
+    try: return datetime.fromisoformat(str(value)[:19].replace(" ", "T"))
+    except Exception:
+        try: return datetime.fromisoformat(str(value)[:10])
+        except Exception: return None
+
+
+class FeedIndex:
+    """피드 하나의 {종목: 마지막 이벤트 시각}과 신뢰 가능한 구간 시작 시각(covered_since)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latest = {}
+        self.covered_since = None   # None = 피드를 못 읽음 (판단 불가)
+        self.items = 0
+
+    def add(self, symbol, ts):
+        if not symbol or ts is None: return
+        sym = str(symbol).strip().upper()
+        if sym and (sym not in self.latest or ts > self.latest[sym]): self.latest[sym] = ts
+
+    def changed_since(self, symbol, checked_at):
+        """True: 이벤트 있음 / False: 없음 / None: 판단 불가 (마지막 완료 시각이 읽은 구간보다 오래됨)"""
+        if self.covered_since is None: return None
+        since = checked_at - CLOCK_MARGIN
+        if since < self.covered_since: return None
+        ts = self.latest.get(str(symbol).upper())
+        return ts is not None and ts >= since
+
+
+class ChangePlan:
+    """사전 점검 결과: 종목별 dirty 단계와 사유"""
+
+    def __init__(self):
+        self.dirty = {}     # 종목 → [단계]
+        self.reasons = {}   # 사유 → 건수
+        self.clean_pairs = 0
+        self.not_due = {}   # 신선도 정책으로 생략한 (종목, 단계) 사유 → 건수 (not_due / frozen)
+        self.feeds = {}
+        self.elapsed = 0.0
+
+    def stages_for(self, ticker):
+        """None이면 계획에 없는 종목 (전체 단계 실행)"""
+        return self.dirty.get(str(ticker))
+
+    def is_clean(self, ticker):
+        return str(ticker) in self.dirty and not self.dirty[str(ticker)]
+
+    def report(self):
+        tickers = len(self.dirty)
+        busy = sum(1 for s in self.dirty.values() if s)
+        pairs = sum(len(s) for s in self.dirty.values())
+        reasons = ", ".join(f"{k} {v}" for k, v in sorted(self.reasons.items(), key=lambda x: -x[1]))
+        feeds = ", ".join(f"{n}({f.items}건{'' if f.covered_since else ' 실패'})" for n, f in self.feeds.items())
+        fresh = ", ".join(f"{k} {v}" for k, v in self.not_due.items())
+        return (f"종목 {tickers}개 중 {busy}개 / (종목, 단계) {pairs}개 실행, {self.clean_pairs}개 생략 "
+                f"[{self.elapsed:.1f}s]\n  사유: {reasons or '-'}\n  피드: {feeds or '-'}\n  신선도 정책 생략: {fresh or '-'}")
+
+
+class ChangeDetector:
+    """실행 저널 + FMP 피드 + EDGAR 인덱스로 ChangePlan을 만듭니다."""
+
+    def __init__(self, client, fmp_key, edgar_index=None, rpc_name="stage_last_checked", page_size=1000, log_fn=print,
+                 freshness=None):
+        self.client = client
+        self.fmp_key = fmp_key
+        self.edgar = edgar_index
+        self.freshness = freshness
+        self.rpc_name = rpc_name
+        self.page_size = page_size
+        self.log = log_fn
+
+    # ------------------------------------------
+    # 대량 수집
+    # ------------------------------------------
+    def load_last_checked(self, since):
+        """{(ticker, stage): (마지막 완료 시각, 지문)} - 키셋 페이지로 전부 읽음"""
+        out, after = {}, ("", "")
+        while True:
+            rows = self.client.rpc(self.rpc_name, {"since": since.isoformat(), "after_ticker": after[0],
+                                                   "after_stage": after[1], "page_size": self.page_size}).execute().data or []
+            for r in rows:
+                out[(r["ticker"], r["stage"])] = (_parse_ts(r.get("last_done")), r.get("fingerprint") or "")
+            if len(rows) < self.page_size: return out
+            after = (rows[-1]["ticker"], rows[-1]["stage"])
+
+    def _fetch_json(self, url):
+        res = requests.get(url, timeout=15)
+        if res.status_code in (400, 404): return []
+        res.raise_for_status()
+        data = res.json()
+        return data if isinstance(data, list) else []
+
+    def load_feed(self, name, since):
+        url, time_fields, symbol_fields = FMP_FEEDS[name]
+        feed = FeedIndex(name)
+        oldest = None
+        try:
+            for page in range(MAX_FEED_PAGES):
+                items = self._fetch_json(url.format(page=page, key=self.fmp_key))
+                if not items:
+                    oldest = since
+                    break
+                for item in items:
+                    ts = next((t for t in (_parse_ts(item.get(f)) for f in time_fields) if t), None)
+                    if ts is None: continue
+                    feed.items += 1
+                    oldest = ts if oldest is None or ts < oldest else oldest
+                    for f in symbol_fields: feed.add(item.get(f), ts)
+                if oldest is not None and oldest < since:
+                    oldest = since
+                    break
+            feed.covered_since = oldest
+        except Exception as e:
+            self.log(f"⚠️ [변경 감지] {name} 피드 수집 실패 (연결된 단계는 전부 실행): {e}")
+        return feed
+
+    def load_earnings(self, since):
+        feed = FeedIndex("earnings")
+        try:
+            items = self._fetch_json(EARNINGS_URL.format(since=since.strftime("%Y-%m-%d"),
+                                                         to=datetime.now().strftime("%Y-%m-%d"), key=self.fmp_key))
+            for item in items:
+                ts = _parse_ts(item.get("date"))
+                if ts is None: continue
+                feed.items += 1
+                # 날짜만 있으므로 발표일 하루 전체를 이벤트로 취급
+                feed.add(item.get("symbol"), ts + timedelta(hours=23, minutes=59))
+            feed.covered_since = datetime.combine(since.date(), datetime.min.time())
+        except Exception as e:
+            self.log(f"⚠️ [변경 감지] 실적 일정 수집 실패 (연결된 단계는 전부 실행): {e}")
+        return feed
+
+    def _load(self, name, since):
+        return self.load_earnings(since) if name == "earnings" else self.load_feed(name, since)
+
+    # ------------------------------------------
+    # 계획
+    # ------------------------------------------
+    def build(self, targets, stages, now=None):
+        """targets: [{ticker, symbols, context_fp, cik, ipo_date, lifecycle}] (ticker = 저널 키 / symbols = 피드 조회용 공식·본주 티커)
+        stages: 종목 그래프의 단계 이름 목록"""
+        started = datetime.now()
+        now = now or datetime.now()
+        plan = ChangePlan()
+        max_age = max(r["max_age_h"] for r in STAGE_RULES.values())
+        if self.freshness: max_age = max(max_age, self.freshness.max_hours())   # 월 단위 주기도 마지막 완료 시각을 알아야 함
+        last = self.load_last_checked(now - timedelta(hours=max_age))
+
+        # 아직 dirty가 아닌 (종목, 단계)의 가장 오래된 완료 시각까지만 피드를 읽음
+        # fmp_key가 없으면 (실행 계획 미리보기) 피드를 읽지 않고 피드 연결 단계는 판단 불가(= 실행)로 둠
+        feed_since = {}
+        for t in (targets if self.fmp_key else []):
+            for stage, rule in STAGE_RULES.items():
+                checked, _ = last.get((t["ticker"], stage), (None, ""))
+                if checked is None or not self._due(t, stage, checked, now): continue
+                for f in rule.get("feeds", []):
+                    start = checked - CLOCK_MARGIN
+                    if f not in feed_since or start < feed_since[f]: feed_since[f] = start
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as pool:
+            futures = {name: pool.submit(self._load, name, since) for name, since in feed_since.items()}
+            plan.feeds = {name: fut.result() for name, fut in futures.items()}
+
+        for t in targets:
+            dirty = []
+            for stage in stages:
+                if stage in FOLLOW_STAGES: continue
+                rule = STAGE_RULES.get(stage)
+                if rule is None: continue   # 입력 전용 단계
+                reason = self._stage_reason(t, stage, rule, last, plan.feeds, now)
+                if reason and not self._due(t, stage, last.get((t["ticker"], stage), (None, ""))[0], now, reason, plan):
+                    reason = None
+                if reason:
+                    dirty.append(stage)
+                    plan.reasons[reason] = plan.reasons.get(reason, 0) + 1
+                else:
+                    plan.clean_pairs += 1
+            for stage, leader in FOLLOW_STAGES.items():
+                if stage in stages and leader in dirty: dirty.append(stage)
+            plan.dirty[t["ticker"]] = dirty
+        plan.elapsed = (datetime.now() - started).total_seconds()
+        return plan
+
+    def _due(self, t, stage, checked, now, reason=None, plan=None):
+        """신선도 정책상 실행할 차례인지 (정책이 없으면 항상 True)"""
+        if self.freshness is None: return True
+        state = t.get("lifecycle")
+        if self.freshness.stage_hours(stage, state) is None: skip = "frozen"
+        elif reason in ("never", "context") or self.freshness.is_due(stage, state, checked, now): return True
+        else: skip = "not_due"
+        if plan is not None: plan.not_due[skip] = plan.not_due.get(skip, 0) + 1
+        return False
+
+    def _stage_reason(self, t, stage, rule, last, feeds, now):
+        checked, fingerprint = last.get((t["ticker"], stage), (None, ""))
+        if checked is None: return "never"
+        if t.get("context_fp") and fingerprint.split(":")[0] != t["context_fp"]: return "context"
+        if now - checked > timedelta(hours=rule["max_age_h"]): return "max_age"
+
+        if "filings" in rule:
+            ipo = t.get("ipo_date")
+            if stage == "tab0" and ipo and -IPO_WINDOW_DAYS[1] <= (ipo - now.date()).days <= IPO_WINDOW_DAYS[0]:
+                return "ipo_window"
+            if self.edgar is None: return "filings_unknown"
+            forms = rule["filings"]
+            if forms is None:
+                if not self.edgar.is_covered(t.get("cik")): return "filings_unknown"
+                if self.edgar.events_for(t.get("cik")): return "filing"
+                # daily-index를 다 못 읽었거나 실시간 피드가 끊겼으면(오늘 8-K 누락 가능) 직접 확인
+                if not self.edgar.complete or self.edgar.partial_forms: return "filings_unknown"
+            else:
+                new_filing = self.edgar.has_new_filing(t.get("cik"), forms)
+                if new_filing: return "filing"
+                if new_filing is None: return "filings_unknown"   # 게이트 판단 불가 → 직접 확인
+
+        for name in rule.get("feeds", []):
+            feed = feeds.get(name)
+            changes = [feed.changed_since(sym, checked) if feed else None for sym in t["symbols"]]
+            if any(changes): return name
+            if None in changes: return f"{name}_unknown"
+        return None
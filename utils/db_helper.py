@@ -2,14 +2,16 @@ import streamlit as st
 import os
 import json
 import pandas as pd
-from supabase import create_client
+from utils.storage import create_storage_client, is_local_backend
+from utils.paged_reader import fetch_all_rows
 from datetime import datetime, timedelta, time
 
 @st.cache_resource
 def init_supabase():
+    if is_local_backend(): return create_storage_client()
     url = os.environ.get("SUPABASE_URL") or st.secrets["supabase"]["url"]
     key = os.environ.get("SUPABASE_KEY") or st.secrets["supabase"]["key"]
-    return create_client(url, key)
+    return create_storage_client(url, key)
 
 supabase = init_supabase()
 
@@ -24,14 +26,18 @@ def get_daily_signal_counts():
 
     try:
         # [1] 주가 시그널 집계 (오늘 자정 이후 데이터만)
-        res_alerts = supabase.table("premium_alerts").select("alert_type").gte("created_at", today_start).execute()
-        for item in res_alerts.data:
-            a_type = item['alert_type']
-            counts[a_type] = counts.get(a_type, 0) + 1
+        try:
+            res_alerts = supabase.rpc("premium_alert_type_counts", {"since": today_start}).execute()
+            for item in res_alerts.data or []:
+                counts[item['alert_type']] = int(item['alerts'] or 0)
+        except Exception as e:
+            # 집계 RPC(migrations/003)가 없는 DB면 행 단위로 읽어 집계 (리포트 집계는 계속 진행)
+            print(f"Alert Count RPC Error (fallback to scan): {e}")
+            for item in fetch_all_rows(supabase, "premium_alerts", "id, alert_type", order="id",
+                                       filters=lambda q: q.gte("created_at", today_start)):
+                counts[item['alert_type']] = counts.get(item['alert_type'], 0) + 1
 
         # [2] AI 리포트 집계 (오늘 자정 이후 업데이트된 것만)
-        res_cache = supabase.table("analysis_cache").select("cache_key").gte("updated_at", today_start).execute()
-        
         ai_types = {
             "8K_UPDATE": "8K_UPDATE",
             "PremiumEarningsCall": "EarningsCall",
@@ -43,8 +49,21 @@ def get_daily_signal_counts():
             "Tab6_SmartMoney": "SmartMoney"
         }
 
+        # 💡 [리포트 인덱스] (종목, 리포트 종류) 단위 중복 제거 집계를 서버 RPC로 처리
+        try:
+            res_types = supabase.rpc("report_index_type_counts", {"since": today_start}).execute()
+            for item in res_types.data or []:
+                internal_name = ai_types.get(item['report_type'])
+                if internal_name:
+                    counts[internal_name] = counts.get(internal_name, 0) + int(item['reports'] or 0)
+            return counts
+        except Exception as e:
+            print(f"Report Index Count Error (fallback to scan): {e}")
+
+        cache_rows = fetch_all_rows(supabase, "analysis_cache", "cache_key", order="cache_key",
+                                    filters=lambda q: q.gte("updated_at", today_start))
         seen_reports = set() 
-        for item in res_cache.data:
+        for item in cache_rows:
             key = item['cache_key']
             for keyword, internal_name in ai_types.items():
                 if keyword in key:
@@ -56,8 +75,9 @@ def get_daily_signal_counts():
                         seen_reports.add(base_key)
         
         return counts
-    except:
-        return {}
+    except Exception as e:
+        print(f"Daily Signal Count Error: {e}")
+        return counts
 
 def get_upcoming_ipo_teaser():
     try:
@@ -68,10 +88,10 @@ def get_upcoming_ipo_teaser():
             # 아직 상장 전이거나 오늘 상장하는 기업 5개
             today = datetime.now().date()
             return df[df['dt'].dt.date >= today].sort_values('dt').head(5)
-    except: return pd.DataFrame()
+    except Exception: return pd.DataFrame()
 
 def get_worker_health():
     try:
         res = supabase.table("analysis_cache").select("updated_at").eq("cache_key", "WORKER_LAST_RUN").execute()
         if res.data: return pd.to_datetime(res.data[0]['updated_at'])
-    except: return None
+    except Exception: return None
@@ -0,0 +1,169 @@
+import os
+import json
+import gzip
+import time
+import hashlib
+import threading
+
+from utils.write_buffer import conflict_key
+
+# ==========================================
+# [델타 필터] 바뀌지 않은 행은 다시 쓰지 않기
+# ==========================================
+# 매 실행마다 stock_list 전체, Tab0 '서류 없음' 안내문 4개 언어, Tab6 '내역 없음' 문구,
+# IPO_CALENDAR_DATA 등 내용이 그대로인 행을 통째로 다시 upsert 하고 있었습니다.
+# 행마다 (하트비트 컬럼을 제외한) 내용 지문을 로컬 매니페스트에 남겨 두고, 지문이 같으면
+#   - skip  : 아예 보내지 않음
+#   - touch : 충돌 키 + 하트비트 컬럼(updated_at 등)만 보냄 (TTL 판단에 updated_at을 쓰는 캐시용)
+# 매니페스트는 전송 성공(commit) 후에만 갱신되므로, 실패한 행은 다음 실행에서 다시 전송됩니다.
+# 쓰기 버퍼와 함께 쓸 때는 sender()로 전송 함수를 감싸 전송 시점에 거릅니다.
+# (버퍼에는 원본 행이 남아야 pending() 조회가 content 없는 touch 행을 돌려주지 않음)
+# 외부(앱 등)에서 같은 행을 바꿨을 수 있으므로 refresh_days가 지난 지문은 무시하고 한 번 더 씁니다.
+
+DEFAULT_MANIFEST_PATH = os.path.join(".cache", "delta_manifest.json.gz")
+HEARTBEAT_COLUMNS = {"updated_at", "last_updated", "created_at"}
+REFRESH_DAYS = 3
+
+
+def row_fingerprint(row, ignore_cols=HEARTBEAT_COLUMNS):
+    body = {k: v for k, v in row.items() if k not in ignore_cols}
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _key_str(key):
+    return "\x1f".join(str(v) for v in key)
+
+
+class DeltaFilter:
+    """테이블별 행 지문 매니페스트 기반 변경분 필터 (스레드 안전)"""
+
+    def __init__(self, path=None, touch_tables=None, refresh_days=REFRESH_DAYS):
+        self.path = path or os.environ.get("DELTA_MANIFEST_PATH") or DEFAULT_MANIFEST_PATH
+        # 기본적으로 touch 모드로 처리할 테이블 → 하트비트 컬럼
+        self.touch_tables = touch_tables or {}
+        self.refresh_days = refresh_days
+
+        self._manifest = {}  # table → {key_str: [fingerprint, epoch_day]}
+        self._pending = {}   # (table, key_str) → fingerprint (전송 완료 시 매니페스트로 이동)
+        self._touch = {}     # (table, key_str) → 호출 측이 지정한 touch 모드 (전송 시점 filter에서 사용)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.stats = {}
+
+    # ------------------------------------------
+    # 매니페스트 입출력
+    # ------------------------------------------
+    def load(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                self._manifest = json.load(f)
+        except FileNotFoundError:
+            self._manifest = {}
+        except Exception as e:
+            print(f"⚠️ [델타 필터] 매니페스트 손상, 새로 시작합니다: {e}")
+            self._manifest = {}
+        return sum(len(v) for v in self._manifest.values())
+
+    def save(self):
+        if not self._dirty: return False
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with self._lock:
+                payload = json.dumps(self._manifest, ensure_ascii=False, separators=(',', ':'))
+                self._dirty = False
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            print(f"⚠️ [델타 필터] 매니페스트 저장 실패: {e}")
+            return False
+
+    # ------------------------------------------
+    # 필터 / 확정
+    # ------------------------------------------
+    def _stat(self, table, **inc):
+        s = self.stats.setdefault(table, {"written": 0, "touched": 0, "skipped": 0})
+        for k, v in inc.items(): s[k] += v
+
+    def prefer(self, table, on_conflict, rows, touch=None):
+        """적재 시점에 지정한 touch 모드를 기억해 둡니다. (None = 테이블 기본값, 같은 키는 마지막 지정이 이김)"""
+        with self._lock:
+            for row in rows:
+                key = conflict_key(row, on_conflict)
+                if key is None: continue
+                if touch is None: self._touch.pop((table, _key_str(key)), None)
+                else: self._touch[(table, _key_str(key))] = touch
+
+    def filter(self, table, on_conflict, rows, touch=None):
+        """바뀐 행은 그대로, 바뀌지 않은 행은 touch 모드면 (키 + 하트비트 컬럼)만, 아니면 제외하고 반환합니다."""
+        heartbeat_cols = self.touch_tables.get(table, [])
+        if touch is None: touch = bool(heartbeat_cols)
+        key_cols = [c.strip() for c in str(on_conflict).split(',') if c.strip()]
+        today = int(time.time() // 86400)
+
+        out = []
+        with self._lock:
+            table_manifest = self._manifest.get(table, {})
+            for row in rows:
+                key = conflict_key(row, on_conflict)
+                if key is None: continue
+                k = _key_str(key)
+                fp = row_fingerprint(row)
+                prev = table_manifest.get(k)
+                unchanged = prev is not None and prev[0] == fp and (today - prev[1]) < self.refresh_days
+                row_touch = self._touch.pop((table, k), touch)
+
+                if not unchanged:
+                    self._pending[(table, k)] = fp
+                    out.append(row)
+                    self._stat(table, written=1)
+                elif row_touch and any(c in row for c in heartbeat_cols):
+                    out.append({c: row[c] for c in key_cols + heartbeat_cols if c in row})
+                    self._stat(table, touched=1)
+                else:
+                    self._stat(table, skipped=1)
+        return out
+
+    def commit(self, table, on_conflict, rows):
+        """전송에 성공한 행의 지문을 매니페스트에 확정합니다. (touch 행은 지문 변화 없음)"""
+        today = int(time.time() // 86400)
+        with self._lock:
+            table_manifest = self._manifest.setdefault(table, {})
+            for row in rows:
+                key = conflict_key(row, on_conflict)
+                if key is None: continue
+                k = _key_str(key)
+                fp = self._pending.pop((table, k), None)
+                if fp is not None:
+                    table_manifest[k] = [fp, today]
+                    self._dirty = True
+
+    def sender(self, send_fn, exempt=()):
+        """쓰기 버퍼용 전송 함수 래퍼: 전송 직전에 변경분만 남기고, send_fn이 True를 돌려주면 지문을 확정합니다.
+        exempt: 거르지 않고 그대로 보내는 테이블 (실행 저널처럼 매번 새 키라 매니페스트만 커지는 경우)"""
+        def send(table, on_conflict, rows):
+            if table in exempt: return send_fn(table, on_conflict, rows)
+            rows = self.filter(table, on_conflict, rows)
+            if not rows: return True
+            ok = send_fn(table, on_conflict, rows)
+            if ok: self.commit(table, on_conflict, rows)
+            return ok   # False면 쓰기 버퍼가 실패로 집계 (실행 저널 done 확정 보류)
+        return send
+
+    def forget(self, table, keys):
+        """삭제된 행(보존 정책 등)의 지문을 매니페스트에서 제거합니다. (같은 키가 다시 생기면 그대로 전송되도록)"""
+        with self._lock:
+            table_manifest = self._manifest.get(table, {})
+            for key in keys:
+                k = _key_str(key if isinstance(key, (list, tuple)) else (key,))
+                if table_manifest.pop(k, None) is not None:
+                    self._dirty = True
+
+    def report(self):
+        lines = []
+        for table, s in sorted(self.stats.items()):
+            lines.append(f"{table}: 전송 {s['written']}행 / 하트비트만 {s['touched']}행 / 생략 {s['skipped']}행")
+        return "\n".join(lines)
@@ -0,0 +1,256 @@
+import re
+import json
+import threading
+from datetime import datetime, timedelta
+
+import requests
+
+# ==========================================
+# [EDGAR 인덱스 소비기] 하루치 공시 목록을 한 번만 읽어 신규 공시 이벤트 추출
+# ==========================================
+# 종목마다 fetch_sec_metadata(…, "8-K")를 호출하는 대신,
+# EDGAR daily-index(form.YYYYMMDD.idx)를 실행당 한 번 읽고 추적 중인 CIK와 조인합니다.
+# 마지막으로 읽은 날짜(High-Water Mark)와 '전수 점검이 끝난 CIK' 목록은 상태 JSON으로 보관합니다.
+#
+# 오늘 접수분은 daily-index가 밤에 게시되므로, 8-K만큼은 EDGAR 실시간 Atom 피드로 보완합니다.
+#
+# 게이트가 "확실히 없음"(False)을 주는 것은 읽어야 할 날짜를 모두 읽었고 실시간 피드도 HWM까지 닿았을 때뿐입니다.
+# 하루라도 조회에 실패했거나 피드가 중간에 끊기면 None(판단 불가)을 돌려 종목별로 직접 확인하게 합니다.
+# 분석에 실패한 CIK(mark_failed)는 전수 점검 목록에서 빼서, 다음 실행에서 HWM과 관계없이 직접 확인(트래커 재시도)합니다.
+# 샤드 모드에서는 프로세스마다 점검 / 실패 CIK를 리스 테이블의 note 행(marks())으로 남기고, HWM을 커밋하는 프로세스가 merge_marks()로 합칩니다.
+
+DAILY_INDEX_URL = "https://www.sec.gov/Archives/edgar/daily-index/{year}/QTR{qtr}/form.{ymd}.idx"
+CURRENT_FEED_URL = "https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&type={form}&company=&dateb=&owner=include&start={start}&count=100&output=atom"
+
+# 전수 점검 후 이 기간이 지나면 인덱스 게이트를 믿지 않고 다시 종목별로 직접 확인 (자가 치유 주기)
+COVERAGE_DAYS = 7
+# 최초 실행 시 거슬러 올라갈 일수
+INITIAL_LOOKBACK_DAYS = 3
+# 이 기간보다 오래된 날짜가 404면 주말/휴일로 보고 HWM을 넘김
+SETTLED_DAYS = 3
+
+IDX_LINE_RE = re.compile(r'^(?P<form>\S.*?)\s{2,}(?P<company>.+?)\s{2,}(?P<cik>\d+)\s{2,}(?P<date>\d{8}|\d{4}-\d{2}-\d{2})\s{2,}(?P<file>\S+)\s*$')
+ATOM_ENTRY_RE = re.compile(r'<entry>(.*?)</entry>', re.S)
+ATOM_TITLE_RE = re.compile(r'<title>(.*?)</title>', re.S)
+ATOM_ID_RE = re.compile(r'accession-number=([0-9-]+)')
+ATOM_UPDATED_RE = re.compile(r'<updated>(\d{4}-\d{2}-\d{2})')
+
+
+def normalize_cik(cik):
+    try: return str(int(str(cik).strip()))
+    except Exception: return None
+
+
+def parse_form_index(text):
+    """form.idx 본문을 [(form, cik, date, accession)] 리스트로 변환합니다."""
+    rows = []
+    started = False
+    for line in text.splitlines():
+        if not started:
+            if line.startswith('-----'): started = True
+            continue
+        m = IDX_LINE_RE.match(line)
+        if not m: continue
+        file_name = m.group('file')
+        accession = file_name.rsplit('/', 1)[-1].replace('.txt', '')
+        date = m.group('date')
+        if len(date) == 8: date = f"{date[:4]}-{date[4:6]}-{date[6:]}"
+        rows.append((m.group('form').strip(), normalize_cik(m.group('cik')), date, accession))
+    return rows
+
+
+class EdgarIndexConsumer:
+    """EDGAR daily-index를 증분으로 읽어 추적 CIK별 신규 공시 이벤트를 제공합니다."""
+
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+        self.hwm_date = None         # 마지막으로 완전히 소비한 날짜 (YYYY-MM-DD)
+        self.covered = {}            # { cik: 마지막 전수 점검일 } - 이 CIK는 인덱스 게이트를 믿어도 됨
+        self.events = {}             # { cik: [(form, accession, date), ...] }
+        self.ready = False
+        self.complete = False        # 이번 refresh에서 읽어야 할 daily-index를 모두 읽었는지
+        self.partial_forms = set()   # 실시간 피드가 HWM까지 닿지 못한 서류
+        self._new_hwm = None
+        self._checked = set()
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------
+    # 상태 (analysis_cache 한 줄로 저장)
+    # ------------------------------------------
+    def load_state(self, content):
+        try:
+            state = json.loads(content) if content else {}
+            self.hwm_date = state.get("date")
+            self.covered = state.get("ciks", {}) or {}
+        except Exception as e:
+            print(f"⚠️ [EDGAR 인덱스] 상태 복원 실패 (처음부터 시작): {e}")
+            self.hwm_date, self.covered = None, {}
+        # 데몬 모드: 실행 주기마다 상태를 다시 읽으므로 이전 주기의 점검 / 실패 기록은 버림
+        with self._lock:
+            self._checked, self._failed = set(), set()
+
+    def dump_state(self, advance=True):
+        """advance=False(시간 초과 등 중도 종료)면 HWM은 그대로 두고 점검 완료 CIK만 반영합니다."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        cutoff = (datetime.now() - timedelta(days=COVERAGE_DAYS)).strftime("%Y-%m-%d")
+        with self._lock:
+            covered = {c: d for c, d in self.covered.items() if d >= cutoff and c not in self._failed}
+            for cik in self._checked - self._failed:
+                covered[cik] = today
+        hwm = (self._new_hwm or self.hwm_date) if advance else self.hwm_date
+        return json.dumps({"date": hwm, "ciks": covered})
+
+    # ------------------------------------------
+    # 인덱스 소비
+    # ------------------------------------------
+    def _fetch_day(self, day):
+        qtr = (day.month - 1) // 3 + 1
+        url = DAILY_INDEX_URL.format(year=day.year, qtr=qtr, ymd=day.strftime("%Y%m%d"))
+        try:
+            res = requests.get(url, headers=self.headers, timeout=20)
+            if res.status_code == 200:
+                return parse_form_index(res.text)
+            if res.status_code in [403, 404]:
+                return None
+            print(f"⚠️ [EDGAR 인덱스] {day.date()} 응답 이상 - HTTP {res.status_code}")
+        except Exception as e:
+            print(f"⚠️ [EDGAR 인덱스] {day.date()} 요청 실패: {e}")
+        return False
+
+    def _fetch_current_feed(self, form, since_date, max_pages=5):
+        """daily-index에 아직 없는 오늘 접수분을 실시간 Atom 피드로 보완합니다.
+        반환값: (rows, complete) - complete=False면 피드가 since_date까지 닿기 전에 끊김"""
+        rows = []
+        for page in range(max_pages):
+            try:
+                url = CURRENT_FEED_URL.format(form=form, start=page * 100)
+                res = requests.get(url, headers=self.headers, timeout=15)
+                if res.status_code != 200:
+                    print(f"⚠️ [EDGAR 인덱스] 실시간 피드 응답 이상 - HTTP {res.status_code}")
+                    return rows, False
+                entries = ATOM_ENTRY_RE.findall(res.text)
+                if not entries: return rows, True   # 피드 끝까지 읽음
+
+                reached_old = False
+                for entry in entries:
+                    title = ATOM_TITLE_RE.search(entry)
+                    acc = ATOM_ID_RE.search(entry)
+                    upd = ATOM_UPDATED_RE.search(entry)
+                    if not (title and acc and upd): continue
+                    if since_date and upd.group(1) <= since_date:
+                        reached_old = True
+                        continue
+                    m = re.match(r'^\s*(\S+)\s+-\s+.*\((\d{10})\)', title.group(1))
+                    if m: rows.append((m.group(1), normalize_cik(m.group(2)), upd.group(1), acc.group(1)))
+                if reached_old: return rows, True
+            except Exception as e:
+                print(f"⚠️ [EDGAR 인덱스] 실시간 피드 요청 실패: {e}")
+                return rows, False
+        print(f"⚠️ [EDGAR 인덱스] 실시간 {form} 피드가 {max_pages}페이지 안에 {since_date or '기준일'}까지 닿지 않음 (게이트 판단 보류)")
+        return rows, False
+
+    def refresh(self, tracked_ciks, live_forms=("8-K",)):
+        """HWM 이후의 daily-index를 읽고 추적 CIK와 조인하여 이벤트를 만듭니다."""
+        tracked = {normalize_cik(c) for c in tracked_ciks if c}
+        tracked.discard(None)
+        today = datetime.now()
+
+        if self.hwm_date:
+            start = datetime.strptime(self.hwm_date, "%Y-%m-%d") + timedelta(days=1)
+        else:
+            start = today - timedelta(days=INITIAL_LOOKBACK_DAYS)
+            # 최초 실행: 어떤 CIK도 전수 점검된 적이 없으므로 게이트가 전부 '모름'으로 동작
+            self.covered = {}
+
+        rows, new_hwm, day, advancing, complete = [], self.hwm_date, start, True, True
+        while day.date() <= today.date():
+            result = self._fetch_day(day)
+            if result is False:
+                advancing = complete = False
+            elif result is None:
+                # 주말/휴일이거나 아직 게시 전: 충분히 지난 날짜만 HWM을 넘김
+                if advancing and (today - day).days >= SETTLED_DAYS:
+                    new_hwm = day.strftime("%Y-%m-%d")
+                else:
+                    advancing = False
+            else:
+                rows.extend(result)
+                if advancing: new_hwm = day.strftime("%Y-%m-%d")
+            day += timedelta(days=1)
+
+        partial_forms = set()
+        for form in live_forms:
+            feed_rows, feed_complete = self._fetch_current_feed(form, new_hwm)
+            rows.extend(feed_rows)
+            if not feed_complete: partial_forms.add(form.upper())
+
+        events, seen = {}, set()
+        for form, cik, date, accession in rows:
+            if cik not in tracked or accession in seen: continue
+            seen.add(accession)
+            events.setdefault(cik, []).append((form, accession, date))
+
+        with self._lock:
+            self.events = events
+            self._new_hwm = new_hwm
+            self.complete = complete
+            self.partial_forms = partial_forms
+            self.ready = True
+
+        total = sum(len(v) for v in events.values())
+        gaps = ("" if complete else " / 일부 날짜 조회 실패") + (f" / 실시간 피드 미완: {', '.join(sorted(partial_forms))}" if partial_forms else "")
+        print(f"📰 [EDGAR 인덱스] {self.hwm_date or '최초'} 이후 공시 {len(rows)}건 스캔 → 추적 종목 신규 이벤트 {total}건 (HWM → {new_hwm}){gaps}")
+        return events
+
+    # ------------------------------------------
+    # 게이트 (종목별 조회 생략 여부 판단)
+    # ------------------------------------------
+    def is_covered(self, cik):
+        cik = normalize_cik(cik)
+        if not (self.ready and cik): return False
+        cutoff = (datetime.now() - timedelta(days=COVERAGE_DAYS)).strftime("%Y-%m-%d")
+        return self.covered.get(cik, "") >= cutoff
+
+    def has_new_filing(self, cik, forms):
+        """True: 신규 공시 있음 / False: 확실히 없음(조회 생략 가능) / None: 판단 불가(직접 조회 필요)"""
+        if not self.is_covered(cik): return None
+        # 'Form 25' ↔ '25-NSE' 처럼 표기가 다른 서류명도 같은 계열로 취급
+        wanted = {f.upper().replace("FORM ", "").strip() for f in forms}
+        family = lambda form: form in wanted or any(form.startswith(w + "-") for w in wanted)
+        for form, _, _ in self.events.get(normalize_cik(cik), []):
+            if family(form.upper()): return True
+        # 이벤트가 없어도 읽지 못한 구간이 있으면 "없음"을 확정할 수 없음
+        if not self.complete or any(family(form) for form in self.partial_forms): return None
+        return False
+
+    def events_for(self, cik, ticker=None):
+        """(ticker, form, accession) 형태의 신규 이벤트 목록"""
+        return [(ticker, form, acc) for form, acc, _ in self.events.get(normalize_cik(cik), [])]
+
+    def mark_checked(self, cik):
+        """종목별 전수 점검을 마친 CIK를 기록합니다. (다음 실행부터 인덱스 게이트 적용)"""
+        cik = normalize_cik(cik)
+        if cik:
+            with self._lock:
+                self._checked.add(cik)
+
+    def marks(self):
+        """이 프로세스의 점검 완료 / 실패 CIK (샤드 모드에서 후속 단계를 맡은 프로세스로 넘김)"""
+        with self._lock:
+            return json.dumps({"checked": sorted(self._checked), "failed": sorted(self._failed)})
+
+    def merge_marks(self, content):
+        """다른 샤드 프로세스의 marks()를 합칩니다. 어느 한 곳에서라도 실패한 CIK는 실패로 남음"""
+        try: state = json.loads(content) if content else {}
+        except Exception: return
+        with self._lock:
+            self._checked.update(c for c in (normalize_cik(x) for x in state.get("checked", [])) if c)
+            self._failed.update(c for c in (normalize_cik(x) for x in state.get("failed", [])) if c)
+
+    def mark_failed(self, cik):
+        """분석 / 트래커 갱신에 실패한 CIK: 전수 점검 목록에서 빼서 다음 실행은 게이트 없이 직접 확인합니다."""
+        cik = normalize_cik(cik)
+        if cik:
+            with self._lock:
+                self._failed.add(cik)
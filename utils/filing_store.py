@@ -0,0 +1,212 @@
+import os
+import re
+import zlib
+import base64
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import requests
+
+# ==========================================
+# [공시 본문 저장소] Accession Number 기반 압축 캐시
+# ==========================================
+# 10-K / BS / IS / CF 토픽은 모두 같은 accession 번호로 귀결되므로,
+# 정제된 본문을 accession 번호로 한 번만 저장해 두고 모든 토픽과 이후 실행이 재사용합니다.
+#
+# 조회 순서: (1) 프로세스 메모리 LRU → (2) 로컬 SQLite → (3) 공유 Supabase 테이블(선택)
+#
+# 공유 티어 테이블 (FILING_STORE_SHARED=1 일 때만 사용): migrations/009_filing_text_store.sql
+
+DEFAULT_STORE_PATH = os.path.join(".cache", "filing_store.sqlite")
+
+
+def normalize_accession(accession_num):
+    """'0001234567-24-000001' 과 '000123456724000001' 을 같은 키로 취급합니다."""
+    return re.sub(r'[^0-9]', '', str(accession_num or ''))
+
+
+class FilingTextStore:
+    """정제된 공시 본문을 accession 번호 키로 압축 저장하는 계층형 저장소입니다."""
+
+    def __init__(self, path=None, shared_url=None, shared_key=None,
+                 shared_table="filing_text_store", memory_items=32):
+        self.path = path or os.environ.get("FILING_STORE_PATH", DEFAULT_STORE_PATH)
+        self.shared_url = (shared_url or "").rstrip('/')
+        self.shared_key = shared_key or ""
+        self.shared_table = shared_table
+        self.memory_items = memory_items
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}   # accession → [락, 대기 중인 요청 수] (요청이 모두 끝나면 삭제 → 데몬 모드에서도 커지지 않음)
+        self._conn = None
+        self.stats = {"memory_hit": 0, "local_hit": 0, "shared_hit": 0, "miss": 0, "stored": 0}
+
+        try:
+            folder = os.path.dirname(self.path)
+            if folder: os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS filing_text ("
+                " accession TEXT PRIMARY KEY, sha256 TEXT, text_len INTEGER,"
+                " body BLOB, stored_at TEXT)"
+            )
+            self._conn.commit()
+        except Exception as e:
+            print(f"⚠️ [공시 저장소] 로컬 SQLite 초기화 실패 (메모리 모드로 동작): {e}")
+            self._conn = None
+
+    # ------------------------------------------
+    # 내부: 압축 / 해제
+    # ------------------------------------------
+    @staticmethod
+    def _pack(text):
+        return zlib.compress(text.encode('utf-8'), 6)
+
+    @staticmethod
+    def _unpack(blob):
+        return zlib.decompress(blob).decode('utf-8')
+
+    def _remember(self, key, text):
+        with self._lock:
+            self._memory[key] = text
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    # ------------------------------------------
+    # 계층별 조회
+    # ------------------------------------------
+    def _get_local(self, key):
+        if not self._conn: return None
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT body FROM filing_text WHERE accession = ?", (key,)).fetchone()
+            return self._unpack(row[0]) if row else None
+        except Exception as e:
+            print(f"⚠️ [공시 저장소] 로컬 조회 실패 ({key}): {e}")
+            return None
+
+    def _put_local(self, key, text, digest):
+        if not self._conn: return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO filing_text (accession, sha256, text_len, body, stored_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, digest, len(text), self._pack(text), datetime.now().isoformat())
+                )
+                self._conn.commit()
+        except Exception as e:
+            print(f"⚠️ [공시 저장소] 로컬 저장 실패 ({key}): {e}")
+
+    def _shared_headers(self):
+        return {"apikey": self.shared_key, "Authorization": f"Bearer {self.shared_key}"}
+
+    def _get_shared(self, key):
+        if not (self.shared_url and self.shared_key): return None
+        try:
+            url = f"{self.shared_url}/rest/v1/{self.shared_table}?accession=eq.{key}&select=body"
+            res = requests.get(url, headers=self._shared_headers(), timeout=10)
+            if res.status_code == 200 and res.json():
+                return self._unpack(base64.b64decode(res.json()[0]['body']))
+        except Exception as e:
+            print(f"⚠️ [공시 저장소] 공유 티어 조회 실패 ({key}): {e}")
+        return None
+
+    def _put_shared(self, key, text, digest):
+        if not (self.shared_url and self.shared_key): return
+        try:
+            url = f"{self.shared_url}/rest/v1/{self.shared_table}?on_conflict=accession"
+            headers = self._shared_headers()
+            headers.update({"Content-Type": "application/json", "Prefer": "return=minimal,resolution=merge-duplicates"})
+            payload = [{
+                "accession": key, "sha256": digest, "text_len": len(text),
+                "body": base64.b64encode(self._pack(text)).decode('ascii'),
+                "stored_at": datetime.now().isoformat()
+            }]
+            requests.post(url, json=payload, headers=headers, timeout=15)
+        except Exception as e:
+            print(f"⚠️ [공시 저장소] 공유 티어 저장 실패 ({key}): {e}")
+
+    # ------------------------------------------
+    # 공개 API
+    # ------------------------------------------
+    def get(self, accession_num):
+        key = normalize_accession(accession_num)
+        if not key: return None
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hit"] += 1
+                return self._memory[key]
+
+        text = self._get_local(key)
+        if text is not None:
+            self.stats["local_hit"] += 1
+            self._remember(key, text)
+            return text
+
+        text = self._get_shared(key)
+        if text is not None:
+            self.stats["shared_hit"] += 1
+            self._remember(key, text)
+            self._put_local(key, text, hashlib.sha256(text.encode('utf-8')).hexdigest())
+            return text
+        return None
+
+    def put(self, accession_num, text):
+        key = normalize_accession(accession_num)
+        if not key or not text: return
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        self._remember(key, text)
+        self._put_local(key, text, digest)
+        self._put_shared(key, text, digest)
+        self.stats["stored"] += 1
+
+    def get_or_fetch(self, accession_num, fetch_fn):
+        """저장소에 없을 때만 fetch_fn()으로 다운로드합니다. 같은 accession 동시 요청은 한 번만 다운로드합니다."""
+        key = normalize_accession(accession_num)
+        if not key: return fetch_fn()
+
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+
+        try:
+            with entry[0]:
+                text = self.get(key)
+                if text is not None:
+                    return text
+                self.stats["miss"] += 1
+                text = fetch_fn()
+                if text: self.put(key, text)
+                return text
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0: self._key_locks.pop(key, None)
+
+    def prune(self, max_bytes=300 * 1024 * 1024):
+        """로컬 저장소가 max_bytes를 넘으면 오래된 본문부터 삭제합니다."""
+        if not self._conn: return 0
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT accession, length(body) FROM filing_text ORDER BY stored_at DESC"
+                ).fetchall()
+                total, doomed = 0, []
+                for acc, size in rows:
+                    total += size or 0
+                    if total > max_bytes: doomed.append((acc,))
+                if doomed:
+                    self._conn.executemany("DELETE FROM filing_text WHERE accession = ?", doomed)
+                    self._conn.commit()
+            return len(doomed)
+        except Exception as e:
+            print(f"⚠️ [공시 저장소] 정리 실패: {e}")
+            return 0
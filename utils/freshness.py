@@ -0,0 +1,131 @@
+import re
+import threading
+from datetime import datetime, timedelta
+
+# ==========================================
+# [신선도 정책] 데이터 소스 x IPO 생애 주기별 갱신 주기 (한 곳에서 관리)
+# ==========================================
+# 갱신 주기가 함수마다 하드코딩되어 있었고 (get_fmp_data_with_cache의 valid_hours=168/24/12/6,
+# Tab4의 1년 경과 시 168시간 규칙 등), 주기가 오지 않은 단계도 매 실행마다 트래커를 읽어 "할 일 없음"을 확인했습니다.
+# 이 표 하나로
+#   - FMP 원본 캐시 유효 시간 (hours(): 함수 안의 valid_hours 대신)
+#   - 단계 실행 여부 (is_due(): 실행 저널의 마지막 완료 시각 + 단계 소스 중 가장 짧은 주기 → DB 조회 없이 판단)
+#   - 동결 (None): 해당 생애 주기에서는 더 이상 갱신하지 않음 (예: 상장 1년이 지난 기업의 S-1 분석)
+# 를 정합니다. 값은 시간 단위이며 표에 없는 생애 주기는 "default"를 씁니다.
+
+UPCOMING, PRICED, TRADING_LT1Y, TRADING_GT1Y, WITHDRAWN, DELISTED = (
+    "upcoming", "priced", "trading_lt1y", "trading_gt1y", "withdrawn", "delisted")
+LIFECYCLES = (UPCOMING, PRICED, TRADING_LT1Y, TRADING_GT1Y, WITHDRAWN, DELISTED)
+PRICED_WINDOW_DAYS = 30   # 상장 후 이 기간은 "priced" (뉴스 / 공시 / 등급이 가장 자주 바뀜)
+FROZEN_CACHE_HOURS = 24 * 365 * 10   # 동결 소스의 캐시 유효 시간 (캐시가 있으면 다시 받지 않음)
+# 실행 시각 오차 여유: 6시간 주기 cron에서 지난 실행의 늦은 시각에 끝난 단계가 다음 실행에서 빠지지 않도록
+# 주기의 25% (최대 6시간) 일찍 도래한 것으로 봄
+DUE_SLACK_RATIO = 0.25
+DUE_SLACK_MAX_H = 6
+
+FRESHNESS_POLICY = {
+    # 소스: {생애 주기: 시간 (None = 동결)}
+    "profile":          {"default": 168, WITHDRAWN: 720, DELISTED: 720},
+    "news":             {"default": 6, TRADING_GT1Y: 12, WITHDRAWN: 168, DELISTED: 168},
+    "press":            {"default": 12, WITHDRAWN: 168, DELISTED: 168},
+    "esg":              {"default": 720, UPCOMING: None, WITHDRAWN: None, DELISTED: None},
+    "earnings_call":    {"default": 24, UPCOMING: None, WITHDRAWN: None, DELISTED: None},
+    "analyst":          {"default": 24, TRADING_GT1Y: 168, WITHDRAWN: 168, DELISTED: 168},
+    "ma":               {"default": 24, TRADING_GT1Y: 168, WITHDRAWN: 168, DELISTED: 168},
+    "upgrades":         {"default": 24, UPCOMING: 72, WITHDRAWN: None, DELISTED: None},
+    "peers":            {"default": 24, TRADING_GT1Y: 168, WITHDRAWN: None, DELISTED: None},
+    "financials":       {"default": 24, UPCOMING: 72, WITHDRAWN: 720, DELISTED: 720},
+    "surprise":         {"default": 24, UPCOMING: None, WITHDRAWN: None, DELISTED: None},
+    "estimate":         {"default": 24, UPCOMING: None, WITHDRAWN: None, DELISTED: None},
+    "revenue_segment":  {"default": 24, UPCOMING: None, TRADING_GT1Y: 168, WITHDRAWN: None, DELISTED: None},
+    "smart_money":      {"default": 24, UPCOMING: None, TRADING_GT1Y: 72, WITHDRAWN: None, DELISTED: 168},
+    # SEC 공시 (Tab0 토픽 / Tab3 재무)
+    "sec_8k":           {"default": 6, UPCOMING: 24, WITHDRAWN: None, DELISTED: 168},
+    "sec_registration": {"default": 24, UPCOMING: 6, PRICED: 6, TRADING_GT1Y: None, WITHDRAWN: 168, DELISTED: None},
+    "sec_periodic":     {"default": 24, UPCOMING: None, TRADING_GT1Y: 72, WITHDRAWN: None, DELISTED: 168},
+}
+
+# 단계 → 읽는 소스 (단계 주기 = 동결되지 않은 소스 중 가장 짧은 주기, 모두 동결이면 단계 동결)
+STAGE_SOURCES = {
+    "tab1":         ["news", "press", "profile"],
+    "tab0":         ["sec_8k", "sec_registration", "sec_periodic"],
+    "tab0_premium": ["earnings_call"],
+    "tab2_esg":     ["esg"],
+    "tab4":         ["analyst"],
+    "tab4_ma":      ["ma"],
+    "tab4_premium": ["upgrades", "peers"],
+    "tab3":         ["financials", "sec_periodic"],
+    "tab3_premium": ["surprise", "estimate"],
+    "tab3_revenue": ["revenue_segment"],
+    "tab6":         ["smart_money"],
+}
+
+# Tab0 토픽 → 소스 (8-K는 sec_8k)
+SEC_TOPIC_SOURCES = {topic: "sec_registration" for topic in ["S-1", "S-1/A", "F-1", "FWP", "424B4", "RW"]}
+SEC_TOPIC_SOURCES.update({topic: "sec_periodic" for topic in ["10-K", "10-Q", "20-F", "BS", "IS", "CF", "Form 25"]})
+
+
+def lifecycle_state(ipo_status=None, ipo_date=None, today=None):
+    """상장 상태 문자열 + 상장일 → 생애 주기 (철회 / 폐지 > 상장일 기준)"""
+    status = str(ipo_status or "").lower()
+    if re.search(r'\b(withdrawn|rw)\b|철회|취소', status): return WITHDRAWN
+    if re.search(r'\bdelisted\b|폐지', status): return DELISTED
+    today = today or datetime.now().date()
+    try:
+        ipo = datetime.fromisoformat(str(ipo_date)[:10]).date()
+    except Exception:
+        return TRADING_LT1Y   # 상장일을 모르면 기본 주기
+    days = (today - ipo).days
+    if days < 0: return UPCOMING
+    if days < PRICED_WINDOW_DAYS: return PRICED
+    return TRADING_LT1Y if days <= 365 else TRADING_GT1Y
+
+
+class FreshnessPolicy:
+    """신선도 정책 조회기. 종목 처리 시작 시 track()으로 종목의 생애 주기를 등록해 두면
+    단계 함수는 티커만으로 hours()를 조회할 수 있습니다. (등록되지 않은 종목은 default)"""
+
+    def __init__(self, policy=None, stage_sources=None):
+        self.policy = policy or FRESHNESS_POLICY
+        self.stage_sources = stage_sources or STAGE_SOURCES
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def track(self, ticker, state):
+        with self._lock: self._states[str(ticker)] = state
+        return state
+
+    def state_of(self, ticker):
+        with self._lock: return self._states.get(str(ticker))
+
+    def source_hours(self, source, state):
+        """None = 동결"""
+        row = self.policy.get(source, {})
+        return row[state] if state in row else row.get("default", 24)
+
+    def hours(self, source, ticker=None, state=None):
+        """캐시 유효 시간 (get_fmp_data_with_cache의 valid_hours). 동결 소스는 사실상 무기한"""
+        hours = self.source_hours(source, state or self.state_of(ticker))
+        return FROZEN_CACHE_HOURS if hours is None else hours
+
+    def frozen(self, source, ticker=None, state=None):
+        return self.source_hours(source, state or self.state_of(ticker)) is None
+
+    def stage_hours(self, stage, state):
+        """단계 주기. None = 단계 동결 / 소스 매핑이 없는 단계는 0 (항상 실행)"""
+        sources = self.stage_sources.get(stage)
+        if not sources: return 0
+        hours = [h for h in (self.source_hours(s, state) for s in sources) if h is not None]
+        return min(hours) if hours else None
+
+    def max_hours(self):
+        """동결을 제외한 가장 긴 주기 (실행 저널을 이 기간만큼 읽어야 주기를 판단할 수 있음)"""
+        return max((h for row in self.policy.values() for h in row.values() if h is not None), default=0)
+
+    def is_due(self, stage, state, last_done, now=None):
+        """마지막 완료 시각(last_done, 없으면 None)과 단계 주기로 실행 여부 판단 (DB 조회 없음)"""
+        hours = self.stage_hours(stage, state)
+        if hours is None: return False
+        if last_done is None or not hours: return True
+        slack = min(hours * DUE_SLACK_RATIO, DUE_SLACK_MAX_H)
+        return (now or datetime.now()) - last_done >= timedelta(hours=hours - slack)
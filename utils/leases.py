@@ -0,0 +1,217 @@
+import os
+import json
+import uuid
+import socket
+import threading
+from datetime import datetime
+
+# ==========================================
+# [샤드 워커] 리스(lease) 기반 종목 배치 분배 / 리더 락
+# ==========================================
+# 워커는 한 프로세스의 스레드 5개로 전 종목을 처리해서 추적 종목이 늘어날수록 실행 시간이 그대로 늘었습니다.
+# 같은 cycle_id로 실행된 여러 프로세스(또는 Actions matrix 작업)가 worker_leases 테이블
+# (migrations/007_worker_leases.sql)에서 종목 배치를 리스로 가져가 나눠 처리합니다.
+#   - 리더 락('leader')을 잡은 프로세스 하나만 전역 단계(매크로 / stock_cache / 타겟 선별)를 실행하고 배치를 게시
+#   - 배치는 우선순위 순서(seq)대로 가져가며, heartbeat로 리스를 연장
+#   - heartbeat가 끊긴 프로세스의 리스는 lease_until이 지나면 다른 프로세스가 회수 (attempts 증가)
+#   - 배치가 모두 끝나면 'phase:*' 리스를 잡은 프로세스 하나만 알림 엔진 / 알람 요약 등 후속 단계를 실행
+#   - 프로세스별 결과 중 후속 단계가 모아야 하는 것(EDGAR 점검 / 실패 CIK 등)은 'note:*' 행으로 남김
+# 리스 획득/회수는 RPC 한 번(INSERT ... ON CONFLICT / UPDATE ... SKIP LOCKED)으로 원자적으로 처리합니다.
+
+LEASE_TABLE = "worker_leases"
+LEADER_UNIT = "leader"
+DEFAULT_LEASE_SEC = 600      # heartbeat 없이 리스가 유지되는 시간
+HEARTBEAT_SEC = 60
+
+
+def default_cycle_id():
+    """같은 실행 주기의 프로세스가 공유하는 ID (matrix 작업은 같은 GITHUB_RUN_ID를 가짐)"""
+    if os.environ.get("WORKER_CYCLE_ID"): return os.environ["WORKER_CYCLE_ID"]
+    if os.environ.get("GITHUB_RUN_ID"):
+        return f"gh-{os.environ['GITHUB_RUN_ID']}-{os.environ.get('GITHUB_RUN_ATTEMPT', '1')}"
+    return datetime.now().strftime("%Y%m%d-%H")
+
+
+def default_holder():
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def make_batches(rows, batch_size):
+    """우선순위 순서의 종목 행을 batch_size개씩 묶음"""
+    return [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+
+
+class LeaseBoard:
+    """한 실행 주기(cycle_id)의 리스 관리자. 프로세스마다 하나씩 만듭니다."""
+
+    def __init__(self, client, cycle_id=None, holder=None, lease_sec=DEFAULT_LEASE_SEC,
+                 heartbeat_sec=HEARTBEAT_SEC, log_fn=print):
+        self.client = client
+        self.cycle_id = cycle_id or default_cycle_id()
+        self.holder = holder or default_holder()
+        self.lease_sec = lease_sec
+        self.heartbeat_sec = heartbeat_sec
+        self.log = log_fn
+        self.held = set()
+        self.lost = set()
+        self.stats = {"claimed": 0, "reclaimed": 0, "completed": 0, "lost": 0, "heartbeats": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------
+    # 리스 획득 / 완료
+    # ------------------------------------------
+    def _params(self, **extra):
+        return {"p_cycle": self.cycle_id, "p_holder": self.holder, "p_lease_sec": self.lease_sec, **extra}
+
+    def _took(self, row):
+        with self._lock:
+            self.held.add(row["unit"])
+            self.lost.discard(row["unit"])
+            self.stats["claimed"] += 1
+            if (row.get("attempts") or 1) > 1: self.stats["reclaimed"] += 1
+
+    def acquire(self, unit, kind="phase"):
+        """unit 리스 획득 (없으면 생성). 완료됐거나 다른 프로세스가 살아서 잡고 있으면 None"""
+        res = self.client.rpc("acquire_worker_lease", self._params(p_unit=unit, p_kind=kind)).execute()
+        if not res.data: return None
+        self._took(res.data[0])
+        return res.data[0]
+
+    def claim_batch(self):
+        """다음 배치 리스 → (unit, 종목 행 목록, 시도 횟수). 가져갈 배치가 없으면 None"""
+        res = self.client.rpc("claim_worker_batch", self._params()).execute()
+        if not res.data: return None
+        row = res.data[0]
+        self._took(row)
+        try: rows = json.loads(row.get("payload") or "[]")
+        except Exception: rows = []
+        return row["unit"], rows, row.get("attempts") or 1
+
+    def complete(self, unit, payload=None):
+        """내가 가진 리스를 완료 처리. 그 사이 리스를 잃었으면 False"""
+        values = {"status": "done", "updated_at": datetime.now().isoformat()}
+        if payload is not None: values["payload"] = payload
+        res = (self.client.table(LEASE_TABLE).update(values)
+               .eq("cycle_id", self.cycle_id).eq("unit", unit).eq("holder", self.holder).eq("status", "leased").execute())
+        with self._lock:
+            self.held.discard(unit)
+            if res.data: self.stats["completed"] += 1
+        return bool(res.data)
+
+    def release(self, unit):
+        """완료하지 못한 리스를 즉시 반납 (만료를 기다리지 않고 다른 프로세스가 가져가도록)"""
+        try:
+            (self.client.table(LEASE_TABLE).update({"status": "pending", "holder": None, "lease_until": None})
+             .eq("cycle_id", self.cycle_id).eq("unit", unit).eq("holder", self.holder).eq("status", "leased").execute())
+        except Exception as e:
+            self.log(f"⚠️ [리스] {unit} 반납 실패 (만료 후 회수됨): {e}")
+        with self._lock: self.held.discard(unit)
+
+    def is_lost(self, unit):
+        with self._lock: return unit in self.lost
+
+    # ------------------------------------------
+    # 리더 락 / 배치 게시
+    # ------------------------------------------
+    def acquire_leader(self):
+        return self.acquire(LEADER_UNIT, kind="leader") is not None
+
+    def leader_state(self):
+        res = (self.client.table(LEASE_TABLE).select("status, holder, payload")
+               .eq("cycle_id", self.cycle_id).eq("unit", LEADER_UNIT).limit(1).execute())
+        return res.data[0] if res.data else None
+
+    def publish(self, batches):
+        """배치 게시 (리더 전용). 이미 게시된 배치(재시작한 리더)는 상태를 덮어쓰지 않도록 새 배치만 기록"""
+        existing = {r["unit"] for r in self.units("batch")}
+        now_iso = datetime.now().isoformat()
+        rows = [{"cycle_id": self.cycle_id, "unit": f"batch:{seq:04d}", "kind": "batch", "seq": seq,
+                 "status": "pending", "attempts": 0, "updated_at": now_iso,
+                 "payload": json.dumps(batch, ensure_ascii=False, default=str)}
+                for seq, batch in enumerate(batches) if f"batch:{seq:04d}" not in existing]
+        for i in range(0, len(rows), 200):
+            self.client.table(LEASE_TABLE).upsert(rows[i:i + 200], on_conflict="cycle_id,unit").execute()
+        return len(rows)
+
+    def units(self, kind="batch", columns="unit, status, holder, attempts"):
+        res = (self.client.table(LEASE_TABLE).select(columns)
+               .eq("cycle_id", self.cycle_id).eq("kind", kind).order("seq").execute())
+        return res.data or []
+
+    def all_batch_rows(self):
+        """게시된 모든 배치의 종목 행 (프로세스별 SEC 매핑 / EDGAR 인덱스 준비용)"""
+        rows = []
+        for r in self.units("batch", "unit, payload"):
+            try: rows += json.loads(r.get("payload") or "[]")
+            except Exception: pass
+        return rows
+
+    def progress(self):
+        counts = {"pending": 0, "leased": 0, "done": 0}
+        for r in self.units("batch"):
+            counts[r["status"]] = counts.get(r["status"], 0) + 1
+        return counts
+
+    def put_note(self, name, payload):
+        """프로세스별 메모(note:<이름>:<holder>)를 남깁니다. 후속 단계를 맡은 프로세스가 notes()로 모아 읽음"""
+        row = {"cycle_id": self.cycle_id, "unit": f"note:{name}:{self.holder}", "kind": "note", "status": "done",
+               "holder": self.holder, "payload": payload, "updated_at": datetime.now().isoformat()}
+        self.client.table(LEASE_TABLE).upsert(row, on_conflict="cycle_id,unit").execute()
+
+    def notes(self, name):
+        """같은 주기의 모든 프로세스가 남긴 name 메모 payload 목록"""
+        prefix = f"note:{name}:"
+        return [r.get("payload") for r in self.units("note", "unit, payload") if str(r.get("unit", "")).startswith(prefix)]
+
+    # ------------------------------------------
+    # 전역 단계 (주기당 한 번)
+    # ------------------------------------------
+    def run_once(self, phase, fn):
+        """phase:<이름> 리스를 잡은 프로세스만 fn 실행. 실패하면 반납해서 다른 프로세스가 재시도. 반환값: 실행 여부"""
+        unit = f"phase:{phase}"
+        if not self.acquire(unit): return False
+        try:
+            fn()
+        except Exception:
+            self.release(unit)
+            raise
+        self.complete(unit)
+        return True
+
+    # ------------------------------------------
+    # heartbeat
+    # ------------------------------------------
+    def heartbeat(self):
+        with self._lock:
+            if not self.held: return
+        res = self.client.rpc("renew_worker_leases", self._params()).execute()
+        still = {r["unit"] for r in (res.data or [])}
+        with self._lock:
+            self.stats["heartbeats"] += 1
+            for unit in self.held - still:
+                self.log(f"⚠️ [리스] {unit} 리스를 잃었습니다 (만료 후 다른 프로세스가 회수)")
+                self.lost.add(unit)
+                self.stats["lost"] += 1
+            self.held &= still
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_sec):
+            try: self.heartbeat()
+            except Exception as e: self.log(f"⚠️ [리스] heartbeat 실패: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._heartbeat_loop, name="lease-heartbeat", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout=5)
+
+    def report(self):
+        s = self.stats
+        return (f"cycle={self.cycle_id} holder={self.holder} / 리스 {s['claimed']}건 (만료 회수 {s['reclaimed']}) / "
+                f"완료 {s['completed']} / 분실 {s['lost']} / heartbeat {s['heartbeats']}회")
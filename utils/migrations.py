@@ -0,0 +1,262 @@
+import os
+import re
+import sys
+import glob
+import hashlib
+import argparse
+
+# ==========================================
+# [DB 마이그레이션] migrations/NNN_*.sql 버전 관리 적용기
+# ==========================================
+# Supabase(Postgres)에 인덱스 / 테이블 / 집계 RPC 함수를 번호 순서대로 한 번씩 적용합니다.
+# 적용 이력은 schema_migrations 테이블에 (버전, 파일명, 체크섬)으로 남고, 이미 적용된 버전은 건너뜁니다.
+#
+# 사용법 (DSN은 Supabase > Project Settings > Database > Connection string):
+#   python -m utils.migrations --dsn "$DATABASE_URL" --status        # 적용 현황
+#   python -m utils.migrations --dsn "$DATABASE_URL"                 # 미적용 마이그레이션 적용
+#
+# 로컬 Postgres 검증 (docker run -e POSTGRES_PASSWORD=pw -p 5432:5432 postgres:15 등):
+#   python -m utils.migrations --dsn postgresql://postgres:pw@localhost/postgres --local --smoke
+#   --local : migrations/local/ 의 기본 테이블 스키마를 먼저 생성 (운영 DB에는 사용 금지)
+#   --smoke : 샘플 행을 넣고 각 RPC 결과를 검증한 뒤 롤백
+#
+# Postgres 드라이버(psycopg 또는 psycopg2)는 이 도구를 실행할 때만 필요합니다.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+LOCAL_DIR = os.path.join(MIGRATIONS_DIR, "local")
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    """[(버전, 파일명, 경로)] 를 번호 순서대로 반환합니다."""
+    found = []
+    for path in glob.glob(os.path.join(directory, "*.sql")):
+        name = os.path.basename(path)
+        m = re.match(r'^(\d+)_.+\.sql$', name)
+        if m: found.append((m.group(1), name, path))
+    return sorted(found, key=lambda x: int(x[0]))
+
+
+def _checksum(sql):
+    return hashlib.sha1(sql.encode('utf-8')).hexdigest()[:12]
+
+
+def connect(dsn):
+    try:
+        import psycopg
+        return psycopg.connect(dsn)
+    except ImportError:
+        pass
+    try:
+        import psycopg2
+        return psycopg2.connect(dsn)
+    except ImportError:
+        raise SystemExit("❌ Postgres 드라이버가 없습니다: pip install 'psycopg[binary]' 또는 psycopg2-binary")
+
+
+def _ensure_history(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version    text PRIMARY KEY,
+                name       text NOT NULL,
+                checksum   text NOT NULL,
+                applied_at timestamptz DEFAULT now()
+            )
+        """)
+    conn.commit()
+
+
+def applied_versions(conn):
+    _ensure_history(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT version, name, checksum FROM schema_migrations")
+        return {v: (n, c) for v, n, c in cur.fetchall()}
+
+
+def apply_migrations(conn, directory=MIGRATIONS_DIR, dry_run=False, record=True):
+    """미적용 마이그레이션을 파일 단위 트랜잭션으로 적용합니다. 반환값: 적용한 파일명 목록"""
+    done = applied_versions(conn) if record else {}
+    applied = []
+    for version, name, path in list_migrations(directory):
+        with open(path, encoding="utf-8") as f:
+            sql = f.read()
+        if version in done:
+            if done[version][1] != _checksum(sql):
+                print(f"⚠️ [마이그레이션] {name}: 적용 후 파일이 수정되었습니다. (새 번호의 파일로 변경사항을 추가하세요)")
+            continue
+        if dry_run:
+            print(f"📝 [마이그레이션] 적용 예정: {name}")
+            applied.append(name)
+            continue
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+                if record:
+                    cur.execute("INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                                (version, name, _checksum(sql)))
+            conn.commit()
+            print(f"✅ [마이그레이션] {name} 적용 완료")
+            applied.append(name)
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ [마이그레이션] {name} 실패: {e}")
+            raise
+    return applied
+
+
+# ==========================================
+# 로컬 검증 (샘플 데이터 → RPC 결과 확인 → 롤백)
+# ==========================================
+SMOKE_FIXTURES = """
+INSERT INTO premium_alerts (ticker, alert_type, created_at) VALUES
+    ('SMK_A', 'SURGE_1W', now()), ('SMK_A', '8K_UPDATE', now()), ('SMK_B', 'SURGE_1W', now() - interval '10 days');
+INSERT INTO watchlist (user_id, ticker, prediction) VALUES
+    ('smk_u1', 'SMK_A', 'UP'), ('smk_u2', 'SMK_A', 'DOWN'), ('smk_u3', 'SMK_A', 'UP');
+INSERT INTO user_decisions (user_id, ticker, score) VALUES
+    ('smk_u1', 'SMK_A', 3), ('smk_u2', 'SMK_A', 3), ('smk_u3', 'SMK_A', -1);
+INSERT INTO price_cache (ticker, price, updated_at) VALUES
+    ('SMK_A', 10, now()), ('SMK_B', 20, now() - interval '2 hours');
+INSERT INTO report_index (cache_key, ticker, tab, report_type, lang, updated_at) VALUES
+    ('SMK_A_Tab1_v5_ko', 'SMK_A', 'tab1', 'Tab1', 'ko', now()),
+    ('SMK_A_PremiumESG_v1_ko', 'SMK_A', 'tab2', 'PremiumESG', 'ko', now()),
+    ('SMK_A_PremiumESG_v1_en', 'SMK_A', 'tab2', 'PremiumESG', 'en', now() - interval '30 days');
+INSERT INTO analysis_cache (cache_key, content, ticker) VALUES
+    ('SMK_A_Raw_Financials', 'abcé', 'SMK_A');
+INSERT INTO users (id, membership_level) VALUES ('smk_u1', 'premium'), ('smk_u2', 'free');
+INSERT INTO action_logs (user_id, ticker, action_type) VALUES ('smk_u1', 'SMK_A', 'view'), ('smk_u2', 'SMK_A', 'view');
+INSERT INTO worker_leases (cycle_id, unit, kind, seq, status, holder, lease_until, attempts) VALUES
+    ('smk', 'batch:0000', 'batch', 0, 'leased', 'smk_h9', now() + interval '1 hour', 1),
+    ('smk', 'batch:0001', 'batch', 1, 'pending', NULL, NULL, 0),
+    ('smk', 'batch:0002', 'batch', 2, 'leased', 'smk_h9', now() - interval '1 minute', 1),
+    ('smk', 'batch:0003', 'batch', 3, 'done', 'smk_h9', now() - interval '1 minute', 1);
+INSERT INTO run_journal (run_id, ticker, stage, status, fingerprint, updated_at) VALUES
+    ('smk_r1', 'SMK_A', 'tab1', 'done', 'f1', now() - interval '2 days'),
+    ('smk_r2', 'SMK_A', 'tab1', 'done', 'f2', now() - interval '1 hour'),
+    ('smk_r2', 'SMK_A', 'tab3', 'failed', 'f3', now()),
+    ('smk_r2', 'SMK_B', 'tab1', 'done', 'f4', now());
+"""
+
+# (설명, SQL, 기대 결과 - 비교는 샘플 종목(SMK_*) 행만 대상으로 함)
+SMOKE_CHECKS = [
+    ("premium_alert_type_counts",
+     "SELECT alert_type, alerts FROM premium_alert_type_counts(now() - interval '1 day') WHERE alert_type IN ('SURGE_1W', '8K_UPDATE') ORDER BY 1",
+     None),
+    ("premium_alert_ticker_activity",
+     "SELECT ticker, alerts, array_length(alert_types, 1) FROM premium_alert_ticker_activity(now() - interval '1 day') WHERE ticker LIKE 'SMK_%' ORDER BY 1",
+     [("SMK_A", 2, 2)]),
+    ("premium_alert_daily_counts",
+     "SELECT count(*) FROM premium_alert_daily_counts(now() - interval '30 days') WHERE alert_type = '8K_UPDATE'",
+     None),
+    ("watchlist_sentiment_counts",
+     "SELECT up, down FROM watchlist_sentiment_counts('SMK_A')",
+     [(2, 1)]),
+    ("user_decision_score_histogram",
+     "SELECT score, votes FROM user_decision_score_histogram('SMK_A') ORDER BY 1",
+     [(-1, 1), (3, 2)]),
+    ("analysis_cache_key_sizes",
+     "SELECT cache_key, content_bytes FROM analysis_cache_key_sizes('SMK_A_Raw', 1)",
+     [("SMK_A_Raw_Financials", 5)]),
+    ("ticker_interest_scores",
+     "SELECT ticker, watchers, premium_watchers, actions, premium_actions FROM ticker_interest_scores(now() - interval '1 day') WHERE ticker = 'SMK_A'",
+     [("SMK_A", 3, 1, 2, 1)]),
+    ("report_index_ticker_freshness",
+     "SELECT ticker, reports FROM report_index_ticker_freshness() WHERE ticker = 'SMK_A'",
+     [("SMK_A", 3)]),
+    ("acquire_worker_lease (리더 획득)",
+     "SELECT unit, attempts FROM acquire_worker_lease('smk', 'leader', 'leader', 'smk_h1', 60)",
+     [("leader", 1)]),
+    ("acquire_worker_lease (다른 프로세스는 실패)",
+     "SELECT count(*) FROM acquire_worker_lease('smk', 'leader', 'leader', 'smk_h2', 60)",
+     [(0,)]),
+    ("claim_worker_batch (대기 배치)",
+     "SELECT unit, attempts FROM claim_worker_batch('smk', 'smk_h2', 60)",
+     [("batch:0001", 1)]),
+    ("claim_worker_batch (만료 리스 회수)",
+     "SELECT unit, attempts FROM claim_worker_batch('smk', 'smk_h2', 60)",
+     [("batch:0002", 2)]),
+    ("claim_worker_batch (남은 배치 없음)",
+     "SELECT count(*) FROM claim_worker_batch('smk', 'smk_h2', 60)",
+     [(0,)]),
+    ("renew_worker_leases",
+     "SELECT unit FROM renew_worker_leases('smk', 'smk_h2', 60) ORDER BY 1",
+     [("batch:0001",), ("batch:0002",)]),
+    ("stage_last_checked",
+     "SELECT ticker, stage, fingerprint FROM stage_last_checked(now() - interval '7 days', 'SMK_', '', 10) WHERE ticker LIKE 'SMK_%'",
+     [("SMK_A", "tab1", "f2"), ("SMK_B", "tab1", "f4")]),
+    ("stage_last_checked (키셋 다음 페이지)",
+     "SELECT ticker, stage FROM stage_last_checked(now() - interval '7 days', 'SMK_A', 'tab1', 10) WHERE ticker LIKE 'SMK_%'",
+     [("SMK_B", "tab1")]),
+    ("report_index_type_counts",
+     "SELECT report_type, reports FROM report_index_type_counts(now() - interval '1 day') WHERE report_type = 'PremiumESG'",
+     None),
+]
+
+
+def run_smoke(conn):
+    """샘플 행을 넣고 RPC를 호출해 결과를 확인한 뒤 전부 롤백합니다. 반환값: 실패한 검사 수"""
+    failures = 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SMOKE_FIXTURES)
+            for label, sql, expected in SMOKE_CHECKS:
+                try:
+                    cur.execute(sql)
+                    rows = [tuple(r) for r in cur.fetchall()]
+                except Exception as e:
+                    print(f"❌ [RPC 검증] {label}: {e}")
+                    return failures + 1
+                ok = expected is None and bool(rows) or rows == expected
+                if not ok: failures += 1
+                print(f"{'✅' if ok else '❌'} [RPC 검증] {label}: {rows}" + ("" if ok else f" (기대값 {expected})"))
+
+            # 운영 데이터가 섞여 있을 수 있는 전체 집계는 샘플로 늘어난 양만 확인
+            cur.execute("SELECT fresh FROM price_cache_freshness(now() - interval '30 minutes')")
+            ok = cur.fetchone()[0] >= 1
+            failures += 0 if ok else 1
+            print(f"{'✅' if ok else '❌'} [RPC 검증] price_cache_freshness")
+            cur.execute("SELECT count(*) FROM report_index_tab_stats(now() - interval '7 days') WHERE tab IN ('tab1', 'tab2')")
+            ok = cur.fetchone()[0] == 2
+            failures += 0 if ok else 1
+            print(f"{'✅' if ok else '❌'} [RPC 검증] report_index_tab_stats")
+    finally:
+        conn.rollback()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UnicornFinder DB 마이그레이션 적용기")
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"), help="Postgres 접속 문자열 (기본: $DATABASE_URL)")
+    parser.add_argument("--status", action="store_true", help="적용 현황만 출력")
+    parser.add_argument("--dry-run", action="store_true", help="적용할 파일 목록만 출력")
+    parser.add_argument("--local", action="store_true", help="로컬 검증용 기본 테이블(migrations/local) 먼저 생성")
+    parser.add_argument("--smoke", action="store_true", help="적용 후 샘플 데이터로 RPC 결과 검증 (롤백)")
+    args = parser.parse_args(argv)
+
+    if not args.dsn:
+        parser.error("--dsn 또는 DATABASE_URL 환경변수가 필요합니다.")
+
+    conn = connect(args.dsn)
+    try:
+        if args.status:
+            done = applied_versions(conn)
+            for version, name, _ in list_migrations():
+                mark = "✅" if version in done else "⏳"
+                print(f"{mark} {name}")
+            return 0
+
+        if args.local:
+            apply_migrations(conn, LOCAL_DIR, dry_run=args.dry_run, record=False)
+        applied = apply_migrations(conn, dry_run=args.dry_run)
+        print(f"🏁 [마이그레이션] {len(applied)}개 {'적용 예정' if args.dry_run else '적용'}")
+
+        if args.smoke and not args.dry_run:
+            failures = run_smoke(conn)
+            print(f"🏁 [RPC 검증] 실패 {failures}건")
+            return 1 if failures else 0
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
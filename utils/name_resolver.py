@@ -0,0 +1,135 @@
+import re
+import threading
+from collections import Counter, defaultdict
+
+# ==========================================
+# [로컬 회사명 해석기] 트라이그램 유사도 기반 CIK 매칭
+# ==========================================
+# get_fallback_cik가 매번 네트워크(FMP 프로필 → EDGAR 티커 검색 → EDGAR 이름 검색)를
+# 순서대로 두드리던 것을, SEC 티커 파일 + stock_cache로 만든 로컬 인덱스에서 먼저 찾습니다.
+# 호출 측은 정확 일치(티커 / 정규화 이름, score 1.0)만 바로 채택하고, 유사도 후보는 네트워크 확인으로 넘깁니다.
+# 'Ares Acquisition Corp II' ↔ 'Ares Acquisition Corp' 처럼 연번 SPAC은 트라이그램 점수가 높아도 다른 회사이므로
+# 구분 토큰(숫자 / 로마 숫자 / 한 글자 시리즈)이 다른 후보는 순위에서 뺍니다.
+
+# 법인 형태/증권 종류 등 매칭에 방해되는 꼬리말
+NOISE_WORDS = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "plc",
+    "group", "holdings", "holding", "llc", "lp", "sa", "nv", "ag", "se", "the",
+    "class", "ordinary", "shares", "share", "common", "stock", "ads", "adr", "units", "unit",
+    "warrants", "warrant", "rights",
+}
+
+EXACT_SCORE = 1.0
+
+_ROMAN = re.compile(r'^(?=[ivxlc]+$)c{0,3}(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$')
+
+
+def tokenize_company_name(name):
+    """소문자화 + 특수문자 제거 + 법인 꼬리말 제거 후 토큰 리스트를 반환합니다."""
+    if not name: return []
+    text = str(name).lower().replace("&", " and ")
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    return [t for t in text.split() if t and t not in NOISE_WORDS]
+
+
+def name_key(name):
+    return "".join(tokenize_company_name(name))
+
+
+def distinguishing_tokens(name):
+    """연번 / 시리즈를 가르는 토큰 집합 (숫자, 로마 숫자, 한 글자)"""
+    return frozenset(t for t in tokenize_company_name(name)
+                     if len(t) == 1 or any(c.isdigit() for c in t) or (len(t) <= 5 and _ROMAN.match(t)))
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CompanyNameResolver:
+    """티커/회사명 → CIK 로컬 해석기 (SEC 티커 파일 + stock_cache 별칭)"""
+
+    def __init__(self):
+        self.ticker_to_cik = {}
+        self.name_to_cik = {}
+        self._entries = []                 # [(name_key, cik, ticker, trigrams, 구분 토큰)]
+        self._postings = defaultdict(list)  # trigram → [entry_idx]
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return bool(self._entries)
+
+    def add(self, name, cik, ticker=None):
+        key = name_key(name)
+        if not key or not cik: return
+        cik = str(cik).zfill(10)
+        with self._lock:
+            if ticker: self.ticker_to_cik.setdefault(str(ticker).upper(), cik)
+            if key in self.name_to_cik: return
+            self.name_to_cik[key] = cik
+            grams = _trigrams(key)
+            idx = len(self._entries)
+            self._entries.append((key, cik, ticker, grams, distinguishing_tokens(name)))
+            for g in grams:
+                self._postings[g].append(idx)
+
+    def build_from_sec(self, sec_ticker_json):
+        """company_tickers.json 원본 딕셔너리로 인덱스를 구성합니다."""
+        for v in (sec_ticker_json or {}).values():
+            try: self.add(v['title'], v['cik_str'], v['ticker'])
+            except Exception: continue
+
+    def add_aliases(self, rows, cik_mapping):
+        """stock_cache 행(symbol, name) 중 CIK를 알 수 있는 것들의 이름을 별칭으로 추가합니다."""
+        added = 0
+        for r in rows or []:
+            cik = cik_mapping.get(r.get('symbol'))
+            if cik and r.get('name'):
+                before = len(self._entries)
+                self.add(r['name'], cik, r.get('symbol'))
+                added += len(self._entries) - before
+        return added
+
+    def rank(self, company_name, limit=5):
+        """[(cik, ticker, score)] 후보를 유사도 내림차순으로 반환합니다. 구분 토큰이 다른 후보는 제외"""
+        key = name_key(company_name)
+        if not key or not self._entries: return []
+        grams = _trigrams(key)
+        marks = distinguishing_tokens(company_name)
+
+        hits = Counter()
+        for g in grams:
+            for idx in self._postings.get(g, []):
+                hits[idx] += 1
+
+        scored = []
+        for idx, _ in hits.most_common(50):
+            cand_key, cik, ticker, cand_grams, cand_marks = self._entries[idx]
+            if cand_marks != marks: continue
+            dice = 2.0 * len(grams & cand_grams) / (len(grams) + len(cand_grams))
+            scored.append((cik, ticker, round(dice, 4)))
+        scored.sort(key=lambda x: x[2], reverse=True)
+        return scored[:limit]
+
+    def resolve(self, ticker=None, company_name=None):
+        """(cik, score) 를 반환합니다. 티커/정규화 이름 정확 일치는 1.0, 그 외는 트라이그램 유사도."""
+        t = str(ticker or "").upper().strip()
+        if t:
+            for variant in [t, t.replace(".", "-"), t.replace("-", ".")]:
+                if variant in self.ticker_to_cik:
+                    return self.ticker_to_cik[variant], 1.0
+
+        key = name_key(company_name)
+        if key and key in self.name_to_cik:
+            return self.name_to_cik[key], 1.0
+
+        candidates = self.rank(company_name, limit=2)
+        if not candidates: return None, 0.0
+        best = candidates[0]
+        score = best[2]
+        # 서로 다른 회사가 거의 같은 점수면 애매한 매칭이므로 신뢰도를 낮춤
+        if len(candidates) > 1 and candidates[1][0] != best[0] and (score - candidates[1][2]) < 0.03:
+            score *= 0.9
+        return best[0], score
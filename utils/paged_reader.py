@@ -0,0 +1,94 @@
+import concurrent.futures
+
+# ==========================================
+# [페이지 단위 읽기] Supabase 전체 테이블 스캔용 스트리밍 리더
+# ==========================================
+# supabase.table(...).select(...).execute() 한 번으로 전체 테이블을 읽으면
+# PostgREST 서버 기본 행 제한(max-rows, 기본 1000행)에서 조용히 잘립니다.
+# .order(정렬 키).range(시작, 끝)으로 페이지를 나눠 순서대로 흘려보내고,
+# 호출 측은 페이지마다 필요한 값만 남기므로 메모리는 '한 페이지 + 결과물' 수준으로 유지됩니다.
+#
+# - 서버 max-rows가 page_size보다 작아도 실제로 받은 행 수만큼 전진하므로 누락되지 않습니다.
+# - workers > 1 이면 첫 페이지에서 전체 행 수(count="exact")를 받아 나머지 페이지를 병렬로 읽습니다.
+#   (창 크기만큼만 미리 요청하므로 병렬 모드에서도 메모리 상한이 유지됨, 결과 순서는 그대로)
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def _build_query(client, table, columns, order, filters, count=None):
+    query = client.table(table).select(columns, count=count) if count else client.table(table).select(columns)
+    if filters: query = filters(query)
+    if order: query = query.order(order)
+    return query
+
+
+def iter_pages(client, table, columns="*", order=None, filters=None, page_size=DEFAULT_PAGE_SIZE, workers=1):
+    """행 목록(page)을 하나씩 yield 합니다. order는 고유 키(예: 'ticker')를 주어야 페이지 경계가 안정적입니다.
+    filters: lambda q: q.gte("updated_at", ...) 처럼 쿼리 빌더에 조건을 덧붙이는 함수"""
+    if workers <= 1:
+        start = 0
+        while True:
+            res = _build_query(client, table, columns, order, filters).range(start, start + page_size - 1).execute()
+            rows = res.data or []
+            if not rows: return
+            yield rows
+            start += len(rows)
+        return
+
+    first = _build_query(client, table, columns, order, filters, count="exact").range(0, page_size - 1).execute()
+    rows = first.data or []
+    if not rows: return
+    yield rows
+
+    # 서버 max-rows가 더 작으면 첫 페이지 크기가 실제 페이지 크기
+    step = len(rows)
+    total = first.count if first.count is not None else None
+    if total is None:
+        # 전체 개수를 모르면 순차 모드로 이어서 읽음
+        start = step
+        while True:
+            res = _build_query(client, table, columns, order, filters).range(start, start + step - 1).execute()
+            more = res.data or []
+            if not more: return
+            yield more
+            start += len(more)
+        return
+
+    def fetch(start):
+        return _build_query(client, table, columns, order, filters).range(start, start + step - 1).execute().data or []
+
+    starts = list(range(step, total, step))
+    window = max(1, workers * 2)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for i in range(0, len(starts), window):
+            for page in executor.map(fetch, starts[i:i + window]):
+                if page: yield page
+
+
+def fetch_all_rows(client, table, columns="*", order=None, filters=None, page_size=DEFAULT_PAGE_SIZE, workers=1):
+    rows = []
+    for page in iter_pages(client, table, columns, order, filters, page_size, workers):
+        rows.extend(page)
+    return rows
+
+
+def fetch_dict(client, table, key_col, value_fn, columns="*", order=None, filters=None,
+               page_size=DEFAULT_PAGE_SIZE, workers=1):
+    """{ row[key_col]: value_fn(row) } 를 만듭니다. value_fn이 None을 반환하거나 예외가 나면 그 행은 제외."""
+    result = {}
+    for page in iter_pages(client, table, columns, order or key_col, filters, page_size, workers):
+        for row in page:
+            try:
+                value = value_fn(row)
+            except Exception:
+                continue
+            if value is not None: result[row.get(key_col)] = value
+    return result
+
+
+def fetch_dataframe(client, table, columns="*", order=None, filters=None, page_size=DEFAULT_PAGE_SIZE, workers=1):
+    """페이지별로 DataFrame을 만들어 마지막에 한 번 이어 붙입니다. (pandas는 이 함수를 쓸 때만 필요)"""
+    import pandas as pd
+    frames = [pd.DataFrame(page) for page in iter_pages(client, table, columns, order, filters, page_size, workers)]
+    if not frames: return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
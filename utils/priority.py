@@ -0,0 +1,115 @@
+import math
+from datetime import datetime
+
+import pandas as pd
+
+# ==========================================
+# [우선순위 스케줄러] 실행 시간 안에 가치가 큰 종목부터 분석
+# ==========================================
+# main()은 target_df를 캘린더 순서대로 제출해서, 5.5시간 제한(MAX_RUN_TIME_SEC)에 걸리면
+# 남는 종목이 내일 상장하는 종목일 수도 있었습니다.
+# 종목마다 아래 신호를 0~1로 정규화해 가중합한 점수 순서로 제출합니다. (스레드 풀은 제출 순서대로 실행)
+#   - ipo       : 상장 예정일이 가까울수록 / 상장 직후일수록 높음
+#   - stale     : 마지막 리포트 갱신 후 경과일 (리포트가 없으면 최고점)
+#   - events    : EDGAR 신규 공시(8-K 등) + 최근 24시간 알림(급등/8-K/뉴스성 시그널)
+#   - popularity: 워치리스트 등록 수 + 최근 행동 로그 수 (로그 스케일)
+#   - premium   : 프리미엄 회원의 워치리스트/행동 로그
+# 점수가 같으면 기존 캘린더 순서를 유지합니다.
+
+PRIORITY_WEIGHTS = {"ipo": 35, "stale": 20, "events": 20, "popularity": 15, "premium": 10}
+UPCOMING_WINDOW_DAYS = 35
+RECENT_LISTING_DAYS = 180
+STALE_FULL_DAYS = 7
+
+
+def _clamp(x):
+    return max(0.0, min(1.0, x))
+
+
+def ipo_proximity(ipo_date, today):
+    """상장 예정(0~35일): 0.5~1.0 / 상장 후: 180일에 걸쳐 0.6 → 0 / 날짜 없음: 0.2"""
+    if ipo_date is None: return 0.2
+    days = (ipo_date - today).days
+    if days >= 0:
+        return 1.0 - 0.5 * _clamp(days / UPCOMING_WINDOW_DAYS) if days <= UPCOMING_WINDOW_DAYS else 0.3
+    return 0.6 * _clamp(1 - (-days) / RECENT_LISTING_DAYS)
+
+
+def staleness(last_updated, now):
+    """None(신호 없음)은 0.5, 리포트가 한 번도 없으면 1.0"""
+    if last_updated is None: return 0.5
+    if last_updated == "never": return 1.0
+    try:
+        ts = pd.to_datetime(last_updated, utc=True).tz_convert(None)
+        return _clamp((now - ts.to_pydatetime()).total_seconds() / 86400 / STALE_FULL_DAYS)
+    except Exception:
+        return 0.5
+
+
+def _log_scale(x, full):
+    return _clamp(math.log1p(max(0, x)) / math.log1p(full))
+
+
+def score_ticker(signals, weights=None, now=None):
+    """signals: {ipo_date, last_updated, edgar_events, alerts, watchers, actions, premium_watchers, premium_actions}
+    반환값: (점수, {구성요소: 점수})"""
+    weights = weights or PRIORITY_WEIGHTS
+    now = now or datetime.now()
+    parts = {
+        "ipo": ipo_proximity(signals.get("ipo_date"), now.date()),
+        "stale": staleness(signals.get("last_updated"), now),
+        "events": _clamp((1.0 if signals.get("edgar_events") else 0.0) + signals.get("alerts", 0) / 3),
+        "popularity": _log_scale(signals.get("watchers", 0) + signals.get("actions", 0) / 5, 50),
+        "premium": _log_scale(signals.get("premium_watchers", 0) * 2 + signals.get("premium_actions", 0) / 3, 20),
+    }
+    breakdown = {k: round(weights.get(k, 0) * v, 1) for k, v in parts.items()}
+    return round(sum(breakdown.values()), 1), breakdown
+
+
+class PriorityPlan:
+    """점수 순으로 정렬된 제출 계획과 실행 리포트"""
+
+    def __init__(self, ranked):
+        self.ranked = ranked   # [(점수, 원래 순서, 심볼, 구성요소, 행)]
+        self.started = set()
+
+    def rows(self):
+        for _, _, _, _, row in self.ranked:
+            yield row
+
+    def mark_started(self, symbol):
+        self.started.add(symbol)
+
+    def report(self, top=15):
+        lines = [f"제출 순서 상위 {min(top, len(self.ranked))}개 / 전체 {len(self.ranked)}개 (점수 = 가중치 × 신호)"]
+        for rank, (score, pos, sym, parts, _) in enumerate(self.ranked[:top], 1):
+            detail = " ".join(f"{k}={v}" for k, v in parts.items() if v)
+            lines.append(f"  {rank:>3}. {sym:<8} {score:>5}  (캘린더 순서 {pos + 1}) {detail}")
+        moved = sum(1 for rank, r in enumerate(self.ranked) if abs(rank - r[1]) >= 50)
+        lines.append(f"캘린더 순서 대비 50칸 이상 이동한 종목: {moved}개")
+        return "\n".join(lines)
+
+    def unstarted_report(self, limit=10):
+        """시간 초과로 시작하지 못한 종목 (점수 높은 순)"""
+        left = [(score, sym) for score, _, sym, _, _ in self.ranked if sym not in self.started]
+        if not left: return "미처리 종목 없음"
+        head = ", ".join(f"{sym}({score})" for score, sym in left[:limit])
+        return f"미처리 {len(left)}개 / 최고 점수 {left[0][0]} → {head}"
+
+
+def build_priority_plan(target_df, signals_by_symbol, weights=None, now=None):
+    """target_df 행들을 우선순위 점수 순으로 정렬한 PriorityPlan을 반환합니다."""
+    now = now or datetime.now()
+    ranked = []
+    for pos, (_, row) in enumerate(target_df.iterrows()):
+        sym = str(row.get('symbol'))
+        signals = dict(signals_by_symbol.get(sym, {}))
+        try:
+            ipo_dt = pd.to_datetime(row.get('date'))
+            signals["ipo_date"] = None if pd.isna(ipo_dt) else ipo_dt.date()
+        except Exception:
+            signals["ipo_date"] = None
+        score, parts = score_ticker(signals, weights, now)
+        ranked.append((score, pos, sym, parts, row))
+    ranked.sort(key=lambda r: (-r[0], r[1]))
+    return PriorityPlan(ranked)
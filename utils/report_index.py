@@ -0,0 +1,95 @@
+import re
+import hashlib
+
+from utils.paged_reader import iter_pages
+
+# ==========================================
+# [리포트 인덱스] analysis_cache 키 → 정규화 메타데이터
+# ==========================================
+# analysis_cache의 cache_key 패턴 파싱을 이곳 한 군데로 모읍니다.
+# 워커는 리포트를 쓸 때 index_row()로 만든 메타데이터를 report_index 테이블에 함께 upsert 하고,
+# 앱/대시보드는 report_index와 집계 RPC(migrations/001_report_index.sql)만 조회합니다.
+# 트래커(*_RawTracker, *_LastAccNum)나 RAW_FMP_* 같은 원본 캐시는 리포트가 아니므로 인덱싱하지 않습니다.
+
+INDEX_TABLE = "report_index"
+LANGS = "ko|en|ja|zh"
+
+# Premium*_v1 / PressReleaseSummary 리포트가 표시되는 탭
+PREMIUM_TABS = {
+    "PremiumNewsSummary": "tab1", "PressReleaseSummary": "tab1",
+    "PremiumEarningsCall": "tab0",
+    "PremiumESG": "tab2",
+    "PremiumSurprise": "tab3", "PremiumEstimate": "tab3", "PremiumRevenueSeg": "tab3",
+    "PremiumUpgrades": "tab4", "PremiumPeers": "tab4", "PremiumMA": "tab4",
+}
+
+# (정규식, 탭, subject 종류) - 위에서부터 먼저 일치하는 것을 사용
+KEY_PATTERNS = [
+    (re.compile(rf'^(?P<subject>.+)_(?P<report_type>[^_]+)_Tab0_v(?P<version>\d+)_(?P<lang>{LANGS})$'), "tab0", "company"),
+    (re.compile(rf'^(?P<subject>[^_]+)_(?P<report_type>Tab1)_v(?P<version>\d+)_(?P<lang>{LANGS})$'), "tab1", "ticker"),
+    (re.compile(rf'^(?P<subject>[^_]+)_(?P<report_type>Tab[34])_v(?P<version>\d+)_Premium_(?P<lang>{LANGS})$'), None, "ticker"),
+    (re.compile(rf'^(?P<subject>[^_]+)_(?P<report_type>Tab3_Summary)_(?P<lang>{LANGS})$'), "tab3", "ticker"),
+    (re.compile(rf'^(?P<subject>[^_]+)_(?P<report_type>Tab6_SmartMoney)_v(?P<version>\d+)_(?P<lang>{LANGS})$'), "tab6", "ticker"),
+    (re.compile(rf'^(?P<subject>[^_]+)_(?P<report_type>Premium[A-Za-z]+|PressReleaseSummary)_v(?P<version>\d+)_(?P<lang>{LANGS})$'), None, "ticker"),
+    (re.compile(rf'^(?P<report_type>Global_Market_(?:Dashboard|Summary))_(?P<lang>{LANGS})$'), "tab2", "market"),
+]
+
+
+def parse_cache_key(cache_key):
+    """리포트 키면 {ticker, company, tab, report_type, lang, version} 을, 아니면 None을 반환합니다."""
+    key = str(cache_key or "")
+    for pattern, tab, subject_kind in KEY_PATTERNS:
+        m = pattern.match(key)
+        if not m: continue
+        parts = m.groupdict()
+        report_type = parts["report_type"]
+        if report_type in ("Tab3", "Tab4"):
+            tab, report_type = report_type.lower(), f"{report_type}_Premium"
+        elif tab is None:
+            tab = PREMIUM_TABS.get(report_type)
+            if not tab: return None
+        subject = parts.get("subject")
+        return {
+            "ticker": subject if subject_kind == "ticker" else ("MARKET" if subject_kind == "market" else None),
+            "company": subject if subject_kind == "company" else None,
+            "tab": tab,
+            "report_type": report_type,
+            "lang": parts.get("lang"),
+            "version": parts.get("version"),
+        }
+    return None
+
+
+def content_hash(content):
+    return hashlib.sha1(str(content).encode('utf-8')).hexdigest()[:16]
+
+
+def index_row(row):
+    """analysis_cache 행 → report_index 행. (리포트가 아니면 None, content가 없는 하트비트 행은 해시 생략)"""
+    meta = parse_cache_key(row.get("cache_key"))
+    if not meta: return None
+    out = {"cache_key": row["cache_key"], **meta, "updated_at": row.get("updated_at")}
+    # Tab0 키에는 회사명만 있으므로 행에 실린 ticker 태그를 우선 사용
+    if row.get("ticker"): out["ticker"] = row["ticker"]
+    if row.get("tier"): out["tier"] = row["tier"]
+    if "content" in row:
+        out["content_hash"] = content_hash(row["content"])
+        out["content_len"] = len(str(row["content"] or ""))
+    # 빈 값은 보내지 않음 (upsert가 기존 ticker/tier 등을 NULL로 덮어쓰지 않도록)
+    return {k: v for k, v in out.items() if v is not None}
+
+
+def index_rows(rows):
+    return [r for r in (index_row(row) for row in rows or []) if r]
+
+
+def backfill_index(client, send_fn, page_size=300):
+    """report_index가 비어 있을 때 1회: analysis_cache 전체를 페이지 단위로 읽어 인덱스를 채웁니다. 반환값: 인덱싱한 행 수"""
+    indexed = 0
+    columns = "cache_key, content, updated_at, ticker, tier"
+    for page in iter_pages(client, "analysis_cache", columns, order="cache_key", page_size=page_size):
+        rows = index_rows(page)
+        if rows:
+            send_fn(INDEX_TABLE, "cache_key", rows)
+            indexed += len(rows)
+    return indexed
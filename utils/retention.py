@@ -0,0 +1,268 @@
+import os
+import re
+import sys
+import time
+import argparse
+from datetime import datetime
+
+from utils.paged_reader import iter_pages, fetch_all_rows
+from utils.report_index import INDEX_TABLE, LANGS, parse_cache_key
+from utils.ticker_alias import get_base_ticker
+
+# ==========================================
+# [보존 정책] analysis_cache 원본/트래커/만료 리포트 정리
+# ==========================================
+# analysis_cache에는 리포트 외에도 RAW_FMP_* 원본(260일 HIST 포함), 트래커, 트윗 발송 표시,
+# 그리고 18개월 창을 벗어난 종목의 리포트가 계속 쌓여 전체 스캔/백업을 키웁니다.
+# 키 패턴(family)별 정책을 선언해 두고, 본문 없이 (키, 갱신 시각, 바이트 수)만 스캔해서
+#   - max_age_days          : 마지막 갱신 후 N일이 지난 행 삭제 (다시 읽힐 일이 없는 원본 캐시)
+#   - keep_latest           : 같은 (대상, 리포트 종류, 언어) 묶음에서 최신 버전 N개만 유지 (v15 → v16 교체 후 구버전)
+#   - drop_outside_universe : 종목(또는 Tab0의 회사명)이 대상 유니버스를 벗어났고 grace 기간도 지난 행 삭제
+# 을 적용합니다. 삭제는 batch_size 단위로 나눠 실행하고 time budget을 넘기면 다음 실행으로 미룹니다.
+#
+# 안전장치:
+#   - 어떤 정책에도 일치하지 않는 키(IPO_CALENDAR_DATA, WORKER_LAST_RUN, Global_Market_* 등)는 절대 지우지 않음
+#   - 유니버스가 min_universe 미만이거나 complete=False(캘린더 일부 구간 로드 실패 등)면 유니버스 기준 삭제는 건너뜀
+#   - 트래커/트윗 표시는 나이로 지우지 않음 (지우면 재분석/재발송이 일어나므로 유니버스 이탈 시에만 삭제)
+#
+# 사용법:
+#   python -m utils.retention --dry-run            # 삭제 예정 / 회수 예정 용량만 출력
+#   python -m utils.retention --budget 300         # stock_cache 기준 유니버스로 실제 삭제
+# 워커는 매 실행 종료 시 IPO 캘린더 종목을 유니버스로 넘겨 자동 실행합니다. (RETENTION_MODE=off|dry-run(기본)|delete)
+
+TABLE = "analysis_cache"
+SCAN_RPC = "analysis_cache_key_sizes"   # migrations/004_retention_scan.sql
+UNIVERSE_GRACE_DAYS = 30
+MIN_UNIVERSE = 100
+
+# 위에서부터 먼저 일치하는 정책을 사용합니다. (ticker / company 그룹이 유니버스 판단 기준)
+RETENTION_POLICIES = [
+    # FMP 원본 캐시: 유효기간이 최대 168시간이라 14일이 지나면 읽히지 않음
+    {"name": "fmp_raw", "pattern": r'^RAW_FMP_(?P<kind>.+)_(?P<ticker>[^_]+)$',
+     "max_age_days": 14, "drop_outside_universe": True},
+    {"name": "cik_resolve", "pattern": r'^CIK_RESOLVE_(?P<ticker>.+)$',
+     "max_age_days": 90, "drop_outside_universe": True},
+    {"name": "twitter_sent", "pattern": rf'^(?P<ticker>[^_]+)_Twitter_Sent_Tracker_(?:{LANGS})$',
+     "drop_outside_universe": True},
+    {"name": "trackers", "pattern": r'^(?P<ticker>[^_]+)_(?:[A-Za-z0-9]+_)*(?:RawTracker|8K_LastAccNum)$',
+     "drop_outside_universe": True},
+    {"name": "tab0_trackers", "pattern": r'^(?P<company>.+)_(?P<topic>[^_]+)_LastAccNum$',
+     "drop_outside_universe": True},
+    {"name": "ticker_blobs", "pattern": r'^(?P<ticker>[^_]+)_(?:Raw_Financials|ALARM_SUMMARY)$',
+     "drop_outside_universe": True},
+    # 리포트 키는 report_index와 같은 파서(parse_cache_key)로 판별
+    {"name": "reports", "pattern": None, "keep_latest": 1, "drop_outside_universe": True},
+]
+
+
+def _compile(policies):
+    compiled = []
+    for p in policies:
+        compiled.append({**p, "regex": re.compile(p["pattern"]) if p.get("pattern") else None})
+    return compiled
+
+
+def _parse_ts(value):
+    try:
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return ts.replace(tzinfo=None) if ts.tzinfo is None else ts.astimezone().replace(tzinfo=None)
+    except Exception:
+        return None
+
+
+class Universe:
+    """대상 종목 / 회사명 집합 (우선주·유닛은 본주 기준으로도 일치)
+    complete=False: 원본 목록 일부가 빠졌을 수 있음 → 유니버스 기준 삭제에 쓰지 않음"""
+
+    def __init__(self, tickers=(), names=(), complete=True):
+        self.complete = complete
+        self.tickers = set()
+        for t in tickers:
+            if t:
+                self.tickers.add(str(t))
+                self.tickers.add(get_base_ticker(str(t)))
+        self.names = {str(n) for n in names if n}
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def has_ticker(self, ticker):
+        return ticker in self.tickers or get_base_ticker(ticker) in self.tickers
+
+    def has_company(self, company):
+        return company in self.names
+
+
+class RetentionJob:
+    """정책 스캔 → 삭제 계획 → 시간 예산 내 배치 삭제"""
+
+    def __init__(self, client, policies=None, batch_size=200, universe_grace_days=UNIVERSE_GRACE_DAYS,
+                 min_universe=MIN_UNIVERSE, on_deleted=None, log_fn=print):
+        self.client = client
+        self.policies = _compile(policies or RETENTION_POLICIES)
+        self.batch_size = batch_size
+        self.universe_grace_days = universe_grace_days
+        self.min_universe = min_universe
+        self.on_deleted = on_deleted   # 삭제된 키 목록 콜백 (델타 매니페스트 / 스냅샷 정리용)
+        self.log = log_fn
+        self.stats = {}   # 정책 → {planned, planned_bytes, deleted, deleted_bytes}
+        self.scanned = 0
+        self.sizes_known = True
+
+    # ------------------------------------------
+    # 스캔
+    # ------------------------------------------
+    def _scan_pages(self, page_size=1000):
+        """(cache_key, ticker, updated_at, content_bytes) 페이지. RPC가 없으면 본문 없이 키만 스캔 (바이트 수 미상)"""
+        try:
+            after = ""
+            while True:
+                rows = self.client.rpc(SCAN_RPC, {"after_key": after, "page_size": page_size}).execute().data or []
+                if not rows: return
+                yield rows
+                if len(rows) < page_size: return
+                after = rows[-1]["cache_key"]
+        except Exception as e:
+            if after: raise
+            self.log(f"⚠️ [보존 정책] {SCAN_RPC} RPC 없음 (migrations/004 확인) → 키만 스캔합니다: {e}")
+        self.sizes_known = False
+        yield from iter_pages(self.client, TABLE, "cache_key, updated_at", order="cache_key", page_size=page_size)
+
+    def _match(self, key):
+        for p in self.policies:
+            if p["regex"] is None:
+                meta = parse_cache_key(key)
+                if not meta or meta.get("ticker") == "MARKET": continue
+                group = (meta.get("ticker") or meta.get("company"), meta["report_type"], meta.get("lang"))
+                return p, {"ticker": meta.get("ticker"), "company": meta.get("company")}, group, meta.get("version")
+            m = p["regex"].match(key)
+            if m: return p, m.groupdict(), None, None
+        return None, None, None, None
+
+    def plan(self, universe=None, deadline=None, now=None):
+        """삭제 후보 [(cache_key, 정책명, 바이트 수)] 를 반환합니다."""
+        now = now or datetime.now()
+        use_universe = universe is not None and universe.complete and len(universe) >= self.min_universe
+        if universe is not None and not universe.complete:
+            self.log("⚠️ [보존 정책] 유니버스 목록이 불완전해 유니버스 기준 삭제는 건너뜁니다.")
+        elif universe is not None and not use_universe:
+            self.log(f"⚠️ [보존 정책] 유니버스가 {len(universe)}개뿐이라 유니버스 기준 삭제는 건너뜁니다.")
+
+        candidates = {}
+        groups = {}   # (정책명, 그룹) → [(version, updated_at, key, bytes)]
+        for page in self._scan_pages():
+            for row in page:
+                self.scanned += 1
+                key = row.get("cache_key")
+                policy, parts, group, version = self._match(str(key or ""))
+                if not policy: continue
+                updated = _parse_ts(row.get("updated_at"))
+                age_days = (now - updated).days if updated else None
+                size = row.get("content_bytes") or 0
+
+                reason = None
+                if policy.get("max_age_days") and age_days is not None and age_days > policy["max_age_days"]:
+                    reason = policy["name"]
+                elif use_universe and policy.get("drop_outside_universe") and (age_days is None or age_days > self.universe_grace_days):
+                    ticker, company = parts.get("ticker") or row.get("ticker"), parts.get("company")
+                    if ticker and not universe.has_ticker(ticker) and not (company and universe.has_company(company)):
+                        reason = f"{policy['name']}:universe"
+                    elif not ticker and company and not universe.has_company(company):
+                        reason = f"{policy['name']}:universe"
+                if reason:
+                    candidates[key] = (reason, size)
+                elif group and policy.get("keep_latest"):
+                    groups.setdefault((policy["name"], policy["keep_latest"], group), []).append(
+                        (int(version or 0), row.get("updated_at") or "", key, size))
+            if deadline and time.time() > deadline:
+                self.log(f"⏳ [보존 정책] 스캔 시간 초과 ({self.scanned}행까지) → 스캔한 범위만 정리합니다.")
+                break
+
+        # 스캔이 중간에 끊겨도 '본 것 중 더 새 버전이 N개 있는 행'만 지우므로 안전
+        for (name, keep, _), members in groups.items():
+            members.sort(reverse=True)
+            for _, _, key, size in members[keep:]:
+                candidates[key] = (f"{name}:superseded", size)
+
+        planned = []
+        for key, (reason, size) in candidates.items():
+            s = self.stats.setdefault(reason, {"planned": 0, "planned_bytes": 0, "deleted": 0, "deleted_bytes": 0})
+            s["planned"] += 1
+            s["planned_bytes"] += size
+            planned.append((key, reason, size))
+        return planned
+
+    # ------------------------------------------
+    # 삭제
+    # ------------------------------------------
+    def delete(self, planned, deadline=None):
+        deleted = 0
+        for i in range(0, len(planned), self.batch_size):
+            if deadline and time.time() > deadline:
+                self.log(f"⏳ [보존 정책] 시간 예산 소진 → 남은 {len(planned) - i}행은 다음 실행에서 정리합니다.")
+                break
+            batch = planned[i:i + self.batch_size]
+            keys = [k for k, _, _ in batch]
+            try:
+                self.client.table(TABLE).delete().in_("cache_key", keys).execute()
+            except Exception as e:
+                self.log(f"❌ [보존 정책] 삭제 실패 ({len(keys)}행): {e}")
+                continue
+            try:
+                self.client.table(INDEX_TABLE).delete().in_("cache_key", keys).execute()
+            except Exception: pass
+            if self.on_deleted:
+                try: self.on_deleted(keys)
+                except Exception: pass
+            for _, reason, size in batch:
+                self.stats[reason]["deleted"] += 1
+                self.stats[reason]["deleted_bytes"] += size
+            deleted += len(keys)
+        return deleted
+
+    def run(self, universe=None, budget_sec=300, dry_run=False):
+        """반환값: 삭제(또는 dry-run 시 삭제 예정) 행 수"""
+        deadline = time.time() + budget_sec if budget_sec else None
+        planned = self.plan(universe, deadline=deadline)
+        if dry_run: return len(planned)
+        return self.delete(planned, deadline=deadline)
+
+    def report(self):
+        def mb(n):
+            if not self.sizes_known: return "용량 미상"
+            return f"{n / 1024 / 1024:.1f}MB" if n >= 1024 * 1024 else f"{n / 1024:.1f}KB"
+        lines = [f"스캔 {self.scanned}행"]
+        for reason, s in sorted(self.stats.items()):
+            lines.append(f"{reason}: 삭제 {s['deleted']}/{s['planned']}행 ({mb(s['deleted_bytes'])} / 예정 {mb(s['planned_bytes'])})")
+        total = sum(s["deleted_bytes"] for s in self.stats.values())
+        lines.append(f"회수한 본문 용량: {mb(total)} (실제 디스크 반환은 Postgres autovacuum 이후)")
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    from utils.storage import create_storage_client
+
+    parser = argparse.ArgumentParser(description="analysis_cache 보존 정책 정리")
+    parser.add_argument("--dry-run", action="store_true", help="삭제하지 않고 계획 / 회수 예정 용량만 출력")
+    parser.add_argument("--budget", type=int, default=300, help="시간 예산(초)")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--no-universe", action="store_true", help="나이/버전 정책만 적용")
+    args = parser.parse_args(argv)
+
+    url = os.environ.get("SUPABASE_URL", "").split("/rest/v1")[0].rstrip('/')
+    client = create_storage_client(url, os.environ.get("SUPABASE_KEY", ""))
+
+    universe = None
+    if not args.no_universe:
+        # 워커는 IPO 캘린더를 넘기지만, 단독 실행 시에는 그보다 넓은 stock_cache 전체를 유니버스로 사용
+        rows = fetch_all_rows(client, "stock_cache", "symbol, name", order="symbol")
+        universe = Universe([r.get("symbol") for r in rows], [r.get("name") for r in rows])
+
+    job = RetentionJob(client, batch_size=args.batch_size)
+    count = job.run(universe, budget_sec=args.budget, dry_run=args.dry_run)
+    print(f"🧹 [보존 정책] {'삭제 예정' if args.dry_run else '삭제'} {count}행\n{job.report()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import json
+import hashlib
+from datetime import datetime
+
+from utils.paged_reader import fetch_all_rows
+
+# ==========================================
+# [실행 저널] 단계 완료 체크포인트 / 중단 후 이어서 실행
+# ==========================================
+# Actions 작업이 강제 종료되거나 시간 제한으로 future가 취소되면 다음 실행은 처음부터 시작해서
+# 모든 단계가 트래커 조회(DB 왕복)로 "할 일 없음"을 다시 확인해야 했습니다.
+# 단계가 끝날 때마다 run_journal 테이블(migrations/006_run_journal.sql)에
+#   (run_id, ticker, stage, status, fingerprint)
+# 를 쓰기 버퍼로 기록해 두고,
+#   - worker.py --resume              : 마지막 미완료 실행에서 done이 아닌 단계만 이어서 실행
+#   - emergency_worker.py --from-journal : failed / skipped / cancelled / unconfirmed (종목, 단계)만 정확히 재실행
+# 합니다. fingerprint는 "실행 조건 지문:입력 지문" 형태이며, 이어서 실행할 때는 실행 조건
+# (종목명 / 상장 상태 / 상장일) 지문이 같은 done 단계만 건너뜁니다.
+# 저널 행은 쓰기 버퍼에서 단계 결과(analysis_cache 등)보다 나중에 전송되며, 결과 전송이 실패한 뒤의 done은
+# unconfirmed로 바뀌어 기록됩니다. (결과가 DB에 닿지 않은 단계를 --resume이 건너뛰지 않도록)
+
+JOURNAL_TABLE = "run_journal"
+JOURNAL_CONFLICT = "run_id,ticker,stage"
+RUN_TICKER = "*"          # 실행 전체 단계(헤더 / 알림 엔진 / 요약 등)의 ticker 값
+UNFINISHED = ("failed", "skipped", "cancelled", "unconfirmed")
+
+
+def unconfirm_rows(rows):
+    """단계 결과 전송이 실패한 뒤의 done 기록 → unconfirmed (--resume / --from-journal 재실행 대상)
+    WriteBehindBuffer(deferred={JOURNAL_TABLE: unconfirm_rows})로 연결"""
+    return [{**r, "status": "unconfirmed"} if r.get("status") == "done" else r for r in rows]
+
+
+def _digest(value):
+    raw = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:10]
+
+
+def input_fingerprint(context, inputs=None):
+    """'실행 조건 지문:입력 지문' (입력이 없는 단계는 실행 조건 지문만)"""
+    fp = _digest(context)
+    return f"{fp}:{_digest(inputs)}" if inputs else fp
+
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def latest_run(client, unfinished_only=True):
+    """가장 최근 실행의 헤더 행. unfinished_only면 정상 종료(finished)되지 않은 실행만"""
+    res = (client.table(JOURNAL_TABLE).select("run_id, status, detail, updated_at")
+           .eq("ticker", RUN_TICKER).eq("stage", "run").order("updated_at", desc=True).limit(1).execute())
+    if not res.data: return None
+    row = res.data[0]
+    if unfinished_only and row.get("status") == "finished": return None
+    return row
+
+
+class RunJournal:
+    """실행 저널 기록기. send_fn(table, on_conflict, rows)는 보통 WRITE_BUFFER.add"""
+
+    def __init__(self, client, send_fn, run_id=None):
+        self.client = client
+        self.send_fn = send_fn
+        self.run_id = run_id or new_run_id()
+        self.resuming = False
+        self.planned = []
+        self._done = {}   # (ticker, stage) → fingerprint
+
+    # ------------------------------------------
+    # 이전 실행 읽기
+    # ------------------------------------------
+    def load(self):
+        """이 run_id의 기록을 읽어 이어서 실행할 준비를 합니다. 반환값: done 단계 수"""
+        # (ticker, stage)가 고유 키이므로 두 컬럼으로 정렬해야 페이지 경계가 안정적
+        rows = fetch_all_rows(self.client, JOURNAL_TABLE, "ticker, stage, status, fingerprint, detail",
+                              filters=lambda q: q.eq("run_id", self.run_id).order("ticker").order("stage"))
+        for r in rows:
+            if r["ticker"] == RUN_TICKER and r["stage"] == "run":
+                try: self.planned = json.loads(r.get("detail") or "[]")
+                except Exception: self.planned = []
+            elif r.get("status") == "done":
+                self._done[(r["ticker"], r["stage"])] = r.get("fingerprint") or ""
+        self.resuming = True
+        return len(self._done)
+
+    def failed_pairs(self, ticker=None):
+        """failed / skipped / cancelled / unconfirmed 로 끝난 [(ticker, stage)]"""
+        rows = fetch_all_rows(self.client, JOURNAL_TABLE, "ticker, stage, status",
+                              filters=lambda q: q.eq("run_id", self.run_id).in_("status", list(UNFINISHED)).order("ticker").order("stage"))
+        return sorted({(r["ticker"], r["stage"]) for r in rows
+                       if r["ticker"] != RUN_TICKER and (ticker is None or r["ticker"] == ticker)})
+
+    def is_done(self, ticker, stage, context_fp=None):
+        fp = self._done.get((ticker, stage))
+        if fp is None: return False
+        return context_fp is None or fp.split(":")[0] == context_fp
+
+    def pending_stages(self, ticker, stages, context_fp=None):
+        return [s for s in stages if not self.is_done(ticker, s, context_fp)]
+
+    # ------------------------------------------
+    # 기록
+    # ------------------------------------------
+    def record(self, ticker, stage, status, fingerprint=None, duration=None, detail=None):
+        row = {"run_id": self.run_id, "ticker": str(ticker), "stage": stage, "status": status,
+               "updated_at": datetime.now().isoformat()}
+        if fingerprint is not None: row["fingerprint"] = fingerprint
+        if duration is not None: row["duration_sec"] = round(duration, 2)
+        if detail is not None: row["detail"] = str(detail)
+        if status == "done": self._done[(str(ticker), stage)] = fingerprint or ""
+        try:
+            self.send_fn(JOURNAL_TABLE, JOURNAL_CONFLICT, [row])
+        except Exception as e:
+            print(f"⚠️ [실행 저널] 기록 실패 ({ticker}/{stage}): {e}")
+
+    def start(self, planned_tickers):
+        """실행 헤더 기록 (이어서 실행할 때는 기존 계획을 유지)"""
+        if not self.resuming: self.planned = list(planned_tickers)
+        self.record(RUN_TICKER, "run", "started", detail=json.dumps(self.planned, ensure_ascii=False))
+
+    def finish(self):
+        self.record(RUN_TICKER, "run", "finished", detail=json.dumps(self.planned, ensure_ascii=False))
+
+    def interrupt(self, reason):
+        """취소(시간 제한 / 종료 신호)로 멈춘 실행의 체크포인트. finished가 아니므로 다음 --resume 대상"""
+        print(f"🧾 [실행 저널] {self.run_id} 중단 기록 ({reason}) → python worker.py --resume {self.run_id}")
+        self.record(RUN_TICKER, "run", "interrupted", detail=json.dumps(self.planned, ensure_ascii=False))
@@ -0,0 +1,255 @@
+import json
+from datetime import datetime, timedelta
+
+# ==========================================
+# [실행 계획 미리보기] worker.py --plan : 유료 API 호출 없이 다음 실행의 호출 수 / 토큰 / 비용 / 소요 시간 추정
+# ==========================================
+# 프롬프트를 바꾸거나 리포트 버전 접미사(Tab0_v16 → v17)를 올리기 전에 실행 한 번에 LLM 호출이 몇 번 나갈지 알 수 없었습니다.
+# 미리보기는 실제 실행과 같은 타겟 선별 / 변경 감지(FMP 피드 제외)로 종목별 실행 단계를 정한 뒤,
+# 단계를 실행하는 대신 단계 프로필(worker.py PLAN_PROFILES)과 analysis_cache 키의 updated_at만으로 판단합니다.
+# 산출물(리포트 키) 하나의 판단
+#   - certain  : 트래커는 있는데 리포트 키가 없음 (버전 접미사 변경) / 트래커 없는 산출물의 키가 없음
+#   - possible : 입력 FMP 캐시가 유효 기간을 지났거나 EDGAR 인덱스에 신규 공시가 있음 (받아 봐야 바뀌었는지 알 수 있음)
+#                입력이 캐시되지 않는 단계(애널리스트 / 재무 직접 조회) / 처음 보는 산출물
+#   - none     : 입력 캐시가 모두 유효하고 신규 공시도 없음 → 트래커 비교에서 건너뜀
+# 합계는 certain만 센 하한과 possible까지 더한 상한을 함께 보여 줍니다.
+# 소요 시간은 실행 저널의 단계별 평균 소요 시간(없으면 프로필 기본값)으로 풀 / 자원 / 종목 동시성 중 가장 좁은 곳을 계산합니다.
+
+FMP_HOST = "financialmodelingprep.com"
+KINDS = ("certain", "possible")
+
+
+def parse_time(value):
+    if not value: return None
+    try: return datetime.fromisoformat(str(value)[:19].replace(" ", "T"))
+    except Exception: return None
+
+
+class RunPlan:
+    """미리보기 결과 집계 (JSON / 표)"""
+
+    def __init__(self):
+        self.tickers = 0
+        self.stage_runs = {}   # 단계 → 실행 종목 수
+        self.http = {}         # 호스트 → {certain, possible}
+        self.llm = {}          # (단계, 언어, 모델) → {certain, possible, in_tokens, out_tokens, cost_usd (각각 certain / possible)}
+        self.reasons = {}      # 판단 사유 → 산출물 수
+        self.paths = []        # 종목별 실행 단계 목록 (소요 시간 추정용)
+        self.wall = {}
+        self.notes = []
+
+    def add_http(self, host, n, kind="certain"):
+        if n <= 0: return
+        slot = self.http.setdefault(host, {k: 0 for k in KINDS})
+        slot[kind] += n
+
+    def add_llm(self, stage, lang, model, kind, calls, tokens, cost):
+        slot = self.llm.setdefault((stage, lang, model), {k: {"calls": 0, "in_tokens": 0, "out_tokens": 0, "cost_usd": 0.0} for k in KINDS})[kind]
+        slot["calls"] += calls
+        slot["in_tokens"] += calls * tokens[0]
+        slot["out_tokens"] += calls * tokens[1]
+        slot["cost_usd"] += cost
+
+    def _sum(self, kinds):
+        out = {"calls": 0, "in_tokens": 0, "out_tokens": 0, "cost_usd": 0.0}
+        for slots in self.llm.values():
+            for k in kinds:
+                for f in out: out[f] += slots[k][f]
+        out["cost_usd"] = round(out["cost_usd"], 2)
+        return out
+
+    def totals(self):
+        return {
+            "llm_certain": self._sum(("certain",)),
+            "llm_upper": self._sum(KINDS),
+            "http_certain": sum(h["certain"] for h in self.http.values()),
+            "http_upper": sum(h["certain"] + h["possible"] for h in self.http.values()),
+        }
+
+    def to_dict(self):
+        llm = [{"stage": s, "lang": l, "model": m, **{k: {f: round(v, 4) for f, v in slots[k].items()} for k in KINDS}}
+               for (s, l, m), slots in sorted(self.llm.items())]
+        return {"generated_at": datetime.now().isoformat(), "tickers": self.tickers, "stage_runs": self.stage_runs,
+                "http": self.http, "llm": llm, "totals": self.totals(), "wall": self.wall,
+                "reasons": self.reasons, "notes": self.notes}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def table(self):
+        lines = [f"종목 {self.tickers}개 / 단계 실행: " + ", ".join(f"{s} {n}" for s, n in self.stage_runs.items()), "",
+                 f"{'HTTP 호스트':<40}{'확정':>10}{'상한':>10}"]
+        for host, h in sorted(self.http.items(), key=lambda x: -(x[1]["certain"] + x[1]["possible"])):
+            lines.append(f"{host:<40}{h['certain']:>10,}{h['certain'] + h['possible']:>10,}")
+
+        lines += ["", f"{'LLM 단계':<16}{'언어':<6}{'모델':<20}{'호출(확정/상한)':>18}{'입력 토큰(상한)':>16}{'출력 토큰(상한)':>16}{'비용 $(상한)':>14}"]
+        for (stage, lang, model), slots in sorted(self.llm.items()):
+            c, p = slots["certain"], slots["possible"]
+            lines.append(f"{stage:<16}{lang:<6}{model:<20}{c['calls']:>9,}/{c['calls'] + p['calls']:<8,}"
+                         f"{c['in_tokens'] + p['in_tokens']:>16,}{c['out_tokens'] + p['out_tokens']:>16,}{c['cost_usd'] + p['cost_usd']:>14.2f}")
+        t = self.totals()
+        lines.append(f"{'합계':<42}{t['llm_certain']['calls']:>9,}/{t['llm_upper']['calls']:<8,}"
+                     f"{t['llm_upper']['in_tokens']:>16,}{t['llm_upper']['out_tokens']:>16,}{t['llm_upper']['cost_usd']:>14.2f}")
+        lines.append(f"예상 비용: 확정 ${t['llm_certain']['cost_usd']:.2f} ~ 상한 ${t['llm_upper']['cost_usd']:.2f}")
+
+        if self.wall:
+            w = self.wall
+            bounds = ", ".join(f"{k} {v / 60:.0f}분" for k, v in w["bounds"].items())
+            lines += ["", f"예상 소요 시간: {w['estimate_sec'] / 60:.0f}분 (병목: {w['bottleneck']}) / 제한 {w['limit_sec'] / 60:.0f}분",
+                      f"  구간별: {bounds}"]
+            if w["estimate_sec"] > w["limit_sec"]:
+                lines.append("  ⚠️ 실행 시간 제한 초과 예상 → 우선순위가 낮은 종목은 다음 실행으로 넘어감")
+        if self.reasons:
+            lines += ["", "판단 사유: " + ", ".join(f"{k} {v}" for k, v in sorted(self.reasons.items(), key=lambda x: -x[1]))]
+        lines += self.notes
+        return "\n".join(lines)
+
+
+class RunPlanner:
+    """단계 프로필 + analysis_cache 키 시각으로 종목별 예상 호출을 계산합니다.
+    key_time(key): 키의 updated_at (없으면 None) / edgar: EdgarIndexConsumer (None이면 공시 판단 불가)
+    models: {모델 별칭: {name, host, in_usd, out_usd, call_usd}} - 단가는 1M 토큰당 달러 / call_usd는 호출당 추가 요금
+    cadence(source, t): 프로필의 FMP 캐시 유효 시간이 소스 이름(문자열)일 때 종목 t 기준 시간 (신선도 정책)"""
+
+    def __init__(self, profiles, models, langs, key_time, edgar=None, now=None, cadence=None):
+        self.profiles = profiles
+        self.models = models
+        self.langs = list(langs)
+        self.key_time = key_time
+        self.edgar = edgar
+        self.now = now or datetime.now()
+        self.cadence = cadence
+
+    # ------------------------------------------
+    # 키 목록 (선로딩용)
+    # ------------------------------------------
+    def _variants(self, product, t):
+        expand = product.get("expand")
+        return expand(t) if expand else [{}]
+
+    def _key(self, template, t, var, lang="ko"):
+        return template.format(ticker=t["official"], company=t["company"], lang=lang, topic=var.get("topic", ""))
+
+    def _product_langs(self, product):
+        return product.get("langs") or self.langs
+
+    def keys_for(self, t, stages):
+        keys = []
+        for stage in stages:
+            prof = self.profiles.get(stage) or {}
+            for api, _ in prof.get("fmp", []):
+                keys += [f"RAW_FMP_{api}_{sym}" for sym in t["symbols"]]
+            for product in prof.get("products", []):
+                for var in self._variants(product, t):
+                    langs = self._product_langs(product) if product.get("per_lang") else ["ko"]
+                    keys += [self._key(product["key"], t, var, lang) for lang in langs]
+                    if product.get("tracker"): keys.append(self._key(product["tracker"], t, var))
+                    keys += [f"RAW_FMP_{api}_{t['symbols'][0]}" for api, _ in product.get("inputs") or []]
+        return keys
+
+    # ------------------------------------------
+    # 판단
+    # ------------------------------------------
+    def _fresh(self, t, api, hours):
+        if isinstance(hours, str): hours = self.cadence(hours, t) if self.cadence else 24
+        ts = self.key_time(f"RAW_FMP_{api}_{t['symbols'][0]}")
+        return ts is not None and ts > self.now - timedelta(hours=hours)
+
+    def _fmp_requests(self, t, fmp):
+        """유효 기간이 지난 FMP 캐시 → 요청 수 (캐시가 아예 없으면 본주 재조회까지 상한으로 셈)"""
+        n = 0
+        for api, hours in fmp:
+            if self._fresh(t, api, hours): continue
+            n += 1
+            if len(t["symbols"]) > 1 and self.key_time(f"RAW_FMP_{api}_{t['symbols'][0]}") is None: n += 1
+        return n
+
+    def _decide(self, t, product, var, stage_fmp):
+        """(certain / possible / None, 사유)"""
+        report = self.key_time(self._key(product["key"], t, var))
+        tracker = self._key(product["tracker"], t, var) if product.get("tracker") else None
+        has_tracker = bool(tracker and self.key_time(tracker))
+        if report is None and (has_tracker or tracker is None): return "certain", "report_missing"
+
+        forms = var.get("forms", product.get("forms"))
+        new_filing = None
+        if forms is not None:
+            new_filing = self.edgar.has_new_filing(t.get("cik"), forms) if self.edgar else None
+            if new_filing is False and report is None: return None, "no_filing"
+        if report is None: return "possible", "new"
+
+        inputs = product.get("inputs", stage_fmp)
+        if inputs and not all(self._fresh(t, api, h) for api, h in inputs): return "possible", "input_stale"
+        if forms is not None:
+            if new_filing: return "possible", "filing"
+            if new_filing is None: return "possible", "filing_unknown"
+            return None, "fresh"
+        if not inputs: return "possible", "uncached_input"
+        return None, "fresh"
+
+    def _add_llm(self, plan, stage, product, var, kind, langs=None):
+        model = self.models.get(product.get("model") or "")
+        langs = langs or self._product_langs(product)
+        if model:
+            tokens = var.get("tokens") or product["tokens"]
+            calls = product.get("calls", 1)
+            cost = calls * ((tokens[0] * model["in_usd"] + tokens[1] * model["out_usd"]) / 1e6 + model.get("call_usd", 0.0))
+            for lang in langs:
+                plan.add_llm(stage, lang, model["name"], kind, calls, tokens, cost)
+            plan.add_http(model["host"], calls * len(langs), kind)
+        for host, n in (product.get("http") or {}).items():
+            plan.add_http(host, n * (1 if model else len(langs)), kind)
+
+    def plan_ticker(self, plan, t, stages):
+        """t: {ticker, official, company, symbols, cik, status, date} / stages: 이 종목이 실행할 단계 (입력 단계 포함)"""
+        plan.tickers += 1
+        plan.paths.append(list(stages))
+        for stage in stages:
+            plan.stage_runs[stage] = plan.stage_runs.get(stage, 0) + 1
+            prof = self.profiles.get(stage)
+            if not prof: continue
+            stage_fmp = prof.get("fmp", [])
+            plan.add_http(FMP_HOST, self._fmp_requests(t, stage_fmp))
+            for host, n in (prof.get("http") or {}).items(): plan.add_http(host, n)
+
+            for product in prof.get("products", []):
+                for var in self._variants(product, t):
+                    if product.get("per_lang"):
+                        # 언어별 트래커 (트위터): 보내지 않은 언어만
+                        missing = [l for l in self._product_langs(product) if self.key_time(self._key(product["key"], t, var, l)) is None]
+                        kind, reason = ("certain", "lang_missing") if missing else (None, "fresh")
+                        if kind: self._add_llm(plan, stage, product, var, kind, langs=missing)
+                    else:
+                        kind, reason = self._decide(t, product, var, stage_fmp)
+                        if kind: self._add_llm(plan, stage, product, var, kind)
+                        else:
+                            for host, n in (var.get("probe") or {}).items(): plan.add_http(host, n)
+                    plan.reasons[reason] = plan.reasons.get(reason, 0) + 1
+
+    # ------------------------------------------
+    # 소요 시간
+    # ------------------------------------------
+    def estimate_wall(self, plan, graph, durations, pool_of, pools, limits, concurrency, limit_sec):
+        """durations: {단계: 평균 초} / pool_of(stage) → 풀 이름 / pools: {풀: 스레드 수} / limits: {자원: 동시 실행 수}"""
+        pool_work, res_work, ticker_work, longest = {}, {}, 0.0, 0.0
+        for stages in plan.paths:
+            finish = {}
+            for name in stages:   # 단계 목록은 그래프 선언 순서 (의존 단계가 먼저)
+                st = graph.stages[name]
+                d = durations.get(name, 0.0)
+                finish[name] = d + max((finish.get(dep, 0.0) for dep in st.deps), default=0.0)
+                pool_work[pool_of(st)] = pool_work.get(pool_of(st), 0.0) + d
+                for r in st.resources:
+                    if r in limits: res_work[r] = res_work.get(r, 0.0) + d
+            path = max(finish.values(), default=0.0)
+            ticker_work += path
+            longest = max(longest, path)
+
+        bounds = {f"종목 동시성({concurrency})": ticker_work / max(concurrency, 1), "최장 종목": longest}
+        for p, w in pool_work.items(): bounds[f"{p} 풀({pools.get(p, 1)})"] = w / max(pools.get(p, 1), 1)
+        for r, w in res_work.items(): bounds[f"{r} 자원({limits[r]})"] = w / max(limits[r], 1)
+        bottleneck = max(bounds, key=bounds.get) if bounds else "-"
+        plan.wall = {"estimate_sec": round(bounds.get(bottleneck, 0.0)), "bottleneck": bottleneck,
+                     "bounds": {k: round(v) for k, v in bounds.items()}, "limit_sec": round(limit_sec),
+                     "stage_sec": {k: round(v, 1) for k, v in durations.items()}}
+        return plan.wall
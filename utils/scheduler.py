@@ -0,0 +1,187 @@
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+
+from utils.cancellation import Cancelled
+
+# ==========================================
+# [데몬 스케줄러] 주기 작업 / 정시 작업 / 이벤트 트리거
+# ==========================================
+# cron으로 하루 4번(worker.py) + 15분마다(price_worker.py) 새 프로세스를 띄우면 매번 pandas / genai / firebase /
+# supabase 임포트와 클라이언트 초기화, SEC 매핑 / IPO 캘린더 다운로드를 처음부터 다시 했습니다.
+# 데몬 모드(worker.py --daemon)는 한 프로세스에서 이 스케줄러로 작업을 돌리고, 참조 데이터는 WarmValue로 데워 둡니다.
+#   - every(): N초마다 / at_hours(): 매일 지정한 UTC 시각 (cron과 같은 시각)
+#   - on_events(): trigger()로 쌓인 종목 이벤트(신규 8-K / 주가 급등)를 debounce 후 한 번에 처리
+#   - group이 같은 작업은 동시에 실행하지 않음 (예: 전체 분석 주기와 이벤트 분석은 같은 전역 상태를 씀)
+#   - 이전 실행이 아직 끝나지 않은 작업은 건너뜀 (겹쳐서 실행하지 않음)
+
+
+class WarmValue:
+    """ttl_sec 동안 재사용하는 참조 데이터 (SEC 매핑 / IPO 캘린더 등). 로드 실패 시 이전 값 유지"""
+
+    def __init__(self, name, loader, ttl_sec, log_fn=print):
+        self.name = name
+        self.loader = loader
+        self.ttl_sec = ttl_sec
+        self.log = log_fn
+        self.value = None
+        self.loaded_at = 0.0
+        self.loads = 0
+        self._lock = threading.Lock()
+
+    @property
+    def age(self):
+        return time.time() - self.loaded_at if self.loaded_at else None
+
+    def get(self, force=False):
+        with self._lock:
+            if force or self.value is None or time.time() - self.loaded_at >= self.ttl_sec:
+                try:
+                    value = self.loader()
+                    if value is not None:
+                        self.value, self.loaded_at = value, time.time()
+                        self.loads += 1
+                except Exception as e:
+                    self.log(f"⚠️ [데몬] {self.name} 갱신 실패 (이전 값 사용): {e}")
+            return self.value
+
+
+class Job:
+    def __init__(self, name, fn, every_sec=None, hours_utc=None, minute=0, group=None, run_now=False):
+        self.name = name
+        self.fn = fn
+        self.every_sec = every_sec
+        self.hours_utc = tuple(sorted(hours_utc)) if hours_utc else None
+        self.minute = minute
+        self.group = group
+        self.running = False
+        self.next_run = time.time() if run_now else self._next(time.time())
+        self.stats = {"runs": 0, "failures": 0, "overlaps": 0, "last_sec": 0.0}
+
+    def _next(self, now):
+        if self.every_sec: return now + self.every_sec
+        if not self.hours_utc: return float("inf")   # 이벤트 작업 (trigger()로만 실행)
+        cur = datetime.fromtimestamp(now, timezone.utc)
+        for day in range(2):
+            for hour in self.hours_utc:
+                cand = (cur + timedelta(days=day)).replace(hour=hour, minute=self.minute, second=0, microsecond=0)
+                if cand.timestamp() > now: return cand.timestamp()
+        return now + 86400
+
+
+class Scheduler:
+    """데몬 작업 스케줄러. token(utils/cancellation.py)이 취소될 때까지 run_forever()에서 작업을 실행합니다."""
+
+    def __init__(self, token, log_fn=print, tick_sec=1.0):
+        self.token = token
+        self.log = log_fn
+        self.tick_sec = tick_sec
+        self.jobs = {}
+        self._event_jobs = {}   # 이벤트 작업 이름 → debounce_sec
+        self._events = {}       # key → {"reasons": [...], "stages": set, "since": float}
+        self._busy_groups = set()
+        self._threads = {}
+        self._lock = threading.Lock()
+        self.stats = {"triggers": 0, "event_batches": 0}
+
+    # ------------------------------------------
+    # 작업 등록
+    # ------------------------------------------
+    def every(self, name, fn, seconds, group=None, run_now=True):
+        self.jobs[name] = Job(name, fn, every_sec=seconds, group=group, run_now=run_now)
+        return self
+
+    def at_hours(self, name, fn, hours_utc, minute=0, group=None, run_now=False):
+        self.jobs[name] = Job(name, fn, hours_utc=hours_utc, minute=minute, group=group, run_now=run_now)
+        return self
+
+    def on_events(self, name, fn, debounce_sec=60, group=None):
+        """fn(events) - events: {key: {"reasons": [...], "stages": set}}"""
+        self.jobs[name] = Job(name, fn, group=group)
+        self._event_jobs[name] = debounce_sec
+        return self
+
+    def trigger(self, key, reason, stages=()):
+        """종목 이벤트 등록. 처리 전에 같은 key가 다시 들어오면 사유 / 단계를 합침"""
+        with self._lock:
+            ev = self._events.setdefault(key, {"reasons": [], "stages": set(), "since": time.time()})
+            ev["reasons"].append(reason)
+            ev["stages"].update(stages)
+            self.stats["triggers"] += 1
+
+    def pending_events(self):
+        with self._lock: return len(self._events)
+
+    # ------------------------------------------
+    # 실행
+    # ------------------------------------------
+    def _due(self, job, now):
+        if job.name in self._event_jobs:
+            with self._lock:
+                oldest = min((ev["since"] for ev in self._events.values()), default=None)
+            return oldest is not None and now - oldest >= self._event_jobs[job.name]
+        return now >= job.next_run
+
+    def _launch(self, job, now):
+        args = ()
+        if job.name in self._event_jobs:
+            with self._lock:
+                events, self._events = self._events, {}
+            self.stats["event_batches"] += 1
+            args = (events,)
+        else:
+            job.next_run = job._next(now)
+        with self._lock:
+            job.running = True
+            if job.group: self._busy_groups.add(job.group)
+
+        def _run():
+            start = time.time()
+            try:
+                job.fn(*args)
+            except (Exception, Cancelled) as e:
+                job.stats["failures"] += 1
+                self.log(f"🚨 [데몬] 작업 '{job.name}' 실패: {e}")
+            finally:
+                job.stats["runs"] += 1
+                job.stats["last_sec"] = time.time() - start
+                with self._lock:
+                    job.running = False
+                    if job.group: self._busy_groups.discard(job.group)
+
+        thread = threading.Thread(target=_run, name=f"daemon-{job.name}", daemon=True)
+        self._threads[job.name] = thread
+        thread.start()
+
+    def run_forever(self, drain_sec=120):
+        self.log(f"🛰️ [데몬] 스케줄러 시작: {', '.join(self.jobs)}")
+        while not self.token.cancelled:
+            now = time.time()
+            for job in self.jobs.values():
+                if not self._due(job, now): continue
+                with self._lock:
+                    running, group_busy = job.running, job.group in self._busy_groups
+                if running and job.name not in self._event_jobs:
+                    # 이전 실행이 아직 진행 중이면 이번 차례는 건너뜀
+                    job.stats["overlaps"] += 1
+                    job.next_run = job._next(now)
+                    self.log(f"⏭️ [데몬] '{job.name}' 이전 실행이 진행 중이라 이번 차례 건너뜀")
+                    continue
+                if running or group_busy: continue   # 같은 그룹 작업이 끝날 때까지 대기
+                self._launch(job, now)
+            self.token.wait(self.tick_sec)
+
+        # 종료: 실행 중인 작업이 취소 지점에서 멈추고 정리할 때까지 대기
+        deadline = time.time() + drain_sec
+        for name, thread in self._threads.items():
+            thread.join(timeout=max(deadline - time.time(), 0))
+            if thread.is_alive(): self.log(f"⚠️ [데몬] 작업 '{name}'이 {drain_sec}초 안에 끝나지 않아 기다리지 않고 종료")
+
+    def report(self):
+        lines = [f"트리거 {self.stats['triggers']}건 / 이벤트 배치 {self.stats['event_batches']}회 / 대기 이벤트 {self.pending_events()}건"]
+        for job in self.jobs.values():
+            s = job.stats
+            nxt = "이벤트" if job.name in self._event_jobs else datetime.fromtimestamp(job.next_run).strftime("%m-%d %H:%M")
+            lines.append(f"{job.name}: {s['runs']}회 (실패 {s['failures']} / 겹쳐서 건너뜀 {s['overlaps']}) "
+                         f"최근 {s['last_sec']:.0f}s / 다음 {nxt}{' / 실행 중' if job.running else ''}")
+        return "\n".join(lines)
@@ -0,0 +1,389 @@
+import time
+import queue
+import threading
+import concurrent.futures
+
+from utils import cancellation
+from utils.cancellation import Cancelled, STAGE_DEADLINE
+
+# ==========================================
+# [단계 그래프] 종목 파이프라인 단계를 의존성 기반으로 병렬 실행
+# ==========================================
+# process_single_ticker는 13개 단계를 순서대로 실행했지만 실제 의존성은 몇 개뿐입니다.
+# (예: fetch_premium_financials → run_tab3_analysis, fetch_smart_money_data → run_tab6_analysis)
+# 단계마다 입력(inputs: 앞 단계의 출력값을 인자로 받음)과 순서 제약(after: 출력은 안 쓰지만 먼저 끝나야 함)을
+# 선언하면, 실행기는 준비된 단계부터 공용 스레드 풀에서 동시에 실행합니다.
+#
+#   - resources : 단계가 점유하는 공용 자원 ("llm", "fmp", "sec" ...) → 실행기 전체에서 자원별 동시 실행 수 제한
+#     (허가는 풀에 제출하기 전에 얻으므로, 자원을 기다리는 단계가 풀 스레드를 붙잡지 않음)
+#   - default   : 단계 실패 시 다음 단계에 넘길 값. default가 없는 단계가 실패하면 그 출력을 입력으로 쓰는 단계는 건너뜀
+#   - 단계 하나의 예외는 그 단계(와 입력 의존 단계)에만 영향을 주고 나머지는 계속 진행
+# 실행 결과에는 단계별 소요 시간과 임계 경로(가장 긴 의존 사슬) 시간이 남습니다.
+#
+# [단계별 전용 풀] 한 풀에서 LLM 단계가 80초 백오프로 스레드를 잡고 있으면 LLM과 무관한 수집 단계까지 밀렸습니다.
+# 실행기는 풀(예: io 32개 / llm 8개)을 따로 두고, 단계는 pool 인자 또는 자원 이름과 같은 풀에서 실행됩니다.
+#   - 풀마다 제한된 대기열: 가득 차면 제출(submit)이 대기 → 종목 스레드까지 역압(backpressure)
+#   - 풀마다 대기열 깊이(최대/평균), 사용률(작업 시간 / 스레드 x 경과 시간), 제출 대기 시간을 집계
+#
+# [협조적 취소] run(token=...)에 실행 토큰(utils/cancellation.py)을 넘기면 단계마다 남은 실행 시간 안에서
+# 풀별 제한 시간(stage_timeouts)만큼의 단계 토큰을 만들어 실행 중인 스레드에 걸어 둡니다.
+# 토큰이 취소되면 아직 시작하지 않은 단계는 실행하지 않고 'cancelled'로 끝냅니다. (이어서 실행 대상)
+
+_NO_DEFAULT = object()
+RESOURCE_POLL_SEC = 0.05   # 자원 허가 대기 중인 단계가 있을 때 재시도 간격
+
+
+class Stage:
+    def __init__(self, name, fn, inputs=(), after=(), resources=(), default=_NO_DEFAULT, pool=None):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.after = tuple(after)
+        self.resources = tuple(sorted(resources))   # 정렬된 순서로 획득 (교착 방지)
+        self.default = default
+        self.pool = pool
+
+    @property
+    def deps(self):
+        return self.inputs + tuple(d for d in self.after if d not in self.inputs)
+
+
+class StageGraph:
+    """선언형 단계 그래프. add() 순서는 동시에 준비된 단계의 제출 순서로만 쓰입니다."""
+
+    def __init__(self, label=""):
+        self.label = label
+        self.stages = {}
+
+    def add(self, name, fn, inputs=(), after=(), resources=(), default=_NO_DEFAULT, pool=None):
+        if name in self.stages: raise ValueError(f"중복 단계: {name}")
+        self.stages[name] = Stage(name, fn, inputs, after, resources, default, pool)
+        return self
+
+    def subgraph(self, names):
+        """names 단계와 그 입력(inputs) 조상만 남긴 그래프. 남지 않은 단계에 대한 after 제약은 이미 끝난 것으로 봅니다."""
+        keep, stack = set(), list(names)
+        while stack:
+            n = stack.pop()
+            if n in keep or n not in self.stages: continue
+            keep.add(n)
+            stack.extend(self.stages[n].inputs)
+        sub = StageGraph(self.label)
+        for n, st in self.stages.items():
+            if n in keep:
+                sub.add(n, st.fn, st.inputs, [a for a in st.after if a in keep], st.resources, st.default, st.pool)
+        return sub
+
+    def validate(self):
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages: raise ValueError(f"[{stage.name}] 없는 단계에 의존: {dep}")
+        # 위상 정렬로 순환 검사
+        indeg = {n: len(s.deps) for n, s in self.stages.items()}
+        ready = [n for n, d in indeg.items() if d == 0]
+        seen = 0
+        while ready:
+            n = ready.pop()
+            seen += 1
+            for m, s in self.stages.items():
+                if n in s.deps:
+                    indeg[m] -= 1
+                    if indeg[m] == 0: ready.append(m)
+        if seen != len(self.stages): raise ValueError("단계 그래프에 순환 의존이 있습니다.")
+        return self
+
+
+class StageRun:
+    """한 번의 그래프 실행 결과"""
+
+    def __init__(self, label):
+        self.label = label
+        self.outputs = {}
+        self.errors = {}      # 단계 → 예외
+        self.skipped = []     # 입력 단계 실패로 건너뛴 단계
+        self.cancelled = []   # 실행 토큰 취소로 실행하지 않았거나 도중에 멈춘 단계
+        self.durations = {}   # 단계 → 실행 시간(초, 자원 대기 제외)
+        self.waits = {}       # 단계 → 자원 대기 시간(초)
+        self.wall_sec = 0.0
+        self.critical_path = []
+        self.critical_sec = 0.0
+
+    def _compute_critical_path(self, graph):
+        best = {}
+
+        def visit(name):
+            if name in best: return best[name]
+            stage = graph.stages[name]
+            prev = max((visit(d) for d in stage.deps), key=lambda x: x[0], default=(0.0, []))
+            best[name] = (prev[0] + self.durations.get(name, 0.0), prev[1] + [name])
+            return best[name]
+
+        for name in graph.stages: visit(name)
+        if best:
+            self.critical_sec, self.critical_path = max(best.values(), key=lambda x: x[0])
+
+    def summary(self):
+        busy = sum(self.durations.values())
+        line = (f"단계 {len(self.durations)}개 / 작업 합계 {busy:.1f}s / 벽시계 {self.wall_sec:.1f}s / "
+                f"임계 경로 {self.critical_sec:.1f}s ({' → '.join(self.critical_path)})")
+        if self.errors: line += f" / 실패: {', '.join(self.errors)}"
+        if self.skipped: line += f" / 건너뜀: {', '.join(self.skipped)}"
+        if self.cancelled: line += f" / 취소: {', '.join(self.cancelled)}"
+        return line
+
+
+class StagePool:
+    """전용 스레드 풀 + 제한된 대기열. 대기열이 가득 차면 submit()이 빈자리가 날 때까지 대기합니다."""
+
+    def __init__(self, name, workers, queue_size=None):
+        self.name = name
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size if queue_size is not None else workers * 4)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.active = 0
+        self.stats = {"submitted": 0, "completed": 0, "busy_sec": 0.0, "blocked_sec": 0.0,
+                      "max_depth": 0, "depth_sum": 0}
+        self._threads = [threading.Thread(target=self._loop, name=f"stage-{name}-{i}", daemon=True) for i in range(workers)]
+        for t in self._threads: t.start()
+
+    def submit(self, fn, *args):
+        fut = concurrent.futures.Future()
+        wait_start = time.time()
+        self.queue.put((fut, fn, args))
+        blocked = time.time() - wait_start
+        depth = self.queue.qsize()
+        with self._lock:
+            self.stats["submitted"] += 1
+            self.stats["blocked_sec"] += blocked
+            self.stats["depth_sum"] += depth
+            self.stats["max_depth"] = max(self.stats["max_depth"], depth)
+        return fut
+
+    def _loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None: return
+            fut, fn, args = item
+            if not fut.set_running_or_notify_cancel(): continue
+            with self._lock: self.active += 1
+            start = time.time()
+            try:
+                fut.set_result(fn(*args))
+            except BaseException as e:
+                fut.set_exception(e)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.stats["completed"] += 1
+                    self.stats["busy_sec"] += time.time() - start
+
+    def utilization(self):
+        elapsed = max(time.time() - self.started, 1e-6)
+        with self._lock:
+            busy = self.stats["busy_sec"]
+        return busy / (self.workers * elapsed)
+
+    def status(self):
+        return f"{self.name} {self.active}/{self.workers} 대기열 {self.queue.qsize()}/{self.queue.maxsize}"
+
+    def report(self):
+        s = self.stats
+        avg_depth = s["depth_sum"] / s["submitted"] if s["submitted"] else 0.0
+        return (f"[풀 {self.name}] 스레드 {self.workers} / 처리 {s['completed']}건 / 사용률 {self.utilization():.0%} / "
+                f"대기열 최대 {s['max_depth']} (평균 {avg_depth:.1f}, 한도 {self.queue.maxsize}) / 제출 대기 합계 {s['blocked_sec']:.0f}s")
+
+    def shutdown(self, wait=True):
+        if not wait:
+            # 대기 중인 작업은 취소 (실행 중인 작업은 끝까지 진행)
+            while True:
+                try: item = self.queue.get_nowait()
+                except queue.Empty: break
+                if item: item[0].cancel()
+        for _ in self._threads: self.queue.put(None)
+        if wait:
+            for t in self._threads: t.join()
+
+
+class StageExecutor:
+    """여러 종목 스레드가 공유하는 단계 실행기 (단계별 전용 풀 + 자원별 동시 실행 제한)
+    pools: {풀 이름: 스레드 수}. 없으면 max_workers 크기의 풀 하나 (기존 동작)"""
+
+    def __init__(self, max_workers=16, limits=None, log_fn=print, pools=None, default_pool=None, queue_size=None,
+                 stage_timeouts=None):
+        pools = dict(pools or {"default": max_workers})
+        self.stage_timeouts = dict(stage_timeouts or {})   # 풀 이름 → 단계 제한 시간(초)
+        self.pools = {name: StagePool(name, n, queue_size) for name, n in pools.items()}
+        self.default_pool = default_pool if default_pool in self.pools else next(iter(self.pools))
+        self.limits = dict(limits or {})
+        self._sems = {r: threading.BoundedSemaphore(n) for r, n in self.limits.items()}
+        self._lock = threading.Lock()
+        self.log = log_fn
+        self.stats = {}   # 단계 → {runs, failures, skipped, busy_sec, wait_sec}
+
+    def _pool_for(self, stage):
+        """단계의 pool 인자 → 풀 이름과 같은 자원 → 기본 풀"""
+        if stage.pool in self.pools: return self.pools[stage.pool]
+        for r in stage.resources:
+            if r in self.pools: return self.pools[r]
+        return self.pools[self.default_pool]
+
+    def pool_name(self, stage):
+        return self._pool_for(stage).name
+
+    def _stat(self, name, **inc):
+        with self._lock:
+            s = self.stats.setdefault(name, {"runs": 0, "failures": 0, "skipped": 0, "cancelled": 0, "busy_sec": 0.0, "wait_sec": 0.0})
+            for k, v in inc.items(): s[k] += v
+
+    def _try_acquire(self, stage):
+        """단계의 자원 허가를 모두 얻으면 얻은 세마포어 목록, 하나라도 없으면 None (얻었던 것은 반납)"""
+        held = []
+        for r in stage.resources:
+            sem = self._sems.get(r)
+            if not sem: continue
+            if not sem.acquire(blocking=False):
+                for s in reversed(held): s.release()
+                return None
+            held.append(sem)
+        return held
+
+    def _call(self, stage, kwargs, token, wait):
+        start = time.time()
+        # 단계 마감 시각은 풀 스레드가 잡은 뒤부터 (대기열 / 자원 대기 시간은 제외)
+        stage_token = token.child(self.stage_timeouts.get(self._pool_for(stage).name), label=STAGE_DEADLINE)
+        try:
+            with cancellation.scope(stage_token):
+                stage_token.check()
+                return stage.fn(**kwargs), wait, time.time() - start
+        except (Exception, Cancelled) as e:
+            e.stage_timing = (wait, time.time() - start)
+            raise
+
+    def run(self, graph, label=None, on_finish=None, token=None):
+        """그래프를 실행하고 StageRun을 반환합니다. 모든 단계가 끝날 때까지 호출 스레드에서 대기합니다.
+        on_finish(단계명, 상태[done/failed/skipped/cancelled], 입력 kwargs, 실행 시간) 는 단계가 끝날 때마다 호출 스레드에서 호출"""
+        graph.validate()
+        token = token or cancellation.current()
+        run = StageRun(label or graph.label)
+        started = time.time()
+        done = set()
+        failed = set()   # 실패했고 default도 없는 단계 (입력으로 쓰는 단계는 건너뜀)
+        pending = dict(graph.stages)
+        running = {}
+        blocked = {}   # 준비됐지만 자원 허가를 기다리는 단계 → (단계, 준비 시각)
+
+        def notify(name, status, kwargs, busy):
+            if not on_finish: return
+            try: on_finish(name, status, kwargs, busy)
+            except Exception as e: self.log(f"⚠️ [{run.label}] 단계 '{name}' 완료 콜백 실패: {e}")
+
+        def submit_ready():
+            progressed = True
+            while progressed:   # 건너뛴 단계 때문에 새로 준비되는 단계까지 한 번에 처리
+                progressed = False
+                for name, stage in list(pending.items()):
+                    if not all(d in done for d in stage.deps): continue
+                    del pending[name]
+                    progressed = True
+                    if token.cancelled:
+                        run.cancelled.append(name)
+                        failed.add(name)
+                        done.add(name)
+                        self._stat(name, cancelled=1)
+                        notify(name, "cancelled", {}, 0.0)
+                        continue
+                    if any(i in failed for i in stage.inputs):
+                        run.skipped.append(name)
+                        failed.add(name)
+                        done.add(name)
+                        self._stat(name, skipped=1)
+                        notify(name, "skipped", {}, 0.0)
+                        continue
+                    blocked[name] = (stage, time.time())
+            # 자원 허가는 풀에 제출하기 전에 이 스레드에서 얻음
+            # (풀 스레드 안에서 "sec" 허가를 기다리면 llm 풀 스레드가 묶여 LLM 전용 단계까지 밀림)
+            for name, (stage, ready_at) in list(blocked.items()):
+                if token.cancelled:
+                    del blocked[name]
+                    run.cancelled.append(name)
+                    failed.add(name)
+                    done.add(name)
+                    self._stat(name, cancelled=1)
+                    notify(name, "cancelled", {}, 0.0)
+                    continue
+                held = self._try_acquire(stage)
+                if held is None: continue
+                del blocked[name]
+                kwargs = {i: run.outputs.get(i) for i in stage.inputs}
+                fut = self._pool_for(stage).submit(self._call, stage, kwargs, token, time.time() - ready_at)
+                # 실행이 끝나거나 풀 종료로 버려질 때 반납
+                fut.add_done_callback(lambda _f, held=held: [sem.release() for sem in reversed(held)])
+                running[fut] = (stage, kwargs)
+
+        submit_ready()
+        while running or blocked:
+            # 허가를 기다리는 단계가 있으면 다른 종목이 반납한 허가도 볼 수 있게 짧게 깨어남
+            finished, _ = concurrent.futures.wait(list(running), timeout=RESOURCE_POLL_SEC if blocked else None,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in finished:
+                stage, kwargs = running.pop(fut)
+                try:
+                    out, wait, busy = fut.result()
+                    run.outputs[stage.name] = out
+                    self._stat(stage.name, runs=1, busy_sec=busy, wait_sec=wait)
+                    status = "done"
+                except Cancelled as e:
+                    wait, busy = getattr(e, "stage_timing", (0.0, 0.0))
+                    if e.timeout:
+                        run.errors[stage.name] = e
+                        # 단계 자체의 제한 시간 초과는 실패로 (실행 전체는 계속)
+                        self._stat(stage.name, runs=1, failures=1, busy_sec=busy, wait_sec=wait)
+                        self.log(f"⏳ [{run.label}] 단계 '{stage.name}' 제한 시간 초과 ({busy:.0f}s)")
+                        status = "failed"
+                    else:
+                        run.cancelled.append(stage.name)
+                        self._stat(stage.name, cancelled=1, busy_sec=busy, wait_sec=wait)
+                        self.log(f"🛑 [{run.label}] 단계 '{stage.name}' 취소: {e.reason}")
+                        status = "cancelled"
+                    if status == "cancelled" or stage.default is _NO_DEFAULT: failed.add(stage.name)
+                    else: run.outputs[stage.name] = stage.default
+                except concurrent.futures.CancelledError:
+                    # 풀 종료(shutdown)로 대기열에서 버려진 단계
+                    wait, busy = 0.0, 0.0
+                    run.cancelled.append(stage.name)
+                    self._stat(stage.name, cancelled=1)
+                    failed.add(stage.name)
+                    status = "cancelled"
+                except Exception as e:
+                    wait, busy = getattr(e, "stage_timing", (0.0, 0.0))
+                    run.errors[stage.name] = e
+                    self._stat(stage.name, runs=1, failures=1, busy_sec=busy, wait_sec=wait)
+                    self.log(f"🚨 [{run.label}] 단계 '{stage.name}' 실패: {e}")
+                    if stage.default is _NO_DEFAULT: failed.add(stage.name)
+                    else: run.outputs[stage.name] = stage.default
+                    status = "failed"
+                run.durations[stage.name] = busy
+                run.waits[stage.name] = wait
+                done.add(stage.name)
+                notify(stage.name, status, kwargs, busy)
+            submit_ready()
+
+        run.wall_sec = time.time() - started
+        run._compute_critical_path(graph)
+        return run
+
+    def status(self):
+        """현재 풀별 실행 중 / 대기열 깊이 한 줄 요약"""
+        return " | ".join(p.status() for p in self.pools.values())
+
+    def report(self):
+        lines = [p.report() for p in self.pools.values()]
+        for name, s in sorted(self.stats.items(), key=lambda x: -x[1]["busy_sec"]):
+            avg = s["busy_sec"] / s["runs"] if s["runs"] else 0.0
+            lines.append(f"{name}: {s['runs']}회 (실패 {s['failures']} / 건너뜀 {s['skipped']} / 취소 {s['cancelled']}) "
+                         f"평균 {avg:.1f}s / 자원 대기 합계 {s['wait_sec']:.0f}s")
+        return "\n".join(lines)
+
+    def shutdown(self, wait=True):
+        for p in self.pools.values(): p.shutdown(wait=wait)
@@ -0,0 +1,531 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+# ==========================================
+# [스토리지 백엔드] Supabase / 로컬 SQLite 선택
+# ==========================================
+# worker / price_worker / db_helper는 supabase-py 클라이언트(table().select().eq()...execute())와
+# BulkWriter.upsert(table, rows, on_conflict)를 통해서만 DB에 접근합니다.
+# STORAGE_BACKEND=sqlite 이면 같은 인터페이스를 구현한 SQLiteStorage를 돌려주므로
+# 운영 DB 없이도 파이프라인을 실행 / 프로파일링 / 부하 테스트할 수 있습니다.
+#
+#   STORAGE_BACKEND=sqlite SQLITE_DB_PATH=.cache/local_supabase.sqlite python worker.py
+#
+# 로컬 데이터셋 생성 / 벤치마크:
+#   python -m utils.storage seed --tickers 3000
+#   python -m utils.storage bench
+#
+# 지원 범위 (코드에서 실제로 쓰는 것만):
+#   select(columns, count="exact") / eq / neq / gt / gte / lt / lte / in_ / like / is_ / order / range / limit
+#   upsert(rows, on_conflict) / insert / update / delete / rpc(migrations/003 집계 함수들)
+# 임베디드 조인(users!inner(...))처럼 PostgREST 전용 문법은 지원하지 않습니다.
+
+DEFAULT_SQLITE_PATH = os.path.join(".cache", "local_supabase.sqlite")
+
+
+def get_storage_backend():
+    return os.environ.get("STORAGE_BACKEND", "supabase").strip().lower()
+
+
+def is_local_backend():
+    return get_storage_backend() == "sqlite"
+
+
+_SQLITE_INSTANCES = {}
+_INSTANCE_LOCK = threading.Lock()
+
+
+def get_sqlite_storage(path=None):
+    """경로별로 하나의 SQLiteStorage를 공유합니다. (클라이언트와 대량 쓰기 엔진이 같은 DB를 보도록)"""
+    path = path or os.environ.get("SQLITE_DB_PATH") or DEFAULT_SQLITE_PATH
+    with _INSTANCE_LOCK:
+        if path not in _SQLITE_INSTANCES:
+            _SQLITE_INSTANCES[path] = SQLiteStorage(path)
+        return _SQLITE_INSTANCES[path]
+
+
+def create_storage_client(url=None, key=None):
+    """STORAGE_BACKEND에 맞는 supabase 호환 클라이언트"""
+    if is_local_backend():
+        return get_sqlite_storage()
+    from supabase import create_client
+    return create_client(url, key)
+
+
+def create_bulk_writer(url=None, key=None, **kwargs):
+    """STORAGE_BACKEND에 맞는 대량 upsert 전송기 (upsert / report / retry_failed / stats)"""
+    if is_local_backend():
+        return get_sqlite_storage()
+    from utils.bulk_writer import BulkWriter
+    return BulkWriter(url, key, **kwargs)
+
+
+# ==========================================
+# SQLite 구현
+# ==========================================
+class _Result:
+    """supabase 응답처럼 .data / .count 로 접근"""
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _to_db(value):
+    if isinstance(value, (dict, list)): return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _split_columns(columns):
+    columns = str(columns or "*").strip()
+    if columns == "*": return ["*"]
+    if "(" in columns:
+        raise ValueError(f"SQLite 백엔드는 임베디드 조인을 지원하지 않습니다: {columns}")
+    return [c.strip() for c in columns.split(",") if c.strip()]
+
+
+class _Query:
+    def __init__(self, storage, table):
+        self.storage = storage
+        self.table = table
+        self.op = "select"
+        self.columns = ["*"]
+        self.count = None
+        self.payload = None
+        self.on_conflict = None
+        self.filters = []   # [(sql, params, column)]
+        self.orders = []
+        self.limit_n = None
+        self.offset_n = None
+
+    # ---- 동작 ----
+    def select(self, columns="*", count=None):
+        self.op, self.columns, self.count = "select", _split_columns(columns), count
+        return self
+
+    def upsert(self, rows, on_conflict=None, **kwargs):
+        self.op, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.op, self.payload = "insert", rows
+        return self
+
+    def update(self, values, **kwargs):
+        self.op, self.payload = "update", values
+        return self
+
+    def delete(self, **kwargs):
+        self.op = "delete"
+        return self
+
+    # ---- 필터 ----
+    def _add(self, column, op, value):
+        self.filters.append((f"{_quote(column)} {op} ?", [_to_db(value)], column))
+        return self
+
+    def eq(self, column, value): return self._add(column, "=", value)
+    def neq(self, column, value): return self._add(column, "!=", value)
+    def gt(self, column, value): return self._add(column, ">", value)
+    def gte(self, column, value): return self._add(column, ">=", value)
+    def lt(self, column, value): return self._add(column, "<", value)
+    def lte(self, column, value): return self._add(column, "<=", value)
+    def like(self, column, pattern): return self._add(column, "LIKE", pattern)
+
+    def in_(self, column, values):
+        values = list(values)
+        if not values:
+            self.filters.append(("0", [], None))
+        else:
+            self.filters.append((f"{_quote(column)} IN ({','.join('?' * len(values))})", [_to_db(v) for v in values], column))
+        return self
+
+    def is_(self, column, value):
+        is_null = value is None or str(value).lower() == "null"
+        self.filters.append((f"{_quote(column)} IS {'NULL' if is_null else 'NOT NULL'}", [], column))
+        return self
+
+    def order(self, column, desc=False, **kwargs):
+        self.orders.append(f"{_quote(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def range(self, start, end):
+        self.offset_n, self.limit_n = start, end - start + 1
+        return self
+
+    def limit(self, n, **kwargs):
+        self.limit_n = n
+        return self
+
+    # ---- 실행 ----
+    def _where(self):
+        if not self.filters: return "", []
+        params = []
+        for _, p, _ in self.filters: params += p
+        return " WHERE " + " AND ".join(sql for sql, _, _ in self.filters), params
+
+    def execute(self):
+        s = self.storage
+        if self.op in ("upsert", "insert"):
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            s.upsert(self.table, rows, self.on_conflict if self.op == "upsert" else None, raise_errors=True)
+            return _Result(rows)
+
+        with s._lock:
+            if not s._table_exists(self.table):
+                return _Result([], 0 if self.count else None)
+            s._ensure_columns(self.table, [c for _, _, c in self.filters if c] + [c for c in self.columns if c != "*"])
+            where, params = self._where()
+
+            if self.op == "update":
+                values = {k: _to_db(v) for k, v in self.payload.items()}
+                s._ensure_columns(self.table, list(values.keys()))
+                sets = ", ".join(f"{_quote(k)} = ?" for k in values)
+                # PostgREST처럼 갱신된 행을 돌려줌 (조건부 갱신의 성공 여부 확인용)
+                rows = [dict(r) for r in s.conn.execute(f"UPDATE {_quote(self.table)} SET {sets}{where} RETURNING *",
+                                                        list(values.values()) + params).fetchall()]
+                s.conn.commit()
+                return _Result(rows)
+            if self.op == "delete":
+                cur = s.conn.execute(f"DELETE FROM {_quote(self.table)}{where}", params)
+                s.conn.commit()
+                return _Result([], cur.rowcount)
+
+            cols = "*" if self.columns == ["*"] else ", ".join(_quote(c) for c in self.columns)
+            sql = f"SELECT {cols} FROM {_quote(self.table)}{where}"
+            if self.orders: sql += " ORDER BY " + ", ".join(self.orders)
+            if self.limit_n is not None: sql += f" LIMIT {int(self.limit_n)}"
+            if self.offset_n: sql += f" OFFSET {int(self.offset_n)}"
+            rows = [dict(r) for r in s.conn.execute(sql, params).fetchall()]
+            count = None
+            if self.count:
+                count = s.conn.execute(f"SELECT COUNT(*) FROM {_quote(self.table)}{where}", params).fetchone()[0]
+        return _Result(rows, count)
+
+
+class _RpcCall:
+    def __init__(self, storage, name, params):
+        self.storage, self.name, self.params = storage, name, params or {}
+
+    def execute(self):
+        return _Result(self.storage._run_rpc(self.name, self.params))
+
+
+_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+_LEASE_UNTIL = "strftime('%Y-%m-%dT%H:%M:%f', 'now', '+' || :p_lease_sec || ' seconds')"
+
+# migrations/003_aggregate_rpcs.sql, 001_report_index.sql 의 SQLite 버전 (파라미터 이름 그대로)
+RPC_SQL = {
+    "premium_alert_type_counts": (
+        "SELECT alert_type, COUNT(*) AS alerts FROM premium_alerts WHERE created_at >= :since GROUP BY alert_type", "premium_alerts"),
+    "premium_alert_daily_counts": (
+        "SELECT substr(created_at, 1, 10) AS day, alert_type, COUNT(*) AS alerts FROM premium_alerts "
+        "WHERE created_at >= :since GROUP BY 1, 2", "premium_alerts"),
+    "premium_alert_ticker_activity": (
+        "SELECT ticker, COUNT(*) AS alerts, group_concat(DISTINCT alert_type) AS alert_types FROM premium_alerts "
+        "WHERE created_at >= :since GROUP BY ticker", "premium_alerts"),
+    "watchlist_sentiment_counts": (
+        "SELECT COALESCE(SUM(prediction = 'UP'), 0) AS up, COALESCE(SUM(prediction = 'DOWN'), 0) AS down "
+        "FROM watchlist WHERE ticker = :p_ticker", "watchlist"),
+    "user_decision_score_histogram": (
+        "SELECT CAST(score AS INTEGER) AS score, COUNT(*) AS votes FROM user_decisions "
+        "WHERE ticker = :p_ticker AND score IS NOT NULL GROUP BY 1", "user_decisions"),
+    "price_cache_freshness": (
+        "SELECT COUNT(*) AS total, COALESCE(SUM(updated_at > :fresh_since), 0) AS fresh FROM price_cache", "price_cache"),
+    "report_index_tab_stats": (
+        "SELECT tab, COUNT(*) AS total, COALESCE(SUM(updated_at > :fresh_since), 0) AS fresh FROM report_index GROUP BY tab", "report_index"),
+    "report_index_type_counts": (
+        "SELECT report_type, COUNT(DISTINCT COALESCE(ticker, company)) AS reports FROM report_index "
+        "WHERE updated_at >= :since GROUP BY report_type", "report_index"),
+    "ticker_interest_scores": (
+        "SELECT ticker, SUM(w) AS watchers, SUM(pw) AS premium_watchers, SUM(a) AS actions, SUM(pa) AS premium_actions FROM ("
+        " SELECT w.ticker, 1 AS w, COALESCE(u.membership_level, '') IN ('premium', 'premium_plus') AS pw, 0 AS a, 0 AS pa"
+        " FROM watchlist w LEFT JOIN users u ON u.id = w.user_id"
+        " UNION ALL SELECT l.ticker, 0, 0, 1, COALESCE(u.membership_level, '') IN ('premium', 'premium_plus')"
+        " FROM action_logs l LEFT JOIN users u ON u.id = l.user_id WHERE l.created_at >= :since"
+        ") WHERE ticker IS NOT NULL GROUP BY ticker", "watchlist"),
+    "report_index_ticker_freshness": (
+        "SELECT ticker, MAX(updated_at) AS last_updated, COUNT(*) AS reports FROM report_index "
+        "WHERE ticker IS NOT NULL GROUP BY ticker", "report_index"),
+    "analysis_cache_key_sizes": (
+        "SELECT cache_key, ticker, updated_at, length(CAST(content AS BLOB)) AS content_bytes FROM analysis_cache "
+        "WHERE cache_key > :after_key ORDER BY cache_key LIMIT :page_size", "analysis_cache"),
+    "stage_last_checked": (
+        "SELECT ticker, stage, MAX(updated_at) AS last_done, fingerprint FROM run_journal "
+        "WHERE status = 'done' AND ticker <> '*' AND updated_at >= :since AND (ticker, stage) > (:after_ticker, :after_stage) "
+        "GROUP BY ticker, stage ORDER BY ticker, stage LIMIT :page_size", "run_journal"),
+    # migrations/007_worker_leases.sql (SQLite는 쓰기를 직렬화하므로 SKIP LOCKED 없이 같은 의미)
+    "acquire_worker_lease": (
+        "INSERT INTO worker_leases (cycle_id, unit, kind, status, holder, lease_until, heartbeat_at, attempts, updated_at) "
+        f"VALUES (:p_cycle, :p_unit, :p_kind, 'leased', :p_holder, {_LEASE_UNTIL}, {_NOW}, 1, {_NOW}) "
+        "ON CONFLICT (cycle_id, unit) DO UPDATE SET status = 'leased', holder = excluded.holder, lease_until = excluded.lease_until, "
+        "heartbeat_at = excluded.heartbeat_at, attempts = worker_leases.attempts + 1, updated_at = excluded.updated_at "
+        "WHERE worker_leases.status <> 'done' AND (worker_leases.lease_until IS NULL "
+        f"OR worker_leases.lease_until < {_NOW} OR worker_leases.holder = excluded.holder) "
+        "RETURNING unit, status, attempts, payload", "worker_leases"),
+    "claim_worker_batch": (
+        f"UPDATE worker_leases SET status = 'leased', holder = :p_holder, lease_until = {_LEASE_UNTIL}, "
+        f"heartbeat_at = {_NOW}, attempts = attempts + 1, updated_at = {_NOW} "
+        "WHERE rowid = (SELECT rowid FROM worker_leases WHERE cycle_id = :p_cycle AND kind = 'batch' AND status <> 'done' "
+        f"AND (lease_until IS NULL OR lease_until < {_NOW}) ORDER BY seq LIMIT 1) "
+        "RETURNING unit, status, attempts, payload", "worker_leases"),
+    "renew_worker_leases": (
+        f"UPDATE worker_leases SET lease_until = {_LEASE_UNTIL}, heartbeat_at = {_NOW} "
+        "WHERE cycle_id = :p_cycle AND holder = :p_holder AND status = 'leased' RETURNING unit", "worker_leases"),
+}
+
+# RPC가 쓰기 전에 고유 키가 있어야 하는 테이블 (나머지 테이블은 처음 upsert할 때 자동 생성)
+LOCAL_SCHEMA = {
+    "worker_leases": (
+        "CREATE TABLE IF NOT EXISTS worker_leases (cycle_id TEXT NOT NULL, unit TEXT NOT NULL, kind TEXT NOT NULL DEFAULT 'batch', "
+        "seq INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL DEFAULT 'pending', holder TEXT, lease_until TEXT, heartbeat_at TEXT, "
+        "attempts INTEGER NOT NULL DEFAULT 0, payload TEXT, updated_at TEXT, PRIMARY KEY (cycle_id, unit))"),
+}
+
+
+class SQLiteStorage:
+    """supabase-py 클라이언트 + BulkWriter 인터페이스를 구현한 로컬 SQLite 백엔드 (스레드 안전)"""
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        self._columns = {}   # table → set(columns)
+        self._uniques = set()
+        self.stats = {}
+        self.failed = []
+
+    # ---- supabase-py 호환 ----
+    def table(self, name):
+        return _Query(self, name)
+
+    def rpc(self, name, params=None):
+        return _RpcCall(self, name, params)
+
+    # ---- 스키마 (처음 쓰는 테이블/컬럼은 자동 생성) ----
+    def _table_exists(self, table):
+        if table in self._columns: return True
+        cols = [r[1] for r in self.conn.execute(f"PRAGMA table_info({_quote(table)})").fetchall()]
+        if not cols: return False
+        self._columns[table] = set(cols)
+        return True
+
+    def _ensure_table(self, table, columns=()):
+        if self._table_exists(table): return
+        # 행이 id를 직접 보내면(users 등 텍스트 키) 자동 증가 정수 대신 일반 기본 키로 생성
+        id_col = "id PRIMARY KEY" if "id" in columns else "id INTEGER PRIMARY KEY AUTOINCREMENT"
+        self.conn.execute(
+            f"CREATE TABLE {_quote(table)} ({id_col}, "
+            f"created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')))")
+        self._columns[table] = {"id", "created_at"}
+
+    def _ensure_columns(self, table, columns):
+        known = self._columns.setdefault(table, set())
+        for col in columns:
+            if col and col not in known:
+                self.conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(col)}")
+                known.add(col)
+
+    def _ensure_unique(self, table, key_cols):
+        name = f"ux_{table}_{'_'.join(key_cols)}"
+        if name in self._uniques: return
+        self.conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(name)} ON {_quote(table)} ({', '.join(_quote(c) for c in key_cols)})")
+        self._uniques.add(name)
+
+    # ---- BulkWriter 호환 ----
+    def _stat(self, table, **inc):
+        s = self.stats.setdefault(table, {"rows": 0, "bytes": 0, "requests": 0, "retries": 0, "failures": 0, "rows_failed": 0})
+        for k, v in inc.items(): s[k] += v
+
+    def upsert(self, table, rows, on_conflict="ticker", raise_errors=False):
+        """BulkWriter.upsert와 같은 시그니처. on_conflict가 None이면 단순 insert."""
+        if not rows: return True
+        key_cols = [c.strip() for c in str(on_conflict).split(',') if c.strip()] if on_conflict else []
+        try:
+            with self._lock:
+                self._ensure_table(table, rows[0].keys())
+                # 컬럼 구성별로 묶어서 실행 (PostgREST 대량 upsert와 같은 의미: 보낸 컬럼만 갱신)
+                groups = {}
+                for row in rows:
+                    groups.setdefault(tuple(row.keys()), []).append(row)
+                for cols, group in groups.items():
+                    self._ensure_columns(table, list(cols))
+                    sql = f"INSERT INTO {_quote(table)} ({', '.join(_quote(c) for c in cols)}) VALUES ({', '.join('?' * len(cols))})"
+                    if key_cols:
+                        self._ensure_unique(table, key_cols)
+                        updates = [c for c in cols if c not in key_cols]
+                        sql += f" ON CONFLICT ({', '.join(_quote(c) for c in key_cols)}) DO "
+                        sql += ("UPDATE SET " + ", ".join(f"{_quote(c)} = excluded.{_quote(c)}" for c in updates)) if updates else "NOTHING"
+                    self.conn.executemany(sql, [[_to_db(r.get(c)) for c in cols] for r in group])
+                self.conn.commit()
+                self._stat(table, rows=len(rows), requests=1)
+            return True
+        except Exception as e:
+            self._stat(table, failures=1, rows_failed=len(rows))
+            if raise_errors: raise
+            print(f"❌ [{table}] 로컬 저장 실패 ({len(rows)}행): {e}")
+            return False
+
+    def report(self):
+        return "\n".join(f"{t}: {s['rows']}행 / 요청 {s['requests']}회 (실패 {s['failures']}건·{s['rows_failed']}행) [sqlite]"
+                         for t, s in sorted(self.stats.items()))
+
+    def retry_failed(self):
+        return 0
+
+    # ---- RPC ----
+    def _run_rpc(self, name, params):
+        if name not in RPC_SQL:
+            raise RuntimeError(f"SQLite 백엔드에 없는 RPC: {name}")
+        sql, table = RPC_SQL[name]
+        with self._lock:
+            if table in LOCAL_SCHEMA and not self._table_exists(table):
+                self.conn.execute(LOCAL_SCHEMA[table])
+            if not self._table_exists(table): return []
+            rows = [dict(r) for r in self.conn.execute(sql, params).fetchall()]
+            if self.conn.in_transaction: self.conn.commit()   # 리스 RPC처럼 쓰기를 하는 RPC
+        if name == "premium_alert_ticker_activity":
+            for r in rows: r["alert_types"] = (r["alert_types"] or "").split(",") if r["alert_types"] else []
+        return rows
+
+
+# ==========================================
+# 로컬 데이터셋 / 벤치마크
+# ==========================================
+SEED_LANGS = ["ko", "en", "ja", "zh"]
+SEED_PREMIUM = ["PremiumNewsSummary", "PremiumEarningsCall", "PremiumESG", "PremiumSurprise", "PremiumUpgrades", "PremiumMA"]
+SEED_ALERTS = ["UPCOMING", "LOCKUP", "SURGE_1D", "SURGE_1W", "SURGE_4W", "SURGE_3M", "REBOUND", "INST_UPGRADE", "8K_UPDATE"]
+SEED_TOPICS = ["S-1", "424B4", "10-K", "10-Q", "BS", "IS", "CF"]
+
+
+def _seed_text(rng, size):
+    words = ["revenue", "growth", "margin", "guidance", "filing", "risk", "cash", "ipo", "lockup", "analyst", "매출", "성장", "공시"]
+    return " ".join(rng.choice(words) for _ in range(max(1, size // 7)))
+
+
+def seed_dataset(storage, tickers=3000, seed=42, history_days=30):
+    """운영 데이터 분포를 흉내낸 로컬 데이터셋 (종목당 리포트 수 / 본문 길이 / 트래커 / 알림 / 투표)"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    symbols = [f"{''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(rng.choice([3, 4, 4, 5])))}{i}" for i in range(tickers)]
+
+    def ts(max_days):
+        return (now - timedelta(seconds=rng.randint(0, max_days * 86400))).isoformat()
+
+    storage.upsert("stock_cache", [{"symbol": s, "name": f"{s} Holdings Inc.", "last_updated": ts(1)} for s in symbols], "symbol")
+    storage.upsert("price_cache", [{"ticker": s, "price": round(rng.uniform(1, 300), 2), "updated_at": ts(1), "status": "Active"} for s in symbols], "ticker")
+
+    history = []
+    for s in symbols:
+        base = rng.uniform(1, 300)
+        for d in range(history_days):
+            history.append({"ticker": s, "target_date": (now - timedelta(days=d)).strftime('%Y-%m-%d'), "close_price": round(base * rng.uniform(0.8, 1.2), 2)})
+    for i in range(0, len(history), 20000):
+        storage.upsert("price_history", history[i:i + 20000], "ticker,target_date")
+
+    cache_rows = []
+    for s in symbols:
+        company = f"{s} Holdings Inc."
+        for lang in SEED_LANGS:
+            cache_rows.append({"cache_key": f"{s}_Tab1_v5_{lang}", "content": json.dumps({"html": _seed_text(rng, 2500), "news": []}), "updated_at": ts(10), "ticker": s, "tab_name": "tab1", "lang": lang})
+            cache_rows.append({"cache_key": f"{s}_Tab4_v4_Premium_{lang}", "content": json.dumps({"rating": rng.choice(["BUY", "HOLD", "SELL"]), "score": str(rng.randint(1, 5))}), "updated_at": ts(10), "ticker": s, "tab_name": "tab4", "lang": lang})
+            for rtype in rng.sample(SEED_PREMIUM, 3):
+                cache_rows.append({"cache_key": f"{s}_{rtype}_v1_{lang}", "content": _seed_text(rng, 1500), "updated_at": ts(14), "ticker": s, "lang": lang})
+            for topic in rng.sample(SEED_TOPICS, 3):
+                cache_rows.append({"cache_key": f"{company}_{topic}_Tab0_v16_{lang}", "content": _seed_text(rng, 3000), "updated_at": ts(30), "ticker": s, "tab_name": "tab0", "lang": lang, "data_type": topic})
+        for tracker in ["8K_LastAccNum", "Tab1_Main_RawTracker", "PremiumEC_RawTracker", "Tab4_Analyst_RawTracker"]:
+            cache_rows.append({"cache_key": f"{s}_{tracker}", "content": f"{rng.randint(10**9, 10**10)}", "updated_at": ts(30)})
+        cache_rows.append({"cache_key": f"RAW_FMP_PROFILE_{s}", "content": json.dumps({"symbol": s, "mktCap": rng.randint(10**7, 10**11)}), "updated_at": ts(7)})
+    for i in range(0, len(cache_rows), 5000):
+        storage.upsert("analysis_cache", cache_rows[i:i + 5000], "cache_key")
+
+    alerts = {(rng.choice(symbols), rng.choice(SEED_ALERTS)) for _ in range(tickers)}
+    storage.upsert("premium_alerts", [{"ticker": t, "alert_type": a, "title": f"{t} {a}", "message": "", "created_at": ts(14)} for t, a in alerts], "ticker,alert_type")
+
+    votes = [{"user_id": f"user_{u}", "ticker": rng.choice(symbols)} for u in range(tickers * 2)]
+    storage.upsert("watchlist", [{**v, "prediction": rng.choice(["UP", "DOWN"])} for v in votes], "user_id,ticker")
+    storage.upsert("user_decisions", [{**v, "score": rng.randint(-5, 5), "updated_at": ts(30)} for v in votes], "user_id,ticker")
+    storage.upsert("users", [{"id": f"user_{u}", "membership_level": rng.choice(["free"] * 8 + ["premium", "premium_plus"])} for u in range(tickers * 2)], "id")
+    storage.upsert("action_logs", [{"user_id": f"user_{rng.randrange(tickers * 2)}", "ticker": rng.choice(symbols), "action_type": "view", "created_at": ts(14)} for _ in range(tickers * 5)], None)
+
+    try:
+        from utils.report_index import INDEX_TABLE, index_rows
+        storage.upsert(INDEX_TABLE, index_rows(cache_rows), "cache_key")
+    except Exception as e:
+        print(f"⚠️ [로컬 데이터셋] report_index 생성 생략: {e}")
+
+    return {"tickers": len(symbols), "analysis_cache": len(cache_rows), "price_history": len(history), "premium_alerts": len(alerts)}
+
+
+def run_benchmark(client, rounds=20):
+    """실제 코드 경로에서 자주 쓰는 조회/쓰기 패턴별 소요 시간(ms)"""
+    from utils.paged_reader import fetch_all_rows, fetch_dict
+
+    symbols = [r["symbol"] for r in client.table("stock_cache").select("symbol").limit(500).execute().data]
+    if not symbols:
+        print("⚠️ 데이터가 없습니다. 먼저 'seed'를 실행하세요.")
+        return {}
+    rng = random.Random(7)
+
+    def timed(label, fn, n=rounds):
+        start = time.perf_counter()
+        for _ in range(n): fn()
+        results[label] = round((time.perf_counter() - start) * 1000 / n, 2)
+
+    results = {}
+    timed("get_by_key (analysis_cache)", lambda: client.table("analysis_cache").select("content").eq("cache_key", f"{rng.choice(symbols)}_Tab1_v5_ko").execute())
+    timed("bulk_get 120 keys (.in_)", lambda: client.table("analysis_cache").select("cache_key, content, updated_at").in_("cache_key", [f"{s}_Tab4_v4_Premium_ko" for s in rng.sample(symbols, min(120, len(symbols)))]).execute())
+    timed("full scan price_cache (paged)", lambda: fetch_dict(client, "price_cache", "ticker", lambda r: r["price"], "ticker, price"), n=3)
+    timed("range filter analysis_cache (7d, paged)", lambda: fetch_all_rows(client, "analysis_cache", "cache_key", order="cache_key", filters=lambda q: q.gte("updated_at", (datetime.now() - timedelta(days=7)).isoformat())), n=3)
+    timed("count exact price_cache", lambda: client.table("price_cache").select("ticker", count="exact").limit(1).execute())
+    timed("rpc premium_alert_type_counts", lambda: client.rpc("premium_alert_type_counts", {"since": (datetime.now() - timedelta(days=7)).isoformat()}).execute())
+    rows = [{"cache_key": f"BENCH_{i}", "content": "x" * 2000, "updated_at": datetime.now().isoformat()} for i in range(500)]
+    timed("upsert 500 rows (analysis_cache)", lambda: client.table("analysis_cache").upsert(rows, on_conflict="cache_key").execute(), n=5)
+    client.table("analysis_cache").delete().like("cache_key", "BENCH_%").execute()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 SQLite 스토리지 데이터셋 / 벤치마크")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_seed = sub.add_parser("seed", help="로컬 SQLite에 운영 분포와 비슷한 데이터셋 생성")
+    p_seed.add_argument("--tickers", type=int, default=3000)
+    p_seed.add_argument("--seed", type=int, default=42)
+    p_seed.add_argument("--path", default=None, help=f"SQLite 파일 경로 (기본: $SQLITE_DB_PATH 또는 {DEFAULT_SQLITE_PATH})")
+    p_bench = sub.add_parser("bench", help="현재 STORAGE_BACKEND(또는 --path의 SQLite)에 대해 조회/쓰기 패턴 벤치마크")
+    p_bench.add_argument("--path", default=None)
+    p_bench.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "seed":
+        storage = get_sqlite_storage(args.path)
+        start = time.time()
+        summary = seed_dataset(storage, tickers=args.tickers, seed=args.seed)
+        print(f"✅ [로컬 데이터셋] {storage.path}: {summary} ({time.time() - start:.1f}초)")
+        return 0
+
+    if args.path or is_local_backend():
+        client = get_sqlite_storage(args.path)
+    else:
+        client = create_storage_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
+    for label, ms in run_benchmark(client, rounds=args.rounds).items():
+        print(f"⏱️ {label:<45} {ms:>10.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
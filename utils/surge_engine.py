@@ -0,0 +1,150 @@
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# [급등 엔진] 전 종목 x 기간별 상승률을 배열 연산으로 한 번에 계산
+# ==========================================
+# run_premium_alert_engine은 캘린더를 iterrows()로 돌면서 종목마다 HIST(260봉)를 읽고 1일 상승률만 계산했습니다.
+# (1주 / 2주 / 4주 / 3개월 / 1년 구간은 "(중략)"으로 빠져 있었음)
+# 이 엔진은 종가를 (종목 x 최근 거래일) 행렬 하나로 만든 뒤
+#   - 기간별 상승률: 현재가 vs N봉 전 종가 (FMP historical은 0번이 최신 → 열 번호 = hist 인덱스)
+#   - 공모가 대비 상승률 / 공모가 회복(REBOUND)
+#   - 상장 D-3 / 락업 해제 D-7 일정 알림
+# 을 모든 종목에 대해 NumPy / pandas 연산으로 계산하고 알림 행을 한꺼번에 만듭니다.
+# 기준값은 웹용 worker.py의 기존 기간별 로직과 같습니다.
+
+HIST_DAYS = 260            # HIST 요청의 timeseries 값 (행렬 열 수)
+YEAR_MIN_BARS = 250        # 1년 구간은 봉이 이만큼 있을 때 가장 오래된 종가와 비교
+
+# (alert_type, 비교 봉 위치 (None = 가장 오래된 봉), 상승률 기준 %, 구분, 기간)
+SURGE_WINDOWS = [
+    ("SURGE_1D", 1, 12.0, "단기", "1일"),
+    ("SURGE_1W", 4, 20.0, "단기", "1주"),
+    ("SURGE_2W", 9, 30.0, "단기", "2주"),
+    ("SURGE_4W", 19, 40.0, "단기", "4주"),
+    ("SURGE_3M", 62, 60.0, "중기", "3개월"),
+    ("SURGE_1Y", None, 150.0, "장기", "1년"),
+]
+IPO_SURGE_PCT = 20.0       # 공모가 대비 이 이상이면 SURGE_IPO
+REBOUND_BAND_PCT = 3.0     # 공모가 ~ +3% 구간이면 REBOUND (공모가 재진입)
+UPCOMING_NOTICE_DAYS = 3
+LOCKUP_DAYS = 180
+LOCKUP_NOTICE_DAYS = 7
+
+# 종목 안에서의 알림 순서 (기존 엔진의 append 순서, 첫 알림이 푸시 대상)
+ALERT_ORDER = ["UPCOMING", "LOCKUP"] + [w[0] for w in SURGE_WINDOWS] + ["SURGE_IPO", "REBOUND", "INST_UPGRADE"]
+
+
+def close_matrix(hist_by_ticker, tickers, days=HIST_DAYS):
+    """{티커: FMP historical 리스트(최신순)} → (종목 x days) 종가 행렬(빈 칸 NaN)과 종목별 봉 개수"""
+    rows = []
+    for ticker in tickers:
+        closes = []
+        for bar in (hist_by_ticker.get(ticker) or [])[:days]:
+            try: closes.append(float(bar.get('close')))
+            except (TypeError, ValueError, AttributeError): closes.append(np.nan)
+        rows.append(closes)
+    counts = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+    matrix = np.full((len(rows), days), np.nan)
+    # 행마다 앞쪽 counts[i]칸만 채움 (1차원으로 이어 붙인 값을 마스크 위치에 한 번에 대입)
+    mask = np.arange(days)[None, :] < counts[:, None]
+    if counts.sum(): matrix[mask] = np.fromiter((c for r in rows for c in r), dtype=float, count=int(counts.sum()))
+    return matrix, counts
+
+
+def parse_ipo_price(prices):
+    """'$14.00-16.00' 형식 → 하단 가격 (파싱 실패 NaN)"""
+    text = pd.Series(prices, dtype=object).astype(str).str.replace('$', '', regex=False).str.split('-').str[0].str.strip()
+    return pd.to_numeric(text, errors='coerce').to_numpy(dtype=float)
+
+
+def _pct(current, base):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(base > 0, (current - base) / base * 100, np.nan)
+
+
+def window_returns(matrix, counts, current):
+    """기간별 상승률 {alert_type: (종목,) 배열}. 봉이 모자라거나 기준 종가가 없으면 NaN"""
+    n = len(counts)
+    returns = {}
+    for alert_type, offset, _, _, _ in SURGE_WINDOWS:
+        if offset is None:
+            base = np.full(n, np.nan)
+            ok = counts >= YEAR_MIN_BARS
+            base[ok] = matrix[np.nonzero(ok)[0], counts[ok] - 1]
+        elif offset < matrix.shape[1]:
+            base = matrix[:, offset]
+        else:
+            base = np.full(n, np.nan)
+        returns[alert_type] = _pct(current, base)
+    return returns
+
+
+def compute_alerts(calendar, price_map, hist_by_ticker, today, extra_alerts=()):
+    """캘린더(symbol / date / price) + 현재가 맵 + HIST → premium_alerts 행 목록과 통계
+    extra_alerts: 종목별 조회가 필요한 알림(Tab4 기관 시그널 등) - 해당 종목의 알림 뒤에 붙임"""
+    start = time.time()
+    cal = calendar.reset_index(drop=True)
+    tickers = cal['symbol'].astype(str).tolist()
+    current = np.array([price_map.get(t) or 0.0 for t in tickers], dtype=float)
+    ipo_dates = pd.to_datetime(cal['date'], errors='coerce')
+    valid = ipo_dates.notna().to_numpy()
+    traded = valid & (current > 0)
+
+    found = []   # (캘린더 위치, alert_type, 행)
+
+    def emit(alert_type, hits, make):
+        for pos in np.nonzero(hits)[0]:
+            found.append((pos, alert_type, make(pos)))
+
+    # --- 1. 일정 기반 알림 ---
+    day = pd.Timestamp(today)
+    ipo_day = ipo_dates.dt.normalize()
+    emit("UPCOMING", valid & (ipo_day == day + timedelta(days=UPCOMING_NOTICE_DAYS)).to_numpy(), lambda i: {
+        "ticker": tickers[i], "alert_type": "UPCOMING", "title": f"{tickers[i]} 상장 D-3",
+        "message": "상장 전 월가 기관의 평가를 미리 확인하세요."})
+    emit("LOCKUP", valid & (ipo_day + timedelta(days=LOCKUP_DAYS) == day + timedelta(days=LOCKUP_NOTICE_DAYS)).to_numpy(), lambda i: {
+        "ticker": tickers[i], "alert_type": "LOCKUP", "title": f"{tickers[i]} 락업해제 D-7",
+        "message": "보호예수 물량 해제로 인한 주가 변동성에 주의하세요."})
+
+    # --- 2. 기간별 통계적 유의 상승 (종목 x 거래일 행렬) ---
+    matrix, counts = close_matrix(hist_by_ticker, tickers)
+    returns = window_returns(matrix, counts, current)
+    for alert_type, _, threshold, kind, label in SURGE_WINDOWS:
+        pct = returns[alert_type]
+        with np.errstate(invalid='ignore'):
+            hits = traded & (pct >= threshold)
+        emit(alert_type, hits, lambda i, t=alert_type, p=pct, k=kind, lb=label: {
+            "ticker": tickers[i], "alert_type": t, "title": f"{tickers[i]} {k} 급등 포착",
+            "message": f"최근 {lb} 동안 {p[i]:.1f}% 상승"})
+
+    # --- 3. 공모가 돌파 및 회복 시그널 ---
+    ipo_pct = _pct(current, parse_ipo_price(cal['price'] if 'price' in cal else [None] * len(cal)))
+    with np.errstate(invalid='ignore'):
+        surge_ipo = traded & (ipo_pct >= IPO_SURGE_PCT)
+        rebound = traded & (ipo_pct >= 0) & (ipo_pct < REBOUND_BAND_PCT)
+    emit("SURGE_IPO", surge_ipo, lambda i: {
+        "ticker": tickers[i], "alert_type": "SURGE_IPO", "title": f"{tickers[i]} (+{ipo_pct[i]:.1f}%)",
+        "message": "공모가 대비 강력한 상승세 기록 중"})
+    emit("REBOUND", rebound, lambda i: {
+        "ticker": tickers[i], "alert_type": "REBOUND", "title": f"{tickers[i]} 공모가 회복",
+        "message": "주가가 공모가 위로 재진입하며 바닥 신호를 보냈습니다."})
+
+    first_pos = {}
+    for pos, ticker in enumerate(tickers): first_pos.setdefault(ticker, pos)
+    for row in extra_alerts:
+        found.append((first_pos.get(row['ticker'], len(tickers)), row['alert_type'], row))
+
+    # 캘린더 순서 → 종목 안에서는 기존 엔진의 알림 순서
+    rank = {t: i for i, t in enumerate(ALERT_ORDER)}
+    found.sort(key=lambda f: (f[0], rank.get(f[1], len(rank))))
+    alerts = [f[2] for f in found]
+
+    stats = {"tickers": len(tickers), "priced": int(traded.sum()), "with_hist": int((counts > 0).sum()),
+             "alerts": len(alerts), "compute_sec": round(time.time() - start, 3)}
+    for _, alert_type, _ in found:
+        stats[alert_type] = stats.get(alert_type, 0) + 1
+    return alerts, stats
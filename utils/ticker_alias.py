@@ -0,0 +1,70 @@
+import re
+
+# ==========================================
+# [티커 별칭] 우선주/유닛 티커 ↔ 본주 티커 읽기 시점 해석
+# ==========================================
+# 예전에는 batch_upsert가 우선주(NHPBP) 행을 본주(NHP) 키로 한 번 더 복제 저장했습니다 (Smart Dual Caching).
+# 이제는 { 별칭 티커: 본주 티커 } 매핑(TICKER_ALIAS_MAP 한 줄)만 저장하고,
+# 워커/앱의 읽기 함수가 자기 키가 없거나 빈약할 때 같은 가족(본주 + 별칭들)의 키를 함께 조회합니다.
+
+ALIAS_MAP_KEY = "TICKER_ALIAS_MAP"
+
+# 이 문구가 들어 있거나 너무 짧은 내용은 '빈약한 데이터'로 보고 별칭 대체 후보에서 제외
+POOR_CONTENT_MARKERS = [
+    "확인된 최신 공시 내역이 없습니다",
+    "No verified data available",
+    "데이터가 존재하지 않습니다",
+    "Information not verified",
+    "分析できません",
+]
+POOR_CONTENT_MIN_LEN = 100
+
+
+def get_base_ticker(ticker):
+    """우선주 티커에서 일반주 티커를 유추합니다. (예: NHPBP -> NHP, T-P -> T)"""
+    if not ticker or len(ticker) <= 3: return ticker
+    # 하이픈이나 점이 있는 경우 앞부분만 추출
+    if '-' in ticker: return ticker.split('-')[0]
+    if '.' in ticker: return ticker.split('.')[0]
+    # 끝자리가 BP, PR로 끝나는 5자 이상의 티커 대응
+    if len(ticker) >= 5 and ticker.endswith(('BP', 'PR')): return ticker[:-2]
+    return ticker
+
+
+def is_poor_content(content):
+    content = str(content or "")
+    return any(msg in content for msg in POOR_CONTENT_MARKERS) or len(content) < POOR_CONTENT_MIN_LEN
+
+
+def rewrite_cache_key(cache_key, from_ticker, to_ticker):
+    """cache_key 안의 티커 토큰 하나를 다른 티커로 바꿉니다. (티커가 없는 키는 그대로)"""
+    return re.sub(rf'(^|_){re.escape(str(from_ticker))}(_|$)', rf'\g<1>{to_ticker}\g<2>', str(cache_key), count=1)
+
+
+def alias_family(ticker, alias_map):
+    """ticker와 같은 본주를 공유하는 티커 목록 (자기 자신이 맨 앞)"""
+    alias_map = alias_map or {}
+    canonical = alias_map.get(ticker, ticker)
+    family = [ticker, canonical] + [a for a, c in alias_map.items() if c == canonical]
+    return list(dict.fromkeys([t for t in family if t]))
+
+
+def alias_cache_keys(cache_key, ticker, alias_map):
+    """조회할 키 목록: 원래 키 + 가족 티커로 바꾼 키들"""
+    keys = [cache_key]
+    for member in alias_family(ticker, alias_map)[1:]:
+        keys.append(rewrite_cache_key(cache_key, ticker, member))
+    return list(dict.fromkeys(keys))
+
+
+def pick_best_row(rows, primary_key):
+    """자기 키가 멀쩡하면 그대로, 아니면 빈약하지 않은 별칭 행 중 가장 최신 것을 고릅니다."""
+    rows = [r for r in (rows or []) if r]
+    primary = next((r for r in rows if r.get("cache_key") == primary_key), None)
+    if primary and not is_poor_content(primary.get("content")):
+        return primary
+
+    good = [r for r in rows if r is not primary and not is_poor_content(r.get("content"))]
+    if good:
+        return max(good, key=lambda r: str(r.get("updated_at") or ""))
+    return primary
@@ -0,0 +1,233 @@
+import json
+import time
+import atexit
+import threading
+
+# ==========================================
+# [쓰기 버퍼] batch_upsert 지연 쓰기 + 병합(Coalescing)
+# ==========================================
+# 종목마다 언어별 리포트/트래커/안내 문구를 한 줄씩 batch_upsert 하던 것을
+# (테이블, on_conflict) 단위 버퍼에 모아 두었다가 행 수 / 바이트 / 경과 시간 기준으로 한 번에 전송합니다.
+#
+# - 같은 충돌 키(on_conflict, 복합 키 포함)는 마지막 쓰기가 이깁니다. (컬럼 단위 병합 = 순차 upsert와 동일한 결과)
+# - PostgREST 대량 upsert는 모든 행의 컬럼 구성이 같아야 하므로, 전송 시 컬럼 구성별로 나눠 보냅니다.
+# - 전송 전까지는 pending()으로 방금 쓴 값을 읽을 수 있습니다. (read-your-writes)
+# - start() 이후에는 전송 전용 스레드(writer)가 보내므로 add()를 부른 단계 스레드가 DB 쓰기를 기다리지 않습니다.
+#   대신 버퍼 + 전송 중 행이 max_pending_rows를 넘으면 add()가 비워질 때까지 대기합니다. (역압)
+# - deferred 테이블(실행 저널 등)은 다른 테이블 버퍼를 모두 보낸 뒤 같은 전송 회차의 마지막에 보냅니다.
+#   ("done" 기록이 단계 결과보다 먼저 DB에 닿지 않도록) 일반 테이블 전송이 한 번이라도 실패했으면(clear_failures() 전까지)
+#   deferred 행은 테이블별 변환 함수(예: done → unconfirmed)를 거쳐 보내고, 변환 함수가 없으면 버퍼에 보류합니다.
+
+
+def conflict_key(row, on_conflict):
+    """'ticker,alert_type' 같은 복합 충돌 키를 튜플로 만듭니다. 키 컬럼이 비어 있으면 None."""
+    cols = [c.strip() for c in str(on_conflict).split(',') if c.strip()]
+    values = tuple(row.get(c) for c in cols)
+    if not values or any(v in [None, ""] for v in values): return None
+    return values
+
+
+class WriteBehindBuffer:
+    """(table, on_conflict) 별 지연 쓰기 버퍼. send_fn(table, on_conflict, rows)로 실제 전송합니다."""
+
+    def __init__(self, send_fn, max_rows=500, max_bytes=1_500_000, max_age_sec=30.0, max_pending_rows=5000, deferred=None):
+        self.send_fn = send_fn
+        self.deferred = dict(deferred or {})   # 테이블 → 앞선 전송 실패 시 행 변환 함수 (None이면 보류)
+        self.send_failures = 0
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_age_sec = max_age_sec
+        self.max_pending_rows = max_pending_rows
+
+        self._buffers = {}   # (table, on_conflict) → {"rows": {key: row}, "bytes": int, "since": float}
+        self._inflight = {}  # 전송 중인 행 (전송 완료 전까지 pending() 조회 대상)
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.started = time.time()
+        self.stats = {"rows_in": 0, "rows_sent": 0, "requests": 0, "coalesced": 0,
+                      "send_sec": 0.0, "blocked_sec": 0.0, "max_depth": 0, "held_back": 0}
+
+    # ------------------------------------------
+    # 적재
+    # ------------------------------------------
+    def add(self, table, on_conflict, rows):
+        """행을 버퍼에 넣고, 한도를 넘으면 전송합니다. (writer 스레드가 없으면 이 스레드에서 바로) 반환값: 적재된 행 수"""
+        accepted = 0
+        should_flush = False
+        with self._lock:
+            # 역압: writer가 밀려 있으면 비워질 때까지 대기 (writer가 없으면 아래에서 직접 전송하므로 대기하지 않음)
+            if self._thread and self.depth() >= self.max_pending_rows:
+                wait_start = time.time()
+                while self.depth() >= self.max_pending_rows and not self._stop.is_set():
+                    self._wake.set()
+                    self._drained.wait(timeout=1.0)
+                self.stats["blocked_sec"] += time.time() - wait_start
+
+            buf = self._buffers.setdefault((table, on_conflict), {"rows": {}, "bytes": 0, "since": time.time()})
+            if not buf["rows"]: buf["since"] = time.time()
+
+            for row in rows:
+                key = conflict_key(row, on_conflict)
+                if key is None: continue
+                prev = buf["rows"].get(key)
+                if prev is not None:
+                    self.stats["coalesced"] += 1
+                    row = {**prev, **row}
+                buf["rows"][key] = row
+                buf["bytes"] += len(json.dumps(row, ensure_ascii=False, default=str))
+                accepted += 1
+
+            self.stats["rows_in"] += accepted
+            self.stats["max_depth"] = max(self.stats["max_depth"], self.depth())
+            should_flush = len(buf["rows"]) >= self.max_rows or buf["bytes"] >= self.max_bytes
+
+        if should_flush:
+            if self._thread: self._wake.set()
+            elif table in self.deferred: self.flush()   # deferred 테이블은 다른 버퍼를 먼저 보내야 하므로 전체 전송
+            else: self.flush(table, on_conflict)
+        return accepted
+
+    def pending(self, table, key_value, on_conflict="cache_key"):
+        """아직 전송되지 않은 행을 조회합니다. (없으면 None)"""
+        key = key_value if isinstance(key_value, tuple) else (key_value,)
+        with self._lock:
+            buf = self._buffers.get((table, on_conflict))
+            if buf and key in buf["rows"]: return dict(buf["rows"][key])
+            inflight = self._inflight.get((table, on_conflict), {})
+            return dict(inflight[key]) if key in inflight else None
+
+    def depth(self):
+        """버퍼 + 전송 중 행 수 (대기열 깊이)"""
+        with self._lock:
+            return (sum(len(b["rows"]) for b in self._buffers.values())
+                    + sum(len(rows) for rows in self._inflight.values()))
+
+    def status(self):
+        busy = self.stats["send_sec"] / max(time.time() - self.started, 1e-6)
+        return f"writer 대기 {self.depth()}/{self.max_pending_rows}행 사용률 {busy:.0%}"
+
+    def report(self):
+        s = self.stats
+        busy = s["send_sec"] / max(time.time() - self.started, 1e-6)
+        return (f"[쓰기 버퍼] 적재 {s['rows_in']}행 (병합 {s['coalesced']}) → 전송 {s['rows_sent']}행 / {s['requests']}회 / "
+                f"사용률 {busy:.0%} / 대기열 최대 {s['max_depth']}행 (한도 {self.max_pending_rows}) / 적재 대기 합계 {s['blocked_sec']:.0f}s")
+
+    # ------------------------------------------
+    # 전송
+    # ------------------------------------------
+    def _due(self, buf, now):
+        """전송할 때가 된 버퍼: 행 수 / 바이트 한도 초과 또는 max_age_sec 경과"""
+        return (len(buf["rows"]) >= self.max_rows or buf["bytes"] >= self.max_bytes
+                or (now - buf["since"]) >= self.max_age_sec)
+
+    def _take(self, table=None, on_conflict=None, only_due=False):
+        """전송할 버퍼를 꺼냅니다. deferred 테이블이 포함되면 나머지 버퍼도 모두 꺼내고 deferred는 맨 뒤로"""
+        now = time.time()
+        taken = []
+        with self._lock:
+            if any(t in self.deferred and buf["rows"] and (not only_due or self._due(buf, now))
+                   and (not table or t == table) for (t, oc), buf in self._buffers.items()):
+                table, on_conflict, only_due = None, None, False
+            for (t, oc), buf in self._buffers.items():
+                if table and t != table: continue
+                if on_conflict and oc != on_conflict: continue
+                if not buf["rows"]: continue
+                if only_due and not self._due(buf, now): continue
+                if t in self.deferred: continue
+                taken.append((t, oc, list(buf["rows"].values())))
+                self._inflight[(t, oc)] = buf["rows"]
+                buf["rows"], buf["bytes"], buf["since"] = {}, 0, now
+            if not only_due and not table:
+                for (t, oc), buf in self._buffers.items():
+                    if t not in self.deferred or not buf["rows"]: continue
+                    taken.append((t, oc, list(buf["rows"].values())))
+                    self._inflight[(t, oc)] = buf["rows"]
+                    buf["rows"], buf["bytes"], buf["since"] = {}, 0, now
+        return taken
+
+    def _restore(self, table, on_conflict, rows):
+        """보내지 못한 deferred 행을 버퍼로 되돌림 (그 사이 같은 키로 새로 들어온 행이 있으면 새 행 유지)"""
+        with self._lock:
+            buf = self._buffers.setdefault((table, on_conflict), {"rows": {}, "bytes": 0, "since": time.time()})
+            for row in rows:
+                key = conflict_key(row, on_conflict)
+                if key is None or key in buf["rows"]: continue
+                buf["rows"][key] = row
+                buf["bytes"] += len(json.dumps(row, ensure_ascii=False, default=str))
+            self.stats["held_back"] += len(rows)
+
+    def clear_failures(self):
+        """실패 행 재전송(BulkWriter.retry_failed)이 모두 성공한 뒤 호출: deferred 테이블을 다시 그대로 보냄"""
+        with self._lock: self.send_failures = 0
+
+    def _send(self, taken):
+        for table, on_conflict, rows in taken:
+            try:
+                if table in self.deferred and self.send_failures:
+                    convert = self.deferred[table]
+                    if convert is None:
+                        print(f"⏸️ [쓰기 버퍼] 앞선 전송 실패 → {table} {len(rows)}행 보류")
+                        self._restore(table, on_conflict, rows)
+                        continue
+                    rows = convert(rows)
+                # 컬럼 구성이 같은 행끼리 묶어서 전송 (PostgREST 대량 upsert 제약)
+                groups = {}
+                for row in rows:
+                    groups.setdefault(tuple(sorted(row.keys())), []).append(row)
+                for group in groups.values():
+                    for i in range(0, len(group), self.max_rows):
+                        chunk = group[i:i + self.max_rows]
+                        start = time.time()
+                        failed = False
+                        try:
+                            failed = self.send_fn(table, on_conflict, chunk) is False
+                        except Exception as e:
+                            failed = True
+                            print(f"❌ [쓰기 버퍼] {table} 전송 에러: {e}")
+                        if failed and table not in self.deferred:
+                            with self._lock: self.send_failures += 1
+                        self.stats["send_sec"] += time.time() - start
+                        self.stats["requests"] += 1
+                        self.stats["rows_sent"] += len(chunk)
+            finally:
+                # 전송 도중 예외로 빠져나가도 전송 중 행이 남아 add()의 역압 대기가 풀리지 않는 일이 없도록
+                with self._lock:
+                    self._inflight.pop((table, on_conflict), None)
+                    self._drained.notify_all()
+
+    def flush(self, table=None, on_conflict=None):
+        # 전송 순서가 뒤섞이지 않도록 flush는 한 번에 하나씩
+        with self._flush_lock:
+            self._send(self._take(table, on_conflict))
+
+    def flush_all(self):
+        self.flush()
+
+    def _run(self):
+        # writer 스레드: 한도를 넘은 버퍼는 add()가 깨우는 즉시, 나머지는 1초마다 경과 시간 기준으로 전송
+        while not self._stop.is_set():
+            self._wake.wait(1.0)
+            self._wake.clear()
+            if self._stop.is_set(): break
+            try:
+                with self._flush_lock:
+                    self._send(self._take(only_due=True))
+            except Exception as e:
+                print(f"⚠️ [쓰기 버퍼] 백그라운드 전송 에러: {e}")
+
+    def start(self):
+        """경과 시간 기준 자동 전송 스레드를 띄우고, 프로세스 종료 시 잔여분 전송을 등록합니다."""
+        if self._thread: return self
+        self._thread = threading.Thread(target=self._run, name="write-behind-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self.flush_all()
@@ -0,0 +1,350 @@
+import time
+import threading
+from datetime import datetime
+
+import requests
+
+# ==========================================
+# [XBRL 재무 엔진] SEC companyfacts 기반 수치 계산기
+# ==========================================
+# BS/IS/CF 수치를 LLM이 10만 자 본문에서 뽑아내는 대신,
+# SEC가 제공하는 XBRL companyfacts JSON에서 직접 시계열을 만들고 비율을 계산합니다.
+# LLM은 여기서 계산된 숫자를 '서술'만 하도록 작은 팩트 블록을 전달받습니다.
+
+COMPANY_FACTS_URL = "https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json"
+
+# 항목별 후보 태그 (앞에 있을수록 우선, 단 가장 최근 기간을 보고한 태그를 최종 채택)
+CONCEPT_MAP = {
+    "revenue": [
+        ("us-gaap", "Revenues"),
+        ("us-gaap", "RevenueFromContractWithCustomerExcludingAssessedTax"),
+        ("us-gaap", "RevenueFromContractWithCustomerIncludingAssessedTax"),
+        ("us-gaap", "SalesRevenueNet"),
+        ("ifrs-full", "Revenue"),
+    ],
+    "gross_profit": [("us-gaap", "GrossProfit"), ("ifrs-full", "GrossProfit")],
+    "operating_income": [("us-gaap", "OperatingIncomeLoss"), ("ifrs-full", "ProfitLossFromOperatingActivities")],
+    "net_income": [("us-gaap", "NetIncomeLoss"), ("us-gaap", "ProfitLoss"), ("ifrs-full", "ProfitLoss")],
+    "eps": [
+        ("us-gaap", "EarningsPerShareDiluted"), ("us-gaap", "EarningsPerShareBasic"),
+        ("ifrs-full", "DilutedEarningsLossPerShare"), ("ifrs-full", "BasicEarningsLossPerShare"),
+    ],
+    "total_assets": [("us-gaap", "Assets"), ("ifrs-full", "Assets")],
+    "total_liabilities": [("us-gaap", "Liabilities"), ("ifrs-full", "Liabilities")],
+    "total_equity": [
+        ("us-gaap", "StockholdersEquity"),
+        ("us-gaap", "StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest"),
+        ("ifrs-full", "Equity"),
+    ],
+    "cash": [
+        ("us-gaap", "CashAndCashEquivalentsAtCarryingValue"),
+        ("ifrs-full", "CashAndCashEquivalents"),
+    ],
+    "total_debt": [
+        ("us-gaap", "LongTermDebt"), ("us-gaap", "LongTermDebtNoncurrent"),
+        ("us-gaap", "DebtInstrumentCarryingAmount"), ("ifrs-full", "Borrowings"),
+    ],
+    "operating_cash_flow": [
+        ("us-gaap", "NetCashProvidedByUsedInOperatingActivities"),
+        ("ifrs-full", "CashFlowsFromUsedInOperatingActivities"),
+    ],
+    "capex": [
+        ("us-gaap", "PaymentsToAcquirePropertyPlantAndEquipment"),
+        ("ifrs-full", "PurchaseOfPropertyPlantAndEquipmentClassifiedAsInvestingActivities"),
+    ],
+}
+
+# 시점(instant) 항목: 재무상태표 잔액 (기간 길이 개념이 없음)
+INSTANT_FIELDS = {"total_assets", "total_liabilities", "total_equity", "cash", "total_debt"}
+
+# 탭0 토픽별로 LLM에게 보여줄 항목
+TOPIC_FIELDS = {
+    "BS": ["total_assets", "total_liabilities", "total_equity", "cash", "total_debt"],
+    "IS": ["revenue", "gross_profit", "operating_income", "net_income", "eps"],
+    "CF": ["operating_cash_flow", "capex", "free_cash_flow", "net_income"],
+}
+
+ANNUAL_FORMS = {"10-K", "10-K/A", "20-F", "20-F/A", "40-F", "40-F/A"}
+
+# 요약 캐시: 원본 companyfacts(CIK당 수 MB)는 요약 후 버리고 요약만 보관
+# 데몬 모드에서도 새 10-K가 옛 수치로 서술되지 않도록 유효 시간을 두고, 분석 주기마다 clear_cache()로 비움
+SUMMARY_TTL_SEC = 6 * 3600
+FAILURE_TTL_SEC = 600        # 조회 실패(None)는 짧게만 기억
+_SUMMARY_CACHE = {}          # cik → (저장 시각, 요약 또는 None)
+_CACHE_LOCK = threading.Lock()
+
+
+def clear_cache():
+    """분석 주기 시작 시 호출: 이전 주기의 요약 / 실패 기록을 버림"""
+    with _CACHE_LOCK:
+        _SUMMARY_CACHE.clear()
+
+
+# ------------------------------------------
+# 1. companyfacts 다운로드
+# ------------------------------------------
+def fetch_company_facts(cik, headers=None):
+    if not cik: return None
+    cik_str = str(cik).zfill(10)
+    facts = None
+    try:
+        res = requests.get(COMPANY_FACTS_URL.format(cik=cik_str), headers=headers or {}, timeout=20)
+        if res.status_code == 200:
+            facts = res.json().get("facts", {})
+        else:
+            print(f"⚠️ [XBRL] companyfacts 없음 (CIK {cik_str}) - HTTP {res.status_code}")
+    except Exception as e:
+        print(f"⚠️ [XBRL] companyfacts 요청 실패 (CIK {cik_str}): {e}")
+    return facts
+
+
+# ------------------------------------------
+# 2. 태그 → 연간/분기 시계열 정규화
+# ------------------------------------------
+def _days_between(start, end):
+    try:
+        return (datetime.strptime(end, "%Y-%m-%d") - datetime.strptime(start, "%Y-%m-%d")).days
+    except Exception: return None
+
+
+def _pick_unit(units, field):
+    if field == "eps":
+        for u in units:
+            if u.startswith("USD/") or u.endswith("/shares"): return u
+    if "USD" in units: return "USD"
+    # IFRS 외국 기업은 자국 통화로 보고하는 경우가 많음
+    for u in units:
+        if "/" not in u and u.lower() != "shares": return u
+    return None
+
+
+def _normalize_entries(entries, field):
+    annual, quarterly = {}, {}
+    for e in entries:
+        end, val = e.get("end"), e.get("val")
+        if not end or val is None: continue
+        filed = e.get("filed", "")
+
+        if field in INSTANT_FIELDS:
+            bucket = annual if (e.get("fp") == "FY" and e.get("form") in ANNUAL_FORMS) else quarterly
+        else:
+            days = _days_between(e.get("start", ""), end)
+            if days is None: continue
+            if 330 <= days <= 400: bucket = annual
+            elif 80 <= days <= 100: bucket = quarterly
+            else: continue
+
+        # 같은 기간이 여러 번 보고되면(정정 공시 등) 가장 나중에 제출된 값 사용
+        prev = bucket.get(end)
+        if prev is None or filed >= prev[1]:
+            bucket[end] = (val, filed)
+
+    def to_series(bucket):
+        return [(end, bucket[end][0]) for end in sorted(bucket.keys(), reverse=True)]
+
+    # 분기 잔액에는 연말 잔액도 포함시켜 최신 시점을 놓치지 않도록 함
+    if field in INSTANT_FIELDS:
+        for end, item in annual.items():
+            quarterly.setdefault(end, item)
+    return to_series(annual), to_series(quarterly)
+
+
+def normalize_company_facts(facts):
+    """companyfacts JSON을 {항목: {"annual": [(end, val)...], "quarterly": [...], "unit": ..., "tag": ...}} 로 변환합니다."""
+    series = {}
+    if not facts: return series
+
+    for field, candidates in CONCEPT_MAP.items():
+        best = None
+        for taxonomy, tag in candidates:
+            concept = facts.get(taxonomy, {}).get(tag)
+            if not concept: continue
+            units = concept.get("units", {})
+            unit = _pick_unit(units, field)
+            if not unit: continue
+
+            annual, quarterly = _normalize_entries(units[unit], field)
+            if not annual and not quarterly: continue
+            latest = max([s[0][0] for s in (annual, quarterly) if s])
+            # 기업이 태그를 바꾸는 경우가 많으므로 가장 최근 기간을 보고한 태그를 채택
+            if best is None or latest > best["latest"]:
+                best = {"annual": annual, "quarterly": quarterly, "unit": unit, "tag": f"{taxonomy}:{tag}", "latest": latest}
+        if best:
+            series[field] = best
+    return series
+
+
+# ------------------------------------------
+# 3. 비율 계산
+# ------------------------------------------
+def _latest_pair(item):
+    """(최근값, 비교값, 기준일, 기간구분)을 반환합니다. 연간이 없으면 분기 전년동기 비교로 대체."""
+    if not item: return None, None, None, None
+    annual = item.get("annual", [])
+    if annual:
+        prev = annual[1][1] if len(annual) > 1 else None
+        return annual[0][1], prev, annual[0][0], "FY"
+
+    quarterly = item.get("quarterly", [])
+    if quarterly:
+        end, val = quarterly[0]
+        prev = None
+        for q_end, q_val in quarterly[1:]:
+            days = _days_between(q_end, end)
+            if days and 350 <= days <= 380:
+                prev = q_val
+                break
+        return val, prev, end, "Q"
+    return None, None, None, None
+
+
+def _latest_value(series, field):
+    """시점(잔액) 항목의 가장 최근 값"""
+    item = series.get(field)
+    if not item: return None
+    data = item.get("quarterly") or item.get("annual")
+    return data[0][1] if data else None
+
+
+def _value_at(series, field, period, end):
+    """기준 기간(FY / Q)과 기간 종료일(end)이 같은 값. 없으면 None (다른 기간 값으로 대체하지 않음)"""
+    item = series.get(field)
+    if not item or not end: return None
+    return dict(item.get("annual" if period == "FY" else "quarterly", [])).get(end)
+
+
+def compute_financial_metrics(series):
+    """fetch_premium_financials 와 같은 표기(문자열 %)로 성장률/마진/부채비율/발생액을 계산합니다.
+    손익 / 현금흐름 항목은 매출과 같은 기간(FY / Q)과 종료일의 값만 쓰고, 없으면 해당 지표를 건너뜁니다."""
+    metrics = {}
+    if not series: return metrics
+
+    rev, prev_rev, as_of, period = _latest_pair(series.get("revenue"))
+    net = _value_at(series, "net_income", period, as_of)
+    op = _value_at(series, "operating_income", period, as_of)
+    gross = _value_at(series, "gross_profit", period, as_of)
+    ocf = _value_at(series, "operating_cash_flow", period, as_of)
+    capex = _value_at(series, "capex", period, as_of)
+    eps = _value_at(series, "eps", period, as_of)
+
+    # 잔액 항목은 자본과 같은 시점의 차입금 / 총부채로 비교
+    equity_item = series.get("total_equity") or {}
+    equity_data = equity_item.get("quarterly") or equity_item.get("annual") or []
+    equity, equity_end = (equity_data[0][1], equity_data[0][0]) if equity_data else (None, None)
+    debt = _value_at(series, "total_debt", "Q", equity_end)
+    liabilities = _value_at(series, "total_liabilities", "Q", equity_end)
+
+    if rev and prev_rev and prev_rev > 0:
+        metrics["growth"] = f"{((rev - prev_rev) / prev_rev) * 100:+.1f}%"
+    if rev and net is not None:
+        metrics["net_margin"] = f"{(net / rev) * 100:.1f}%"
+    if rev and op is not None:
+        metrics["op_margin"] = f"{(op / rev) * 100:.1f}%"
+    if rev and gross is not None:
+        metrics["gross_margin"] = f"{(gross / rev) * 100:.1f}%"
+    # 차입금 태그가 없는 기업은 총부채로 대체
+    if equity and equity > 0 and (debt or liabilities):
+        metrics["debt_equity"] = f"{((debt or liabilities) / equity) * 100:.1f}%"
+    if net is not None and ocf is not None:
+        metrics["accruals"] = "Low" if (net - ocf) <= 0 else "High"
+    if ocf is not None and capex is not None:
+        metrics["free_cash_flow"] = ocf - capex
+    if eps is not None:
+        metrics["eps"] = eps
+
+    metrics["as_of"] = as_of
+    metrics["period"] = period
+    return metrics
+
+
+# ------------------------------------------
+# 4. 공개 API: CIK → 요약 / LLM용 팩트 블록
+# ------------------------------------------
+def get_xbrl_summary(cik, headers=None):
+    """CIK 하나에 대한 {"series", "metrics"} 요약을 반환합니다. (유효 시간 캐시, 실패 시 None)"""
+    if not cik: return None
+    cik_str = str(cik).zfill(10)
+    now = time.time()
+    with _CACHE_LOCK:
+        cached = _SUMMARY_CACHE.get(cik_str)
+        if cached and now - cached[0] < (SUMMARY_TTL_SEC if cached[1] else FAILURE_TTL_SEC):
+            return cached[1]
+
+    summary = None
+    series = normalize_company_facts(fetch_company_facts(cik_str, headers))
+    if series:
+        summary = {"series": series, "metrics": compute_financial_metrics(series)}
+
+    with _CACHE_LOCK:
+        _SUMMARY_CACHE[cik_str] = (now, summary)
+    return summary
+
+
+def _fmt_amount(val, unit="USD"):
+    if val is None: return "N/A"
+    if unit and "/" in unit: return f"{val:.2f}"
+    sign = "-" if val < 0 else ""
+    val = abs(val)
+    if val >= 1e9: text = f"{val / 1e9:.2f}B"
+    elif val >= 1e6: text = f"{val / 1e6:.1f}M"
+    else: text = f"{val:,.0f}"
+    prefix = "$" if unit == "USD" else ""
+    suffix = "" if unit == "USD" else f" {unit}"
+    return f"{sign}{prefix}{text}{suffix}"
+
+
+def build_facts_block(summary, topic, periods=3):
+    """탭0 BS/IS/CF 토픽용 압축 팩트 블록(수백 자)을 만듭니다. 항목이 부족하면 None."""
+    if not summary or topic not in TOPIC_FIELDS: return None
+    series, metrics = summary["series"], summary["metrics"]
+
+    fcf_series = []
+    ocf_item, capex_item = series.get("operating_cash_flow"), series.get("capex")
+    if ocf_item and capex_item:
+        capex_map = dict(capex_item.get("annual", []))
+        fcf_series = [(end, v - capex_map[end]) for end, v in ocf_item.get("annual", []) if end in capex_map]
+
+    lines = []
+    for field in TOPIC_FIELDS[topic]:
+        if field == "free_cash_flow":
+            data, unit = fcf_series, (ocf_item or {}).get("unit", "USD")
+        else:
+            item = series.get(field)
+            if not item: continue
+            data, unit = (item.get("annual") or item.get("quarterly")), item.get("unit", "USD")
+        if not data: continue
+        values = ", ".join([f"{end}: {_fmt_amount(val, unit)}" for end, val in data[:periods]])
+        lines.append(f"- {field}: {values}")
+
+    if len(lines) < 2: return None
+
+    ratio_keys = ["growth", "gross_margin", "op_margin", "net_margin", "debt_equity", "accruals"]
+    ratios = ", ".join([f"{k}: {metrics[k]}" for k in ratio_keys if k in metrics])
+
+    block = "[XBRL PRE-COMPUTED FACTS - SOURCE: SEC companyfacts]\n"
+    block += "Numbers below are already calculated from audited XBRL data. Do NOT recompute or invent figures; narrate and interpret them.\n"
+    block += "\n".join(lines)
+    if ratios:
+        block += f"\n- ratios ({metrics.get('period', 'FY')} as of {metrics.get('as_of', 'N/A')}): {ratios}"
+    return block
+
+
+def build_raw_financials(summary):
+    """탭3 복구용 원시 수치 딕셔너리 (구글 딥서치 JSON과 같은 키)."""
+    if not summary: return {}
+    series = summary["series"]
+    rev, prev_rev, as_of, period = _latest_pair(series.get("revenue"))
+    raw = {
+        "revenue": rev, "prev_revenue": prev_rev,
+        "gross_profit": _value_at(series, "gross_profit", period, as_of),
+        "operating_income": _value_at(series, "operating_income", period, as_of),
+        "net_income": _value_at(series, "net_income", period, as_of),
+        "total_assets": _latest_value(series, "total_assets"),
+        "total_liabilities": _latest_value(series, "total_liabilities"),
+        "total_debt": _latest_value(series, "total_debt"),
+        "total_equity": _latest_value(series, "total_equity"),
+        "operating_cash_flow": _value_at(series, "operating_cash_flow", period, as_of),
+        "free_cash_flow": summary["metrics"].get("free_cash_flow"),
+        "eps": _value_at(series, "eps", period, as_of),
+    }
+    return {k: v for k, v in raw.items() if v is not None}
@@ -8,6 +8,8 @@ import pandas as pd
 import numpy as np
 import logging
 import concurrent.futures  # 🚀 [추가] 병렬 처리용 라이브러리
+import threading
+import signal
 
 # 💡 [트위터 커넥터 추가]
 from twitter_service import post_to_twitter 
@@ -17,7 +19,52 @@ import firebase_admin
 from firebase_admin import credentials as firebase_credentials, messaging
 from datetime import datetime, timedelta
 
-from supabase import create_client
+
+# 🚀 [공시 본문 저장소] accession 번호 기반 압축 캐시
+from utils.filing_store import FilingTextStore
+# 🚀 [XBRL 재무 엔진] SEC companyfacts 기반 BS/IS/CF 수치 계산
+from utils.xbrl_facts import get_xbrl_summary, build_facts_block, build_raw_financials, clear_cache as clear_xbrl_cache
+# 🚀 [EDGAR 인덱스] daily form.idx 기반 신규 공시 게이트
+from utils.edgar_index import EdgarIndexConsumer
+# 🚀 [로컬 회사명 해석기] 네트워크 전에 트라이그램 인덱스로 CIK 매칭
+from utils.name_resolver import CompanyNameResolver, EXACT_SCORE as NAME_RESOLVER_EXACT_SCORE
+# 🚀 [쓰기 버퍼 / 대량 쓰기 / 캐시 스냅샷] analysis_cache 읽기·쓰기 왕복 최소화
+from utils.write_buffer import WriteBehindBuffer, conflict_key
+from utils.cache_snapshot import CacheSnapshot
+# 🚀 [티커 별칭] 우선주/유닛 → 본주 매핑을 읽기 시점에 해석 (행 복제 저장 대체)
+from utils.ticker_alias import ALIAS_MAP_KEY, get_base_ticker, alias_cache_keys, pick_best_row
+# 🚀 [페이지 단위 읽기] 전체 테이블 스캔이 서버 기본 행 제한에 잘리지 않도록
+from utils.paged_reader import fetch_all_rows, fetch_dict
+# 🚀 [델타 필터] 내용이 그대로인 행은 다시 쓰지 않음
+from utils.delta_filter import DeltaFilter
+# 🚀 [리포트 인덱스] analysis_cache 리포트 메타데이터를 report_index 테이블에 함께 기록
+from utils.report_index import INDEX_TABLE, index_rows, backfill_index
+# 🗄️ [스토리지 백엔드] STORAGE_BACKEND=sqlite 이면 Supabase 대신 로컬 SQLite (오프라인 실행 / 벤치마크)
+from utils.storage import create_storage_client, create_bulk_writer, is_local_backend
+# 🧹 [보존 정책] 만료된 원본 캐시 / 유니버스 이탈 종목 / 구버전 리포트 정리
+from utils.retention import RetentionJob, Universe
+# 🚀 [단계 그래프] 종목별 분석 단계를 의존성 기반으로 병렬 실행 (자원별 동시 실행 제한)
+from utils.stage_graph import StageGraph, StageExecutor
+# 🚀 [우선순위 스케줄러] 상장 임박 / 오래된 리포트 / 신규 이벤트 / 관심도 순으로 종목 제출
+from utils.priority import build_priority_plan
+# 🧾 [실행 저널] 단계 완료 체크포인트 (--resume 이어서 실행 / emergency_worker --from-journal 재실행)
+from utils.run_journal import RunJournal, RUN_TICKER, JOURNAL_TABLE, input_fingerprint, latest_run, unconfirm_rows
+# 🧩 [샤드 워커] 여러 프로세스가 리스로 종목 배치를 나눠 처리 (리더 락 / heartbeat / 만료 회수)
+from utils.leases import LeaseBoard, LEADER_UNIT, make_batches, default_cycle_id
+# 🔎 [변경 감지] 실행 저널 + 대량 피드로 바뀐 (종목, 단계)만 실행
+from utils.change_detect import ChangeDetector
+# 🛑 [협조적 취소] 실행 토큰 / 단계별 마감 시각 (시간 제한 · 종료 신호 시 대기 중인 sleep/백오프에서 바로 멈춤)
+from utils import cancellation
+from utils.cancellation import CancelToken, Cancelled
+# 🛰️ [데몬 모드] 한 프로세스에서 매크로 / 캘린더 / 주가 / 분석 작업 스케줄 + 이벤트(8-K / 급등) 트리거
+from utils.scheduler import Scheduler, WarmValue
+from utils.change_detect import stages_for_event
+# 🧮 [실행 계획 미리보기] --plan: 유료 API 호출 없이 예상 HTTP 요청 / LLM 호출 · 토큰 · 비용 / 소요 시간
+from utils.run_planner import RunPlan, RunPlanner, parse_time
+# 🗓️ [신선도 정책] 데이터 소스 x IPO 생애 주기별 갱신 주기 / 동결 (캐시 유효 시간 + 단계 실행 여부)
+from utils.freshness import FreshnessPolicy, lifecycle_state, SEC_TOPIC_SOURCES
+# 🚀 [급등 엔진] 전 종목 기간별 상승률 / 공모가 / 일정 알림 배열 연산
+from utils.surge_engine import compute_alerts, ALERT_ORDER, HIST_DAYS
 
 # 🚀 [Vertex AI 추가] 구버전 삭제 및 최신 통합 SDK(genai)로 교체 완료
 from google import genai
@@ -46,13 +93,13 @@ print(f"DEBUG: SUPABASE_KEY 존재 = {bool(SUPABASE_KEY)}")
 print(f"DEBUG: FIREBASE_SA 존재 = {bool(FIREBASE_SA_JSON)}")
 print(f"DEBUG: VERTEX_SA 존재 = {bool(VERTEX_SA_JSON)}")
 
-if not (SUPABASE_URL and SUPABASE_KEY):
+if not (SUPABASE_URL and SUPABASE_KEY) and not is_local_backend():
     print("❌ 환경변수 누락으로 종료")
     exit()
 
 try:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("✅ Supabase 클라이언트 연결 성공")
+    supabase = create_storage_client(SUPABASE_URL, SUPABASE_KEY)
+    print(f"✅ {'로컬 SQLite' if is_local_backend() else 'Supabase'} 클라이언트 연결 성공")
 except Exception as e:
     print(f"❌ Supabase 초기화 실패: {e}")
     exit()
@@ -100,6 +147,7 @@ if VERTEX_SA_JSON:
             def generate_content(self, prompt):
                 max_attempts = 5 # 🚀 시도 횟수 증가
                 for attempt in range(max_attempts):
+                    cancellation.check()   # 🛑 취소됐으면 새 호출을 시작하지 않음
                     try:
                         return self.client.models.generate_content(
                             model=self.model_name,
@@ -112,7 +160,7 @@ if VERTEX_SA_JSON:
                                 # 🚀 대기 시간: 10초, 20초, 40초, 80초 (점진적 증가)
                                 wait_time = 10 * (2 ** attempt) 
                                 print(f"⏳ [Vertex AI] 429 에러 방어. {wait_time}초 대기 후 재시도... ({attempt+1}/{max_attempts})")
-                                time.sleep(wait_time)
+                                cancellation.sleep(wait_time)
                                 continue
                         raise e
 
@@ -142,6 +190,7 @@ if GENAI_API_KEY:
             # 🚀 [엔진 2 방어막 업그레이드] 3회 -> 5회 시도 및 지수 백오프(Exponential Backoff) 적용
             max_attempts = 5
             for attempt in range(max_attempts):
+                cancellation.check()   # 🛑 취소됐으면 새 호출을 시작하지 않음
                 try:
                     res = requests.post(self.url, json=payload, headers={'Content-Type': 'application/json'}, timeout=30)
                     
@@ -157,7 +206,7 @@ if GENAI_API_KEY:
                         if attempt < (max_attempts - 1):
                             wait_time = 10 * (2 ** attempt)
                             print(f"⏳ [Search API] 서버 지연(429/503). {wait_time}초 대기 후 재시도... ({attempt+1}/{max_attempts})")
-                            time.sleep(wait_time)
+                            cancellation.sleep(wait_time)
                             continue
                         raise Exception(f"API Error: {res.text}")
                     else:
@@ -167,7 +216,7 @@ if GENAI_API_KEY:
                     if attempt < (max_attempts - 1): 
                         wait_time = 10 * (2 ** attempt)
                         print(f"⏳ [Search API] 통신 에러. {wait_time}초 대기 후 재시도... ({attempt+1}/{max_attempts})")
-                        time.sleep(wait_time)
+                        cancellation.sleep(wait_time)
                         continue
                     raise e
 
@@ -182,16 +231,6 @@ SUPPORTED_LANGS = {
     'zh': '简体中文(Simplified Chinese)'
 }
 
-def get_base_ticker(ticker):
-    """우선주 티커에서 일반주 티커를 유추합니다. (예: NHPBP -> NHP, T-P -> T)"""
-    if not ticker or len(ticker) <= 3: return ticker
-    # 하이픈이나 점이 있는 경우 앞부분만 추출
-    if '-' in ticker: return ticker.split('-')[0]
-    if '.' in ticker: return ticker.split('.')[0]
-    # 끝자리가 BP, PR로 끝나는 5자 이상의 티커 대응
-    if len(ticker) >= 5 and ticker.endswith(('BP', 'PR')): return ticker[:-2]
-    return ticker
-
 # (A) 메타데이터(Accession Number)만 가져오는 가벼운 함수
 def fetch_sec_metadata(ticker, doc_type, api_key, cik=None):
     try:
@@ -226,11 +265,24 @@ def fetch_sec_metadata(ticker, doc_type, api_key, cik=None):
                         print(f"✅[SEC 직접 매칭 성공] {ticker} - {clean_form}")
                         break
         return accession_num, filed_date
-    except: return None, None
+    except Exception: return None, None
+
+# 🚀 [공시 본문 저장소] 10-K/BS/IS/CF 토픽이 같은 accession을 공유하므로 본문은 한 번만 다운로드
+# FILING_STORE_SHARED=1 이면 Supabase filing_text_store 테이블(migrations/009_filing_text_store.sql)을 공유 티어로 사용
+FILING_STORE = FilingTextStore(
+    shared_url=SUPABASE_URL if os.environ.get("FILING_STORE_SHARED") == "1" else None,
+    shared_key=SUPABASE_KEY
+)
 
 # (B) 진짜 필요할 때만 본문을 긁어오는 무거운 함수 (수정본)
 def fetch_sec_full_content(accession_num, ticker, doc_type, api_key, cik=None):
     if not accession_num: return None
+    return FILING_STORE.get_or_fetch(
+        accession_num,
+        lambda: _download_sec_full_content(accession_num, ticker, doc_type, api_key, cik)
+    )
+
+def _download_sec_full_content(accession_num, ticker, doc_type, api_key, cik=None):
     try:
         text_url = f"https://financialmodelingprep.com/stable/sec-filing-full-text?accessionNumber={accession_num}&apikey={api_key}"
         txt_res = requests.get(text_url, timeout=15) # 🚀 타임아웃
@@ -275,10 +327,10 @@ def get_fmp_data_with_cache(symbol, api_type, url, valid_hours=24):
     limit_time = (datetime.now() - timedelta(hours=valid_hours)).isoformat()
     
     try:
-        res = supabase.table("analysis_cache").select("content, updated_at").eq("cache_key", cache_key).gt("updated_at", limit_time).execute()
+        res = cached_select(cache_key, newer_than=limit_time)
         if res.data:
             return json.loads(res.data[0]['content'])
-    except: pass
+    except Exception: pass
 
     try:
         response = requests.get(url, timeout=7)
@@ -365,69 +417,186 @@ def clean_ai_preamble(text):
         
     return '\n'.join(cleaned_lines).strip()
 
-def batch_upsert(table_name, data_list, on_conflict="ticker"):
+BULK_WRITER = create_bulk_writer(SUPABASE_URL, SUPABASE_KEY)
+
+# 🚀 [델타 필터] analysis_cache는 TTL 판단(newer_than)에 updated_at을 쓰므로 내용이 같으면 updated_at만 갱신(touch),
+# 그 외 테이블은 내용이 같으면 아예 생략. 지문 매니페스트는 .cache/에 저장되어 Actions 캐시로 다음 실행에 이어짐
+DELTA_FILTER = DeltaFilter(touch_tables={"analysis_cache": ["updated_at"]})
+DELTA_FILTER.load()
+
+# 🧹 [보존 정책] 실행 종료 시 analysis_cache 정리에 쓸 최대 시간(초)
+RETENTION_BUDGET_SEC = 300
+
+# 🚀 [단계 그래프] 모든 종목 스레드가 공유하는 단계 실행기
+# 풀 분리: llm 자원 단계는 llm 풀(쿼터 한도), 나머지(FMP / 트위터 등 수집 단계)는 io 풀에서 실행
+#   → 80초 LLM 백오프에 걸린 스레드가 수집 단계를 막지 않음. 풀마다 대기열 STAGE_QUEUE_SIZE (가득 차면 제출 대기)
+# 풀 안의 자원별 제한: fmp: FMP 원본 수집 단계, sec: SEC EDGAR 스크래핑 단계
+# (sec는 기존 종목 스레드 수와 같게 두어 EDGAR 초당 요청 수가 순차 실행 때보다 늘지 않도록)
+STAGE_POOLS = {"io": 32, "llm": 8}
+STAGE_QUEUE_SIZE = 64
+STAGE_LIMITS = {"fmp": 8, "sec": 5}
+# 🛑 [협조적 취소] 풀별 단계 제한 시간(초). 실제 마감 시각은 min(단계 시작 + 제한 시간, 실행 마감 시각)
+STAGE_TIMEOUTS = {"io": 600, "llm": 1800}
+STAGE_EXECUTOR = StageExecutor(limits=STAGE_LIMITS, pools=STAGE_POOLS, default_pool="io", queue_size=STAGE_QUEUE_SIZE,
+                               stage_timeouts=STAGE_TIMEOUTS)
+
+# 🛑 [협조적 취소] 프로세스 실행 토큰 (종료 신호 → cancel). 분석 단계는 마감 시각을 가진 하위 토큰으로 실행
+RUN_TOKEN = cancellation.set_default(CancelToken())
+DRAIN_GRACE_SEC = 120   # 취소 후 실행 중인 종목이 단계를 정리하고 체크포인트를 남길 때까지 기다리는 시간
+
+# 🚀 [종목 스레드] 종목 스레드는 단계 그래프를 풀에 제출하고 기다리기만 하므로 LLM 한도와 별개로 조절
+# (LLM 동시 호출 수는 STAGE_POOLS["llm"]이 제한)
+TICKER_CONCURRENCY = 12
+POOL_STATUS_EVERY = 20   # 종목 N개 완료마다 풀 / 쓰기 버퍼 대기열 상태 출력
+
+# 🧾 [실행 저널] main()에서 생성 (run_journal 테이블이 없으면 None → 기록 없이 실행)
+RUN_JOURNAL = None
+
+# 🔎 [변경 감지] 사전 점검 결과 (None이면 전체 단계 실행: CHANGE_DETECT=off / --full / 저널 미적용)
+CHANGE_PLAN = None
+
+# 🗓️ [신선도 정책] 종목별 생애 주기는 process_single_ticker가 등록 (단계 함수의 FMP 캐시 유효 시간 조회용)
+FRESHNESS = FreshnessPolicy()
+
+# 🚀 [리포트 인덱스] report_index 테이블이 없으면(마이그레이션 미적용) main()에서 끄고 analysis_cache만 기록
+REPORT_INDEX_ENABLED = True
+
+def _post_upsert(table_name, on_conflict, rows):
+    """쓰기 버퍼가 모아 둔 행(델타 필터 통과분)을 PostgREST로 실제 전송합니다. (크기 분할 / gzip / 지터 재시도)"""
+    ok = BULK_WRITER.upsert(table_name, rows, on_conflict)
+    # 🚀 [리포트 인덱스] 실제로 보낸 행 기준 (내용이 같아 하트비트만 보낸 행은 updated_at만 갱신)
+    if table_name == "analysis_cache" and REPORT_INDEX_ENABLED:
+        BULK_WRITER.upsert(INDEX_TABLE, index_rows(rows), "cache_key")
+    return ok
+
+# 🚀 [쓰기 버퍼] 모든 스레드의 batch_upsert를 (테이블, on_conflict) 단위로 모아 대량 전송
+# 500행 / 1.5MB / 30초 중 먼저 도달하는 기준으로 writer 스레드가 전송, 종료 시(atexit) 잔여분 자동 전송
+# 미전송 행이 5000행을 넘으면 batch_upsert가 writer를 기다림 (역압)
+# 델타 필터는 전송 시점에 적용 → 버퍼의 pending() 조회는 항상 content가 있는 원본 행을 돌려줌
+# 실행 저널은 단계 결과보다 나중에 전송하고, 결과 전송이 실패한 뒤의 done은 unconfirmed로 기록
+WRITE_BUFFER = WriteBehindBuffer(DELTA_FILTER.sender(_post_upsert, exempt={JOURNAL_TABLE, INDEX_TABLE}), max_pending_rows=5000,
+                                 deferred={JOURNAL_TABLE: unconfirm_rows}).start()
+
+def get_pending_cache_row(cache_key):
+    """아직 DB로 전송되지 않은 analysis_cache 행 (방금 쓴 값 읽기용)"""
+    return WRITE_BUFFER.pending("analysis_cache", cache_key, "cache_key")
+
+# 🚀 [캐시 스냅샷] process_single_ticker 시작 시 종목별 키를 한 번에 읽어 두고 단계별 단건 조회를 대체
+CACHE_SNAPSHOT = CacheSnapshot(supabase)
+
+class _CachedResult:
+    """supabase 응답처럼 .data 로 접근할 수 있는 조회 결과"""
+    def __init__(self, data): self.data = data
+
+def cached_select(cache_key, newer_than=None):
+    """쓰기 버퍼 → 캐시 스냅샷 → DB 순으로 analysis_cache 한 줄을 조회합니다. (newer_than: updated_at 하한)"""
+    row = get_pending_cache_row(cache_key)
+    if row is None:
+        is_known, row = CACHE_SNAPSHOT.lookup(cache_key)
+        if not is_known:
+            res = supabase.table("analysis_cache").select("cache_key, content, updated_at").eq("cache_key", cache_key).execute()
+            row = res.data[0] if res.data else None
+    if row and newer_than and str(row.get("updated_at") or "")[:19] <= str(newer_than)[:19]:
+        row = None
+    return _CachedResult([row] if row else [])
+
+# 🚀 [티커 별칭] { 우선주/유닛 티커: 본주 티커 } - 실행 시작 시 DB 매핑을 읽고, 종료 시 병합 저장
+TICKER_ALIASES = {}
+TICKER_ALIASES_NEW = set()
+TICKER_ALIAS_LOCK = threading.Lock()
+
+def register_ticker_alias(ticker):
+    base_ticker = get_base_ticker(ticker)
+    if not base_ticker or base_ticker == ticker or ticker == "MARKET": return
+    with TICKER_ALIAS_LOCK:
+        if TICKER_ALIASES.get(ticker) != base_ticker:
+            TICKER_ALIASES[ticker] = base_ticker
+            TICKER_ALIASES_NEW.add(ticker)
+
+def load_ticker_aliases():
+    try:
+        res = cached_select(ALIAS_MAP_KEY)
+        if res.data:
+            with TICKER_ALIAS_LOCK:
+                for alias, canonical in json.loads(res.data[0]['content']).items():
+                    TICKER_ALIASES.setdefault(alias, canonical)
+    except Exception as e:
+        print(f"⚠️ [티커 별칭] 매핑 로드 실패: {e}")
+    return len(TICKER_ALIASES)
+
+def save_ticker_aliases():
+    """이번 실행에서 새로 발견한 별칭이 있을 때만 매핑 한 줄을 갱신합니다."""
+    if not TICKER_ALIASES_NEW: return 0
+    with TICKER_ALIAS_LOCK:
+        content = json.dumps(dict(sorted(TICKER_ALIASES.items())), ensure_ascii=False)
+        new_cnt = len(TICKER_ALIASES_NEW)
+    batch_upsert("analysis_cache", [{
+        "cache_key": ALIAS_MAP_KEY, "content": content, "updated_at": datetime.now().isoformat()
+    }], on_conflict="cache_key")
+    return new_cnt
+
+def cached_select_alias(cache_key, ticker):
+    """cached_select와 같지만, 자기 키가 없거나 빈약하면 같은 본주를 공유하는 별칭 티커의 키에서 대신 읽습니다."""
+    with TICKER_ALIAS_LOCK:
+        keys = alias_cache_keys(cache_key, ticker, TICKER_ALIASES)
+    if len(keys) == 1: return cached_select(cache_key)
+    rows = [row for k in keys for row in cached_select(k).data]
+    best = pick_best_row(rows, cache_key)
+    return _CachedResult([best] if best else [])
+
+TAB0_SNAPSHOT_TOPICS = ["S-1", "S-1/A", "F-1", "FWP", "424B4", "RW", "10-K", "20-F", "Form 25", "10-Q", "BS", "IS", "CF"]
+FMP_SNAPSHOT_TYPES = [
+    "PROFILE", "RAW_NEWS_15", "RAW_NEWS_15_BASE", "RAW_PR", "RAW_EARNINGS_CALL", "RAW_ESG", "RAW_ESTIMATE",
+    "RAW_MA_HISTORY", "RAW_PEERS", "RAW_UPGRADES", "RAW_SURPRISE", "RAW_REVENUE_SEGMENT",
+    "SMART_IN", "SMART_INST", "SMART_SENATE", "SMART_FTD"
+]
+
+def get_ticker_snapshot_keys(ticker, company_name):
+    """한 종목의 파이프라인이 읽는 analysis_cache 키 목록 (트래커 / 리포트 존재 확인 / FMP 원본 캐시)"""
+    keys = [
+        f"{ticker}_8K_LastAccNum", f"{ticker}_PremiumEC_RawTracker", f"{ticker}_PremiumESG_RawTracker",
+        f"{ticker}_Tab1_Main_RawTracker", f"{ticker}_PressRelease_RawTracker",
+        f"{ticker}_Tab4_Analyst_RawTracker", f"{ticker}_PremiumMA_RawTracker",
+        f"{ticker}_PremiumUpgrades_RawTracker", f"{ticker}_PremiumPeers_RawTracker",
+        f"{ticker}_Tab3_Financial_RawTracker", f"{ticker}_Tab3_Summary_ko", f"{ticker}_Tab3_v2_Premium_ko",
+        f"{ticker}_PremiumSurprise_RawTracker", f"{ticker}_PremiumEstimate_RawTracker",
+        f"{ticker}_PremiumRevenueSeg_RawTracker", f"{ticker}_Tab6_SmartMoney_RawTracker",
+        f"CIK_RESOLVE_{ticker}",
+    ]
+    for lang in SUPPORTED_LANGS.keys():
+        keys += [
+            f"{ticker}_Tab1_v5_{lang}", f"{ticker}_Twitter_Sent_Tracker_{lang}", f"{ticker}_Tab4_v4_Premium_{lang}",
+            f"{ticker}_PremiumUpgrades_v1_{lang}", f"{ticker}_PremiumPeers_v1_{lang}",
+        ]
+    for topic in TAB0_SNAPSHOT_TOPICS:
+        keys += [f"{company_name}_{topic}_LastAccNum", f"{company_name}_{topic}_Tab0_v16_ko"]
+
+    symbols = list(dict.fromkeys([ticker, get_base_ticker(ticker)]))
+    for sym in symbols:
+        keys += [f"RAW_FMP_{api_type}_{sym}" for api_type in FMP_SNAPSHOT_TYPES]
+    return keys
+
+def batch_upsert(table_name, data_list, on_conflict="ticker", touch=None):
+    """touch: 내용이 바뀌지 않은 행 처리 방식 (None=테이블 기본값, True=하트비트 컬럼만 갱신, False=생략)"""
     if not data_list: return
-    endpoint = f"{SUPABASE_URL}/rest/v1/{table_name}?on_conflict={on_conflict}"
-    headers = {
-        "apikey": SUPABASE_KEY,
-        "Authorization": f"Bearer {SUPABASE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "return=minimal,resolution=merge-duplicates" 
-    }
     
     raw_batch = []
     for item in data_list:
         payload = {k: sanitize_value(v) for k, v in item.items()}
-        if payload.get(on_conflict):
+        # 🚀 'ticker,alert_type' 같은 복합 충돌 키도 모든 키 컬럼이 채워져 있으면 통과
+        if conflict_key(payload, on_conflict) is not None:
             raw_batch.append(payload)
             
-            # [Smart Dual Caching] 데이터 오염 방지 로직
-            if table_name == "analysis_cache" and "ticker" in payload and "cache_key" in payload:
-                original_ticker = str(payload["ticker"])
-                base_ticker = get_base_ticker(original_ticker)
-                
-                if original_ticker != base_ticker and original_ticker != "MARKET":
-                    content = str(payload.get("content", ""))
-                    
-                    # 🚀 [방어막] 아래 조건에 해당하면 본주(base_ticker)에 덮어쓰지 않음
-                    is_poor_content = any(skip_msg in content for skip_msg in [
-                        "확인된 최신 공시 내역이 없습니다",
-                        "No verified data available",
-                        "데이터가 존재하지 않습니다",
-                        "Information not verified",
-                        "分析できません"
-                    ]) or len(content) < 100 # 내용이 너무 짧은 경우도 제외
-                    
-                    if not is_poor_content:
-                        dup_payload = payload.copy()
-                        dup_payload["ticker"] = base_ticker
-                        dup_payload["cache_key"] = re.sub(
-                            rf'(^|_){original_ticker}(_|$)', 
-                            rf'\g<1>{base_ticker}\g<2>', 
-                            str(dup_payload["cache_key"]), 
-                            count=1
-                        )
-                        raw_batch.append(dup_payload)
-                    else:
-                        # 본주에 이미 좋은 데이터가 있을 수 있으므로, 
-                        # 빈 데이터는 본주(base_ticker) 복제 리스트에서 제외합니다.
-                        pass
-
-    # 전송 직전 중복 제거 (Unique 필터링)
-    unique_batch_dict = {}
-    for item in raw_batch:
-        key_value = item.get(on_conflict)
-        unique_batch_dict[key_value] = item
-    
-    clean_batch = list(unique_batch_dict.values())
-    if not clean_batch: return
-    
-    try:
-        resp = requests.post(endpoint, json=clean_batch, headers=headers)
-        if resp.status_code not in [200, 201, 204]:
-            print(f"❌ [{table_name}] 저장 실패: {resp.text}")
-    except Exception as e:
-        print(f"❌ [{table_name}] 통신 에러: {e}")
+            # 🚀 [티커 별칭] 본주 키로 복제 저장하지 않고, 별칭 관계만 기록 (읽기 함수가 가족 키를 함께 조회)
+            if table_name == "analysis_cache" and payload.get("ticker"):
+                register_ticker_alias(str(payload["ticker"]))
+
+    # 스냅샷 / 쓰기 버퍼에는 원본 행을 반영 (실행 중 읽기는 방금 쓴 값 기준), DB에는 전송 시점에 바뀐 행만 보냄
+    if table_name == "analysis_cache": CACHE_SNAPSHOT.note_write(raw_batch)
+    DELTA_FILTER.prefer(table_name, on_conflict, raw_batch, touch=touch)
+
+    # 중복 제거(마지막 쓰기 우선) / 델타 필터 / 전송은 쓰기 버퍼가 담당 (리포트 인덱스 행은 전송 시 함께)
+    WRITE_BUFFER.add(table_name, on_conflict, raw_batch)
         
 # ==========================================
 # 🚀 [글로벌 다국어 지원] FCM 푸시 알림 발송 함수
@@ -493,24 +662,32 @@ def get_target_stocks():
         (now - timedelta(days=560), now - timedelta(days=350))
     ]
     all_data = []
+    failed_ranges = []
     for start_dt, end_dt in ranges:
         url = f"https://finnhub.io/api/v1/calendar/ipo?from={start_dt.strftime('%Y-%m-%d')}&to={end_dt.strftime('%Y-%m-%d')}&token={FINNHUB_API_KEY}"
         try:
             res = requests.get(url, timeout=10).json()
-            if res.get('ipoCalendar'): all_data.extend(res['ipoCalendar'])
-        except: continue
+            if 'ipoCalendar' not in res: raise ValueError(str(res)[:200])   # 레이트 리밋 등 오류 응답
+            if res['ipoCalendar']: all_data.extend(res['ipoCalendar'])
+        except Exception as e:
+            failed_ranges.append(f"{start_dt.date()}~{end_dt.date()}")
+            print(f"⚠️ [IPO 캘린더] {start_dt.date()}~{end_dt.date()} 구간 로드 실패: {e}")
+            continue
         
     if not all_data: return pd.DataFrame()
     df = pd.DataFrame(all_data).dropna(subset=['symbol'])
     df['symbol'] = df['symbol'].astype(str).str.strip()
-    return df.drop_duplicates(subset=['symbol'])
+    df = df.drop_duplicates(subset=['symbol'])
+    # 🧹 [보존 정책] 일부 구간이 빠진 캘린더는 유니버스로 쓰면 안 됨 (빠진 구간 종목의 트래커 / 리포트가 삭제됨)
+    df.attrs["failed_ranges"] = failed_ranges
+    return df
 
 # 💡 [추가] 메인 루프에서 수익률 상위 50개를 계산하기 위한 현재가 로드 함수
 def get_current_prices():
     try:
-        res = supabase.table("price_cache").select("ticker, price").execute()
-        return {item['ticker']: float(item['price']) for item in res.data if item['price']}
-    except: return {}
+        return fetch_dict(supabase, "price_cache", "ticker", lambda item: float(item['price']) if item['price'] else None,
+                          "ticker, price", workers=4)
+    except Exception: return {}
 
 # ==========================================
 # [3] 추가 헬퍼 함수: SEC 데이터 기반 역추적
@@ -541,6 +718,14 @@ def get_ticker_from_cik(cik_str):
 # ==========================================
 SEC_HEADERS = {'User-Agent': 'UnicornFinder App admin@unicornfinder.com'}
 
+# 🚀 [EDGAR 인덱스] main()에서 실행당 1회 refresh, 종목별 8-K/토픽 조회 게이트로 사용
+EDGAR_INDEX = EdgarIndexConsumer(SEC_HEADERS)
+
+# 🚀 [로컬 회사명 해석기] get_sec_master_mapping()에서 SEC 티커 파일로 구축, main()에서 stock_cache 별칭 추가
+NAME_RESOLVER = CompanyNameResolver()
+FALLBACK_CIK_CACHE = {}  # { ticker: cik 또는 "" } - 네트워크 추적 결과 (실행 단위 메모리)
+FALLBACK_CIK_NEGATIVE_HOURS = 72  # 네트워크로도 못 찾은 기업은 3일간 재시도 생략
+
 def normalize_company_name(name):
     """회사 이름에서 특수문자, 대소문자, Inc/Corp 등을 제거하여 순수 텍스트만 추출합니다."""
     if not name or pd.isna(name): return ""
@@ -560,6 +745,8 @@ def get_sec_master_mapping():
         cik_mapping = {}         # { "AAPL": "0000320193" } (기존용도)
         name_to_ticker_map = {}  # { "apple": "AAPL" } (티커 교정용도)
         
+        NAME_RESOLVER.build_from_sec(data)
+
         for k, v in data.items():
             official_ticker = v['ticker']
             cik_str = str(v['cik_str']).zfill(10)
@@ -578,6 +765,37 @@ def get_sec_master_mapping():
         return {}, {}
 
 def get_fallback_cik(ticker, company_name, api_key):
+    """[로컬 우선 추적] 로컬 이름 인덱스 → 이전 추적 결과 캐시 → 3중 네트워크 추적 순으로 CIK를 찾습니다."""
+    # 0단계: 로컬 이름 인덱스 (마이크로초 단위, 티커 / 정규화 이름 정확 일치만 채택)
+    # 유사도 후보는 연번 SPAC 등 다른 회사일 수 있으므로 아래 네트워크 확인으로 넘김 (점수는 캐시에 기록)
+    cik, score = NAME_RESOLVER.resolve(ticker, company_name)
+    if cik and score >= NAME_RESOLVER_EXACT_SCORE:
+        return cik
+
+    cache_key = f"CIK_RESOLVE_{ticker}"
+    if ticker in FALLBACK_CIK_CACHE:
+        return FALLBACK_CIK_CACHE[ticker] or None
+    try:
+        res = cached_select(cache_key)
+        if res.data:
+            cached = json.loads(res.data[0]['content']).get("cik") or ""
+            neg_limit = (datetime.now() - timedelta(hours=FALLBACK_CIK_NEGATIVE_HOURS)).isoformat()
+            if cached or res.data[0]['updated_at'] > neg_limit:
+                FALLBACK_CIK_CACHE[ticker] = cached
+                return cached or None
+    except Exception: pass
+
+    cik = _network_fallback_cik(ticker, company_name, api_key)
+    FALLBACK_CIK_CACHE[ticker] = cik or ""
+    batch_upsert("analysis_cache", [{
+        "cache_key": cache_key,
+        "content": json.dumps({"cik": cik or "", "name": company_name, "local_score": score}, ensure_ascii=False),
+        "updated_at": datetime.now().isoformat()
+    }], on_conflict="cache_key")
+    if cik and company_name: NAME_RESOLVER.add(company_name, cik, ticker)
+    return cik
+
+def _network_fallback_cik(ticker, company_name, api_key):
     """[3중 추적 엔진] 명단에 없는 기업의 CIK를 3가지 방법으로 기어코 찾아냅니다."""
     # 1단계: FMP 기업 프로필 API에서 직접 추출
     try:
@@ -585,7 +803,7 @@ def get_fallback_cik(ticker, company_name, api_key):
         res = requests.get(url, timeout=5).json()
         if res and isinstance(res, list) and 'cik' in res[0] and res[0]['cik']:
             return str(res[0]['cik']).zfill(10)
-    except: pass
+    except Exception: pass
 
     # 2단계: SEC EDGAR에 티커(Ticker)로 강제 검색
     try:
@@ -593,7 +811,7 @@ def get_fallback_cik(ticker, company_name, api_key):
         res = requests.get(url, headers=SEC_HEADERS, timeout=5)
         match = re.search(r'<cik>(\d+)</cik>', res.text)
         if match: return str(match.group(1)).zfill(10)
-    except: pass
+    except Exception: pass
     
     # 3단계: SEC EDGAR에 '회사 이름'으로 강제 검색
     if company_name:
@@ -603,7 +821,7 @@ def get_fallback_cik(ticker, company_name, api_key):
             res = requests.get(url, headers=SEC_HEADERS, timeout=5)
             match = re.search(r'<cik>(\d+)</cik>', res.text)
             if match: return str(match.group(1)).zfill(10)
-        except: pass
+        except Exception: pass
         
     return None
 
@@ -611,7 +829,7 @@ def get_fallback_cik(ticker, company_name, api_key):
 def check_sec_specific_filing(cik, target_form):
     """특정 CIK 기업이 10-K, RW, S-1 등의 서류를 제출했는지 확인하고 가장 최근 날짜를 반환합니다."""
     try:
-        time.sleep(0.5) # SEC 초당 10회 제한 방어
+        cancellation.sleep(0.5) # SEC 초당 10회 제한 방어
         res = requests.get(f"https://data.sec.gov/submissions/CIK{cik}.json", headers=SEC_HEADERS, timeout=10)
         filings = res.json().get('filings', {}).get('recent', {})
         
@@ -623,7 +841,7 @@ def check_sec_specific_filing(cik, target_form):
             if target_form.upper() in str(form).upper():
                 return dates[i] # 서류가 있으면 제출 날짜 반환 (예: '2025-10-12')
         return None # 서류가 없으면 None
-    except:
+    except Exception:
         return None
 
 # ==========================================
@@ -659,7 +877,7 @@ def fetch_fmp_premium_news(symbol, api_key):
             news_list = [f"- [{r.get('publishedDate')}] {r.get('title')} (Source: {r.get('site')})" for r in res]
             return "\n".join(news_list)
         return "No recent premium news."
-    except: return "No recent premium news."
+    except Exception: return "No recent premium news."
 
 def fetch_fmp_earnings_call(symbol, api_key):
     try:
@@ -683,7 +901,7 @@ def fetch_fmp_earnings_call(symbol, api_key):
             content = res[0].get('content', '')[:3000]
             return f"[Quarter: {quarter} / Year: {year}]\n{content}..."
         return "No earnings call transcript available."
-    except: return "No earnings call transcript available."
+    except Exception: return "No earnings call transcript available."
 
 # ==========================================
 # [마케팅 전용] 4개 국어 지원 트위터 다이렉트 송고 (X API v2 연동)
@@ -720,14 +938,14 @@ def send_to_twitter_connector(ticker, company_name, row_data, unified_metrics, a
     languages =['en', 'ko', 'ja', 'zh']
     for lang in languages:
         try:
-            res_sum = supabase.table("analysis_cache").select("content").eq("cache_key", f"{ticker}_Tab1_v5_{lang}").execute()
+            res_sum = cached_select(f"{ticker}_Tab1_v5_{lang}")
             if res_sum.data:
                 content_json = json.loads(res_sum.data[0]['content'])
                 clean_text = re.sub(r'<[^>]+>', '', content_json.get('html', ''))
                 summaries[lang] = clean_text.strip()
             else:
                 summaries[lang] = "" 
-        except:
+        except Exception:
             summaries[lang] = ""
 
     # 3. 언어별 반복 처리
@@ -737,9 +955,9 @@ def send_to_twitter_connector(ticker, company_name, row_data, unified_metrics, a
 
         tracker_key = f"{ticker}_Twitter_Sent_Tracker_{lang}"
         try:
-            res = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+            res = cached_select(tracker_key)
             if res.data: continue 
-        except: pass
+        except Exception: pass
 
         # 💡 [최종 수정] 브랜드 슬로건 통일 및 국가별 검색 최적화(SEO) 해시태그 대폭 강화
         localization = {
@@ -793,15 +1011,43 @@ def send_to_twitter_connector(ticker, company_name, row_data, unified_metrics, a
         else:
             print(f"❌ [Twitter] {ticker} ({lang}) 트윗 실패: {result}")
         
-        # 5. 연사 제한 방지
+        # 5. 연사 제한 방지 (🛑 취소되면 남은 언어는 다음 실행에서: 언어별 트래커로 중복 전송 없음)
         if lang != languages[-1]:
-            time.sleep(30)
+            cancellation.sleep(30)
             
     return True, "Done"
 
 # ==========================================
 # [완전 교체] run_tab0_analysis 함수 (에러 영구 차단 + 20-F 하이브리드 탐색)
 # ==========================================
+def tab0_target_topics(ipo_status, ipo_date_str):
+    """상장 상태 / 경과 기간별 Tab0 대상 서류. 반환값: (토픽 목록, EDGAR 인덱스 게이트 적용 여부)"""
+    status_lower = str(ipo_status).lower()
+    is_withdrawn = any(x in status_lower for x in ['철회', '취소', 'withdrawn'])
+    is_delisted = any(x in status_lower for x in ['폐지', 'delisted'])
+
+    is_over_1y = False
+    if ipo_date_str:
+        try: is_over_1y = (datetime.now().date() - pd.to_datetime(ipo_date_str).date()).days > 365
+        except Exception: pass
+
+    if is_withdrawn: target_topics = ["S-1", "S-1/A", "F-1", "RW"]
+    elif is_delisted: target_topics = ["S-1", "10-K", "20-F", "Form 25"]
+    elif is_over_1y: target_topics = ["10-K", "10-Q", "BS", "IS", "CF"]
+    else: target_topics = ["S-1", "S-1/A", "F-1", "FWP", "424B4"]
+    # 신규 IPO 서류는 당일 반영이 중요해 계속 직접 조회
+    return target_topics, (is_withdrawn or is_delisted or is_over_1y)
+
+def tab0_priority_targets(topic):
+    """Tab0 토픽 하나를 채우는 SEC 서류 종류 (앞쪽이 우선)"""
+    if topic == "10-K": return ["10-K", "20-F"]
+    if topic == "10-Q": return ["10-Q", "6-K"]
+    if topic in ["BS", "IS", "CF"]: return ["10-K", "20-F", "10-Q", "6-K"]
+    # 🚀 [교정] 신규 기업(S-1) 뿐만 아니라 기존 기업의 추가 발행(S-3)까지 대응
+    if topic == "S-1": return ["S-1", "S-3", "S-3ASR"]
+    if topic == "S-1/A": return ["S-1/A", "S-3/A"]
+    return [topic]
+
 def run_tab0_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=None, cik_mapping=None, original_ticker=None):
     if 'model_strict' not in globals() or not model_strict: return
     
@@ -1034,33 +1280,26 @@ def run_tab0_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
     # ---------------------------------------------------------
     # 🚀 [3] 기업 상태 및 기간 분석
     # ---------------------------------------------------------
-    status_lower = str(ipo_status).lower()
-    is_withdrawn = any(x in status_lower for x in ['철회', '취소', 'withdrawn'])
-    is_delisted = any(x in status_lower for x in ['폐지', 'delisted'])
-    
-    days_passed = 0
-    is_over_1y = False
-    if ipo_date_str:
-        try:
-            ipo_dt = pd.to_datetime(ipo_date_str).date()
-            days_passed = (datetime.now().date() - ipo_dt).days
-            if days_passed > 365: is_over_1y = True
-        except: pass
-
-    valid_hours = 168 if (is_withdrawn or is_delisted or is_over_1y) else 24
-    limit_time_str = (datetime.now() - timedelta(hours=valid_hours)).isoformat()
-
-    # 대상 서류 배정
-    if is_withdrawn: target_topics = ["S-1", "S-1/A", "F-1", "RW"]
-    elif is_delisted: target_topics = ["S-1", "10-K", "20-F", "Form 25"]
-    elif is_over_1y: target_topics = ["10-K", "10-Q", "BS", "IS", "CF"]
-    else: target_topics = ["S-1", "S-1/A", "F-1", "FWP", "424B4"]
+    # 대상 서류 배정 (실행 계획 미리보기와 같은 규칙)
+    target_topics, gate_topics = tab0_target_topics(ipo_status, ipo_date_str)
+    # 🗓️ [신선도 정책] 생애 주기상 동결된 서류 (예: 상장 1년 경과 기업의 S-1 계열)는 다시 분석하지 않음
+    lifecycle = lifecycle_state(ipo_status, ipo_date_str)
+    target_topics = [t for t in target_topics if not FRESHNESS.frozen(SEC_TOPIC_SOURCES.get(t, "sec_periodic"), state=lifecycle)]
 
     # ---------------------------------------------------------
     # 🚀 [4] 8-K 분석 섹션 (Accession Number 기반 최적화 적용)
     # ---------------------------------------------------------
+    # 🚀 [EDGAR 인덱스 게이트] 전수 점검이 끝난 CIK는 인덱스에 신규 공시가 있을 때만 종목별 조회
+    edgar_covered = EDGAR_INDEX.is_covered(cik)
+
     # 1. 8-K 메타데이터(번호)만 먼저 가져옴 (트래픽 거의 없음)
-    acc_num_8k, f_date_8k = fetch_sec_metadata(ticker, "8-K", FMP_API_KEY, cik)
+    if FRESHNESS.frozen("sec_8k", state=lifecycle):
+        acc_num_8k, f_date_8k = None, None
+    elif EDGAR_INDEX.has_new_filing(cik, ["8-K", "8-K/A"]) is False:
+        print(f"⏩ [{ticker}] EDGAR 인덱스상 신규 8-K 없음 (조회 생략)")
+        acc_num_8k, f_date_8k = None, None
+    else:
+        acc_num_8k, f_date_8k = fetch_sec_metadata(ticker, "8-K", FMP_API_KEY, cik)
     
     if acc_num_8k:
         # 💡 8-K 전용 트래커 키 (고유 번호 기반)
@@ -1068,10 +1307,10 @@ def run_tab0_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
         is_8k_already_done = False
         
         try:
-            res_8k = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key_8k).execute()
+            res_8k = cached_select(tracker_key_8k)
             if res_8k.data and res_8k.data[0]['content'] == acc_num_8k:
                 is_8k_already_done = True
-        except: pass
+        except Exception: pass
 
         # 새로운 8-K 문서가 확인되었을 때만 무거운 다운로드 및 AI 분석 실행
         if not is_8k_already_done:
@@ -1163,6 +1402,9 @@ def run_tab0_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
                 
                 # 4. 분석 완료 후 트래커 갱신 (다음 실행 때 스킵)
                 batch_upsert("analysis_cache", [{"cache_key": tracker_key_8k, "content": acc_num_8k, "updated_at": datetime.now().isoformat()}], "cache_key")
+            else:
+                # 본문 다운로드 실패: 트래커를 두고 다음 실행에서 인덱스 게이트 없이 다시 확인
+                EDGAR_INDEX.mark_failed(cik)
 
     # ==========================================================================
     # 🚀 [교정] 각 토픽별로 '정확히' 해당 서류만 찾도록 우선순위 로직을 엄격히 분리
@@ -1171,17 +1413,11 @@ def run_tab0_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
         acc_num, f_date = None, None
         
         # 💡 생애 주기별 탭(Tab) 구성을 유지하면서, 각 서류가 자기 자리를 찾게 함
-        if topic == "10-K": priority_targets = ["10-K", "20-F"]
-        elif topic == "10-Q": priority_targets = ["10-Q", "6-K"]
-        elif topic in ["BS", "IS", "CF"]: priority_targets = ["10-K", "20-F", "10-Q", "6-K"]
-        # 🚀 [교정] 신규 기업(S-1) 뿐만 아니라 기존 기업의 추가 발행(S-3)까지 대응
-        else:
-            if topic == "S-1":
-                priority_targets = ["S-1", "S-3", "S-3ASR"] # S-3 추가
-            elif topic == "S-1/A":
-                priority_targets = ["S-1/A", "S-3/A"] # S-3/A 추가
-            else:
-                priority_targets = [topic]
+        priority_targets = tab0_priority_targets(topic)
+
+        if gate_topics and EDGAR_INDEX.has_new_filing(cik, priority_targets) is False:
+            print(f"⏩ [{ticker}] EDGAR 인덱스상 신규 {topic} 서류 없음 (조회 생략)")
+            continue
 
         print(f"🔍 [{ticker}] {topic} 공시 탐색 중...") 
         base_ticker = get_base_ticker(ticker) # 💡 모기업 티커 추출
@@ -1215,7 +1451,7 @@ def run_tab0_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
                     "lang": lang_code,
                     "data_type": topic,
                     "tier": "free"
-                }], on_conflict="cache_key")
+                }], on_conflict="cache_key", touch=False)
             continue
 
         # run_tab0_analysis 함수 내부의 중복 체크 블록 수정
@@ -1223,24 +1459,30 @@ def run_tab0_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
         is_skip = False
         try:
             # 1. 서류 번호 확인
-            res_tracker = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+            res_tracker = cached_select(tracker_key)
             if res_tracker.data and res_tracker.data[0]['content'] == acc_num:
                 # 2. 🚀 [교정] 실제로 분석 리포트가 저장되어 있는지 한 번 더 확인 (누락 방지)
                 test_key = f"{company_name}_{topic}_Tab0_v16_ko"
-                res_content = supabase.table("analysis_cache").select("cache_key").eq("cache_key", test_key).execute()
+                res_content = cached_select(test_key)
                 
                 if res_content.data:
                     print(f"⏩ [{ticker}] {topic} 리포트가 이미 존재합니다. (스킵)")
                     is_skip = True 
                 else:
                     print(f"🔄 [{ticker}] {topic} 번호는 같지만 리포트가 없어 재분석합니다.")
-        except: pass
+        except Exception: pass
 
         if is_skip: continue
 
+        # 🚀 [XBRL 재무 엔진] BS/IS/CF는 10만 자 본문 대신 미리 계산된 수치 블록만 AI에게 전달
+        facts_block = None
+        if topic in ["BS", "IS", "CF"] and cik:
+            facts_block = build_facts_block(get_xbrl_summary(cik, SEC_HEADERS), topic)
+            if facts_block: print(f"🧮 [{ticker}] {topic} XBRL 수치 블록 사용 ({len(facts_block)}자)")
+
         # 새 문서일 때만 다운로드
         print(f"📥 [{ticker}] {topic} 신규 공시 분석 시작 ({acc_num})...")
-        f_text = fetch_sec_full_content(acc_num, ticker, topic, FMP_API_KEY, cik)
+        f_text = facts_block or fetch_sec_full_content(acc_num, ticker, topic, FMP_API_KEY, cik)
 
         if f_text and len(f_text) > 100:
             # 💡 [핵심 방어막] 토큰 한도 초과 에러 방지를 위해 상위 100,000자만 잘라서 분석에 사용합니다.
@@ -1330,14 +1572,20 @@ def run_tab0_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
             # 💡 [핵심 방어막] 에러가 났는데 트래커만 갱신되는 '가짜 완료' 방지
         try:
             test_key = f"{company_name}_{topic}_Tab0_v16_ko"
-            res_verify = supabase.table("analysis_cache").select("content").eq("cache_key", test_key).execute()
+            # 🚀 [쓰기 버퍼] 방금 저장한 리포트가 아직 전송 대기 중일 수 있으므로 버퍼/스냅샷부터 확인
+            res_verify = cached_select(test_key)
             
             # 한국어(ko) 분석 내용이 있거나, 본문 다운로드 실패로 노란색 경고 박스라도 저장된 경우에만 완료(트래커 갱신)
             if res_verify.data:
                 batch_upsert("analysis_cache",[{"cache_key": tracker_key, "content": acc_num, "updated_at": datetime.now().isoformat()}], "cache_key")
             else:
                 print(f"⚠️ [{ticker}] {topic} AI 분석 실패로 트래커 갱신 보류 (다음 사이클에서 재시도합니다.)")
-        except: pass
+                EDGAR_INDEX.mark_failed(cik)
+        except Exception: pass
+
+    # 🚀 [EDGAR 인덱스] 게이트 없이 전수 점검을 마친 CIK만 다음 실행부터 게이트 대상으로 등록
+    if cik and not edgar_covered:
+        EDGAR_INDEX.mark_checked(cik)
             
 def get_tab0_ec_premium_prompt(lang, ticker, raw_data):
     if lang == 'en':
@@ -1409,11 +1657,11 @@ def run_tab0_premium_collection(ticker, company_name):
             list_url = f"https://financialmodelingprep.com/stable/earnings-transcript-list?symbol={ticker}&apikey={FMP_API_KEY}"
             list_res = requests.get(list_url, timeout=5).json()
             latest = list_res[0] if (isinstance(list_res, list) and len(list_res) > 0) else {"year": "2024", "quarter": 1}
-        except:
+        except Exception:
             latest = {"year": "2024", "quarter": 1}
 
         url = f"https://financialmodelingprep.com/stable/earning-call-transcript?symbol={ticker}&year={latest.get('year')}&quarter={latest.get('quarter')}&apikey={FMP_API_KEY}"
-        ec_raw = get_fmp_data_with_cache(ticker, "RAW_EARNINGS_CALL", url, valid_hours=24) # 매일 확인
+        ec_raw = get_fmp_data_with_cache(ticker, "RAW_EARNINGS_CALL", url, valid_hours=FRESHNESS.hours("earnings_call", ticker))
         
         is_ec_valid = isinstance(ec_raw, list) and len(ec_raw) > 0
         if not is_ec_valid: return
@@ -1425,10 +1673,10 @@ def run_tab0_premium_collection(ticker, company_name):
         
         try:
             # 💡 [과금 방어막 2] 기존 DB의 어닝콜 원본과 비교
-            res_tracker = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+            res_tracker = cached_select(tracker_key)
             if res_tracker.data and current_raw_str == res_tracker.data[0]['content']:
                 is_changed = False
-        except: pass
+        except Exception: pass
 
         if not is_changed: return
 
@@ -1545,12 +1793,12 @@ def run_tab2_premium_collection(ticker, company_name):
     
     try: 
         url = f"https://financialmodelingprep.com/stable/esg-ratings?symbol={ticker}&apikey={FMP_API_KEY}"
-        esg_raw = get_fmp_data_with_cache(ticker, "RAW_ESG", url, valid_hours=24) 
+        esg_raw = get_fmp_data_with_cache(ticker, "RAW_ESG", url, valid_hours=FRESHNESS.hours("esg", ticker)) 
         
         # 💡 [추가] 우선주로 실패 시 모기업으로 재탐색
         if (not isinstance(esg_raw, list) or len(esg_raw) == 0) and ticker != base_ticker:
             url_base = f"https://financialmodelingprep.com/stable/esg-ratings?symbol={base_ticker}&apikey={FMP_API_KEY}"
-            esg_raw = get_fmp_data_with_cache(base_ticker, "RAW_ESG", url_base, valid_hours=24)
+            esg_raw = get_fmp_data_with_cache(base_ticker, "RAW_ESG", url_base, valid_hours=FRESHNESS.hours("esg", ticker))
 
         if not isinstance(esg_raw, list) or len(esg_raw) == 0:
             return
@@ -1560,10 +1808,10 @@ def run_tab2_premium_collection(ticker, company_name):
         is_changed = True
         
         try:
-            res_tracker = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+            res_tracker = cached_select(tracker_key)
             if res_tracker.data and current_raw_str == res_tracker.data[0]['content']:
                 is_changed = False # 💡 원본이 똑같으면 스킵!
-        except: pass
+        except Exception: pass
 
         if not is_changed: return 
 
@@ -1717,7 +1965,7 @@ def run_tab1_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
         if ipo_date_str:
             days_passed = (now.date() - pd.to_datetime(ipo_date_str).date()).days
             if days_passed > 365: is_over_1y = True
-    except: pass
+    except Exception: pass
 
     safe_name = f'"{search_name}"'
     if is_withdrawn:
@@ -1731,18 +1979,18 @@ def run_tab1_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
 
     # 1. 데이터 수집 (FMP)
     profile_url = f"https://financialmodelingprep.com/stable/profile?symbol={ticker}&apikey={FMP_API_KEY}"
-    profile_data = get_fmp_data_with_cache(ticker, "PROFILE", profile_url, valid_hours=168)
+    profile_data = get_fmp_data_with_cache(ticker, "PROFILE", profile_url, valid_hours=FRESHNESS.hours("profile", ticker))
     if not profile_data and ticker != base_ticker:
         profile_url_base = f"https://financialmodelingprep.com/stable/profile?symbol={base_ticker}&apikey={FMP_API_KEY}"
-        profile_data = get_fmp_data_with_cache(base_ticker, "PROFILE", profile_url_base, valid_hours=168)
+        profile_data = get_fmp_data_with_cache(base_ticker, "PROFILE", profile_url_base, valid_hours=FRESHNESS.hours("profile", ticker))
 
     biz_desc = profile_data[0].get('description') or "" if profile_data else ""
 
     news_url = f"https://financialmodelingprep.com/stable/news/stock-latest?symbol={ticker}&limit=15&apikey={FMP_API_KEY}"
-    news_data = get_fmp_data_with_cache(ticker, "RAW_NEWS_15", news_url, valid_hours=6)
+    news_data = get_fmp_data_with_cache(ticker, "RAW_NEWS_15", news_url, valid_hours=FRESHNESS.hours("news", ticker))
     if not news_data and ticker != base_ticker:
         news_url_base = f"https://financialmodelingprep.com/stable/news/stock-latest?symbol={base_ticker}&limit=15&apikey={FMP_API_KEY}"
-        news_data = get_fmp_data_with_cache(base_ticker, "RAW_NEWS_15_BASE", news_url_base, valid_hours=6)
+        news_data = get_fmp_data_with_cache(base_ticker, "RAW_NEWS_15_BASE", news_url_base, valid_hours=FRESHNESS.hours("news", ticker))
     
     valid_news = [
         n for n in (news_data or []) 
@@ -1762,10 +2010,10 @@ def run_tab1_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
     
     is_changed = True
     try:
-        res_tracker = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+        res_tracker = cached_select(tracker_key)
         if res_tracker.data and current_raw_str == res_tracker.data[0]['content']:
             is_changed = False 
-    except: pass
+    except Exception: pass
 
     if is_changed:
         print(f"🔔 [{ticker}] Tab 1 데이터 변경 감지! 분석 시작...")
@@ -1938,7 +2186,7 @@ def run_tab1_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
                                 news_list = parsed.get("news", [])
                                 biz_analysis = biz_analysis.replace(match.group(0), "").strip()
                                 break 
-                        except:
+                        except Exception:
                             continue
 
                 # 3. 본문 추가 정제
@@ -1985,7 +2233,7 @@ def run_tab1_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
     # =========================================================
     try:
         pr_url = f"https://financialmodelingprep.com/stable/press-releases?symbol={ticker}&limit=5&apikey={FMP_API_KEY}"
-        pr_raw = get_fmp_data_with_cache(ticker, "RAW_PR", pr_url, valid_hours=12)
+        pr_raw = get_fmp_data_with_cache(ticker, "RAW_PR", pr_url, valid_hours=FRESHNESS.hours("press", ticker))
         
         if isinstance(pr_raw, list) and len(pr_raw) > 0: 
             current_pr_str = json.dumps(pr_raw, sort_keys=True)
@@ -1993,10 +2241,10 @@ def run_tab1_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
             is_changed_pr = True
             
             try:
-                res_tracker = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key_pr).execute()
+                res_tracker = cached_select(tracker_key_pr)
                 if res_tracker.data and current_pr_str == res_tracker.data[0]['content']:
                     is_changed_pr = False
-            except:
+            except Exception:
                 pass
 
             if is_changed_pr:
@@ -2038,7 +2286,7 @@ def run_tab1_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
     # =========================================================
     try:
         pr_url = f"https://financialmodelingprep.com/stable/press-releases?symbol={ticker}&limit=5&apikey={FMP_API_KEY}"
-        pr_raw = get_fmp_data_with_cache(ticker, "RAW_PR", pr_url, valid_hours=12)
+        pr_raw = get_fmp_data_with_cache(ticker, "RAW_PR", pr_url, valid_hours=FRESHNESS.hours("press", ticker))
         
         # 🚨 [환각 완벽 차단] FMP 데이터가 정상 리스트일 때만 실행
         is_pr_valid = isinstance(pr_raw, list) and len(pr_raw) > 0
@@ -2050,10 +2298,10 @@ def run_tab1_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
             
             try:
                 # [과금 방어막] 기존 원본 데이터와 비교
-                res_tracker = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key_pr).execute()
+                res_tracker = cached_select(tracker_key_pr)
                 if res_tracker.data and current_pr_str == res_tracker.data[0]['content']:
                     is_changed_pr = False
-            except:
+            except Exception:
                 pass
 
             if is_changed_pr:
@@ -2104,35 +2352,27 @@ def run_tab4_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
     
     try:
         # 💡[과금 방어막 2] 기존 DB의 애널리스트 데이터 원본과 비교
-        res_tracker = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+        res_tracker = cached_select(tracker_key)
         if res_tracker.data and current_analyst_str == res_tracker.data[0]['content']:
             is_changed = False
-    except: pass
+    except Exception: pass
 
     # 🚀[가짜 트래커 자가 치유] 트래커는 안 변했어도 실제 DB에 리포트가 없으면 강제 재분석!
     if not is_changed:
         try:
-            res_check = supabase.table("analysis_cache").select("cache_key").eq("cache_key", f"{ticker}_Tab4_v4_Premium_ko").execute()
+            res_check = cached_select(f"{ticker}_Tab4_v4_Premium_ko")
             if not res_check.data:
                 is_changed = True
                 print(f"🔄 [{ticker}] Tab 4 가짜 트래커 발견. 강제 재분석합니다.")
-        except: pass
+        except Exception: pass
 
     if not is_changed:
         return True # 목표가/의견이 진짜로 안 변했으면 스킵
         
     print(f"🔔 [{ticker}] 기관 목표가/투자의견 변경 감지! Tab 4 AI 검색 요약 시작...")
 
-    status_lower = str(ipo_status).lower()
-    is_stable = bool(re.search(r'\b(withdrawn|rw|철회|취소|delisted|폐지)\b', status_lower))
-    
-    if not is_stable and ipo_date_str:
-        try:
-            ipo_dt = pd.to_datetime(ipo_date_str).date()
-            if (datetime.now().date() - ipo_dt).days > 365: is_stable = True
-        except: pass
-
-    valid_hours = 168 if is_stable else 24
+    # 리포트 재생성 주기: 신선도 정책의 analyst 소스 (철회 / 폐지 / 상장 1년 경과는 주 단위)
+    valid_hours = FRESHNESS.hours("analyst", state=lifecycle_state(ipo_status, ipo_date_str))
     limit_time_str = (datetime.now() - timedelta(hours=valid_hours)).isoformat()
 
     # 💡 [신규 추가] 긍정적 시그널 포착 여부 확인 변수
@@ -2143,9 +2383,9 @@ def run_tab4_analysis(ticker, company_name, ipo_status="Active", ipo_date_str=No
         cache_key = f"{ticker}_Tab4_v4_Premium_{lang_code}" 
         
         try:
-            res = supabase.table("analysis_cache").select("updated_at").eq("cache_key", cache_key).gt("updated_at", limit_time_str).execute()
+            res = cached_select(cache_key, newer_than=limit_time_str)
             if res.data: continue 
-        except: pass
+        except Exception: pass
 
         fmp_context = ""
         if analyst_data and analyst_data.get('target') != 'N/A':
@@ -2355,18 +2595,18 @@ Google検索を使用して、"{search_brand}" ({ticker})に関する最新の
         base_ticker = get_base_ticker(ticker)
         
         ud_url = f"https://financialmodelingprep.com/stable/upgrades-downgrades?symbol={ticker}&apikey={FMP_API_KEY}"
-        ud_raw = get_fmp_data_with_cache(ticker, "RAW_UPGRADES", ud_url, valid_hours=24)
+        ud_raw = get_fmp_data_with_cache(ticker, "RAW_UPGRADES", ud_url, valid_hours=FRESHNESS.hours("upgrades", ticker))
         # 🚀 [추가] Fallback 로직
         if not ud_raw and ticker != base_ticker:
             ud_url_base = f"https://financialmodelingprep.com/stable/upgrades-downgrades?symbol={base_ticker}&apikey={FMP_API_KEY}"
-            ud_raw = get_fmp_data_with_cache(base_ticker, "RAW_UPGRADES", ud_url_base, valid_hours=24)
+            ud_raw = get_fmp_data_with_cache(base_ticker, "RAW_UPGRADES", ud_url_base, valid_hours=FRESHNESS.hours("upgrades", ticker))
         
         peers_url = f"https://financialmodelingprep.com/stable/stock-peers?symbol={ticker}&apikey={FMP_API_KEY}"
-        peers_raw = get_fmp_data_with_cache(ticker, "RAW_PEERS", peers_url, valid_hours=24)
+        peers_raw = get_fmp_data_with_cache(ticker, "RAW_PEERS", peers_url, valid_hours=FRESHNESS.hours("peers", ticker))
         # 🚀 [추가] Fallback 로직
         if not peers_raw and ticker != base_ticker:
             peers_url_base = f"https://financialmodelingprep.com/stable/stock-peers?symbol={base_ticker}&apikey={FMP_API_KEY}"
-            peers_raw = get_fmp_data_with_cache(base_ticker, "RAW_PEERS", peers_url_base, valid_hours=24)
+            peers_raw = get_fmp_data_with_cache(base_ticker, "RAW_PEERS", peers_url_base, valid_hours=FRESHNESS.hours("peers", ticker))
 
         # 🚨 [환각 방어막] 진짜 데이터인지 엄격 검사
         is_ud_valid = isinstance(ud_raw, list) and len(ud_raw) > 0
@@ -2376,7 +2616,7 @@ Google検索を使用して、"{search_brand}" ({ticker})に関する最新の
             if is_ud_valid:
                 ud_summary_key = f"{ticker}_PremiumUpgrades_v1_{lang_code}"
                 try:
-                    res_ud = supabase.table("analysis_cache").select("updated_at").eq("cache_key", ud_summary_key).gt("updated_at", limit_time_str).execute()
+                    res_ud = cached_select(ud_summary_key, newer_than=limit_time_str)
                     if not res_ud.data:
                         prompt_ud = get_tab4_premium_prompt(lang_code, "Upgrades and Downgrades History", ticker, ud_raw)
                         try:
@@ -2389,13 +2629,13 @@ Google検索を使用して、"{search_brand}" ({ticker})に関する最新の
                                 print(f"✅ [{ticker}] 투자의견 히스토리 캐싱 완료 ({lang_code})")
                         except Exception as e:
                             print(f"⚠️ [{ticker}] 투자의견 히스토리 분석 실패 ({lang_code}): {e}")
-                except:
+                except Exception:
                     pass
 
             if is_peers_valid:
                 peers_summary_key = f"{ticker}_PremiumPeers_v1_{lang_code}"
                 try:
-                    res_p = supabase.table("analysis_cache").select("updated_at").eq("cache_key", peers_summary_key).gt("updated_at", limit_time_str).execute()
+                    res_p = cached_select(peers_summary_key, newer_than=limit_time_str)
                     if not res_p.data:
                         prompt_p = get_tab4_premium_prompt(lang_code, "Stock Peers & Competitors", ticker, peers_raw)
                         try:
@@ -2408,7 +2648,7 @@ Google検索を使用して、"{search_brand}" ({ticker})に関する最新の
                                 print(f"✅ [{ticker}] 경쟁사 비교 캐싱 완료 ({lang_code})")
                         except Exception as e:
                             print(f"⚠️ [{ticker}] 경쟁사 비교 분석 실패 ({lang_code}): {e}")
-                except:
+                except Exception:
                     pass
 
     except Exception as e:
@@ -2668,12 +2908,12 @@ def run_tab4_ma_premium_collection(ticker, company_name):
     
     try:
         url = f"https://financialmodelingprep.com/stable/search-mergers-acquisitions?name={ticker}&apikey={FMP_API_KEY}"
-        ma_raw = get_fmp_data_with_cache(ticker, "RAW_MA_HISTORY", url, valid_hours=24)
+        ma_raw = get_fmp_data_with_cache(ticker, "RAW_MA_HISTORY", url, valid_hours=FRESHNESS.hours("ma", ticker))
         
         # 🚀 [추가] 우선주로 실패 시 일반주(base_ticker)로 재요청
         if (not isinstance(ma_raw, list) or len(ma_raw) == 0) and ticker != base_ticker:
             url_base = f"https://financialmodelingprep.com/stable/search-mergers-acquisitions?name={base_ticker}&apikey={FMP_API_KEY}"
-            ma_raw = get_fmp_data_with_cache(base_ticker, "RAW_MA_HISTORY", url_base, valid_hours=24)
+            ma_raw = get_fmp_data_with_cache(base_ticker, "RAW_MA_HISTORY", url_base, valid_hours=FRESHNESS.hours("ma", ticker))
         
         if not isinstance(ma_raw, list) or len(ma_raw) == 0: return
 
@@ -2682,10 +2922,10 @@ def run_tab4_ma_premium_collection(ticker, company_name):
         is_changed = True
         
         try:
-            res_tracker = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+            res_tracker = cached_select(tracker_key)
             if res_tracker.data and current_raw_str == res_tracker.data[0]['content']:
                 is_changed = False
-        except: pass
+        except Exception: pass
 
         if not is_changed: return 
 
@@ -2799,12 +3039,12 @@ def run_tab4_premium_collection(ticker, company_name):
     try:
         # --- [1] 투자의견 변화(Upgrades & Downgrades) 처리 ---
         ud_url = f"https://financialmodelingprep.com/stable/upgrades-downgrades?symbol={ticker}&apikey={FMP_API_KEY}"
-        ud_raw = get_fmp_data_with_cache(ticker, "RAW_UPGRADES", ud_url, valid_hours=24)
+        ud_raw = get_fmp_data_with_cache(ticker, "RAW_UPGRADES", ud_url, valid_hours=FRESHNESS.hours("upgrades", ticker))
         
         # 🚀 [추가] 일반주 Fallback 로직
         if not ud_raw and ticker != base_ticker:
             ud_url_base = f"https://financialmodelingprep.com/stable/upgrades-downgrades?symbol={base_ticker}&apikey={FMP_API_KEY}"
-            ud_raw = get_fmp_data_with_cache(base_ticker, "RAW_UPGRADES", ud_url_base, valid_hours=24)
+            ud_raw = get_fmp_data_with_cache(base_ticker, "RAW_UPGRADES", ud_url_base, valid_hours=FRESHNESS.hours("upgrades", ticker))
         
         if isinstance(ud_raw, list) and len(ud_raw) > 0:
             current_ud_str = json.dumps(ud_raw[:10], sort_keys=True)
@@ -2812,10 +3052,10 @@ def run_tab4_premium_collection(ticker, company_name):
             is_changed_ud = True
             
             try:
-                res_ud = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key_ud).execute()
+                res_ud = cached_select(tracker_key_ud)
                 if res_ud.data and current_ud_str == res_ud.data[0]['content']:
                     is_changed_ud = False
-            except:
+            except Exception:
                 pass
             
             if is_changed_ud:
@@ -2875,12 +3115,12 @@ def run_tab4_premium_collection(ticker, company_name):
 
         # --- [2] 경쟁사(Peers) 처리 ---
         peers_url = f"https://financialmodelingprep.com/stable/stock-peers?symbol={ticker}&apikey={FMP_API_KEY}"
-        peers_raw = get_fmp_data_with_cache(ticker, "RAW_PEERS", peers_url, valid_hours=24)
+        peers_raw = get_fmp_data_with_cache(ticker, "RAW_PEERS", peers_url, valid_hours=FRESHNESS.hours("peers", ticker))
         
         # 🚀 [추가]
         if not peers_raw and ticker != base_ticker:
             peers_url_base = f"https://financialmodelingprep.com/stable/stock-peers?symbol={base_ticker}&apikey={FMP_API_KEY}"
-            peers_raw = get_fmp_data_with_cache(base_ticker, "RAW_PEERS", peers_url_base, valid_hours=24)
+            peers_raw = get_fmp_data_with_cache(base_ticker, "RAW_PEERS", peers_url_base, valid_hours=FRESHNESS.hours("peers", ticker))
         
         if isinstance(peers_raw, list) and len(peers_raw) > 0:
             current_p_str = json.dumps(peers_raw, sort_keys=True)
@@ -2889,10 +3129,10 @@ def run_tab4_premium_collection(ticker, company_name):
             
             try: # 2880라인
                 # 기존 캐시 확인 로직
-                res_p = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key_p).execute()
+                res_p = cached_select(tracker_key_p)
                 if res_p.data and current_p_str == res_p.data[0]['content']:
                     is_changed_p = False
-            except:
+            except Exception:
                 pass
             
             if is_changed_p:
@@ -2935,7 +3175,7 @@ def run_tab4_premium_collection(ticker, company_name):
 # ==========================================
 # [최종 수정본] Tab 3: 미시 지표 분석 (데이터 정직성 + 실시간 동기화)
 # ==========================================
-def run_tab3_analysis(ticker, company_name, raw_metrics, ipo_date_str=None):
+def run_tab3_analysis(ticker, company_name, raw_metrics, ipo_date_str=None, cik=None):
     if 'model_strict' not in globals() or not model_strict: return False
     
     print(f"🛠️[DEBUG-{ticker}] Tab3 프로세스 진입")
@@ -2946,7 +3186,7 @@ def run_tab3_analysis(ticker, company_name, raw_metrics, ipo_date_str=None):
     is_changed = True
     
     try:
-        res_tracker = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+        res_tracker = cached_select(tracker_key)
         if res_tracker.data and pristine_metrics_str == res_tracker.data[0]['content']:
             is_changed = False 
     except Exception as e: pass
@@ -2954,11 +3194,11 @@ def run_tab3_analysis(ticker, company_name, raw_metrics, ipo_date_str=None):
     # 🚀[가짜 트래커 자가 치유] 트래커가 같아도 실제 AI 리포트가 없으면 강제로 뚫고 들어감!
     if not is_changed:
         try:
-            res_check = supabase.table("analysis_cache").select("cache_key").eq("cache_key", f"{ticker}_Tab3_v2_Premium_ko").execute()
+            res_check = cached_select(f"{ticker}_Tab3_v2_Premium_ko")
             if not res_check.data:
                 is_changed = True 
                 print(f"🔄 [{ticker}] Tab 3 가짜 트래커 발견. 강제 재분석합니다.")
-        except: pass
+        except Exception: pass
 
     # AI 보강용 복사본 생성
     enriched_metrics = copy.deepcopy(raw_metrics)
@@ -2971,10 +3211,10 @@ def run_tab3_analysis(ticker, company_name, raw_metrics, ipo_date_str=None):
         try:
             limit_time_str = (datetime.now() - timedelta(hours=168)).isoformat()
             test_key = f"{ticker}_Tab3_Summary_ko"
-            res_exp = supabase.table("analysis_cache").select("updated_at").eq("cache_key", test_key).gt("updated_at", limit_time_str).execute()
+            res_exp = cached_select(test_key, newer_than=limit_time_str)
             if not res_exp.data:
                 force_search_run = True 
-        except: pass
+        except Exception: pass
 
     if not is_changed and not force_search_run:
         return True 
@@ -2986,6 +3226,29 @@ def run_tab3_analysis(ticker, company_name, raw_metrics, ipo_date_str=None):
     past_3_years = f"{curr_yr-2} {curr_yr-1} {curr_yr}"
     rich_raw_data_str = "N/A"
     
+    # =====================================================================
+    # 🚀 [Step 0] SEC XBRL companyfacts로 먼저 수치 복구 (AI 호출 없이 직접 계산)
+    # =====================================================================
+    if is_fmp_fin_poor and cik:
+        xbrl_summary = get_xbrl_summary(cik, SEC_HEADERS)
+        xbrl_metrics = xbrl_summary["metrics"] if xbrl_summary else {}
+        if xbrl_metrics.get("growth"):
+            print(f"🧮 [{ticker}] XBRL 재무 수치로 복구 완료. 구글 딥서치 생략")
+            for k in ["growth", "net_margin", "op_margin", "debt_equity", "accruals", "eps"]:
+                if k in xbrl_metrics: enriched_metrics[k] = xbrl_metrics[k]
+
+            raw_data = build_raw_financials(xbrl_summary)
+            rich_raw_data_str = ", ".join([f"{k}: {v}" for k, v in raw_data.items()])
+            enriched_metrics["raw_deep_data"] = rich_raw_data_str
+            can_fin_search = False
+
+            batch_upsert("analysis_cache", [{
+                "cache_key": f"{ticker}_Raw_Financials",
+                "content": json.dumps(enriched_metrics, ensure_ascii=False),
+                "updated_at": datetime.now().isoformat(),
+                "ticker": ticker, "data_type": "enriched_financial_data"
+            }], on_conflict="cache_key")
+
     # =====================================================================
     # 🚀 [Step 1] 구글 검색 데이터 보강 및 "카드 원본 JSON" 갱신
     # =====================================================================
@@ -3012,7 +3275,7 @@ def run_tab3_analysis(ticker, company_name, raw_metrics, ipo_date_str=None):
                 
                 def to_float(val):
                     try: return float(re.sub(r'[^0-9.-]', '', str(val)))
-                    except: return None
+                    except Exception: return None
                 
                 rev, p_rev, net = to_float(raw_data.get("revenue")), to_float(raw_data.get("prev_revenue")), to_float(raw_data.get("net_income"))
                 debt, equity, ocf = to_float(raw_data.get("total_debt")), to_float(raw_data.get("total_equity")), to_float(raw_data.get("operating_cash_flow"))
@@ -3073,7 +3336,7 @@ def run_tab3_analysis(ticker, company_name, raw_metrics, ipo_date_str=None):
         
         try:
             print(f"🛠️ [DEBUG-{ticker}] 캐시 DB 조회 중...")
-            res_tracker = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+            res_tracker = cached_select(tracker_key)
             if res_tracker.data and pristine_metrics_str == res_tracker.data[0]['content']:
                 is_changed = False 
         except Exception as e: 
@@ -3088,10 +3351,10 @@ def run_tab3_analysis(ticker, company_name, raw_metrics, ipo_date_str=None):
             try:
                 limit_time_str = (datetime.now() - timedelta(hours=168)).isoformat()
                 test_key = f"{ticker}_Tab3_Summary_ko"
-                res_exp = supabase.table("analysis_cache").select("updated_at").eq("cache_key", test_key).gt("updated_at", limit_time_str).execute()
+                res_exp = cached_select(test_key, newer_than=limit_time_str)
                 if not res_exp.data:
                     force_search_run = True 
-            except: pass
+            except Exception: pass
     
         if not is_changed and not force_search_run:
             print(f"🛠️ [DEBUG-{ticker}] 변경점 없음. 분석 스킵!")
@@ -3127,7 +3390,7 @@ def run_tab3_analysis(ticker, company_name, raw_metrics, ipo_date_str=None):
                     
                     def to_float(val):
                         try: return float(re.sub(r'[^0-9.-]', '', str(val)))
-                        except: return None
+                        except Exception: return None
                     
                     rev, p_rev, net = to_float(raw_data.get("revenue")), to_float(raw_data.get("prev_revenue")), to_float(raw_data.get("net_income"))
                     debt, equity, ocf = to_float(raw_data.get("total_debt")), to_float(raw_data.get("total_equity")), to_float(raw_data.get("operating_cash_flow"))
@@ -3414,12 +3677,12 @@ def run_tab3_premium_collection(ticker, company_name):
     try:
         # --- [1] 어닝서프라이즈 처리 ---
         surp_url = f"https://financialmodelingprep.com/stable/earnings-surprises?symbol={ticker}&apikey={FMP_API_KEY}"
-        surp_raw = get_fmp_data_with_cache(ticker, "RAW_SURPRISE", surp_url, valid_hours=24)
+        surp_raw = get_fmp_data_with_cache(ticker, "RAW_SURPRISE", surp_url, valid_hours=FRESHNESS.hours("surprise", ticker))
         
         # 🚀 [추가] 우선주로 실패 시 일반주로 재요청 폴백
         if not surp_raw and ticker != base_ticker:
             surp_url_base = f"https://financialmodelingprep.com/stable/earnings-surprises?symbol={base_ticker}&apikey={FMP_API_KEY}"
-            surp_raw = get_fmp_data_with_cache(base_ticker, "RAW_SURPRISE", surp_url_base, valid_hours=24)
+            surp_raw = get_fmp_data_with_cache(base_ticker, "RAW_SURPRISE", surp_url_base, valid_hours=FRESHNESS.hours("surprise", ticker))
         
         if isinstance(surp_raw, list) and len(surp_raw) > 0:
             current_surp_str = json.dumps(surp_raw, sort_keys=True)
@@ -3427,10 +3690,10 @@ def run_tab3_premium_collection(ticker, company_name):
             is_changed_s = True
             
             try:
-                res_s = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key_s).execute()
+                res_s = cached_select(tracker_key_s)
                 if res_s.data and current_surp_str == res_s.data[0]['content']:
                     is_changed_s = False # 💡 원본이 똑같으면 스킵!
-            except: pass
+            except Exception: pass
             
             if is_changed_s:
                 print(f"🔔 [{ticker}] 어닝서프라이즈 업데이트 감지! AI 요약 시작...")
@@ -3477,12 +3740,12 @@ def run_tab3_premium_collection(ticker, company_name):
 
         # --- [2] 실적전망치 처리 ---
         est_url = f"https://financialmodelingprep.com/stable/analyst-estimates?symbol={ticker}&period=annual&limit=2&apikey={FMP_API_KEY}"
-        est_raw = get_fmp_data_with_cache(ticker, "RAW_ESTIMATE", est_url, valid_hours=24)
+        est_raw = get_fmp_data_with_cache(ticker, "RAW_ESTIMATE", est_url, valid_hours=FRESHNESS.hours("estimate", ticker))
         
         # 🚀 [추가] 우선주로 실패 시 일반주로 재요청 폴백
         if not est_raw and ticker != base_ticker:
             est_url_base = f"https://financialmodelingprep.com/stable/analyst-estimates?symbol={base_ticker}&period=annual&limit=2&apikey={FMP_API_KEY}"
-            est_raw = get_fmp_data_with_cache(base_ticker, "RAW_ESTIMATE", est_url_base, valid_hours=24)
+            est_raw = get_fmp_data_with_cache(base_ticker, "RAW_ESTIMATE", est_url_base, valid_hours=FRESHNESS.hours("estimate", ticker))
         
         if isinstance(est_raw, list) and len(est_raw) > 0:
             current_est_str = json.dumps(est_raw, sort_keys=True)
@@ -3490,10 +3753,10 @@ def run_tab3_premium_collection(ticker, company_name):
             is_changed_e = True
             
             try:
-                res_e = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key_e).execute()
+                res_e = cached_select(tracker_key_e)
                 if res_e.data and current_est_str == res_e.data[0]['content']:
                     is_changed_e = False # 💡 원본이 똑같으면 스킵!
-            except: pass
+            except Exception: pass
             
             if is_changed_e:
                 print(f"🔔 [{ticker}] 실적전망치 업데이트 감지! AI 요약 시작...")
@@ -3615,14 +3878,14 @@ def run_tab3_revenue_premium_collection(ticker, company_name):
     
     try:
         url = f"https://financialmodelingprep.com/stable/revenue-product-segmentation?symbol={ticker}&structure=flat&period=annual&apikey={FMP_API_KEY}"
-        rev_raw = get_fmp_data_with_cache(ticker, "RAW_REVENUE_SEGMENT", url, valid_hours=24)
+        rev_raw = get_fmp_data_with_cache(ticker, "RAW_REVENUE_SEGMENT", url, valid_hours=FRESHNESS.hours("revenue_segment", ticker))
         
         is_rev_valid = (isinstance(rev_raw, list) and len(rev_raw) > 0) or (isinstance(rev_raw, dict) and len(rev_raw) > 0 and "Error Message" not in rev_raw)
         
         # 🚀 [추가] 우선주로 실패 시 일반주로 재요청 폴백
         if not is_rev_valid and ticker != base_ticker:
             url_base = f"https://financialmodelingprep.com/stable/revenue-product-segmentation?symbol={base_ticker}&structure=flat&period=annual&apikey={FMP_API_KEY}"
-            rev_raw = get_fmp_data_with_cache(base_ticker, "RAW_REVENUE_SEGMENT", url_base, valid_hours=24)
+            rev_raw = get_fmp_data_with_cache(base_ticker, "RAW_REVENUE_SEGMENT", url_base, valid_hours=FRESHNESS.hours("revenue_segment", ticker))
             is_rev_valid = (isinstance(rev_raw, list) and len(rev_raw) > 0) or (isinstance(rev_raw, dict) and len(rev_raw) > 0 and "Error Message" not in rev_raw)
 
         if not is_rev_valid: return
@@ -3632,10 +3895,10 @@ def run_tab3_revenue_premium_collection(ticker, company_name):
         is_changed = True
         
         try:
-            res_t = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+            res_t = cached_select(tracker_key)
             if res_t.data and current_raw_str == res_t.data[0]['content']:
                 is_changed = False
-        except: pass
+        except Exception: pass
 
         if not is_changed: return
 
@@ -3713,7 +3976,7 @@ def update_macro_data(df):
                 
             data["unprofitable_pct"] = 72.0 if data["ipo_volume"] > 10 else 60.0
             data["ipo_return"] = 15.2 if data["vix"] < 18 else 4.5
-    except: pass
+    except Exception: pass
 
     # [3] 시장 펀더멘털 데이터 수집 (FMP API)
     try:
@@ -3734,7 +3997,7 @@ def update_macro_data(df):
             if us_risk: 
                 erp = float(us_risk.get('totalEquityRiskPremium', 5.0))
                 data["fear_greed"] = max(0, min(100, 100 - ((erp - 3.0) * 20))) 
-    except: pass
+    except Exception: pass
 
     # [4] 실물 경제 지표 로드 (FRED 캐시 활용)
     real_economy_str = "N/A"
@@ -3747,7 +4010,7 @@ def update_macro_data(df):
             cpi = cur.get("CPIAUCSL", {}).get("val", "N/A")
             unrate = cur.get("UNRATE", {}).get("val", "N/A")
             real_economy_str = f"기준금리: {fed_rate}%, 소비자물가(CPI): {cpi}%, 실업률: {unrate}%"
-    except: pass
+    except Exception: pass
 
     # UI 수치 데이터 저장
     batch_upsert("analysis_cache", [{"cache_key": "Market_Dashboard_Metrics", "content": json.dumps(data), "updated_at": datetime.now().isoformat()}], "cache_key")
@@ -3757,10 +4020,10 @@ def update_macro_data(df):
     tracker_key = "Global_Macro_RawTracker"
     is_changed = True
     try:
-        res_t = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+        res_t = cached_select(tracker_key)
         if res_t.data and current_state_str == res_t.data[0]['content']:
             is_changed = False
-    except: pass
+    except Exception: pass
 
     if not is_changed:
         print("⏩ [거시경제] 지표 수치 변화 없음. AI 분석 스킵!")
@@ -3894,9 +4157,10 @@ def fetch_smart_money_data(symbol, api_key):
     
     # 내부 함수: 본주 Fallback 지원
     def get_with_fallback(api_type, url_template):
-        res = get_fmp_data_with_cache(symbol, api_type, url_template.format(sym=symbol))
+        valid_hours = FRESHNESS.hours("smart_money", symbol)
+        res = get_fmp_data_with_cache(symbol, api_type, url_template.format(sym=symbol), valid_hours)
         if (not isinstance(res, list) or len(res) == 0) and symbol != base_ticker:
-            res = get_fmp_data_with_cache(base_ticker, api_type, url_template.format(sym=base_ticker))
+            res = get_fmp_data_with_cache(base_ticker, api_type, url_template.format(sym=base_ticker), valid_hours)
         return res if isinstance(res, list) else []
 
     # 💡 [수정] 포맷 문자열로 변경하여 Fallback 지원
@@ -3933,7 +4197,7 @@ def run_tab6_analysis(ticker, company_name, smart_money_data):
             else: msg = "No verified data available from recent filings."
             
             empty_content = f"{msg} |||SEP||| {msg} |||SEP||| {msg} |||SEP||| {msg}"
-            batch_upsert("analysis_cache", [{"cache_key": cache_key, "content": empty_content, "updated_at": datetime.now().isoformat()}], "cache_key")
+            batch_upsert("analysis_cache", [{"cache_key": cache_key, "content": empty_content, "updated_at": datetime.now().isoformat()}], "cache_key", touch=False)
         
         # 💡 [핵심] 여기서 트래커만 갱신하고 함수를 종료(return)해버립니다.
         # 이렇게 하면 하단의 send_fcm_push 로직까지 도달하지 않습니다.
@@ -3947,14 +4211,15 @@ def run_tab6_analysis(ticker, company_name, smart_money_data):
     
     # 중복 체크 로직
     try:
-        res_tracker = supabase.table("analysis_cache").select("content").eq("cache_key", tracker_key).execute()
+        res_tracker = cached_select(tracker_key)
         if res_tracker.data and current_raw_str == res_tracker.data[0]['content']:
             return True # 변경사항 없으면 종료
-    except: pass
+    except Exception: pass
 
     print(f"🔔 [{ticker}] 실제 스마트머니 데이터 감지! AI 분석 및 알림 발송 준비...")
     
     analysis_performed = False
+    failed_langs = []
     for lang_code, target_lang in SUPPORTED_LANGS.items():
         cache_key = f"{ticker}_Tab6_SmartMoney_v1_{lang_code}"
         
@@ -3987,7 +4252,9 @@ def run_tab6_analysis(ticker, company_name, smart_money_data):
                     "data_type": "smart_money_report"
                 }], on_conflict="cache_key")
                 analysis_performed = True
-        except: pass
+                continue
+        except Exception as e: print(f"⚠️ [{ticker}] Tab6 {lang_code} 분석 실패: {e}")
+        failed_langs.append(lang_code)
 
     # 🚀 [알림 조건 강화] 
     # 1. AI 분석이 성공했고(analysis_performed)
@@ -4000,6 +4267,10 @@ def run_tab6_analysis(ticker, company_name, smart_money_data):
         )
         print(f"🚀 [{ticker}] 실제 데이터에 대한 푸시 알림 발송 완료")
 
+    # 한 언어라도 분석에 실패하면 트래커를 갱신하지 않음 (다음 실행에서 다시 분석)
+    if failed_langs:
+        print(f"⏸️ [{ticker}] Tab6 분석 미완료({', '.join(failed_langs)}) → 트래커 갱신 보류")
+        return False
     batch_upsert("analysis_cache", [{"cache_key": tracker_key, "content": current_raw_str, "updated_at": datetime.now().isoformat()}], "cache_key")
     return True
 
@@ -4010,75 +4281,53 @@ def run_tab6_analysis(ticker, company_name, smart_money_data):
 def run_premium_alert_engine(df_calendar):
     print("🕵️ 프리미엄 알림 엔진 가동 (FMP 캐싱 최적화 + 실시간 푸시)...")
     today = datetime.now().date()
-    new_alerts = []
     
     # DB에서 실시간 가격 맵 로드
     price_map = get_current_prices()
 
-    for _, row in df_calendar.iterrows():
-        ticker = row['symbol']
-        current_p = price_map.get(ticker, 0.0)
-        
-        try: ipo_date = pd.to_datetime(row['date']).date()
-        except: continue
-        
-        # --- 1. 일정 기반 알림 (기존 로직 유지) ---
-        if ipo_date == today + timedelta(days=3):
-            new_alerts.append({
-                "ticker": ticker, "alert_type": "UPCOMING", "title": f"{ticker} 상장 D-3", 
-                "message": "상장 전 월가 기관의 평가를 미리 확인하세요."
-            })
-        
-        if ipo_date + timedelta(days=180) == today + timedelta(days=7):
-            new_alerts.append({
-                "ticker": ticker, "alert_type": "LOCKUP", "title": f"{ticker} 락업해제 D-7", 
-                "message": "보호예수 물량 해제로 인한 주가 변동성에 주의하세요."
-            })
-
-        if current_p <= 0: continue
-
-        # --- 2. 기간별 통계적 유의 상승 로직 (FMP API 캐싱 적용) ---
-        try:
-            url = f"https://financialmodelingprep.com/stable/historical-price-eod/full?symbol={ticker}&timeseries=260&apikey={FMP_API_KEY}"
-            res = get_fmp_data_with_cache(ticker, "HIST", url, valid_hours=24)
-            
-            if res and 'historical' in res:
-                hist = res.get('historical', [])
-                if len(hist) >= 2:
-                    p_1d = hist[1]['close'] # 어제 종가
-                    if p_1d > 0 and ((current_p - p_1d) / p_1d) * 100 >= 12.0:
-                        new_alerts.append({"ticker": ticker, "alert_type": "SURGE_1D", "title": f"{ticker} 단기 급등 포착", "message": f"최근 1일 동안 {((current_p - p_1d) / p_1d) * 100:.1f}% 상승"})
-                
-                # ... (1주, 2주, 4주, 3개월, 1년 로직은 동일하므로 유지하시면 됩니다) ...
-                # (중략 - 기존 급등 로직 유지)
-        except: pass
+    # 🚀 [급등 엔진] 종목별 HIST는 여기서 한 번씩만 모으고, 기간별 / 공모가 / 일정 알림은 surge_engine이 전 종목 배열 연산으로 계산
+    df_calendar = df_calendar.reset_index(drop=True)
+    ipo_dates = pd.to_datetime(df_calendar['date'], errors='coerce')
+    traded = [t for t, d in zip(df_calendar['symbol'], ipo_dates) if pd.notna(d) and (price_map.get(t) or 0.0) > 0]
+    traded = list(dict.fromkeys(traded))
+    hist_map = {}
+    inst_alerts = []
+
+    # 🚀 [캐시 스냅샷] 100종목 단위로 HIST / Tab4 키를 일괄 선로딩 (종목당 단건 조회 2회 → 배치당 2~3회)
+    for pos in range(0, len(traded), 100):
+        chunk = traded[pos:pos + 100]
+        batch_keys = [k for t in chunk for k in (f"RAW_FMP_HIST_{t}", f"{t}_Tab4_v4_Premium_ko")]
+        CACHE_SNAPSHOT.preload(batch_keys)
+        for ticker in chunk:
+            # --- 기간별 급등 계산용 HIST (FMP API 캐싱 적용) ---
+            try:
+                url = f"https://financialmodelingprep.com/stable/historical-price-eod/full?symbol={ticker}&timeseries={HIST_DAYS}&apikey={FMP_API_KEY}"
+                res = get_fmp_data_with_cache(ticker, "HIST", url, valid_hours=24)
+                if res and 'historical' in res:
+                    hist_map[ticker] = res.get('historical', [])
+            except Exception: pass
 
-        # --- 3. 공모가 돌파 및 회복 시그널 (기존 로직 유지) ---
-        try:
-            ipo_p = float(str(row.get('price', '0')).replace('$', '').split('-')[0])
-            if ipo_p > 0:
-                surge_pct_ipo = ((current_p - ipo_p) / ipo_p) * 100
-                if surge_pct_ipo >= 20.0:
-                    new_alerts.append({"ticker": ticker, "alert_type": "SURGE_IPO", "title": f"{ticker} (+{surge_pct_ipo:.1f}%)", "message": f"공모가 대비 강력한 상승세 기록 중"})
-                elif 0 <= surge_pct_ipo < 3.0:
-                    new_alerts.append({"ticker": ticker, "alert_type": "REBOUND", "title": f"{ticker} 공모가 회복", "message": "주가가 공모가 위로 재진입하며 바닥 신호를 보냈습니다."})
-        except: pass
-
-        # --- 4. 월가 기관 투자심리 호조 시그널 (Tab 4 연동) ---
-        try:
-            # 💡 [주의] Tab 4에서 저장하는 캐시 키와 일치시켜야 합니다.
-            tab4_key = f"{ticker}_Tab4_v4_Premium_ko" 
-            res_tab4 = supabase.table("analysis_cache").select("content").eq("cache_key", tab4_key).execute()
-            if res_tab4.data:
-                tab4_data = json.loads(res_tab4.data[0]['content'])
-                rating_val = str(tab4_data.get('rating', '')).upper()
-                score_val = str(tab4_data.get('score', '0')).strip()
-                if ("BUY" in rating_val) or (score_val in ["4", "5"]):
-                    new_alerts.append({
-                        "ticker": ticker, "alert_type": "INST_UPGRADE", "title": f"{ticker} 기관 BUY 시그널", 
-                        "message": f"월가 전문 분석가의 긍정적인 투자 등급이 포착되었습니다."
-                    })
-        except: pass
+            # --- 월가 기관 투자심리 호조 시그널 (Tab 4 연동) ---
+            try:
+                # 💡 [주의] Tab 4에서 저장하는 캐시 키와 일치시켜야 합니다.
+                tab4_key = f"{ticker}_Tab4_v4_Premium_ko" 
+                res_tab4 = cached_select_alias(tab4_key, ticker)
+                if res_tab4.data:
+                    tab4_data = json.loads(res_tab4.data[0]['content'])
+                    rating_val = str(tab4_data.get('rating', '')).upper()
+                    score_val = str(tab4_data.get('score', '0')).strip()
+                    if ("BUY" in rating_val) or (score_val in ["4", "5"]):
+                        inst_alerts.append({
+                            "ticker": ticker, "alert_type": "INST_UPGRADE", "title": f"{ticker} 기관 BUY 시그널", 
+                            "message": f"월가 전문 분석가의 긍정적인 투자 등급이 포착되었습니다."
+                        })
+            except Exception: pass
+        CACHE_SNAPSHOT.evict(batch_keys)
+
+    new_alerts, stats = compute_alerts(df_calendar, price_map, hist_map, today, extra_alerts=inst_alerts)
+    counts = ", ".join(f"{t} {stats[t]}" for t in ALERT_ORDER if stats.get(t))
+    print(f"📈 [급등 엔진] {stats['tickers']}종목 (현재가 {stats['priced']} / HIST {stats['with_hist']}) → "
+          f"알림 {stats['alerts']}건 [{stats['compute_sec']}s] {counts}")
             
     if new_alerts:
         # DB 저장
@@ -4211,17 +4460,98 @@ def update_global_macro_and_events():
     except Exception as e: print(f"⚠️ FMP Economic Calendar Error: {e}")
 
 # 🚀 [수정된 메인 쓰레드 함수] 전체 재시도 루프(for attempt)를 제거하고 직관적으로 실행
-def process_single_ticker(idx, total, row, cik_mapping, name_to_ticker_map):
-    original_symbol = row.get('symbol')
-    name = row.get('name')
+def build_ticker_graph(official_symbol, name, row, cik_mapping, original_symbol):
+    """한 종목의 분석 단계 그래프 (입력/순서 의존만 선언, 나머지는 공용 실행기에서 동시에 실행)"""
+    row = row if row is not None else {}
     c_status = row.get('status', 'Active')
     c_date = row.get('date', None)
-    
-    clean_name = normalize_company_name(name)
-    official_symbol = name_to_ticker_map.get(clean_name, original_symbol)
-    
+    cik = (cik_mapping or {}).get(official_symbol)
+
+    def save_raw_financials():
+        unified_metrics = fetch_premium_financials(official_symbol, FMP_API_KEY)
+        batch_upsert("analysis_cache",[{
+            "cache_key": f"{official_symbol}_Raw_Financials",
+            "content": json.dumps(unified_metrics, ensure_ascii=False),
+            "updated_at": datetime.now().isoformat()
+        }], on_conflict="cache_key")
+        return unified_metrics
+
+    def tab0():
+        try:
+            return run_tab0_analysis(official_symbol, name, c_status, c_date, cik_mapping, original_symbol)
+        except BaseException:
+            # 중간에 멈춘 종목은 다음 실행에서 EDGAR 인덱스 게이트 없이 직접 확인
+            EDGAR_INDEX.mark_failed((cik_mapping or {}).get(official_symbol))
+            raise
+
+    graph = StageGraph(original_symbol)
+    graph.add("tab1", lambda: run_tab1_analysis(official_symbol, name, c_status, c_date), resources=["llm"])
+    graph.add("tab0", tab0, resources=["llm", "sec"])
+    graph.add("tab0_premium", lambda: run_tab0_premium_collection(official_symbol, name), resources=["llm"])
+    graph.add("tab2_esg", lambda: run_tab2_premium_collection(official_symbol, name), resources=["llm"])
+    graph.add("analyst", lambda: fetch_analyst_estimates(official_symbol, FMP_API_KEY), resources=["fmp"], default={})
+    graph.add("tab4", lambda analyst: run_tab4_analysis(official_symbol, name, c_status, c_date, analyst), inputs=["analyst"], resources=["llm"])
+    graph.add("tab4_ma", lambda: run_tab4_ma_premium_collection(official_symbol, name), resources=["llm"])
+    # Tab4 분석과 Tab4 프리미엄 수집은 같은 PremiumUpgrades/PremiumPeers 키를 쓰므로 순서 유지
+    graph.add("tab4_premium", lambda: run_tab4_premium_collection(official_symbol, name), after=["tab4"], resources=["llm"])
+    graph.add("financials", save_raw_financials, resources=["fmp"], default={})
+    graph.add("tab3", lambda financials: run_tab3_analysis(official_symbol, name, financials, cik=cik), inputs=["financials"], resources=["llm", "sec"])
+    graph.add("tab3_premium", lambda: run_tab3_premium_collection(official_symbol, name), resources=["llm"])
+    graph.add("tab3_revenue", lambda: run_tab3_revenue_premium_collection(official_symbol, name), resources=["llm"])
+    graph.add("smart_money", lambda: fetch_smart_money_data(official_symbol, FMP_API_KEY), resources=["fmp"])
+    graph.add("tab6", lambda smart_money: run_tab6_analysis(official_symbol, name, smart_money), inputs=["smart_money"], resources=["llm"])
+    # [마케팅 단계] 트위터는 Tab1 요약을 읽으므로 Tab1 뒤에 실행 (AI 실패와 무관하게 팩트 기반 포스팅 가능)
+    graph.add("twitter", lambda analyst, financials: send_to_twitter_connector(official_symbol, name, row, financials or {}, analyst or {}),
+              inputs=["analyst", "financials"], after=["tab1"])
+    return graph
+
+TICKER_GRAPH = build_ticker_graph(None, None, None, None, None)   # 단계 이름 / 의존성 조회용 (실행하지 않음)
+TICKER_STAGES = list(TICKER_GRAPH.stages)
+
+def run_ticker_stages(graph, original_symbol, context):
+    """단계 그래프를 실행하고, 단계가 끝날 때마다 실행 저널에 기록합니다."""
+    def on_finish(stage, status, kwargs, busy):
+        if RUN_JOURNAL:
+            RUN_JOURNAL.record(original_symbol, stage, status, input_fingerprint(context, kwargs), busy)
+
+    stage_run = STAGE_EXECUTOR.run(graph, on_finish=on_finish)
+    print(f"⏱️ [{original_symbol}] {stage_run.summary()}")
+    return stage_run
+
+def ticker_context(official_symbol, row):
+    """실행 조건 지문의 재료 (종목명 / 상장 상태 / 상장일). 배치 payload(JSON)로 넘어온 행과 같은 값이 되도록 정규화"""
+    values = [row.get('name'), row.get('status', 'Active'), row.get('date', None)]
+    return [official_symbol] + [None if v is None or pd.isna(v) else str(v) for v in values]
+
+def resolve_official_symbol(row, cik_mapping, name_to_ticker_map):
+    """캘린더 티커 → SEC 공식 티커 (회사명 기준 보정). 보정된 경우 캘린더 티커에도 같은 CIK를 연결"""
+    original_symbol = row.get('symbol')
+    official_symbol = name_to_ticker_map.get(normalize_company_name(row.get('name')), original_symbol)
     if original_symbol != official_symbol and official_symbol in cik_mapping:
         cik_mapping[original_symbol] = cik_mapping[official_symbol]
+    return official_symbol
+
+def process_single_ticker(idx, total, row, cik_mapping, name_to_ticker_map):
+    original_symbol = row.get('symbol')
+    name = row.get('name')
+    official_symbol = resolve_official_symbol(row, cik_mapping, name_to_ticker_map)
+
+    if cancellation.current().cancelled: return
+    FRESHNESS.track(official_symbol, lifecycle_state(row.get('status', 'Active'), row.get('date')))
+
+    # 🔎 [변경 감지] 사전 점검에서 바뀐 단계만 (샤드 워커는 배치 행의 _stages)
+    context = ticker_context(official_symbol, row)
+    stages = TICKER_STAGES
+    planned = row.get('_stages')
+    if planned is None and CHANGE_PLAN: planned = CHANGE_PLAN.stages_for(str(original_symbol))
+    if planned is not None:
+        stages = [s for s in TICKER_STAGES if s in planned]
+    # 🚀 [실행 저널] --resume: 이전 실행에서 같은 조건으로 끝낸 단계는 건너뜀
+    if RUN_JOURNAL and RUN_JOURNAL.resuming:
+        stages = RUN_JOURNAL.pending_stages(str(original_symbol), stages, input_fingerprint(context))
+    if not stages:
+        print(f"⏭️ [{idx}/{total}] {original_symbol}: 실행할 단계 없음 (변경 없음 / 이전 실행에서 완료)")
+        return
 
     print(f"\n⚡[{idx}/{total}] 쓰레드 가동: {original_symbol} 분석 중...")
     
@@ -4235,47 +4565,114 @@ def process_single_ticker(idx, total, row, cik_mapping, name_to_ticker_map):
         print(f"⚠️ [스킵] {original_symbol} Ticker가 존재하지 않아 분석을 건너뜁니다.")
         return 
 
-    # [분석 단계] - 각 함수가 내부적으로 알아서 에러를 삼키고 다음으로 넘어가도록 설계됨
+    # 🚀 [캐시 스냅샷] 이 종목의 트래커/리포트/FMP 캐시 키를 한두 번의 조회로 미리 로딩
+    snapshot_keys = get_ticker_snapshot_keys(official_symbol, name)
+    CACHE_SNAPSHOT.preload(snapshot_keys)
+
+    # [분석 단계] 단계 하나가 실패해도 그 출력을 입력으로 쓰는 단계만 건너뛰고 나머지는 계속 진행
+    graph = build_ticker_graph(official_symbol, name, row, cik_mapping, original_symbol)
+    if len(stages) < len(TICKER_STAGES):
+        graph = graph.subgraph(stages)
+        print(f"🎯 [{original_symbol}] 일부 단계만 실행: {', '.join(graph.stages)}")
     try:
-        run_tab1_analysis(official_symbol, name, c_status, c_date)
-        run_tab0_analysis(official_symbol, name, c_status, c_date, cik_mapping, original_symbol)
-        run_tab0_premium_collection(official_symbol, name)
-        run_tab2_premium_collection(official_symbol, name) 
-        
-        analyst_metrics = fetch_analyst_estimates(official_symbol, FMP_API_KEY)
-        run_tab4_analysis(official_symbol, name, c_status, c_date, analyst_metrics)
-        run_tab4_ma_premium_collection(official_symbol, name) 
-        run_tab4_premium_collection(official_symbol, name) 
-        
-        unified_metrics = fetch_premium_financials(official_symbol, FMP_API_KEY)
-        batch_upsert("analysis_cache",[{
-            "cache_key": f"{official_symbol}_Raw_Financials",
-            "content": json.dumps(unified_metrics, ensure_ascii=False),
-            "updated_at": datetime.now().isoformat()
-        }], on_conflict="cache_key")
-        
-        run_tab3_analysis(official_symbol, name, unified_metrics)
-        run_tab3_premium_collection(official_symbol, name)
-        run_tab3_revenue_premium_collection(official_symbol, name) 
-        
-        smart_money_data = fetch_smart_money_data(official_symbol, FMP_API_KEY)
-        run_tab6_analysis(official_symbol, name, smart_money_data)
-        
+        run_ticker_stages(graph, original_symbol, context)
     except Exception as e:
         print(f"🚨 [{original_symbol}] 파이프라인 진행 중 예외 발생: {e}")
 
-    # [마케팅 단계] 트위터 커넥터는 독립적으로 실행 (AI 실패와 무관하게 팩트 기반 포스팅 가능)
+    CACHE_SNAPSHOT.evict(snapshot_keys)
+
+    # 디도스 방어용 짧은 휴식 (종목 간의 간격 확보, 취소되면 바로 반환)
+    cancellation.current().wait(1)
+
+
+# 💡 DB의 알람 코드를 UI용 깔끔한 영문으로 완벽 매핑
+SIGNAL_LABELS_EN = {
+    "UPCOMING": "IPO Approaching",
+    "LOCKUP": "Lock-up Expiry",
+    "SURGE_1D": "1D Surge",
+    "SURGE_1W": "1W Surge",
+    "SURGE_4W": "4W Surge",
+    "SURGE_3M": "3M Surge",
+    "SURGE_1Y": "1Y Surge",
+    "SURGE_IPO": "IPO Price Surge",
+    "REBOUND": "Bottom Rebound",
+    "INST_UPGRADE": "Inst. Upgrade",
+    "8K_UPDATE": "8-K Material Event"
+}
+
+def get_alert_type_counts(since_iso):
+    """{alert_type: 개수} - 서버 집계 RPC(premium_alert_type_counts) 우선, 미적용 DB면 페이지 단위로 읽어 집계"""
+    try:
+        res = supabase.rpc("premium_alert_type_counts", {"since": since_iso}).execute()
+        return {r['alert_type']: int(r['alerts'] or 0) for r in (res.data or [])}
+    except Exception as e:
+        print(f"⚠️ [집계 RPC] premium_alert_type_counts 실패 (행 단위 집계로 대체): {e}")
+    counts = {}
+    for a in fetch_all_rows(supabase, "premium_alerts", "id, alert_type", order="id", filters=lambda q: q.gte("created_at", since_iso)):
+        counts[a['alert_type']] = counts.get(a['alert_type'], 0) + 1
+    return counts
+
+def get_alert_ticker_activity(since_iso):
+    """{ticker: (알림 수, {알림 종류})} - 종목마다 조회하던 것을 RPC(premium_alert_ticker_activity) 한 번으로"""
+    try:
+        res = supabase.rpc("premium_alert_ticker_activity", {"since": since_iso}).execute()
+        return {r['ticker']: (int(r['alerts'] or 0), set(r['alert_types'] or [])) for r in (res.data or [])}
+    except Exception as e:
+        print(f"⚠️ [집계 RPC] premium_alert_ticker_activity 실패 (행 단위 집계로 대체): {e}")
+    activity = {}
+    for a in fetch_all_rows(supabase, "premium_alerts", "id, ticker, alert_type", order="id", filters=lambda q: q.gte("created_at", since_iso)):
+        cnt, types = activity.get(a['ticker'], (0, set()))
+        types.add(a['alert_type'])
+        activity[a['ticker']] = (cnt + 1, types)
+    return activity
+
+def load_priority_signals(target_df, cik_mapping, name_to_ticker_map):
+    """우선순위 스케줄러 입력 신호 {symbol: {...}} - 집계 RPC가 없으면 해당 신호만 생략(중립값)"""
+    symbols = [str(s) for s in target_df['symbol']]
+    signals = {s: {} for s in symbols}
+    now = datetime.now()
+    # 캘린더 티커 → 워커가 리포트를 저장하는 SEC 공식 티커 (회사명 기준 보정)
+    official = {str(r['symbol']): name_to_ticker_map.get(normalize_company_name(r.get('name')), r.get('symbol'))
+                for _, r in target_df.iterrows()}
+
+    # 1. 마지막 리포트 갱신 시각 (report_index는 공식 티커 기준, 한 번도 없으면 'never')
     try:
-        # unified_metrics, analyst_metrics가 갱신 안 됐어도 빈 딕셔너리로 대응 가능
-        send_to_twitter_connector(official_symbol, name, row, 
-                                  locals().get('unified_metrics', {}), 
-                                  locals().get('analyst_metrics', {}))
-    except Exception as e: 
-        print(f"⚠️ Twitter Connector Error: {e}")
+        res = supabase.rpc("report_index_ticker_freshness", {}).execute()
+        fresh = {r['ticker']: r['last_updated'] for r in (res.data or [])}
+        for s in symbols:
+            o = str(official.get(s) or s)
+            signals[s]["last_updated"] = fresh.get(o) or fresh.get(s) or fresh.get(get_base_ticker(o)) or "never"
+    except Exception as e:
+        print(f"⚠️ [우선순위] 리포트 신선도 신호 생략 (migrations/005 확인): {e}")
 
-    # 디도스 방어용 짧은 휴식 (종목 간의 간격 확보)
-    time.sleep(1)
+    # 2. 최근 24시간 알림 (급등 / 8-K / 기관 등급 등)
+    try:
+        activity = get_alert_ticker_activity((now - timedelta(days=1)).isoformat())
+        for s in symbols:
+            signals[s]["alerts"] = activity.get(s, (0, set()))[0]
+    except Exception as e:
+        print(f"⚠️ [우선순위] 알림 신호 생략: {e}")
 
+    # 3. 관심도 (워치리스트 / 최근 7일 행동 로그, 프리미엄 회원 분리)
+    try:
+        res = supabase.rpc("ticker_interest_scores", {"since": (now - timedelta(days=7)).isoformat()}).execute()
+        for r in (res.data or []):
+            if r['ticker'] in signals:
+                signals[r['ticker']].update({k: int(r.get(k) or 0) for k in ["watchers", "premium_watchers", "actions", "premium_actions"]})
+    except Exception as e:
+        print(f"⚠️ [우선순위] 관심도 RPC 실패 (워치리스트 수만 사용): {e}")
+        try:
+            for r in fetch_all_rows(supabase, "watchlist", "ticker", order="ticker"):
+                if r.get('ticker') in signals:
+                    signals[r['ticker']]["watchers"] = signals[r['ticker']].get("watchers", 0) + 1
+        except Exception: pass
+
+    # 4. EDGAR 신규 공시 (이번 실행에서 읽은 daily-index 이벤트)
+    if EDGAR_INDEX.ready:
+        for s in symbols:
+            cik = cik_mapping.get(official.get(s)) or cik_mapping.get(s)
+            if cik: signals[s]["edgar_events"] = len(EDGAR_INDEX.events_for(cik))
+    return signals
 
 def get_global_market_stats():
     """오늘 전체 시장에서 발생한 알람 수와 상위 4개 종류 집계"""
@@ -4283,16 +4680,15 @@ def get_global_market_stats():
     today_start = datetime(now.year, now.month, now.day).isoformat()
     
     try:
-        # 오늘 발생한 모든 알람 가져오기
-        res = supabase.table("premium_alerts").select("alert_type").gte("created_at", today_start).execute()
-        all_alerts = res.data or []
-        total_count = len(all_alerts)
+        # 오늘 발생한 알람 종류별 개수 (서버 집계)
+        type_counts = get_alert_type_counts(today_start)
+        total_count = sum(type_counts.values())
         
         # 종류별 집계 (영어 라벨 적용)
         counts = {}
-        for a in all_alerts:
-            name = SIGNAL_LABELS_EN.get(a['alert_type'], a['alert_type'])
-            counts[name] = counts.get(name, 0) + 1
+        for a_type, cnt in type_counts.items():
+            name = SIGNAL_LABELS_EN.get(a_type, a_type)
+            counts[name] = counts.get(name, 0) + cnt
             
         # 개수 순으로 정렬하여 상위 4개 추출
         top_4 = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:4]
@@ -4301,39 +4697,28 @@ def get_global_market_stats():
         print(f"⚠️ Global Market Stats 집계 에러: {e}")
         return 0, []
 
-def update_alarm_summary_cache(ticker, global_total, global_surge_counts):
+def update_alarm_summary_cache(ticker, global_total, global_surge_counts, ticker_activity=None):
     """
     비결제 유저 후킹용 프리미엄 알람 요약 (100% English UI Format)
     global_surge_counts 예시: {"1W": 12, "4W": 5, "3M": 2}
+    ticker_activity: get_alert_ticker_activity() 결과 (없으면 이 종목만 직접 조회)
     """
     now = datetime.now()
     seven_days_ago = (now - timedelta(days=7)).isoformat()
 
     try:
-        # 1. 특정 종목 최근 7일 알림 데이터 가져오기
-        res_ticker = supabase.table("premium_alerts").select("alert_type").eq("ticker", ticker).gte("created_at", seven_days_ago).execute()
-        ticker_alerts = res_ticker.data or []
-        ticker_7d_total = len(ticker_alerts)
-
-        # 💡 DB의 알람 코드를 UI용 깔끔한 영문으로 완벽 매핑
-        SIGNAL_LABELS_EN = {
-            "UPCOMING": "IPO Approaching",
-            "LOCKUP": "Lock-up Expiry",
-            "SURGE_1D": "1D Surge",
-            "SURGE_1W": "1W Surge",
-            "SURGE_4W": "4W Surge",
-            "SURGE_3M": "3M Surge",
-            "SURGE_1Y": "1Y Surge",
-            "SURGE_IPO": "IPO Price Surge",
-            "REBOUND": "Bottom Rebound",
-            "INST_UPGRADE": "Inst. Upgrade",
-            "8K_UPDATE": "8-K Material Event"
-        }
+        # 1. 특정 종목 최근 7일 알림 수 / 종류
+        if ticker_activity is not None:
+            ticker_7d_total, alert_types = ticker_activity.get(ticker, (0, set()))
+        else:
+            res_ticker = supabase.table("premium_alerts").select("alert_type").eq("ticker", ticker).gte("created_at", seven_days_ago).execute()
+            ticker_alerts = res_ticker.data or []
+            ticker_7d_total = len(ticker_alerts)
+            alert_types = {a['alert_type'] for a in ticker_alerts}
         
         # 중복 알람 카테고리 제거
         unique_alerts = set()
-        for a in ticker_alerts:
-            raw_type = a['alert_type']
+        for raw_type in alert_types:
             friendly_name = SIGNAL_LABELS_EN.get(raw_type, raw_type)
             unique_alerts.add(friendly_name)
         
@@ -4369,25 +4754,53 @@ def update_alarm_summary_cache(ticker, global_total, global_surge_counts):
 # ==========================================
 # [4] 메인 실행 루프
 # ==========================================
-def main():
-    print(f"🚀 Worker Process 시작: {datetime.now()}")
-    
-
+def open_run_journal(resume=None, run_id=None):
+    """resume: None(새 실행) / "latest"(마지막 미완료 실행) / run_id. run_id는 새 실행의 ID (샤드 워커는 cycle_id)"""
+    try:
+        supabase.table(JOURNAL_TABLE).select("run_id").limit(1).execute()
+    except Exception as e:
+        print(f"⚠️ [실행 저널] 비활성화 (migrations/006_run_journal.sql 적용 여부 확인): {e}")
+        return None
+    if not resume:
+        return RunJournal(supabase, WRITE_BUFFER.add, run_id)
+    run_id = resume
+    if resume == "latest":
+        header = latest_run(supabase)
+        if not header:
+            print("ℹ️ [실행 저널] 이어서 실행할 미완료 실행이 없습니다. 새 실행으로 시작합니다.")
+            return RunJournal(supabase, WRITE_BUFFER.add)
+        run_id = header["run_id"]
+    journal = RunJournal(supabase, WRITE_BUFFER.add, run_id)
+    done_cnt = journal.load()
+    print(f"🔁 [실행 저널] {run_id} 이어서 실행: 완료 단계 {done_cnt}개 / 계획 종목 {len(journal.planned)}개")
+    return journal
+
+# 🚀 [실행 시간 제한] Actions 6시간 제한 전에 후속 단계까지 끝내도록
+MAX_RUN_TIME_SEC = 5.5 * 3600  # 5.5시간(19,800초)
+
+# 🧩 [샤드 워커] 배치 하나(리스 단위)의 종목 수 / 리더 게시 · 다른 프로세스 배치 대기 폴링 간격(초)
+SHARD_BATCH_SIZE = 10
+SHARD_POLL_SEC = 20
+
+def prepare_cycle(calendar=None, macro=True):
+    """[전역 단계] 매크로 / stock_cache 명단 / 타겟 선별. 반환값: (전체 캘린더, 분석 대상, 회사명 별칭용 행)
+    calendar / macro=False: 데몬 모드가 데워 둔 IPO 캘린더를 쓰고 매크로는 별도 작업에서 갱신"""
     # 👇👇👇 [기존 코드 유지] 👇👇👇
-    update_global_macro_and_events()
+    if macro: update_global_macro_and_events()
     
-    df = get_target_stocks()
+    df = calendar.copy() if calendar is not None else get_target_stocks()
     if df.empty: 
         print("⚠️ 수집된 IPO 종목이 없습니다.")
-        return
+        return df, None, []
 
     print("\n📋 [stock_cache] 명단 업데이트 및 신규 편입 식별 시작...")
     
     try:
-        res_known = supabase.table("stock_cache").select("symbol").execute()
-        known_tickers = {item['symbol'] for item in res_known.data}
+        known_rows = fetch_all_rows(supabase, "stock_cache", "symbol, name", order="symbol", workers=4)
+        known_tickers = {item['symbol'] for item in known_rows}
     except Exception as e:
         print(f"⚠️ 기존 Ticker 로드 실패 (초기화 상태로 간주): {e}")
+        known_rows = []
         known_tickers = set()
         
     now_iso = datetime.now().isoformat()
@@ -4399,7 +4812,7 @@ def main():
         sym = str(row['symbol'])
         
         try: ipo_dt = pd.to_datetime(row['date']).date()
-        except: ipo_dt = today_date
+        except Exception: ipo_dt = today_date
         
         if known_tickers and (sym not in known_tickers) and (ipo_dt <= today_date):
             sudden_additions.append(sym)
@@ -4412,22 +4825,25 @@ def main():
         
     if sudden_additions:
         try:
-            old_res = supabase.table("analysis_cache").select("content").eq("cache_key", "SUDDEN_ADDITIONS_LIST").execute()
+            old_res = cached_select("SUDDEN_ADDITIONS_LIST")
             if old_res.data:
                 old_list = json.loads(old_res.data[0]['content'])
                 sudden_additions = list(set(old_list + sudden_additions))
-        except: pass
+        except Exception: pass
         
         batch_upsert("analysis_cache", [{
             "cache_key": "IPO_CALENDAR_DATA",
             "content": df.to_json(orient='records'),
             "updated_at": datetime.now().isoformat()
-        }], on_conflict="cache_key")
+        }], on_conflict="cache_key", touch=False)
         print(f"✨ 신규 편입(스팩/직상장) 누적 {len(sudden_additions)}개 식별 및 DB 저장 완료.")
 
     batch_upsert("stock_cache", stock_list, on_conflict="symbol")
     update_macro_data(df)
-    
+    return df, select_target_df(df), known_rows + stock_list
+
+def select_target_df(df):
+    """분석 대상 선별 (DB 쓰기 없음 - 실행 계획 미리보기도 같은 규칙을 씀)"""
     # ------------------ 💡 18개월 이내 상장 기업 타겟팅 ------------------
     print("🔥 타겟 종목 선별 중 (35일 상장예정 + 18개월 신규상장)...")
     price_map = get_current_prices() 
@@ -4450,45 +4866,677 @@ def main():
     print(f"✅ 최종 분석 대상: 총 {len(target_symbols)}개 종목 (중복 제거)")
 
     target_df = df[df['symbol'].isin(target_symbols)]
-    total = len(target_df)
-    
-    print("\n🏛️ SEC EDGAR CIK 매핑 데이터 로드 중 (API 최적화)...")
-    cik_mapping, name_to_ticker_map = get_sec_master_mapping()
+    # 🧾 [실행 저널] 이어서 실행할 때는 중단된 실행의 계획 종목만 (캘린더가 바뀌어도 같은 범위)
+    if RUN_JOURNAL and RUN_JOURNAL.resuming and RUN_JOURNAL.planned:
+        target_df = df[df['symbol'].astype(str).isin(set(RUN_JOURNAL.planned))]
+        print(f"🔁 [실행 저널] 계획 종목 {len(RUN_JOURNAL.planned)}개 중 {len(target_df)}개 재대상")
+    return target_df
+
+def prepare_process(target_rows, alias_rows, backfill=True, sec_mapping=None):
+    """[프로세스 준비] SEC CIK 매핑 / 회사명 인덱스 / 티커 별칭 / 리포트 인덱스 / EDGAR 인덱스
+    sec_mapping: 데몬 모드가 데워 둔 (cik_mapping, name_to_ticker_map) - 있으면 SEC 파일을 다시 받지 않음"""
+    global REPORT_INDEX_ENABLED
+    if sec_mapping:
+        # 종목 처리 중 별칭 CIK를 덧붙이므로 데워 둔 원본은 건드리지 않도록 복사
+        cik_mapping, name_to_ticker_map = dict(sec_mapping[0]), dict(sec_mapping[1])
+    else:
+        print("\n🏛️ SEC EDGAR CIK 매핑 데이터 로드 중 (API 최적화)...")
+        cik_mapping, name_to_ticker_map = get_sec_master_mapping()
     print(f"✅ 총 {len(cik_mapping)}개의 SEC 식별번호 확보 완료.")
-    
-    print(f"\n🤖 Vertex AI 기반 병렬 심층 분석 시작 (총 {total}개 종목)...")
-    
-    WORKER_START_TIME = time.time()
-    MAX_RUN_TIME_SEC = 5.5 * 3600  # 5.5시간(19,800초)
+    alias_cnt = NAME_RESOLVER.add_aliases(alias_rows, cik_mapping)
+    print(f"✅ 로컬 회사명 인덱스 구축 완료 (stock_cache 별칭 {alias_cnt}개 추가)")
+    print(f"✅ 티커 별칭 매핑 {load_ticker_aliases()}개 로드 완료 (우선주/유닛 → 본주)")
+
+    # 🚀 [리포트 인덱스] 테이블이 비어 있으면 (최초 1회) 기존 analysis_cache로 인덱스 채우기
+    try:
+        res_idx = supabase.table(INDEX_TABLE).select("cache_key", count="exact").limit(1).execute()
+        if not res_idx.count and backfill:
+            print("🗂️ [리포트 인덱스] 비어 있음 → analysis_cache 기준으로 백필 시작...")
+            print(f"✅ [리포트 인덱스] {backfill_index(supabase, WRITE_BUFFER.add)}개 리포트 인덱싱 완료")
+    except Exception as e:
+        REPORT_INDEX_ENABLED = False
+        print(f"⚠️ [리포트 인덱스] 비활성화 (migrations/001_report_index.sql 적용 여부 확인): {e}")
+
+    # 🚀 [EDGAR 인덱스] HWM 이후의 daily-index를 한 번만 읽어 추적 종목의 신규 공시 이벤트 추출
+    try:
+        res_hwm = cached_select("EDGAR_DAILY_INDEX_HWM")
+        EDGAR_INDEX.load_state(res_hwm.data[0]['content'] if res_hwm.data else None)
+
+        tracked_ciks = set(EDGAR_INDEX.covered.keys())
+        for t_row in target_rows:
+            official = name_to_ticker_map.get(normalize_company_name(t_row.get('name')), t_row.get('symbol'))
+            for sym in [official, t_row.get('symbol')]:
+                if cik_mapping.get(sym): tracked_ciks.add(cik_mapping[sym])
+        EDGAR_INDEX.refresh(tracked_ciks)
+    except Exception as e:
+        print(f"⚠️ [EDGAR 인덱스] 로드 실패 (종목별 직접 조회로 진행): {e}")
+    return cik_mapping, name_to_ticker_map
+
+def build_change_plan(target_rows, cik_mapping, name_to_ticker_map, offline=False):
+    """🔎 [변경 감지] 대상 종목의 dirty (종목, 단계)만 담은 실행 계획. 판단할 수 없으면 None (전체 실행)
+    offline: FMP 피드를 읽지 않음 (실행 계획 미리보기 - 피드 연결 단계는 실행하는 것으로 계산)"""
+    if os.environ.get("CHANGE_DETECT", "on").lower() == "off" or not RUN_JOURNAL: return None
+    targets = []
+    for row in target_rows:
+        sym = str(row.get('symbol'))
+        official = name_to_ticker_map.get(normalize_company_name(row.get('name')), sym)
+        try: ipo_date = pd.to_datetime(row.get('date')).date()
+        except Exception: ipo_date = None
+        targets.append({
+            "ticker": sym,
+            "symbols": sorted({official, get_base_ticker(official), sym}),
+            "context_fp": input_fingerprint(ticker_context(official, row)),
+            "cik": cik_mapping.get(official) or cik_mapping.get(sym),
+            "ipo_date": ipo_date if ipo_date == ipo_date else None,   # NaT 제외
+            "lifecycle": lifecycle_state(row.get('status', 'Active'), row.get('date')),
+        })
+    try:
+        plan = ChangeDetector(supabase, None if offline else FMP_API_KEY, EDGAR_INDEX,
+                              freshness=FRESHNESS).build(targets, TICKER_STAGES)
+    except Exception as e:
+        print(f"⚠️ [변경 감지] 사전 점검 실패 → 전체 단계 실행 (migrations/008_stage_last_checked.sql 적용 여부 확인): {e}")
+        return None
+    print(f"🔎 [변경 감지] {plan.report()}")
+    return plan
 
+def run_ticker_pool(ranked_rows, total, cik_mapping, name_to_ticker_map, deadline, on_start=None, should_run=None):
+    """(순번, 종목 행)을 제출 순서대로 스레드 풀에서 분석합니다. 반환값: 시간 제한 / 종료 신호로 중단했는지"""
     # 🚀[병렬 스레드 풀 적용]
-    # 한 번에 5개의 기업을 동시에 분석합니다. (Vertex AI의 한도에 따라 최대 10~20까지 조절 가능)
-    max_threads = 5 
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
-        futures =[]
-        for idx, row in target_df.iterrows():
-            futures.append(
-                executor.submit(process_single_ticker, idx+1, total, row, cik_mapping, name_to_ticker_map)
-            )
-        
-        for future in concurrent.futures.as_completed(futures):
-            # 5.5시간 강제 종료 방어막
-            if time.time() - WORKER_START_TIME > MAX_RUN_TIME_SEC:
-                print("⏳[알림] 작업 제한 시간 임박! 대기 중인 스레드를 취소합니다.")
-                executor.shutdown(wait=False, cancel_futures=True)
-                break
+    # 한 번에 TICKER_CONCURRENCY개의 기업을 동시에 분석합니다. (실제 호출 동시성은 단계 실행기의 풀이 제한)
+    # 🛑 [협조적 취소] 분석 토큰 = 실행 토큰 + 마감 시각. 단계마다 이 토큰의 남은 시간 안에서 단계 마감 시각을 받음
+    token = RUN_TOKEN.child(max(deadline - time.time(), 0.001))
+    is_time_over = False
+    drain_until = None
+    done_count = 0
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=TICKER_CONCURRENCY)
+
+    def run_one(rank, row):
+        if token.cancelled: return
+        if should_run and not should_run(row): return
+        if on_start: on_start(row)
+        with cancellation.scope(token):
+            return process_single_ticker(rank, total, row, cik_mapping, name_to_ticker_map)
+
+    futures =[]
+    for rank, row in ranked_rows:
+        futures.append(executor.submit(run_one, rank, row))
+
+    remaining = set(futures)
+    while remaining:
+        finished, remaining = concurrent.futures.wait(remaining, timeout=5, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in finished:
+            if future.cancelled(): continue
             try:
                 future.result() # 스레드에서 발생한 예외 캐치
-            except Exception as exc:
+            except (Exception, Cancelled) as exc:
                 print(f"🔥 스레드 실행 중 예외 발생: {exc}")
+            done_count += 1
+            if done_count % POOL_STATUS_EVERY == 0:
+                print(f"📊 [풀 상태] {done_count}/{len(futures)} | {STAGE_EXECUTOR.status()} | {WRITE_BUFFER.status()}")
+
+        # 5.5시간 강제 종료 방어막 / 종료 신호: 대기 중인 종목은 버리고, 실행 중인 종목은 단계를 정리할 때까지 대기
+        if token.cancelled and drain_until is None:
+            print(f"⏳[알림] 실행 취소({token.reason})! 대기 중인 종목을 취소하고 실행 중인 {len(remaining)}개 스레드를 정리합니다.")
+            executor.shutdown(wait=False, cancel_futures=True)
+            is_time_over = True
+            drain_until = time.time() + DRAIN_GRACE_SEC
+        if drain_until and time.time() > drain_until:
+            print(f"⚠️ [협조적 취소] {DRAIN_GRACE_SEC}초 안에 끝나지 않은 스레드 {len(remaining)}개는 기다리지 않고 진행")
+            break
+
+    executor.shutdown(wait=False)
+    # 🚀 [쓰기 버퍼] 강제 종료 전에 완료된 분석 결과부터 확실히 저장
+    if is_time_over: WRITE_BUFFER.flush_all()
+    return is_time_over
+
+def run_journal_phase(phase, fn):
+    """실행 전체 단계 (이어서 실행 시 이미 끝났으면 건너뜀)"""
+    if RUN_JOURNAL and RUN_JOURNAL.is_done(RUN_TICKER, phase):
+        print(f"⏭️ [실행 저널] '{phase}' 단계는 이전 실행에서 완료")
+        return
+    phase_start = time.time()
+    try:
+        fn()
+        status = "done"
+    except Exception as e:
+        print(f"🚨 [{phase}] 실패: {e}")
+        status = "failed"
+    if RUN_JOURNAL: RUN_JOURNAL.record(RUN_TICKER, phase, status, duration=time.time() - phase_start)
+
+def finalize_cycle(df, started, is_time_over):
+    """[전역 후속 단계] EDGAR HWM / 알림 엔진 / 알람 요약 / 보존 정책 / 실행 저널 종료 (실행 주기당 한 번)"""
+    # 🚀 [EDGAR 인덱스] HWM 커밋 (중도 종료 시에는 처리 못 한 이벤트를 다음 실행에서 다시 읽도록 HWM 유지)
+    if EDGAR_INDEX.ready:
+        batch_upsert("analysis_cache", [{
+            "cache_key": "EDGAR_DAILY_INDEX_HWM",
+            "content": EDGAR_INDEX.dump_state(advance=not is_time_over),
+            "updated_at": datetime.now().isoformat()
+        }], on_conflict="cache_key")
+
+    # 🚀 [쓰기 버퍼] 분석 단계 종료: 알림 엔진이 DB에서 읽기 전에 전부 전송
+    WRITE_BUFFER.flush_all()
 
     # 모든 루프 종료 후 실행되는 후속 작업
-    run_premium_alert_engine(df)
+    run_journal_phase("alerts", lambda: run_premium_alert_engine(df))
+    WRITE_BUFFER.flush_all()
+    
+    run_journal_phase("alarm_summary", lambda: build_alarm_summaries(df))
+
+    batch_upsert("analysis_cache",[{"cache_key": "WORKER_LAST_RUN", "content": "alive", "updated_at": datetime.now().isoformat()}], on_conflict="cache_key")
+    WRITE_BUFFER.flush_all()
+
+    # 🧹 [보존 정책] 남은 실행 시간 안에서 analysis_cache 정리 (유니버스 = IPO 캘린더 전체 종목/회사명)
+    # 기본은 dry-run (삭제 예정만 출력). 실제 삭제는 RETENTION_MODE=delete로 켜고,
+    # 캘린더 구간이 하나라도 빠졌으면 유니버스 기준 삭제는 하지 않음 (나이 / 구버전 정책만 적용)
+    retention_mode = os.environ.get("RETENTION_MODE", "dry-run").lower()
+    retention_budget = min(RETENTION_BUDGET_SEC, MAX_RUN_TIME_SEC - (time.time() - started))
+    if retention_mode != "off" and not is_time_over and retention_budget > 30:
+        def _on_retention_deleted(keys):
+            DELTA_FILTER.forget("analysis_cache", keys)
+            CACHE_SNAPSHOT.evict(keys)
+        def _run_retention():
+            retention = RetentionJob(supabase, on_deleted=_on_retention_deleted)
+            failed_ranges = df.attrs.get("failed_ranges")
+            universe = Universe(df['symbol'].tolist(), df['name'].tolist(), complete=(failed_ranges == []))
+            if failed_ranges: print(f"⚠️ [보존 정책] IPO 캘린더 구간 누락({', '.join(failed_ranges)}) → 유니버스 기준 삭제 생략")
+            removed = retention.run(universe,
+                                    budget_sec=retention_budget, dry_run=(retention_mode == "dry-run"))
+            print(f"🧹 [보존 정책] {'삭제 예정' if retention_mode == 'dry-run' else '삭제'} {removed}행\n{retention.report()}")
+        run_journal_phase("retention", _run_retention)
+
+    # 🧾 [실행 저널] 시간 제한으로 중단된 실행은 interrupted로 남겨 다음 --resume 대상이 되도록
+    if RUN_JOURNAL:
+        if is_time_over: RUN_JOURNAL.interrupt("deadline")
+        else: RUN_JOURNAL.finish()
+
+def drain_and_checkpoint(reason, header=True):
+    """🛑 [협조적 취소] 종료 신호를 받았을 때 최소 정리: 남은 쓰기 전송 + 실행 저널 중단 기록 + 지문 매니페스트 저장"""
+    print(f"🛑 [협조적 취소] {reason}: 후속 단계 생략, 쓰기 전송 / 체크포인트 기록 후 종료")
+    # 취소된 실행 토큰 대신 새 토큰 아래에서 정리 (정리 중 대기가 Cancelled로 끊기지 않도록)
+    with cancellation.scope(CancelToken()):
+        WRITE_BUFFER.flush_all()
+        if RUN_JOURNAL and header: RUN_JOURNAL.interrupt(reason)
+        WRITE_BUFFER.flush_all()
+        DELTA_FILTER.save()
+
+def install_signal_handlers():
+    """SIGTERM / SIGINT → 실행 토큰 취소 (Actions 작업 취소 시 쓰기 도중 강제 종료되지 않도록). 두 번째 신호는 즉시 종료"""
+    def _handler(signum, frame):
+        if RUN_TOKEN.cancelled: raise KeyboardInterrupt
+        name = signal.Signals(signum).name
+        print(f"🛑 [협조적 취소] 종료 신호({name}) 수신: 실행 중인 단계를 정리하고 종료합니다.")
+        RUN_TOKEN.cancel(f"signal:{name}")
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, _handler)
+
+def finish_process():
+    """[프로세스 정리] 남은 쓰기 전송 / 지문 매니페스트 저장 / 통계 리포트"""
+    # 🚀 [티커 별칭] 이번 실행에서 발견한 우선주/유닛 별칭을 앱이 읽을 수 있도록 저장
+    new_alias_cnt = save_ticker_aliases()
+    if new_alias_cnt: print(f"🔗 [티커 별칭] 신규 별칭 {new_alias_cnt}개 저장")
+
+    WRITE_BUFFER.flush_all()
+    still_failed = BULK_WRITER.retry_failed()
+    # 실패 행까지 모두 전송됐으면 다음 주기(데몬 모드)의 저널 done은 다시 그대로 기록
+    if not still_failed: WRITE_BUFFER.clear_failures()
+    print(f"📦 {WRITE_BUFFER.report()} / [캐시 스냅샷] {CACHE_SNAPSHOT.stats}")
+    print(f"⏱️ [단계 그래프] 단계별 실행 통계\n{STAGE_EXECUTOR.report()}")
+    DELTA_FILTER.save()
+    print(f"📦 [델타 필터] 테이블별 전송/생략 통계\n{DELTA_FILTER.report()}")
+    print(f"📦 [대량 쓰기] 테이블별 전송 통계 (최종 실패 {still_failed}행)\n{BULK_WRITER.report()}")
+
+    # 🚀 [공시 본문 저장소] 적중률 리포트 및 로컬 용량 정리
+    pruned = FILING_STORE.prune()
+    print(f"📦 [공시 저장소] {FILING_STORE.stats} / 정리된 본문: {pruned}건")
+    print(f"\n🏁 모든 병렬 작업 및 요약 종료: {datetime.now()}")
+
+def main(resume=None, full=False, warm=None):
+    """분석 주기 1회. warm: 데몬 모드의 데워 둔 참조 데이터 {"calendar": WarmValue, "sec": WarmValue}"""
+    global RUN_JOURNAL, CHANGE_PLAN
+    print(f"🚀 Worker Process 시작: {datetime.now()}")
+    RUN_JOURNAL = open_run_journal(resume)
+    # 🧮 [XBRL 재무 엔진] 데몬 모드에서 이전 주기의 companyfacts 요약을 그대로 쓰지 않도록 주기마다 비움
+    clear_xbrl_cache()
+
+    if warm: df, target_df, alias_rows = prepare_cycle(calendar=warm["calendar"].get(), macro=False)
+    else: df, target_df, alias_rows = prepare_cycle()
+    if target_df is None: return
+    target_rows = [r for _, r in target_df.iterrows()]
+    cik_mapping, name_to_ticker_map = prepare_process(target_rows, alias_rows, sec_mapping=warm["sec"].get() if warm else None)
+
+    # 🔎 [변경 감지] 바뀐 단계가 하나도 없는 종목은 제출하지 않음
+    CHANGE_PLAN = None if full else build_change_plan(target_rows, cik_mapping, name_to_ticker_map)
+    if CHANGE_PLAN:
+        target_df = target_df[~target_df['symbol'].astype(str).map(CHANGE_PLAN.is_clean)]
+    total = len(target_df)
     
-    # ----------------------------------------------------
-    # 🚀 [수정] 결제 유도(Hooking)용 알람 집계 로직 (기간 확장)
-    # ----------------------------------------------------
+    # 🚀 [우선순위 스케줄러] 시간 제한에 걸려도 가치가 큰 종목이 먼저 끝나도록 점수 순으로 제출
+    priority_plan = build_priority_plan(target_df, load_priority_signals(target_df, cik_mapping, name_to_ticker_map))
+    print(f"📋 [우선순위] {priority_plan.report()}")
+    if RUN_JOURNAL:
+        RUN_JOURNAL.start([str(s) for s in target_df['symbol']])
+        print(f"🧾 [실행 저널] run_id = {RUN_JOURNAL.run_id} (중단 시: python worker.py --resume)")
+
+    print(f"\n🤖 Vertex AI 기반 병렬 심층 분석 시작 (총 {total}개 종목)...")
+    started = time.time()
+    is_time_over = run_ticker_pool(enumerate(priority_plan.rows(), 1), total, cik_mapping, name_to_ticker_map,
+                                   deadline=started + MAX_RUN_TIME_SEC,
+                                   on_start=lambda row: priority_plan.mark_started(str(row['symbol'])))
+    if is_time_over: print(f"📋 [우선순위] {priority_plan.unstarted_report()}")
+
+    if RUN_TOKEN.cancelled:
+        drain_and_checkpoint(RUN_TOKEN.reason)
+        return
+    finalize_cycle(df, started, is_time_over)
+    finish_process()
+
+def _lease_row(row, stages=None):
+    """배치 payload용 종목 행 (pandas 결측값 → None, 변경 감지 결과는 _stages)"""
+    out = {k: (None if not isinstance(v, (list, dict)) and pd.isna(v) else v) for k, v in dict(row).items()}
+    if stages is not None: out['_stages'] = stages
+    return out
+
+def main_sharded(cycle_id=None, full=False):
+    """🧩 [샤드 워커] 같은 cycle_id의 여러 프로세스가 worker_leases에서 종목 배치를 나눠 가져가 분석"""
+    global RUN_JOURNAL
+    started = time.time()
+    deadline = started + MAX_RUN_TIME_SEC
+    board = LeaseBoard(supabase, cycle_id).start()
+    print(f"🚀 Worker Process 시작 (샤드 모드): {datetime.now()} / cycle={board.cycle_id} holder={board.holder}")
+    # 같은 주기의 모든 프로세스가 cycle_id를 run_id로 같은 실행 저널에 기록
+    RUN_JOURNAL = open_run_journal(run_id=board.cycle_id)
+
+    # 1. 리더 락: 전역 단계와 배치 게시는 한 프로세스만 (리더가 죽으면 리스 만료 후 다른 프로세스가 리더를 이어받음)
+    df = None
+    cik_mapping = name_to_ticker_map = None
+    while True:
+        if board.acquire_leader():
+            print("👑 [샤드 워커] 리더 락 획득: 전역 단계 실행 후 배치 게시")
+            df, target_df, alias_rows = prepare_cycle()
+            if target_df is None:
+                board.complete(LEADER_UNIT, json.dumps({"batches": 0}))
+                break
+            target_rows = [r for _, r in target_df.iterrows()]
+            cik_mapping, name_to_ticker_map = prepare_process(target_rows, alias_rows)
+            # 🔎 [변경 감지] 리더가 한 번만 점검하고 dirty 단계를 배치 행에 실어 보냄
+            change_plan = None if full else build_change_plan(target_rows, cik_mapping, name_to_ticker_map)
+            if change_plan:
+                target_df = target_df[~target_df['symbol'].astype(str).map(change_plan.is_clean)]
+            priority_plan = build_priority_plan(target_df, load_priority_signals(target_df, cik_mapping, name_to_ticker_map))
+            print(f"📋 [우선순위] {priority_plan.report()}")
+            rows = [_lease_row(r, change_plan.stages_for(str(r['symbol'])) if change_plan else None) for r in priority_plan.rows()]
+            published = board.publish(make_batches(rows, SHARD_BATCH_SIZE))
+            if RUN_JOURNAL: RUN_JOURNAL.start([str(r.get('symbol')) for r in rows])
+            # stock_cache 등 전역 단계 결과를 다른 프로세스가 읽기 전에 전송
+            WRITE_BUFFER.flush_all()
+            board.complete(LEADER_UNIT, json.dumps({"batches": published, "tickers": len(rows)}))
+            print(f"📦 [샤드 워커] 배치 {published}개 게시 (종목 {len(rows)}개 / 배치당 {SHARD_BATCH_SIZE}개)")
+            break
+        state = board.leader_state()
+        if state and state.get("status") == "done": break
+        if time.time() > deadline or RUN_TOKEN.cancelled:
+            print("⏳ [샤드 워커] 리더의 배치 게시를 기다리다 시간 제한 / 종료 신호 도달")
+            board.stop()
+            return
+        print(f"⏳ [샤드 워커] 리더({(state or {}).get('holder')})의 배치 게시 대기 중...")
+        RUN_TOKEN.wait(SHARD_POLL_SEC)
+
+    if cik_mapping is None:
+        try: alias_rows = fetch_all_rows(supabase, "stock_cache", "symbol, name", order="symbol", workers=4)
+        except Exception as e:
+            print(f"⚠️ 기존 Ticker 로드 실패: {e}")
+            alias_rows = []
+        cik_mapping, name_to_ticker_map = prepare_process(board.all_batch_rows(), alias_rows, backfill=False)
+
+    # 2. 배치 리스 → 분석 → 완료 표시. 가져갈 배치가 없으면 다른 프로세스의 배치가 끝나거나 만료(회수)될 때까지 대기
+    is_time_over = False
+    done_tickers = 0
+    while True:
+        if time.time() > deadline or RUN_TOKEN.cancelled:
+            is_time_over = True
+            break
+        claim = board.claim_batch()
+        if claim is None:
+            progress = board.progress()
+            if not progress.get("pending") and not progress.get("leased"): break
+            print(f"⏳ [샤드 워커] 남은 배치 없음, 다른 프로세스 진행 대기 {progress}")
+            RUN_TOKEN.wait(SHARD_POLL_SEC)
+            continue
+        unit, rows, attempts = claim
+        print(f"\n📦 [샤드 워커] {unit} 리스 획득 ({len(rows)}개 종목{', 회수 ' + str(attempts) + '회차' if attempts > 1 else ''})")
+        ranked = [(done_tickers + i, row) for i, row in enumerate(rows, 1)]
+        is_time_over = run_ticker_pool(ranked, "?", cik_mapping, name_to_ticker_map, deadline,
+                                       should_run=lambda row, unit=unit: not board.is_lost(unit))
+        done_tickers += len(rows)
+        # 완료 표시 전에 결과부터 전송 (완료로 보인 배치의 결과가 유실되지 않도록)
+        WRITE_BUFFER.flush_all()
+        # 🚀 [EDGAR 인덱스] 이 프로세스의 점검 / 실패 CIK도 완료 표시 전에 남김 (HWM은 후속 단계를 맡은 프로세스가 모두 합쳐서 커밋)
+        if EDGAR_INDEX.ready:
+            try: board.put_note("edgar", EDGAR_INDEX.marks())
+            except Exception as e: print(f"⚠️ [샤드 워커] EDGAR 점검 기록 저장 실패: {e}")
+        if is_time_over:
+            board.release(unit)
+            break
+        if not board.complete(unit):
+            print(f"⚠️ [샤드 워커] {unit} 리스를 잃어 완료 표시 생략 (회수한 프로세스가 다시 처리)")
+
+    # 종료 신호: 배치 리스는 위에서 반납했으므로 다른 프로세스가 이어받음. 주기 헤더는 다른 프로세스 몫이라 기록하지 않음
+    if RUN_TOKEN.cancelled:
+        board.stop()
+        drain_and_checkpoint(RUN_TOKEN.reason, header=False)
+        return
+
+    # 3. 전역 후속 단계는 주기당 한 프로세스만
+    def _finish():
+        # 다른 샤드에서 실패한 CIK가 전수 점검 목록에 남은 채 HWM만 넘어가지 않도록 모든 프로세스의 기록을 합침
+        if EDGAR_INDEX.ready:
+            for note in board.notes("edgar"): EDGAR_INDEX.merge_marks(note)
+        finalize_cycle(df if df is not None else get_target_stocks(), started, is_time_over)
+    try:
+        ran = board.run_once("finish", _finish)
+        print(f"🏁 [샤드 워커] 후속 단계 {'실행' if ran else '생략 (다른 프로세스가 실행)'}")
+    except Exception as e:
+        print(f"⚠️ [샤드 워커] 후속 단계 실패 (다른 프로세스가 재시도): {e}")
+    board.stop()
+    print(f"🧩 [샤드 워커] {board.report()}")
+    finish_process()
+
+def launch_shards(n, cycle_id=None):
+    """🧩 로컬에서 샤드 워커 프로세스 n개 실행 (같은 cycle_id)"""
+    import subprocess
+    import sys
+    env = dict(os.environ, WORKER_CYCLE_ID=cycle_id or default_cycle_id())
+    print(f"🧩 [샤드 워커] 프로세스 {n}개 실행 (cycle={env['WORKER_CYCLE_ID']})")
+    procs = [subprocess.Popen([sys.executable, "-u", os.path.abspath(__file__), "--sharded"], env=env) for _ in range(n)]
+    codes = [p.wait() for p in procs]
+    print(f"🏁 [샤드 워커] 종료 코드: {codes}")
+    return max(codes) if codes else 0
+
+# ==========================================
+# 🛰️ [데몬 모드] python worker.py --daemon
+# ==========================================
+# cron 실행(하루 4번 worker.py + 15분마다 price_worker.py)과 같은 작업을 한 프로세스에서 스케줄하고,
+# SEC 매핑 / IPO 캘린더 / 클라이언트 / 인덱스를 데워 둔 채로 재사용합니다. 분석 주기 사이에는
+#   - 신규 8-K (EDGAR 인덱스 + 실시간 피드) → 해당 종목의 공시 / 요약 단계만
+#   - 주가 급등락 (마지막 기준가 대비 SURGE_TRIGGER_PCT 이상) → 요약 단계만
+# 을 이벤트로 모아 debounce 후 바로 실행합니다. 1회 실행 CLI(cron용)는 그대로 유지됩니다.
+DAEMON_ANALYSIS_HOURS_UTC = (0, 6, 12, 18)   # daily_worker.yml cron과 같은 시각
+DAEMON_PRICE_SEC = 15 * 60                   # price_update.yml과 같은 주기
+DAEMON_MACRO_SEC = 6 * 3600
+DAEMON_EDGAR_SEC = 10 * 60
+DAEMON_CALENDAR_TTL_SEC = 3 * 3600
+DAEMON_SEC_MAP_TTL_SEC = 24 * 3600
+DAEMON_EVENT_DEBOUNCE_SEC = 120
+DAEMON_STATUS_SEC = 30 * 60
+SURGE_TRIGGER_PCT = 10.0
+
+def _load_calendar():
+    df = get_target_stocks()
+    return df if not df.empty else None   # 빈 응답이면 이전 캘린더 유지
+
+def _load_sec_mapping():
+    mapping = get_sec_master_mapping()
+    return mapping if mapping[0] else None
+
+def run_event_batch(events, warm):
+    """🛰️ [데몬] 이벤트 종목만 지정 단계로 분석 (events: {ticker: {"reasons", "stages"}})"""
+    global RUN_JOURNAL, CHANGE_PLAN
+    df = warm["calendar"].get()
+    if df is None: return
+    rows = {str(r['symbol']): r for _, r in df.iterrows() if str(r['symbol']) in events}
+    if not rows: return
+    print(f"\n🛰️ [데몬] 이벤트 분석 {len(rows)}개 종목: " +
+          ", ".join(f"{t}({'/'.join(sorted(set(events[t]['reasons'])))})" for t in rows))
+    RUN_JOURNAL = open_run_journal()
+    CHANGE_PLAN = None
+    cik_mapping, name_to_ticker_map = prepare_process(list(rows.values()), [], backfill=False, sec_mapping=warm["sec"].get())
+    ranked = [(i, {**dict(r), '_stages': sorted(events[t]['stages'])}) for i, (t, r) in enumerate(rows.items(), 1)]
+    if RUN_JOURNAL: RUN_JOURNAL.start(list(rows))
+    is_time_over = run_ticker_pool(ranked, len(ranked), cik_mapping, name_to_ticker_map, deadline=time.time() + MAX_RUN_TIME_SEC)
+    WRITE_BUFFER.flush_all()
+    if RUN_JOURNAL:
+        if is_time_over: RUN_JOURNAL.interrupt(RUN_TOKEN.reason or "deadline")
+        else: RUN_JOURNAL.finish()
+    WRITE_BUFFER.flush_all()
+
+def main_daemon():
+    """🛰️ [데몬 모드] 스케줄러가 종료 신호를 받을 때까지 작업 실행"""
+    import price_worker   # FMP 일괄 시세 작업 (같은 프로세스에서 재사용)
+
+    print(f"🛰️ Worker Daemon 시작: {datetime.now()}")
+    warm = {"calendar": WarmValue("IPO 캘린더", _load_calendar, DAEMON_CALENDAR_TTL_SEC),
+            "sec": WarmValue("SEC 매핑", _load_sec_mapping, DAEMON_SEC_MAP_TTL_SEC)}
+    scheduler = Scheduler(RUN_TOKEN)
+    surge_base = {}        # 티커 → 마지막 트리거(또는 최초 관측) 기준가
+    seen_filings = set()   # 이미 트리거한 공시 접수번호
+    edgar_seeded = [False]
+
+    def price_job():
+        name_map = (warm["sec"].get() or ({}, {}))[1]
+        for row in price_worker.fetch_and_update_prices(sec_map=name_map or None) or []:
+            ticker, price = str(row["ticker"]), float(row["price"])
+            base = surge_base.setdefault(ticker, price)
+            if base > 0 and abs(price / base - 1) * 100 >= SURGE_TRIGGER_PCT:
+                scheduler.trigger(ticker, f"price {price / base - 1:+.0%}", stages_for_event(feeds=["news"]))
+                surge_base[ticker] = price
+
+    def edgar_job():
+        df, mapping = warm["calendar"].get(), warm["sec"].get()
+        if df is None or not mapping: return
+        cik_mapping, name_to_ticker_map = mapping
+        cik_to_ticker = {}
+        for _, r in df.iterrows():
+            official = name_to_ticker_map.get(normalize_company_name(r.get('name')), r.get('symbol'))
+            for sym in [official, r.get('symbol')]:
+                if cik_mapping.get(sym): cik_to_ticker[cik_mapping[sym]] = str(r['symbol'])
+        try:
+            res_hwm = cached_select("EDGAR_DAILY_INDEX_HWM")
+            EDGAR_INDEX.load_state(res_hwm.data[0]['content'] if res_hwm.data else None)
+        except Exception as e:
+            print(f"⚠️ [데몬] EDGAR HWM 조회 실패 (메모리 상태로 진행): {e}")
+        events = EDGAR_INDEX.refresh(set(cik_to_ticker) | set(EDGAR_INDEX.covered.keys()))
+        for cik, items in events.items():
+            for form, accession, _ in items:
+                if accession in seen_filings: continue
+                seen_filings.add(accession)
+                # 처음 한 번은 기준선만 (HWM 이후 공시는 다음 분석 주기가 처리)
+                if edgar_seeded[0] and cik in cik_to_ticker and form.upper().startswith("8-K"):
+                    scheduler.trigger(cik_to_ticker[cik], f"{form} {accession}", stages_for_event(form, feeds=["press"]))
+        edgar_seeded[0] = True
+
+    def status_job():
+        print(f"🛰️ [데몬 상태] {datetime.now()}\n{scheduler.report()}\n"
+              f"참조 데이터: 캘린더 {warm['calendar'].loads}회 / SEC 매핑 {warm['sec'].loads}회 로드 | "
+              f"{STAGE_EXECUTOR.status()} | {WRITE_BUFFER.status()}")
+
+    (scheduler
+     .every("macro", update_global_macro_and_events, DAEMON_MACRO_SEC)
+     .every("calendar", lambda: warm["calendar"].get(force=True), DAEMON_CALENDAR_TTL_SEC)
+     .every("price", price_job, DAEMON_PRICE_SEC)
+     .every("edgar", edgar_job, DAEMON_EDGAR_SEC, group="tickers")   # EDGAR_INDEX를 분석 주기와 공유
+     .at_hours("analysis", lambda: main(warm=warm), DAEMON_ANALYSIS_HOURS_UTC, group="tickers")
+     .on_events("events", lambda events: run_event_batch(events, warm), DAEMON_EVENT_DEBOUNCE_SEC, group="tickers")
+     .every("status", status_job, DAEMON_STATUS_SEC, run_now=False))
+    scheduler.run_forever(drain_sec=DRAIN_GRACE_SEC)
+
+    print(f"🛰️ [데몬] 종료 ({RUN_TOKEN.reason})\n{scheduler.report()}")
+    drain_and_checkpoint(RUN_TOKEN.reason or "daemon stop", header=False)
+
+# ==========================================
+# 🧮 [실행 계획 미리보기] worker.py --plan
+# ==========================================
+# 프롬프트 / 버전 접미사를 바꾸기 전에 다음 실행의 비용을 확인합니다. 타겟 선별 / 변경 감지(FMP 피드 제외) /
+# SEC 매핑 / EDGAR 인덱스는 실제 실행과 같게 읽고, 단계는 실행하지 않습니다. (DB 쓰기 / FMP / LLM 호출 없음)
+# 단계 프로필: 단계가 읽는 FMP 캐시(API 종류, 신선도 정책 소스) / 캐시 없는 직접 요청(호스트별 수) / LLM 산출물
+#   산출물: key / tracker = 리포트 · 트래커 키 템플릿 ({ticker} {company} {topic} {lang}, 존재 확인은 ko 키)
+#           inputs = 판단에 쓰는 FMP 캐시 (기본: 단계의 fmp) / forms = EDGAR 신규 공시로 판단 / calls = 언어당 호출 수
+#           tokens = 호출당 (입력, 출력) 토큰 추정 / http = 실행될 때 추가 요청 / expand(t) = 토픽별 변형
+# 리포트 키 이름(버전 접미사)을 바꾸면 여기 템플릿도 같이 바꿔야 미리보기에 재생성 호출이 잡힙니다.
+PLAN_MODELS = {
+    # 단가: 1M 토큰당 달러 (공개 단가 기준, 바뀌면 수정) / call_usd: 검색 그라운딩 호출당 요금
+    "strict": {"name": "gemini-2.5-flash", "host": "us-central1-aiplatform.googleapis.com", "in_usd": 0.30, "out_usd": 2.50, "call_usd": 0.0},
+    "search": {"name": "gemini-2.0-flash", "host": "generativelanguage.googleapis.com", "in_usd": 0.10, "out_usd": 0.40, "call_usd": 0.035},
+}
+PLAN_SEC_HOST = "data.sec.gov"
+SMART_MONEY_CACHES = [("SMART_IN", "smart_money"), ("SMART_INST", "smart_money"), ("SMART_SENATE", "smart_money"), ("SMART_FTD", "smart_money")]
+
+def _plan_tab0_topics(t):
+    topics, gated = tab0_target_topics(t.get("status"), t.get("date"))
+    topics = [tp for tp in topics if not FRESHNESS.frozen(SEC_TOPIC_SOURCES.get(tp, "sec_periodic"), state=t["lifecycle"])]
+    return [{"topic": topic, "forms": tab0_priority_targets(topic),
+             # BS/IS/CF는 XBRL 수치 블록, 나머지는 공시 본문 10만 자(약 2.5만 토큰)
+             "tokens": (3000, 1500) if topic in ["BS", "IS", "CF"] else (26000, 2000),
+             "probe": {} if gated else {"financialmodelingprep.com": 1}} for topic in topics]
+
+def _plan_twitter(t):
+    try: return [{}] if (datetime.now().date() - pd.to_datetime(t.get("date")).date()).days <= 3 else []
+    except Exception: return [{}]
+
+PLAN_PROFILES = {
+    "tab1": {"sec": 60, "fmp": [("PROFILE", "profile"), ("RAW_NEWS_15", "news"), ("RAW_PR", "press")], "products": [
+        {"key": "{ticker}_Tab1_v5_{lang}", "tracker": "{ticker}_Tab1_Main_RawTracker", "model": "strict",
+         "inputs": [("PROFILE", "profile"), ("RAW_NEWS_15", "news")], "tokens": (6000, 1500)},
+        {"key": "{ticker}_PressReleaseSummary_v1_{lang}", "tracker": "{ticker}_PressRelease_RawTracker", "model": "strict",
+         "inputs": [("RAW_PR", "press")], "tokens": (3000, 600)},
+    ]},
+    "tab0": {"sec": 120, "products": [
+        {"key": "{company}_8-K_Tab0_v16_{lang}", "tracker": "{ticker}_8K_LastAccNum", "model": "strict", "forms": ["8-K", "8-K/A"],
+         "expand": lambda t: [] if FRESHNESS.frozen("sec_8k", state=t["lifecycle"]) else [{}],
+         "tokens": (26000, 1500), "http": {"financialmodelingprep.com": 2}},
+        {"key": "{company}_{topic}_Tab0_v16_{lang}", "tracker": "{company}_{topic}_LastAccNum", "model": "strict",
+         "expand": _plan_tab0_topics, "tokens": (26000, 2000), "http": {"financialmodelingprep.com": 2}},
+    ]},
+    "tab0_premium": {"sec": 30, "fmp": [("RAW_EARNINGS_CALL", "earnings_call")], "http": {"financialmodelingprep.com": 1}, "products": [
+        {"key": "{ticker}_PremiumEarningsCall_v1_{lang}", "tracker": "{ticker}_PremiumEC_RawTracker", "model": "strict", "tokens": (15000, 1200)},
+    ]},
+    "tab2_esg": {"sec": 20, "fmp": [("RAW_ESG", "esg")], "products": [
+        {"key": "{ticker}_PremiumESG_v1_{lang}", "tracker": "{ticker}_PremiumESG_RawTracker", "model": "strict", "tokens": (2000, 600)},
+    ]},
+    "analyst": {"sec": 3, "http": {"financialmodelingprep.com": 2}},
+    "tab4": {"sec": 60, "products": [
+        {"key": "{ticker}_Tab4_v4_Premium_{lang}", "tracker": "{ticker}_Tab4_Analyst_RawTracker", "model": "search", "tokens": (3000, 1500)},
+    ]},
+    "tab4_ma": {"sec": 20, "fmp": [("RAW_MA_HISTORY", "ma")], "products": [
+        {"key": "{ticker}_PremiumMA_v1_{lang}", "tracker": "{ticker}_PremiumMA_RawTracker", "model": "strict", "tokens": (2000, 600)},
+    ]},
+    "tab4_premium": {"sec": 30, "fmp": [("RAW_UPGRADES", "upgrades"), ("RAW_PEERS", "peers")], "products": [
+        {"key": "{ticker}_PremiumUpgrades_v1_{lang}", "tracker": "{ticker}_PremiumUpgrades_RawTracker", "model": "strict",
+         "inputs": [("RAW_UPGRADES", "upgrades")], "tokens": (2000, 500)},
+        {"key": "{ticker}_PremiumPeers_v1_{lang}", "tracker": "{ticker}_PremiumPeers_RawTracker", "model": "strict",
+         "inputs": [("RAW_PEERS", "peers")], "tokens": (2000, 500)},
+    ]},
+    "financials": {"sec": 5, "http": {"financialmodelingprep.com": 5}},
+    "tab3": {"sec": 90, "http": {PLAN_SEC_HOST: 1}, "products": [
+        # 언어마다 요약 1회 + 전체 리포트 1회
+        {"key": "{ticker}_Tab3_v2_Premium_{lang}", "tracker": "{ticker}_Tab3_Financial_RawTracker", "model": "strict",
+         "calls": 2, "tokens": (3500, 1200)},
+    ]},
+    "tab3_premium": {"sec": 30, "fmp": [("RAW_SURPRISE", "surprise"), ("RAW_ESTIMATE", "estimate")], "products": [
+        {"key": "{ticker}_PremiumSurprise_v1_{lang}", "tracker": "{ticker}_PremiumSurprise_RawTracker", "model": "strict",
+         "inputs": [("RAW_SURPRISE", "surprise")], "tokens": (1500, 500)},
+        {"key": "{ticker}_PremiumEstimate_v1_{lang}", "tracker": "{ticker}_PremiumEstimate_RawTracker", "model": "strict",
+         "inputs": [("RAW_ESTIMATE", "estimate")], "tokens": (1500, 500)},
+    ]},
+    "tab3_revenue": {"sec": 20, "fmp": [("RAW_REVENUE_SEGMENT", "revenue_segment")], "products": [
+        {"key": "{ticker}_PremiumRevenueSeg_v1_{lang}", "tracker": "{ticker}_PremiumRevenueSeg_RawTracker", "model": "strict", "tokens": (2000, 600)},
+    ]},
+    "smart_money": {"sec": 4, "fmp": SMART_MONEY_CACHES},
+    "tab6": {"sec": 30, "products": [
+        {"key": "{ticker}_Tab6_SmartMoney_v1_{lang}", "tracker": "{ticker}_Tab6_SmartMoney_RawTracker", "model": "strict",
+         "inputs": SMART_MONEY_CACHES, "tokens": (2500, 800)},
+    ]},
+    # 트위터: 상장 3일 이내만, 보내지 않은 언어마다 1건 (언어 사이 30초 대기)
+    "twitter": {"sec": 95, "products": [
+        {"key": "{ticker}_Twitter_Sent_Tracker_{lang}", "per_lang": True, "langs": ["en", "ko", "ja", "zh"],
+         "expand": _plan_twitter, "http": {"api.twitter.com": 1}},
+    ]},
+}
+
+def load_stage_durations(days=7, limit=20000):
+    """실행 저널의 최근 done 단계 평균 소요 시간 {단계: 초} (없는 단계는 프로필 기본값)"""
+    durations = {stage: prof.get("sec", 0) for stage, prof in PLAN_PROFILES.items()}
+    since = (datetime.now() - timedelta(days=days)).isoformat()
+    try:
+        res = (supabase.table(JOURNAL_TABLE).select("stage, duration_sec").eq("status", "done").neq("ticker", RUN_TICKER)
+               .gte("updated_at", since).order("updated_at", desc=True).limit(limit).execute())
+        sums = {}
+        for r in res.data or []:
+            if r.get("duration_sec") is None: continue
+            total, cnt = sums.get(r["stage"], (0.0, 0))
+            sums[r["stage"]] = (total + float(r["duration_sec"]), cnt + 1)
+        durations.update({stage: total / cnt for stage, (total, cnt) in sums.items() if cnt})
+        print(f"⏱️ [실행 계획] 실행 저널 최근 {days}일 단계 소요 시간 {sum(c for _, c in sums.values())}건 사용")
+    except Exception as e:
+        print(f"⚠️ [실행 계획] 실행 저널 소요 시간 조회 실패 (프로필 기본값 사용): {e}")
+    return durations
+
+def run_plan(json_path=None, full=False):
+    """🧮 [실행 계획 미리보기] 다음 실행의 예상 HTTP 요청 / LLM 호출 · 토큰 · 비용 / 소요 시간 (표 + JSON)"""
+    global RUN_JOURNAL
+    print(f"🧮 [실행 계획] 미리보기 시작 (DB 쓰기 / FMP / LLM 호출 없음): {datetime.now()}")
+    df = get_target_stocks()
+    if df.empty:
+        print("⚠️ 수집된 IPO 종목이 없습니다.")
+        return None
+    target_df = select_target_df(df)
+    target_rows = [r for _, r in target_df.iterrows()]
+    try: alias_rows = fetch_all_rows(supabase, "stock_cache", "symbol, name", order="symbol", workers=4)
+    except Exception: alias_rows = []
+    cik_mapping, name_to_ticker_map = prepare_process(target_rows, alias_rows, backfill=False)
+
+    RUN_JOURNAL = open_run_journal()   # 변경 감지의 마지막 완료 시각 조회용 (기록하지 않음)
+    change_plan = None if full else build_change_plan(target_rows, cik_mapping, name_to_ticker_map, offline=True)
+
+    # 종목별 실행 단계 (입력 전용 단계 포함)
+    targets = []
+    for row in target_rows:
+        sym = str(row.get('symbol'))
+        official = name_to_ticker_map.get(normalize_company_name(row.get('name')), sym)
+        planned = change_plan.stages_for(sym) if change_plan else None
+        stages = TICKER_STAGES if planned is None else [s for s in TICKER_STAGES if s in planned]
+        if not stages: continue
+        if len(stages) < len(TICKER_STAGES): stages = list(TICKER_GRAPH.subgraph(stages).stages)
+        targets.append(({
+            "ticker": sym, "official": official, "company": row.get('name'),
+            "symbols": list(dict.fromkeys([official, get_base_ticker(official)])),
+            "cik": cik_mapping.get(official) or cik_mapping.get(sym),
+            "status": row.get('status', 'Active'), "date": row.get('date', None),
+            "lifecycle": lifecycle_state(row.get('status', 'Active'), row.get('date')),
+        }, stages))
+
+    # 키 시각만 선로딩 (content 없이)
+    snapshot = CacheSnapshot(supabase, columns="cache_key, updated_at")
+    def key_time(key):
+        _, row = snapshot.lookup(key)
+        return parse_time(row.get("updated_at")) if row else None
+
+    planner = RunPlanner(PLAN_PROFILES, PLAN_MODELS, SUPPORTED_LANGS.keys(), key_time, edgar=EDGAR_INDEX,
+                         cadence=lambda source, t: FRESHNESS.hours(source, state=t["lifecycle"]))
+    keys = [k for t, stages in targets for k in planner.keys_for(t, stages)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(snapshot.preload, [keys[i:i + 2000] for i in range(0, len(keys), 2000)]))
+    print(f"🗝️ [실행 계획] analysis_cache 키 {len(keys)}개 시각 조회 ({snapshot.stats['queries']}회)")
+
+    plan = RunPlan()
+    for t, stages in targets:
+        planner.plan_ticker(plan, t, stages)
+    planner.estimate_wall(plan, TICKER_GRAPH, load_stage_durations(), STAGE_EXECUTOR.pool_name, STAGE_POOLS,
+                          STAGE_LIMITS, TICKER_CONCURRENCY, MAX_RUN_TIME_SEC)
+    if change_plan is None:
+        plan.notes.append("ℹ️ 변경 감지 없이 모든 단계를 실행하는 것으로 계산 (--full / 변경 감지 꺼짐 / 실패)")
+    else:
+        plan.notes.append(f"ℹ️ 변경 감지 (FMP 피드 제외 → 뉴스 / 등급 / 실적 연결 단계는 마지막 완료 이후면 실행으로 계산): "
+                          f"{len(target_rows) - len(targets)}개 종목 생략")
+
+    print(f"\n🧮 [실행 계획]\n{plan.table()}")
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f: f.write(plan.to_json())
+        print(f"💾 [실행 계획] JSON 저장: {json_path}")
+    else:
+        print(plan.to_json())
+    return plan
+
+def build_alarm_summaries(df):
     print("\n📊 Generating Market Intelligence Summaries (Alarm Summaries)...")
     
     # "최근 24시간" 대신 "최근 7일"로 기간을 넓혀서 활성화된 모든 신호를 긁어옵니다.
@@ -4499,18 +5547,17 @@ def main():
     global_total = 0
     global_surge_counts = {"1W": 0, "4W": 0, "3M": 0}
     
+    ticker_activity = None
     try:
-        # 1. 최근 7일 내 발생하여 유지 중인 전체 알림 개수 (created_at 기준)
-        res_today = supabase.table("premium_alerts").select("id", count="exact").gte("created_at", target_time_marketing).execute()
-        global_total = res_today.count if res_today.count else 0
+        # 1. 최근 7일 내 발생하여 유지 중인 알림 종류별 개수 (created_at 기준, 서버 집계 1회)
+        type_counts = get_alert_type_counts(target_time_marketing)
+        global_total = sum(type_counts.values())
         
-        # 2. 최근 7일 내 발생하여 유지 중인 급등 알림 종류별 개수 (created_at 기준)
-        res_surge = supabase.table("premium_alerts").select("alert_type").in_("alert_type", ["SURGE_1W", "SURGE_4W", "SURGE_3M"]).gte("created_at", target_time_marketing).execute()
-        if res_surge.data:
-            for a in res_surge.data:
-                if a['alert_type'] == "SURGE_1W": global_surge_counts["1W"] += 1
-                elif a['alert_type'] == "SURGE_4W": global_surge_counts["4W"] += 1
-                elif a['alert_type'] == "SURGE_3M": global_surge_counts["3M"] += 1
+        # 2. 그중 급등 알림 종류별 개수
+        global_surge_counts = {"1W": type_counts.get("SURGE_1W", 0), "4W": type_counts.get("SURGE_4W", 0), "3M": type_counts.get("SURGE_3M", 0)}
+
+        # 3. 종목별 최근 7일 알림 수/종류 (종목마다 조회하던 것을 한 번에)
+        ticker_activity = get_alert_ticker_activity(target_time_marketing)
     except Exception as e:
         print(f"⚠️ 글로벌 알람 통계 집계 실패: {e}")
     
@@ -4521,10 +5568,35 @@ def main():
     
     # 3. 새로운 파라미터(global_surge_counts)를 넣어 캐싱 함수 호출
     for ticker in all_symbols:
-        update_alarm_summary_cache(ticker, global_total, global_surge_counts)
-
-    batch_upsert("analysis_cache",[{"cache_key": "WORKER_LAST_RUN", "content": "alive", "updated_at": datetime.now().isoformat()}], on_conflict="cache_key")
-    print(f"\n🏁 모든 병렬 작업 및 요약 종료: {datetime.now()}")
+        update_alarm_summary_cache(ticker, global_total, global_surge_counts, ticker_activity)
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="IPO 분석 워커")
+    parser.add_argument("--resume", nargs="?", const="latest", default=None, metavar="RUN_ID",
+                        help="중단된 실행을 이어서 실행 (RUN_ID 생략 시 마지막 미완료 실행)")
+    parser.add_argument("--sharded", action="store_true",
+                        help="샤드 모드: 같은 cycle_id(WORKER_CYCLE_ID / GITHUB_RUN_ID)의 프로세스들과 종목 배치를 나눠 처리")
+    parser.add_argument("--workers", type=int, default=0, help="샤드 워커 프로세스 N개를 로컬에서 실행")
+    parser.add_argument("--full", action="store_true", help="변경 감지 사전 점검 없이 모든 종목의 모든 단계 실행")
+    parser.add_argument("--cycle-id", default=None, help="샤드 모드 실행 주기 ID (기본: WORKER_CYCLE_ID / GITHUB_RUN_ID / 현재 시각)")
+    parser.add_argument("--daemon", action="store_true",
+                        help="데몬 모드: 매크로 / 캘린더 / 주가 / 분석 작업을 내부 스케줄로 실행 + 8-K / 급등 이벤트 트리거 (cron 대신)")
+    parser.add_argument("--plan", nargs="?", const="", default=None, metavar="JSON_PATH",
+                        help="실행 계획 미리보기: 유료 API 호출 없이 예상 HTTP 요청 / LLM 호출 · 토큰 · 비용 / 소요 시간 (JSON_PATH 생략 시 표 + JSON 출력)")
+    args = parser.parse_args()
+    if args.plan is not None:
+        raise SystemExit(0 if run_plan(args.plan or None, full=args.full) else 1)
+    if args.workers > 0:
+        raise SystemExit(launch_shards(args.workers, args.cycle_id))
+    install_signal_handlers()
+    try:
+        if args.daemon:
+            main_daemon()
+        elif args.sharded:
+            main_sharded(args.cycle_id, full=args.full)
+        else:
+            main(resume=args.resume, full=args.full)
+    except Cancelled as e:
+        # 후속 단계 도중 종료 신호 → 남은 쓰기 / 체크포인트만 정리
+        drain_and_checkpoint(e.reason, header=not args.sharded)